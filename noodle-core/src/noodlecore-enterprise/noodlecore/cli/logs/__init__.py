@@ -22,8 +22,10 @@ This module contains comprehensive logging and monitoring components for the Noo
 """
 
 from .logger import Logger, LogLevel, LogFormat, LogOutput, LoggingException, get_logger, reset_logger
+from .log_pipeline import LogPipeline, LogRingBuffer, OverflowPolicy
 from .audit_trail import (
     AuditTrail, 
+    AuditIndex,
     AuditEventType, 
     AuditLevel, 
     CryptographicSigner,
@@ -47,6 +49,8 @@ from .metrics_collector import (
     AggregatedMetric,
     MetricsException
 )
+from .metrics_storage import ColumnarMetricStore, RollupBucket
+from .metrics_accumulator import ShardedMetricAccumulator
 from .log_analyzer import (
     LogAnalyzer,
     LogLevel as AnalyzerLogLevel,
@@ -93,9 +97,13 @@ __all__ = [
     "LoggingException",
     "get_logger",
     "reset_logger",
+    "LogPipeline",
+    "LogRingBuffer",
+    "OverflowPolicy",
     
     # Audit Trail
     "AuditTrail",
+    "AuditIndex",
     "AuditEventType",
     "AuditLevel",
     "CryptographicSigner",
@@ -118,6 +126,9 @@ __all__ = [
     "MetricValue",
     "AggregatedMetric",
     "MetricsException",
+    "ColumnarMetricStore",
+    "RollupBucket",
+    "ShardedMetricAccumulator",
     
     # Log Analyzer
     "LogAnalyzer",
@@ -277,8 +288,8 @@ async def shutdown_logging_system(components: Dict[str, Any]) -> None:
                 elif component_name == 'storage_manager':
                     await component.stop_maintenance()
                 elif component_name == 'audit_trail':
-                    # Audit trail doesn't have explicit shutdown
-                    pass
+                    # Commit buffered audit entries
+                    await component.close()
         
         print("Logging system shutdown completed")
         
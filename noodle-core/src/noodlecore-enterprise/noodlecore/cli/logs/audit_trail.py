@@ -16,24 +16,26 @@ It includes cryptographic signatures, AI interaction tracking, and tamper-eviden
 """
 
 import asyncio
+import atexit
 import hashlib
-import hmac
 import json
+import logging
 import os
+import sqlite3
 import time
 from datetime import datetime, timedelta
 from enum import Enum
 from pathlib import Path
-from typing import Dict, Any, Optional, List, Union
+from typing import Dict, Any, Optional, List, Set, Tuple, Union
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.asymmetric import padding, rsa
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.backends import default_backend
 from cryptography.fernet import Fernet
 import base64
 
 from ..cli_config import get_cli_config
 
+logger = logging.getLogger(__name__)
 
 # Error codes for audit trail system (5101-5200)
 class AuditErrorCodes:
@@ -70,6 +72,42 @@ class AuditLevel(Enum):
     CRITICAL = "critical"
 
 
+# Hash chain constants
+GENESIS_HASH = '0' * 64
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_COMMIT_INTERVAL = 0.5
+
+
+def compute_entry_hash(canonical_entry: str) -> str:
+    """Hash a canonical (sorted, compact) JSON entry as a Merkle leaf."""
+    return hashlib.sha256(b'\x00' + canonical_entry.encode('utf-8')).hexdigest()
+
+
+def compute_merkle_root(entry_hashes: List[str]) -> str:
+    """
+    Compute the Merkle root over a batch of entry hashes.
+    
+    Interior nodes are domain-separated from leaves and an odd node is
+    paired with itself.
+    """
+    if not entry_hashes:
+        return GENESIS_HASH
+    
+    level = [bytes.fromhex(h) for h in entry_hashes]
+    while len(level) > 1:
+        if len(level) % 2:
+            level.append(level[-1])
+        level = [
+            hashlib.sha256(b'\x01' + level[i] + level[i + 1]).digest()
+            for i in range(0, len(level), 2)
+        ]
+    return level[0].hex()
+
+
+def _canonical_json(data: Dict[str, Any]) -> str:
+    return json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+
+
 class AuditException(Exception):
     """Base exception for audit trail errors."""
     
@@ -120,7 +158,7 @@ class CryptographicSigner:
             raise AuditException(
                 f"Failed to initialize cryptographic keys: {str(e)}",
                 AuditErrorCodes.SIGNATURE_FAILED
-            )
+            ) from e
     
     def sign_entry(self, entry_data: str) -> str:
         """Sign an audit entry."""
@@ -138,7 +176,7 @@ class CryptographicSigner:
             raise AuditException(
                 f"Failed to sign audit entry: {str(e)}",
                 AuditErrorCodes.SIGNATURE_FAILED
-            )
+            ) from e
     
     def verify_entry(self, entry_data: str, signature: str) -> bool:
         """Verify an audit entry signature."""
@@ -165,15 +203,178 @@ class CryptographicSigner:
         ).decode('utf-8')
 
 
+class AuditIndex:
+    """
+    SQLite secondary index over audit entries.
+    
+    Rows are inserted in commit order, so the rowid doubles as a stable,
+    newest-first pagination cursor. Each indexed column is paired with the
+    rowid so filtered queries are a single index seek plus a backward scan.
+    """
+    
+    INDEXED_COLUMNS = ('event_type', 'user', 'component', 'request_id')
+    FILTER_COLUMNS = INDEXED_COLUMNS + ('action', 'resource', 'level')
+    
+    def __init__(self, index_file: Path):
+        """Initialize the index database."""
+        self.index_file = index_file
+        
+        with sqlite3.connect(self.index_file) as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS audit_events (
+                    id INTEGER PRIMARY KEY,
+                    seq INTEGER UNIQUE,
+                    entry_id TEXT,
+                    timestamp TEXT,
+                    event_type TEXT,
+                    user TEXT,
+                    component TEXT,
+                    request_id TEXT,
+                    action TEXT,
+                    resource TEXT,
+                    level TEXT,
+                    data TEXT NOT NULL
+                )
+            ''')
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_audit_timestamp ON audit_events(timestamp, id)"
+            )
+            for column in self.INDEXED_COLUMNS:
+                conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_audit_{column} ON audit_events({column}, id)"
+                )
+    
+    @staticmethod
+    def _row(entry: Dict[str, Any]) -> tuple:
+        return (
+            entry.get('seq'),
+            entry.get('entry_id'),
+            entry.get('timestamp'),
+            entry.get('event_type'),
+            entry.get('user'),
+            entry.get('component'),
+            entry.get('request_id'),
+            entry.get('action'),
+            entry.get('resource'),
+            entry.get('level'),
+            json.dumps(entry, default=str)
+        )
+    
+    def add_entries(self, entries: List[Dict[str, Any]]) -> None:
+        """Index a batch of entries in one transaction."""
+        with sqlite3.connect(self.index_file) as conn:
+            conn.executemany(
+                '''INSERT OR IGNORE INTO audit_events
+                   (seq, entry_id, timestamp, event_type, user, component,
+                    request_id, action, resource, level, data)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                [self._row(entry) for entry in entries]
+            )
+    
+    def max_seq(self) -> Optional[int]:
+        """Highest chained sequence number indexed."""
+        with sqlite3.connect(self.index_file) as conn:
+            return conn.execute("SELECT MAX(seq) FROM audit_events").fetchone()[0]
+    
+    def count(self) -> int:
+        """Number of indexed entries."""
+        with sqlite3.connect(self.index_file) as conn:
+            return conn.execute("SELECT COUNT(*) FROM audit_events").fetchone()[0]
+    
+    def query(
+        self,
+        filters: Dict[str, Any],
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        limit: int = 100,
+        cursor: Optional[int] = None
+    ) -> tuple:
+        """
+        Return (entries, next_cursor), newest first.
+        
+        Args:
+            filters: Column equality filters (None values are ignored)
+            since: Minimum timestamp (ISO format)
+            until: Maximum timestamp (ISO format)
+            limit: Page size
+            cursor: Cursor returned by the previous page
+        """
+        clauses = []
+        params: List[Any] = []
+        for column in self.FILTER_COLUMNS:
+            value = filters.get(column)
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        # ISO timestamps from datetime.isoformat() sort lexicographically
+        if since:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            clauses.append("timestamp <= ?")
+            params.append(until)
+        if cursor is not None:
+            clauses.append("id < ?")
+            params.append(cursor)
+        
+        query = "SELECT id, data FROM audit_events"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit + 1)
+        
+        with sqlite3.connect(self.index_file) as conn:
+            rows = conn.execute(query, params).fetchall()
+        
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        entries = [json.loads(data) for _, data in rows]
+        next_cursor = rows[-1][0] if has_more and rows else None
+        return entries, next_cursor
+    
+    def delete_before(self, boundary_seq: Optional[int], cutoff: str) -> int:
+        """Drop archived entries: chained ones below boundary_seq, legacy ones by time."""
+        with sqlite3.connect(self.index_file) as conn:
+            deleted = conn.execute(
+                "DELETE FROM audit_events WHERE seq IS NULL AND timestamp < ?",
+                (cutoff,)
+            ).rowcount
+            if boundary_seq is not None:
+                deleted += conn.execute(
+                    "DELETE FROM audit_events WHERE seq < ?",
+                    (boundary_seq,)
+                ).rowcount
+            return deleted
+
+
 class AuditTrail:
     """Comprehensive audit trail for NoodleCore CLI."""
     
-    def __init__(self, audit_dir: Optional[str] = None):
+    def __init__(
+        self,
+        audit_dir: Optional[str] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        commit_interval: float = DEFAULT_COMMIT_INTERVAL,
+        fsync_commits: bool = True
+    ):
         """
         Initialize the audit trail.
         
+        Entries are hash-chained and buffered; each group commit appends the
+        batch in one write and signs a single segment record carrying the
+        Merkle root of the batch.
+        
+        Durability window: an entry returned by log_event is on disk only after
+        its group commit, i.e. within commit_interval seconds or batch_size
+        entries (CRITICAL events commit at once). close() and normal
+        interpreter exit (atexit) commit whatever is still buffered; a hard
+        crash or SIGKILL loses at most the entries of that window.
+        
         Args:
             audit_dir: Directory to store audit files
+            batch_size: Entries per group commit
+            commit_interval: Maximum seconds an entry waits for its commit
+            fsync_commits: fsync audit files at every commit
         """
         self.config = get_cli_config()
         self.audit_dir = Path(audit_dir or '.project/.noodle/logs')
@@ -186,6 +387,25 @@ class AuditTrail:
         self.audit_file = self.audit_dir / 'audit.log'
         self.signature_file = self.audit_dir / 'audit.signatures'
         self.ai_audit_file = self.audit_dir / 'ai_audit.log'
+        self.checkpoint_file = self.audit_dir / 'audit.checkpoint'
+        self.index_file = self.audit_dir / 'audit_index.db'
+        
+        # Group commit settings
+        self.batch_size = batch_size
+        self.commit_interval = commit_interval
+        self.fsync_commits = fsync_commits
+        self._pending: List[Dict[str, Any]] = []
+        self._commit_lock = asyncio.Lock()
+        self._commit_handle: Optional[asyncio.TimerHandle] = None
+        self._commit_task: Optional[asyncio.Task] = None
+        # Batch whose entries are on disk but whose seal or index step failed,
+        # with the names of the steps already done
+        self._unfinished: Optional[Tuple[List[Dict[str, Any]], Set[str]]] = None
+        
+        # Hash chain state (recovered from disk below)
+        self._next_seq = 0
+        self._chain_head = GENESIS_HASH
+        self._next_segment_id = 0
         
         # In-memory audit entries for recent access
         self.audit_entries: List[Dict[str, Any]] = []
@@ -199,6 +419,13 @@ class AuditTrail:
         
         # Initialize audit files
         self._initialize_audit_files()
+        self._recover_chain_state()
+        
+        # Secondary index for queries, maintained at commit time
+        self.index = AuditIndex(self.index_file)
+        self._sync_index()
+        
+        atexit.register(self._flush_at_exit)
     
     def _get_or_create_encryption_key(self) -> Fernet:
         """Get or create encryption key for sensitive audit data."""
@@ -219,7 +446,7 @@ class AuditTrail:
             raise AuditException(
                 f"Failed to initialize encryption key: {str(e)}",
                 AuditErrorCodes.ENCRYPTION_FAILED
-            )
+            ) from e
     
     def _initialize_audit_files(self):
         """Initialize audit files with headers."""
@@ -234,7 +461,7 @@ class AuditTrail:
             # Create signature file if it doesn't exist
             if not self.signature_file.exists():
                 with open(self.signature_file, 'w', encoding='utf-8') as f:
-                    f.write("# Audit Entry Signatures\n\n")
+                    f.write("# Audit Segment Signatures\n\n")
             
             # Create AI audit file if it doesn't exist
             if not self.ai_audit_file.exists():
@@ -246,7 +473,131 @@ class AuditTrail:
             raise AuditException(
                 f"Failed to initialize audit files: {str(e)}",
                 AuditErrorCodes.STORAGE_ERROR
-            )
+            ) from e
+    
+    def _read_checkpoint(self) -> Dict[str, Any]:
+        """Read the last verification checkpoint."""
+        default = {
+            'anchor_seq': 0,
+            'anchor_head': GENESIS_HASH,
+            'audit_offset': 0,
+            'signature_offset': 0,
+            'next_seq': 0,
+            'chain_head': GENESIS_HASH,
+            'verified_segments': 0,
+            'verified_entries': 0
+        }
+        if not self.checkpoint_file.exists():
+            return default
+        try:
+            with open(self.checkpoint_file, 'r', encoding='utf-8') as f:
+                return {**default, **json.load(f)}
+        except (OSError, ValueError):
+            return default
+    
+    @staticmethod
+    def _reset_checkpoint(checkpoint: Dict[str, Any]) -> Dict[str, Any]:
+        """Rewind a checkpoint to the start of the log (its chain anchor)."""
+        return {
+            **checkpoint,
+            'audit_offset': 0,
+            'signature_offset': 0,
+            'next_seq': checkpoint['anchor_seq'],
+            'chain_head': checkpoint['anchor_head'],
+            'verified_segments': 0,
+            'verified_entries': 0
+        }
+    
+    def _write_checkpoint(self, checkpoint: Dict[str, Any]) -> None:
+        """Atomically replace the verification checkpoint."""
+        tmp_file = self.checkpoint_file.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_file, self.checkpoint_file)
+    
+    @staticmethod
+    def _iter_records(path: Path, offset: int):
+        """Yield (record, end_offset) for complete JSON lines from offset."""
+        if not path.exists():
+            return
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            position = offset
+            for raw_line in f:
+                if not raw_line.endswith(b'\n'):
+                    break  # Torn write at the tail
+                position += len(raw_line)
+                line = raw_line.strip()
+                if not line or line.startswith(b'#'):
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                yield record, position
+    
+    def _recover_chain_state(self) -> None:
+        """
+        Restore the chain head and sequence numbers from disk.
+        
+        Scans from the verification checkpoint; entries that were written but
+        never sealed (e.g. a crash between the two appends of a commit) are
+        sealed now as a recovery segment.
+        """
+        try:
+            checkpoint = self._read_checkpoint()
+            self._next_seq = checkpoint['next_seq']
+            self._chain_head = checkpoint['chain_head']
+            self._next_segment_id = checkpoint['verified_segments']
+            
+            sealed_seq = self._next_seq
+            for record, _ in self._iter_records(self.signature_file, checkpoint['signature_offset']):
+                if 'segment_id' in record:
+                    self._next_segment_id = record['segment_id'] + 1
+                    sealed_seq = record['first_seq'] + record['count']
+            
+            unsealed = []
+            for record, _ in self._iter_records(self.audit_file, checkpoint['audit_offset']):
+                if 'seq' not in record:
+                    continue
+                self._next_seq = record['seq'] + 1
+                self._chain_head = record['entry_hash']
+                if record['seq'] >= sealed_seq:
+                    unsealed.append(record)
+            
+            if unsealed:
+                self._write_segment(unsealed)
+                
+        except Exception as e:
+            raise AuditException(
+                f"Failed to recover audit chain state: {str(e)}",
+                AuditErrorCodes.AUDIT_INIT_FAILED
+            ) from e
+    
+    def _sync_index(self) -> None:
+        """Backfill the index with committed entries it has not seen."""
+        try:
+            indexed_seq = self.index.max_seq()
+            include_legacy = self.index.count() == 0
+            if indexed_seq is None and not include_legacy and self._next_seq == 0:
+                return
+            if indexed_seq is not None and indexed_seq >= self._next_seq - 1:
+                return
+            
+            # Legacy (unchained) entries are only indexed on first build
+            missing = [
+                record for record, _ in self._iter_records(self.audit_file, 0)
+                if ('seq' in record and (indexed_seq is None or record['seq'] > indexed_seq))
+                or ('seq' not in record and include_legacy)
+            ]
+            if missing:
+                self.index.add_entries(missing)
+                
+        except Exception as e:
+            raise AuditException(
+                f"Failed to build audit index: {str(e)}",
+                AuditErrorCodes.AUDIT_INIT_FAILED
+            ) from e
     
     async def log_event(
         self,
@@ -263,7 +614,11 @@ class AuditTrail:
         sensitive_data: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
-        Log an audit event with cryptographic signature.
+        Log an audit event into the hash chain.
+        
+        The entry is linked to its predecessor immediately and becomes durable
+        and signed with the next group commit (within commit_interval, or at
+        once for CRITICAL events or a full batch).
         
         Args:
             event_type: Type of event
@@ -308,36 +663,38 @@ class AuditTrail:
                 encrypted_data = self._encrypt_sensitive_data(sensitive_data)
                 audit_entry['encrypted_data'] = encrypted_data
             
-            # Create entry data for signing
-            entry_data = json.dumps(audit_entry, sort_keys=True, separators=(',', ':'))
-            
-            # Sign the entry
-            signature = self.signer.sign_entry(entry_data)
+            # Link the entry into the hash chain
+            audit_entry['seq'] = self._next_seq
+            audit_entry['prev_hash'] = self._chain_head
+            audit_entry['entry_hash'] = compute_entry_hash(_canonical_json(audit_entry))
+            self._next_seq += 1
+            self._chain_head = audit_entry['entry_hash']
             
             # Add to in-memory entries
             self.audit_entries.append(audit_entry)
             if len(self.audit_entries) > self.max_memory_entries:
                 self.audit_entries.pop(0)
             
-            # Save to files
-            await self._save_audit_entry(audit_entry, signature)
-            
-            # Special handling for AI events
-            if event_type == AuditEventType.AI_INTERACTION.value:
-                await self._save_ai_audit_entry(audit_entry, signature)
+            # Buffer for the next group commit
+            self._pending.append(audit_entry)
+            if len(self._pending) >= self.batch_size or level == AuditLevel.CRITICAL:
+                await self.flush()
+            else:
+                self._schedule_commit()
             
             return {
                 'success': True,
                 'message': "Audit event logged successfully",
                 'entry_id': audit_entry['entry_id'],
-                'timestamp': audit_entry['timestamp']
+                'timestamp': audit_entry['timestamp'],
+                'entry_hash': audit_entry['entry_hash']
             }
             
         except Exception as e:
             raise AuditException(
                 f"Failed to log audit event: {str(e)}",
                 AuditErrorCodes.STORAGE_ERROR
-            )
+            ) from e
     
     async def log_ai_interaction(
         self,
@@ -404,7 +761,7 @@ class AuditTrail:
             raise AuditException(
                 f"Failed to log AI interaction: {str(e)}",
                 AuditErrorCodes.AI_TRACKING_ERROR
-            )
+            ) from e
     
     async def log_file_operation(
         self,
@@ -467,7 +824,7 @@ class AuditTrail:
             raise AuditException(
                 f"Failed to log file operation: {str(e)}",
                 AuditErrorCodes.STORAGE_ERROR
-            )
+            ) from e
     
     async def log_config_change(
         self,
@@ -533,48 +890,169 @@ class AuditTrail:
             raise AuditException(
                 f"Failed to log config change: {str(e)}",
                 AuditErrorCodes.STORAGE_ERROR
-            )
+            ) from e
     
-    async def _save_audit_entry(self, audit_entry: Dict[str, Any], signature: str) -> None:
-        """Save audit entry and signature to files."""
+    def _schedule_commit(self) -> None:
+        """Arm the commit timer if one is not already pending."""
+        if self._commit_handle is not None:
+            return
         try:
-            # Save to main audit file
-            with open(self.audit_file, 'a', encoding='utf-8') as f:
-                f.write(json.dumps(audit_entry, default=str) + '\n')
-            
-            # Save signature
-            signature_entry = {
-                'entry_id': audit_entry['entry_id'],
-                'timestamp': audit_entry['timestamp'],
-                'signature': signature
-            }
-            with open(self.signature_file, 'a', encoding='utf-8') as f:
-                f.write(json.dumps(signature_entry) + '\n')
-                
-        except IOError as e:
-            raise AuditException(
-                f"Failed to save audit entry: {str(e)}",
-                AuditErrorCodes.STORAGE_ERROR
-            )
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._commit_handle = loop.call_later(self.commit_interval, self._start_timed_commit)
+    
+    def _start_timed_commit(self) -> None:
+        """Run a timer-triggered commit as a task whose failure gets logged."""
+        self._commit_handle = None
+        self._commit_task = asyncio.ensure_future(self.flush())
+        self._commit_task.add_done_callback(self._on_timed_commit_done)
+    
+    def _on_timed_commit_done(self, task: asyncio.Task) -> None:
+        if task is self._commit_task:
+            self._commit_task = None
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            # The batch stays buffered; the next commit retries it
+            logger.error("Timed audit commit failed: %s", error, exc_info=error)
+            if self._pending or self._unfinished is not None:
+                self._schedule_commit()
     
-    async def _save_ai_audit_entry(self, audit_entry: Dict[str, Any], signature: str) -> None:
-        """Save AI-specific audit entry."""
+    async def flush(self) -> None:
+        """Group-commit all buffered entries."""
+        async with self._commit_lock:
+            if self._commit_handle is not None:
+                self._commit_handle.cancel()
+                self._commit_handle = None
+            
+            self._commit_pending()
+    
+    def _commit_pending(self) -> None:
+        """Finish an interrupted commit, then commit the buffered entries."""
+        if self._unfinished is not None:
+            batch, done = self._unfinished
+            self._append_batch(batch, done)
+            self._unfinished = None
+        
+        if not self._pending:
+            return
+        
+        batch, self._pending = self._pending, []
+        done: Set[str] = set()
         try:
-            ai_entry = {
-                **audit_entry,
-                'signature': signature
-            }
-            with open(self.ai_audit_file, 'a', encoding='utf-8') as f:
-                f.write(json.dumps(ai_entry, default=str) + '\n')
-        except IOError as e:
+            self._append_batch(batch, done)
+        except Exception:
+            if done:
+                # Entries are already in audit.log; retry only the remaining steps
+                self._unfinished = (batch, done)
+            else:
+                # Nothing was written; put the batch back to retry it in order
+                self._pending = batch + self._pending
+            raise
+    
+    async def close(self) -> None:
+        """Commit outstanding entries; call before shutdown."""
+        if self._commit_task is not None and not self._commit_task.done():
+            try:
+                await self._commit_task
+            except Exception:
+                pass  # Logged by the done callback; flush() below retries
+        await self.flush()
+        atexit.unregister(self._flush_at_exit)
+    
+    def _flush_at_exit(self) -> None:
+        """Commit buffered entries synchronously when the interpreter exits."""
+        if not self._pending and self._unfinished is None:
+            return
+        try:
+            self._commit_pending()
+        except Exception as e:
+            logger.error("Failed to commit audit entries at exit: %s", e)
+    
+    def _append_lines(self, path: Path, lines: List[str]) -> None:
+        """Append lines with a single write, fsyncing if configured."""
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(''.join(lines))
+            if self.fsync_commits:
+                f.flush()
+                os.fsync(f.fileno())
+    
+    def _append_batch(self, batch: List[Dict[str, Any]], done: Optional[Set[str]] = None) -> None:
+        """
+        Write a batch of chained entries, then seal it with a segment record.
+        
+        Each finished step is added to done, so a failed commit can be
+        resumed without writing the entries or their segment twice. A failed
+        audit.log write is truncated back to where it started.
+        """
+        done = set() if done is None else done
+        try:
+            if 'entries' not in done:
+                self._append_entries(batch)
+                done.add('entries')
+            
+            if 'ai' not in done:
+                ai_lines = [
+                    json.dumps(entry, default=str) + '\n'
+                    for entry in batch
+                    if entry['event_type'] == AuditEventType.AI_INTERACTION.value
+                ]
+                if ai_lines:
+                    self._append_lines(self.ai_audit_file, ai_lines)
+                done.add('ai')
+            
+            if 'segment' not in done:
+                self._write_segment(batch)
+                done.add('segment')
+            
+            if 'index' not in done:
+                self.index.add_entries(batch)
+                done.add('index')
+            
+        except (IOError, sqlite3.Error) as e:
             raise AuditException(
-                f"Failed to save AI audit entry: {str(e)}",
+                f"Failed to save audit entries: {str(e)}",
                 AuditErrorCodes.STORAGE_ERROR
+            ) from e
+    
+    def _append_entries(self, batch: List[Dict[str, Any]]) -> None:
+        """Append entries to audit.log, leaving no partial lines on failure."""
+        offset = self.audit_file.stat().st_size if self.audit_file.exists() else 0
+        try:
+            self._append_lines(
+                self.audit_file,
+                [json.dumps(entry, default=str) + '\n' for entry in batch]
             )
+        except IOError:
+            try:
+                with open(self.audit_file, 'r+b') as f:
+                    f.truncate(offset)
+            except IOError as e:
+                logger.error("Failed to roll back partial audit write: %s", e)
+            raise
+    
+    def _write_segment(self, entries: List[Dict[str, Any]]) -> None:
+        """Sign the Merkle root of entries and append the segment record."""
+        segment = {
+            'segment_id': self._next_segment_id,
+            'first_seq': entries[0]['seq'],
+            'count': len(entries),
+            'first_entry_id': entries[0]['entry_id'],
+            'last_entry_id': entries[-1]['entry_id'],
+            'merkle_root': compute_merkle_root([entry['entry_hash'] for entry in entries]),
+            'chain_head': entries[-1]['entry_hash'],
+            'timestamp': datetime.now().isoformat()
+        }
+        segment['signature'] = self.signer.sign_entry(_canonical_json(segment))
+        
+        self._append_lines(self.signature_file, [json.dumps(segment) + '\n'])
+        self._next_segment_id += 1
     
     def _generate_entry_id(self) -> str:
         """Generate unique entry ID."""
-        return f"{int(time.time() * 1000)}-{os.getpid()}-{len(self.audit_entries)}"
+        return f"{int(time.time() * 1000)}-{os.getpid()}-{self._next_seq}"
     
     def _encrypt_sensitive_data(self, data: Dict[str, Any]) -> str:
         """Encrypt sensitive data."""
@@ -586,7 +1064,7 @@ class AuditTrail:
             raise AuditException(
                 f"Failed to encrypt sensitive data: {str(e)}",
                 AuditErrorCodes.ENCRYPTION_FAILED
-            )
+            ) from e
     
     def _decrypt_sensitive_data(self, encrypted_data: str) -> Dict[str, Any]:
         """Decrypt sensitive data."""
@@ -598,7 +1076,7 @@ class AuditTrail:
             raise AuditException(
                 f"Failed to decrypt sensitive data: {str(e)}",
                 AuditErrorCodes.ENCRYPTION_FAILED
-            )
+            ) from e
     
     def _estimate_cost(self, model: str, tokens: int) -> float:
         """Estimate cost for AI interaction."""
@@ -614,69 +1092,117 @@ class AuditTrail:
         cost = cost_per_1k.get(model.lower(), cost_per_1k['default'])
         return (tokens / 1000) * cost
     
-    async def verify_audit_integrity(self) -> Dict[str, Any]:
+    async def verify_audit_integrity(self, full: bool = False) -> Dict[str, Any]:
         """
         Verify the integrity of audit entries.
         
+        Verification resumes from the last verified checkpoint: only segments
+        sealed since then are read. For each segment the signature over its
+        record is checked, every entry's hash and link to its predecessor is
+        recomputed, and the batch's Merkle root is compared.
+        
+        Args:
+            full: Ignore the checkpoint and re-verify the whole log
+        
         Returns:
             Dictionary containing verification results
         """
         try:
-            # Read audit entries and signatures
-            audit_entries = []
-            signatures = {}
-            
-            # Read audit file
-            if self.audit_file.exists():
-                with open(self.audit_file, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        line = line.strip()
-                        if line and not line.startswith('#'):
-                            try:
-                                entry = json.loads(line)
-                                audit_entries.append(entry)
-                            except:
-                                continue
+            await self.flush()
             
-            # Read signature file
-            if self.signature_file.exists():
-                with open(self.signature_file, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        line = line.strip()
-                        if line and not line.startswith('#'):
-                            try:
-                                sig_entry = json.loads(line)
-                                signatures[sig_entry['entry_id']] = sig_entry['signature']
-                            except:
-                                continue
+            checkpoint = self._read_checkpoint()
+            if full:
+                checkpoint = self._reset_checkpoint(checkpoint)
             
-            # Verify entries
-            verified_count = 0
+            entries = self._iter_records(self.audit_file, checkpoint['audit_offset'])
+            newly_verified = 0
             failed_count = 0
-            missing_signatures = 0
-            
-            for entry in audit_entries:
-                entry_id = entry.get('entry_id')
-                if entry_id in signatures:
-                    entry_data = json.dumps(entry, sort_keys=True, separators=(',', ':'))
-                    if self.signer.verify_entry(entry_data, signatures[entry_id]):
-                        verified_count += 1
-                    else:
+            legacy_entries = 0
+            failure = None
+            
+            for segment, signature_offset in self._iter_records(
+                self.signature_file, checkpoint['signature_offset']
+            ):
+                if 'segment_id' not in segment:
+                    # Per-entry signature from before hash chaining
+                    checkpoint['signature_offset'] = signature_offset
+                    continue
+                
+                signature = segment.pop('signature', '')
+                if not self.signer.verify_entry(_canonical_json(segment), signature):
+                    failure = f"Invalid signature on segment {segment['segment_id']}"
+                    break
+                
+                if segment['first_seq'] != checkpoint['next_seq']:
+                    failure = f"Segment {segment['segment_id']} does not continue the chain"
+                    break
+                
+                batch_hashes = []
+                audit_offset = checkpoint['audit_offset']
+                chain_head = checkpoint['chain_head']
+                for entry, entry_offset in entries:
+                    if 'seq' not in entry:
+                        legacy_entries += 1
+                        continue
+                    
+                    stored_hash = entry.pop('entry_hash', None)
+                    expected_seq = segment['first_seq'] + len(batch_hashes)
+                    if (
+                        entry['seq'] != expected_seq
+                        or entry.get('prev_hash') != chain_head
+                        or compute_entry_hash(_canonical_json(entry)) != stored_hash
+                    ):
                         failed_count += 1
-                else:
-                    missing_signatures += 1
-            
-            total_entries = len(audit_entries)
+                        failure = f"Entry {entry.get('entry_id')} breaks the hash chain"
+                        break
+                    
+                    batch_hashes.append(stored_hash)
+                    chain_head = stored_hash
+                    audit_offset = entry_offset
+                    if len(batch_hashes) == segment['count']:
+                        break
+                
+                if failure:
+                    break
+                if len(batch_hashes) != segment['count']:
+                    failure = f"Segment {segment['segment_id']} is missing entries"
+                    break
+                if compute_merkle_root(batch_hashes) != segment['merkle_root']:
+                    failure = f"Merkle root mismatch in segment {segment['segment_id']}"
+                    break
+                
+                checkpoint.update({
+                    'audit_offset': audit_offset,
+                    'signature_offset': signature_offset,
+                    'next_seq': segment['first_seq'] + segment['count'],
+                    'chain_head': chain_head,
+                    'verified_segments': checkpoint['verified_segments'] + 1,
+                    'verified_entries': checkpoint['verified_entries'] + segment['count']
+                })
+                newly_verified += segment['count']
+            
+            # Entries after the last sealed segment are not covered by a signature
+            unsealed = sum(1 for entry, _ in entries if 'seq' in entry)
+            
+            if failure is None:
+                self._write_checkpoint(checkpoint)
+            
+            verified_count = checkpoint['verified_entries']
+            total_entries = verified_count + failed_count + unsealed
             integrity_score = (verified_count / total_entries) if total_entries > 0 else 0
             
             return {
                 'success': True,
                 'total_entries': total_entries,
                 'verified_entries': verified_count,
+                'newly_verified_entries': newly_verified,
+                'verified_segments': checkpoint['verified_segments'],
                 'failed_entries': failed_count,
-                'missing_signatures': missing_signatures,
+                'missing_signatures': unsealed,
+                'legacy_entries': legacy_entries,
                 'integrity_score': integrity_score,
-                'tamper_detected': failed_count > 0,
+                'tamper_detected': failure is not None,
+                'failure': failure,
                 'verification_time': datetime.now().isoformat()
             }
             
@@ -699,11 +1225,15 @@ class AuditTrail:
         resource: Optional[str] = None,
         level: Optional[AuditLevel] = None,
         limit: int = 100,
-        include_sensitive: bool = False
+        include_sensitive: bool = False,
+        cursor: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Get audit events with filtering.
         
+        Events are answered from the audit index, newest first. Pass the
+        returned next_cursor back as cursor to fetch the following page.
+        
         Args:
             event_type: Filter by event type
             user: Filter by user
@@ -716,74 +1246,45 @@ class AuditTrail:
             level: Filter by audit level
             limit: Maximum number of events
             include_sensitive: Include decrypted sensitive data
+            cursor: Cursor from a previous page
             
         Returns:
             Dictionary containing filtered audit events
         """
         try:
-            # Start with in-memory entries (recent)
-            events = self.audit_entries.copy()
-            
-            # Read from file if we need more events
-            if len(events) < limit and self.audit_file.exists():
-                with open(self.audit_file, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        line = line.strip()
-                        if line and not line.startswith('#'):
-                            try:
-                                entry = json.loads(line)
-                                if entry not in events:  # Avoid duplicates
-                                    events.append(entry)
-                            except:
-                                continue
+            # Make buffered entries visible to the index
+            await self.flush()
             
-            # Apply filters
-            filtered_events = []
-            for event in events:
-                if event_type and event.get('event_type') != event_type:
-                    continue
-                if user and event.get('user') != user:
-                    continue
-                if request_id and event.get('request_id') != request_id:
-                    continue
-                if component and event.get('component') != component:
-                    continue
-                if action and event.get('action') != action:
-                    continue
-                if resource and event.get('resource') != resource:
-                    continue
-                if level and event.get('level') != level.value:
-                    continue
-                
-                # Date filtering
-                event_time = datetime.fromisoformat(event.get('timestamp', ''))
-                if since:
-                    since_time = datetime.fromisoformat(since)
-                    if event_time < since_time:
-                        continue
-                if until:
-                    until_time = datetime.fromisoformat(until)
-                    if event_time > until_time:
-                        continue
-                
-                # Decrypt sensitive data if requested
-                if include_sensitive and 'encrypted_data' in event:
-                    try:
-                        sensitive_data = self._decrypt_sensitive_data(event['encrypted_data'])
-                        event['sensitive_data'] = sensitive_data
-                    except:
-                        pass  # Keep encrypted if decryption fails
-                
-                filtered_events.append(event)
+            filtered_events, next_cursor = self.index.query(
+                {
+                    'event_type': event_type,
+                    'user': user,
+                    'request_id': request_id,
+                    'component': component,
+                    'action': action,
+                    'resource': resource,
+                    'level': level.value if level else None
+                },
+                since=since,
+                until=until,
+                limit=limit,
+                cursor=int(cursor) if cursor else None
+            )
             
-            # Sort by timestamp (newest first) and apply limit
-            filtered_events.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-            filtered_events = filtered_events[:limit]
+            # Decrypt sensitive data if requested
+            if include_sensitive:
+                for event in filtered_events:
+                    if 'encrypted_data' in event:
+                        try:
+                            event['sensitive_data'] = self._decrypt_sensitive_data(event['encrypted_data'])
+                        except:
+                            pass  # Keep encrypted if decryption fails
             
             return {
                 'success': True,
                 'events': filtered_events,
                 'count': len(filtered_events),
+                'next_cursor': str(next_cursor) if next_cursor is not None else None,
                 'filters': {
                     'event_type': event_type,
                     'user': user,
@@ -908,40 +1409,93 @@ class AuditTrail:
             archive_dir.mkdir(exist_ok=True)
             
             archive_file = archive_dir / f'audit_{cutoff_date.strftime("%Y%m")}.log'
-            
-            if self.audit_file.exists():
-                current_events = []
-                archived_events = []
-                
-                with open(self.audit_file, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        line = line.strip()
-                        if line and not line.startswith('#'):
+            archive_signature_file = archive_dir / f'audit_{cutoff_date.strftime("%Y%m")}.signatures'
+            
+            await self.flush()
+            async with self._commit_lock:
+                # Only whole sealed segments are archived, and only as a prefix
+                # of the chain, so the remaining log still verifies
+                boundary_seq = None
+                anchor_head = None
+                archiving = True
+                current_signatures = []
+                archived_signatures = []
+                if self.signature_file.exists():
+                    with open(self.signature_file, 'r', encoding='utf-8') as f:
+                        for line in f:
+                            line = line.strip()
+                            if not line or line.startswith('#'):
+                                continue
                             try:
-                                event = json.loads(line)
-                                event_time = datetime.fromisoformat(event.get('timestamp', ''))
-                                
-                                if event_time < cutoff_date:
-                                    archived_events.append(line)
-                                    archived_count += 1
-                                else:
-                                    current_events.append(line)
-                            except:
-                                current_events.append(line)  # Keep malformed lines
+                                record = json.loads(line)
+                            except ValueError:
+                                current_signatures.append(line)
+                                continue
+                            if 'segment_id' not in record:
+                                current_signatures.append(line)
+                            elif archiving and datetime.fromisoformat(record['timestamp']) < cutoff_date:
+                                archived_signatures.append(line)
+                                boundary_seq = record['first_seq'] + record['count']
+                                anchor_head = record['chain_head']
+                            else:
+                                archiving = False
+                                current_signatures.append(line)
                 
-                # Write current events back
-                with open(self.audit_file, 'w', encoding='utf-8') as f:
-                    f.write("# NoodleCore Audit Trail\n")
-                    f.write(f"# Archived entries older than {cutoff_date.isoformat()}\n")
-                    f.write(f"# Public Key: {self.signer.get_public_key_pem()}\n\n")
-                    for event in current_events:
-                        f.write(event + '\n')
+                if self.audit_file.exists():
+                    current_events = []
+                    archived_events = []
+                    
+                    with open(self.audit_file, 'r', encoding='utf-8') as f:
+                        for line in f:
+                            line = line.strip()
+                            if line and not line.startswith('#'):
+                                try:
+                                    event = json.loads(line)
+                                    if 'seq' in event:
+                                        archive = boundary_seq is not None and event['seq'] < boundary_seq
+                                    else:
+                                        event_time = datetime.fromisoformat(event.get('timestamp', ''))
+                                        archive = event_time < cutoff_date
+                                    
+                                    if archive:
+                                        archived_events.append(line)
+                                        archived_count += 1
+                                    else:
+                                        current_events.append(line)
+                                except:
+                                    current_events.append(line)  # Keep malformed lines
+                    
+                    # Write current events back and archive old events
+                    if archived_events:
+                        with open(self.audit_file, 'w', encoding='utf-8') as f:
+                            f.write("# NoodleCore Audit Trail\n")
+                            f.write(f"# Archived entries older than {cutoff_date.isoformat()}\n")
+                            f.write(f"# Public Key: {self.signer.get_public_key_pem()}\n\n")
+                            for event in current_events:
+                                f.write(event + '\n')
+                        
+                        with open(archive_file, 'a', encoding='utf-8') as f:
+                            for event in archived_events:
+                                f.write(event + '\n')
+                
+                if archived_signatures:
+                    with open(self.signature_file, 'w', encoding='utf-8') as f:
+                        f.write("# Audit Segment Signatures\n\n")
+                        for record in current_signatures:
+                            f.write(record + '\n')
+                    with open(archive_signature_file, 'a', encoding='utf-8') as f:
+                        for record in archived_signatures:
+                            f.write(record + '\n')
                 
-                # Archive old events
-                if archived_events:
-                    with open(archive_file, 'a', encoding='utf-8') as f:
-                        for event in archived_events:
-                            f.write(event + '\n')
+                # Offsets changed: verification restarts at the new head of the
+                # log, anchored on the last archived (signed) chain head
+                if archived_count or archived_signatures:
+                    self.index.delete_before(boundary_seq, cutoff_date.isoformat())
+                    checkpoint = self._read_checkpoint()
+                    if boundary_seq is not None:
+                        checkpoint['anchor_seq'] = boundary_seq
+                        checkpoint['anchor_head'] = anchor_head
+                    self._write_checkpoint(self._reset_checkpoint(checkpoint))
             
             # Clean up memory entries
             self.audit_entries = [
@@ -31,6 +31,7 @@ from typing import Dict, Any, Optional, List, Union, Callable
 from concurrent.futures import ThreadPoolExecutor
 
 from ..cli_config import get_cli_config
+from .log_pipeline import LogPipeline, OverflowPolicy, DEFAULT_CAPACITY
 
 
 # Error codes for logging system (5001-5999)
@@ -162,51 +163,13 @@ class StructuredFormatter(logging.Formatter):
             return json.dumps(log_data, default=str, indent=2)
 
 
-class AsyncLogHandler:
-    """Async log handler for performance optimization."""
-    
-    def __init__(self, handler: logging.Handler):
-        self.handler = handler
-        self.queue = asyncio.Queue()
-        self.task = None
-        self.running = False
-    
-    async def start(self):
-        """Start the async log handler."""
-        self.running = True
-        self.task = asyncio.create_task(self._process_queue())
-    
-    async def stop(self):
-        """Stop the async log handler."""
-        self.running = False
-        if self.task:
-            await self.queue.put(None)  # Signal to stop
-            await self.task
-    
-    async def emit(self, record: logging.LogRecord):
-        """Emit a log record asynchronously."""
-        await self.queue.put(record)
-    
-    async def _process_queue(self):
-        """Process log records from the queue."""
-        while self.running:
-            try:
-                record = await asyncio.wait_for(self.queue.get(), timeout=1.0)
-                if record is None:  # Stop signal
-                    break
-                
-                # Process in thread pool to avoid blocking
-                loop = asyncio.get_event_loop()
-                await loop.run_in_executor(None, self.handler.emit, record)
-                
-            except asyncio.TimeoutError:
-                continue
-            except Exception as e:
-                # Fallback to sync logging if async fails
-                try:
-                    self.handler.emit(record)
-                except:
-                    pass  # Avoid infinite recursion
+_LEVEL_NUMBERS = {
+    LogLevel.DEBUG: logging.DEBUG,
+    LogLevel.INFO: logging.INFO,
+    LogLevel.WARNING: logging.WARNING,
+    LogLevel.ERROR: logging.ERROR,
+    LogLevel.CRITICAL: logging.CRITICAL
+}
 
 
 class Logger:
@@ -218,7 +181,8 @@ class Logger:
         self.logger = logging.getLogger('noodlecore')
         self.audit_logger = None
         self._initialized = False
-        self._async_handlers: List[AsyncLogHandler] = []
+        self._pipeline: Optional[LogPipeline] = None
+        self._sinks: List[logging.Handler] = []
         self._filters: List[LogFilter] = []
         self._executor = ThreadPoolExecutor(max_workers=4)
         
@@ -236,7 +200,9 @@ class Logger:
         verbose: bool = False,
         outputs: List[LogOutput] = None,
         format_type: LogFormat = LogFormat.JSON,
-        enable_async: bool = True
+        enable_async: bool = True,
+        overflow_policy: Optional[OverflowPolicy] = None,
+        queue_capacity: Optional[int] = None
     ) -> None:
         """
         Initialize the logging system with comprehensive configuration.
@@ -247,6 +213,8 @@ class Logger:
             outputs: List of output destinations
             format_type: Log format type
             enable_async: Enable async logging
+            overflow_policy: Ring buffer overflow policy (block, drop_oldest, sample)
+            queue_capacity: Maximum number of records waiting for the writer thread
             
         Raises:
             LoggingException: If initialization fails
@@ -263,8 +231,16 @@ class Logger:
             
             self.logger.setLevel(log_level)
             
+            # A failed earlier attempt may have left its writer running on
+            # the sinks cleared below
+            if self._pipeline is not None:
+                loop = asyncio.get_event_loop()
+                await loop.run_in_executor(self._executor, self._pipeline.stop)
+                self._pipeline = None
+            
             # Clear existing handlers
             self.logger.handlers.clear()
+            self._sinks.clear()
             
             # Set default outputs
             if outputs is None:
@@ -277,6 +253,24 @@ class Logger:
             for output in outputs:
                 await self._setup_handler(output, formatter, log_level, enable_async)
             
+            # Route every async sink through one bounded pipeline
+            if enable_async and self._sinks:
+                if overflow_policy is None:
+                    overflow_policy = OverflowPolicy(
+                        self.config.get('NOODLE_LOG_OVERFLOW_POLICY', OverflowPolicy.BLOCK.value)
+                    )
+                if queue_capacity is None:
+                    queue_capacity = self.config.get_int('NOODLE_LOG_QUEUE_SIZE', DEFAULT_CAPACITY)
+                self._pipeline = LogPipeline(
+                    self._sinks,
+                    logger_name=self.logger.name,
+                    filters=self._filters,
+                    capacity=queue_capacity,
+                    policy=overflow_policy,
+                    internal_files=[__file__]
+                )
+                self._pipeline.start()
+            
             # Initialize audit logger if enabled
             if self.config.get_bool('NOODLE_ENABLE_AUDIT_LOG', True):
                 from .audit_trail import AuditTrail
@@ -291,7 +285,8 @@ class Logger:
                     'verbose': verbose,
                     'outputs': [o.value for o in outputs],
                     'format': format_type.value,
-                    'async_enabled': enable_async
+                    'async_enabled': enable_async,
+                    'overflow_policy': overflow_policy.value if overflow_policy else None
                 }
             )
             
@@ -339,12 +334,9 @@ class Logger:
             handler.setLevel(log_level)
             handler.setFormatter(formatter)
             
-            if enable_async and output != LogOutput.CONSOLE:
-                async_handler = AsyncLogHandler(handler)
-                await async_handler.start()
-                self._async_handlers.append(async_handler)
-                # Add custom async handler wrapper
-                self.logger.addHandler(AsyncHandlerWrapper(async_handler))
+            if enable_async:
+                # Written in batches by the pipeline's writer thread
+                self._sinks.append(handler)
             else:
                 self.logger.addHandler(handler)
                 
@@ -363,7 +355,17 @@ class Logger:
     ) -> None:
         """Log a message with request ID tracking."""
         try:
-            start_time = time.time()
+            start_time = time.perf_counter()
+            
+            levelno = _LEVEL_NUMBERS[level]
+            if not self.logger.isEnabledFor(levelno):
+                return
+            
+            # Async path: capture a tuple; filtering and formatting happen on the writer thread
+            if self._pipeline is not None:
+                self._pipeline.submit(levelno, message, request_id, kwargs)
+                self._update_performance_stats(level, time.perf_counter() - start_time)
+                return
             
             if request_id is None:
                 request_id = str(uuid.uuid4())
@@ -383,7 +385,7 @@ class Logger:
             log_method(message, extra=extra)
             
             # Update performance stats
-            log_time = time.time() - start_time
+            log_time = time.perf_counter() - start_time
             self._update_performance_stats(level, log_time)
             
         except Exception as e:
@@ -536,21 +538,28 @@ class Logger:
         self.logger.setLevel(log_level)
         
         # Update handler levels
-        for handler in self.logger.handlers:
-            if isinstance(handler, AsyncHandlerWrapper):
-                handler.handler.handler.setLevel(log_level)
-            else:
-                handler.setLevel(log_level)
+        for handler in self.logger.handlers + self._sinks:
+            handler.setLevel(log_level)
     
     def get_performance_stats(self) -> Dict[str, Any]:
         """Get performance statistics."""
-        return self._performance_stats.copy()
+        stats = self._performance_stats.copy()
+        if self._pipeline is not None:
+            stats['pipeline'] = self._pipeline.get_stats()
+        return stats
+    
+    def flush(self) -> None:
+        """Write every buffered record to the sinks."""
+        if self._pipeline is not None:
+            self._pipeline.flush()
     
     async def shutdown(self) -> None:
         """Shutdown the logging system gracefully."""
-        # Stop async handlers
-        for async_handler in self._async_handlers:
-            await async_handler.stop()
+        # Drain the pipeline without blocking the event loop
+        if self._pipeline is not None:
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(self._executor, self._pipeline.stop)
+            self._pipeline = None
         
         # Shutdown executor
         self._executor.shutdown(wait=True)
@@ -558,27 +567,6 @@ class Logger:
         self._initialized = False
 
 
-class AsyncHandlerWrapper(logging.Handler):
-    """Wrapper for async log handlers to work with standard logging."""
-    
-    def __init__(self, async_handler: AsyncLogHandler):
-        super().__init__()
-        self.async_handler = async_handler
-    
-    def emit(self, record: logging.LogRecord):
-        """Emit record asynchronously."""
-        try:
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                asyncio.create_task(self.async_handler.emit(record))
-            else:
-                # Fallback to sync if no event loop
-                self.async_handler.handler.emit(record)
-        except:
-            # Fallback to sync
-            self.async_handler.handler.emit(record)
-
-
 # Global logger instance
 _logger = None
 
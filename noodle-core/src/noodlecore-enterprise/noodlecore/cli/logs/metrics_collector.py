@@ -20,18 +20,22 @@ import json
 import os
 import psutil
 import time
-import threading
-from collections import defaultdict, deque
 from dataclasses import dataclass, asdict
-from datetime import datetime, timedelta
+from datetime import datetime
 from enum import Enum
 from pathlib import Path
 from typing import Dict, Any, Optional, List, Callable, Union
-import statistics
 import socket
 import platform
 
 from ..cli_config import get_cli_config
+from .metrics_accumulator import ShardedMetricAccumulator, MetricEvent
+from .metrics_storage import (
+    ColumnarMetricStore,
+    RollupBucket,
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_RAW_RETENTION_SECONDS
+)
 
 
 # Error codes for metrics collector (5301-5400)
@@ -109,24 +113,44 @@ class MetricsException(Exception):
 class MetricsCollector:
     """Comprehensive metrics collection system."""
     
-    def __init__(self, config_dir: Optional[str] = None):
+    def __init__(
+        self,
+        config_dir: Optional[str] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        raw_retention_seconds: int = DEFAULT_RAW_RETENTION_SECONDS,
+        flush_interval: float = 1.0
+    ):
         """
         Initialize the metrics collector.
         
         Args:
             config_dir: Directory for metrics storage
+            chunk_size: Samples per storage chunk before it is sealed
+            raw_retention_seconds: How long raw samples are kept
+            flush_interval: Seconds between merges of the hot-path shards
         """
         self.config = get_cli_config()
         self.config_dir = Path(config_dir or '.project/.noodle/logs/metrics')
         self.config_dir.mkdir(parents=True, exist_ok=True)
         
         # Metrics storage
-        self.metrics_file = self.config_dir / 'metrics.log'
+        self.series_dir = self.config_dir / 'series'
         self.aggregated_file = self.config_dir / 'aggregated_metrics.json'
         self.custom_metrics_file = self.config_dir / 'custom_metrics.json'
         
-        # In-memory metrics storage
-        self.metrics_buffer: Dict[str, deque] = defaultdict(lambda: deque(maxlen=10000))
+        # Columnar time-series storage with incremental rollups
+        self.storage = ColumnarMetricStore(
+            self.series_dir,
+            chunk_size=chunk_size,
+            raw_retention_seconds=raw_retention_seconds
+        )
+        
+        # Per-thread hot-path shards, merged into storage by a background flusher
+        self._accumulator = ShardedMetricAccumulator(
+            self._ingest_events,
+            counter_types=(MetricType.COUNTER,),
+            flush_interval=flush_interval
+        )
         self.metric_definitions: Dict[str, MetricDefinition] = {}
         
         # Custom metrics registry
@@ -136,7 +160,9 @@ class MetricsCollector:
         self._collecting = False
         self._collection_task = None
         self._aggregation_task = None
-        self._lock = threading.Lock()
+        
+        # Aggregation windows (seconds) answered from rollups
+        self.aggregation_windows = [60, 300, 900, 3600]
         
         # Collection intervals (seconds)
         self.system_interval = 30
@@ -145,7 +171,6 @@ class MetricsCollector:
         
         # Statistics
         self._stats = {
-            'total_metrics': 0,
             'total_collections': 0,
             'start_time': datetime.now(),
             'last_collection': datetime.now()
@@ -156,6 +181,7 @@ class MetricsCollector:
         
         # Initialize files
         self._initialize_files()
+        self._load_storage()
     
     def _initialize_metric_definitions(self) -> None:
         """Initialize built-in metric definitions."""
@@ -359,12 +385,6 @@ class MetricsCollector:
     def _initialize_files(self) -> None:
         """Initialize metrics collection files."""
         try:
-            # Initialize metrics file
-            if not self.metrics_file.exists():
-                with open(self.metrics_file, 'w', encoding='utf-8') as f:
-                    f.write("# NoodleCore Metrics Collection\n")
-                    f.write(f"# Started: {datetime.now().isoformat()}\n\n")
-            
             # Initialize aggregated metrics file
             if not self.aggregated_file.exists():
                 with open(self.aggregated_file, 'w', encoding='utf-8') as f:
@@ -381,6 +401,16 @@ class MetricsCollector:
                 MetricsErrorCodes.COLLECTOR_INIT_FAILED
             )
     
+    def _load_storage(self) -> None:
+        """Load persisted chunks and rollups into the columnar store."""
+        try:
+            self.storage.load()
+        except Exception as e:
+            raise MetricsException(
+                f"Failed to load metrics storage: {str(e)}",
+                MetricsErrorCodes.STORAGE_ERROR
+            ) from e
+    
     async def start_collection(self) -> None:
         """Start metrics collection."""
         if self._collecting:
@@ -388,6 +418,7 @@ class MetricsCollector:
         
         try:
             self._collecting = True
+            self._accumulator.start()
             
             # Start collection tasks
             self._collection_task = asyncio.create_task(self._collection_loop())
@@ -419,8 +450,10 @@ class MetricsCollector:
             except asyncio.CancelledError:
                 pass
         
-        # Save final aggregated metrics
+        # Merge outstanding shards and save final aggregated metrics
+        self._accumulator.stop()
         await self._save_aggregated_metrics()
+        await self._flush_storage()
     
     async def _collection_loop(self) -> None:
         """Main collection loop."""
@@ -462,8 +495,8 @@ class MetricsCollector:
         """Periodic aggregation loop."""
         while self._collecting:
             try:
-                await self._aggregate_metrics()
                 await self._save_aggregated_metrics()
+                await self._flush_storage()
                 await asyncio.sleep(self.aggregation_interval)
                 
             except asyncio.CancelledError:
@@ -592,7 +625,7 @@ class MetricsCollector:
                 "metrics_collected_total",
                 MetricCategory.APPLICATION,
                 MetricType.COUNTER,
-                self._stats['total_metrics'],
+                self._total_metrics(),
                 {"component": "metrics_collector"}
             )
             
@@ -642,19 +675,12 @@ class MetricsCollector:
     ) -> None:
         """Record a metric value."""
         try:
-            metric_value = MetricValue(
-                timestamp=datetime.now(),
-                value=value,
-                tags=tags
-            )
-            
-            # Add to buffer
-            with self._lock:
-                self.metrics_buffer[name].append(metric_value)
-                self._stats['total_metrics'] += 1
+            # Histogram values are stored by their sum, as aggregation always did
+            if isinstance(value, dict):
+                value = value.get('sum', 0)
             
-            # Save to file
-            await self._save_metric(name, category, metric_type, metric_value)
+            # Hot path: no lock and no I/O, the flusher merges into storage
+            self._accumulator.record(name, category, metric_type, value, tags)
             
         except Exception as e:
             raise MetricsException(
@@ -662,30 +688,29 @@ class MetricsCollector:
                 MetricsErrorCodes.METRIC_COLLECTION_FAILED
             )
     
-    async def _save_metric(
-        self,
-        name: str,
-        category: MetricCategory,
-        metric_type: MetricType,
-        metric_value: MetricValue
-    ) -> None:
-        """Save metric to file."""
+    def _ingest_events(self, events: List[MetricEvent]) -> None:
+        """Merge a drained batch of hot-path events into the columnar store."""
+        for name, category, metric_type, timestamp, value, tags in events:
+            if name not in self.metric_definitions and isinstance(category, MetricCategory):
+                self.metric_definitions[name] = MetricDefinition(
+                    name, category, metric_type, "", "", {}
+                )
+            self.storage.append(name, timestamp, float(value), tags)
+    
+    def _total_metrics(self) -> int:
+        """Number of metric events recorded, including those not yet merged."""
+        accumulator_stats = self._accumulator.get_stats()
+        return accumulator_stats['events_drained'] + accumulator_stats['pending_events']
+    
+    async def _flush_storage(self) -> None:
+        """Persist sealed chunks and rollups, then drop chunks past raw retention."""
         try:
-            metric_data = {
-                'timestamp': metric_value.timestamp.isoformat(),
-                'name': name,
-                'category': category.value,
-                'type': metric_type.value,
-                'value': metric_value.value,
-                'tags': metric_value.tags
-            }
+            self.storage.flush()
+            self.storage.enforce_retention()
             
-            with open(self.metrics_file, 'a', encoding='utf-8') as f:
-                f.write(json.dumps(metric_data, default=str) + '\n')
-                
-        except IOError as e:
+        except Exception as e:
             raise MetricsException(
-                f"Failed to save metric: {str(e)}",
+                f"Failed to flush metrics storage: {str(e)}",
                 MetricsErrorCodes.STORAGE_ERROR
             )
     
@@ -991,9 +1016,9 @@ class MetricsCollector:
     async def _aggregate_metrics(self) -> None:
         """Aggregate metrics over time windows."""
         try:
-            time_windows = [60, 300, 900, 3600]  # 1min, 5min, 15min, 1hour
+            self._accumulator.drain()
             
-            for window in time_windows:
+            for window in self.aggregation_windows:
                 await self._aggregate_metrics_for_window(window)
                 
         except Exception as e:
@@ -1002,80 +1027,81 @@ class MetricsCollector:
                 MetricsErrorCodes.AGGREGATION_FAILED
             )
     
+    def _build_aggregation(
+        self,
+        metric_def: MetricDefinition,
+        bucket: RollupBucket,
+        time_window: int
+    ) -> Dict[str, float]:
+        """Derive the per-type aggregation from a merged rollup bucket."""
+        aggregation = {}
+        
+        if metric_def.metric_type == MetricType.COUNTER:
+            aggregation['sum'] = bucket.total
+            aggregation['rate'] = bucket.total / time_window
+        elif metric_def.metric_type == MetricType.GAUGE:
+            aggregation['latest'] = bucket.latest
+            aggregation['avg'] = bucket.mean
+            aggregation['min'] = bucket.minimum
+            aggregation['max'] = bucket.maximum
+        elif metric_def.metric_type == MetricType.TIMER:
+            aggregation['count'] = bucket.count
+            aggregation['sum'] = bucket.total
+            aggregation['avg'] = bucket.mean
+            aggregation['min'] = bucket.minimum
+            aggregation['max'] = bucket.maximum
+            if bucket.count > 1:
+                aggregation['std_dev'] = bucket.std_dev
+            # Percentiles come from the rollup sketch (~1% relative error)
+            aggregation['p50'] = bucket.sketch.quantile(0.5)
+            aggregation['p95'] = bucket.sketch.quantile(0.95)
+            aggregation['p99'] = bucket.sketch.quantile(0.99)
+        elif metric_def.metric_type == MetricType.RATE:
+            aggregation['avg_rate'] = bucket.mean
+            aggregation['max_rate'] = bucket.maximum
+        
+        return aggregation
+    
+    def _compute_window_aggregates(
+        self,
+        time_window: int,
+        metric_names: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """Aggregate every defined metric over a window from its rollups."""
+        aggregated = {}
+        now = time.time()
+        
+        for metric_name in self.storage.series_names():
+            if metric_names and not any(name in metric_name for name in metric_names):
+                continue
+            
+            # Get metric definition
+            metric_def = self.metric_definitions.get(metric_name)
+            if not metric_def:
+                continue
+            
+            bucket = self.storage.aggregate(metric_name, time_window, now=now)
+            if bucket is None:
+                continue
+            
+            aggregated_metric = AggregatedMetric(
+                metric_name=metric_name,
+                category=metric_def.category,
+                metric_type=metric_def.metric_type,
+                time_window=time_window,
+                aggregation=self._build_aggregation(metric_def, bucket, time_window),
+                tags=metric_def.tags,
+                timestamp=datetime.now()
+            )
+            
+            aggregated[f"{metric_name}_{time_window}s"] = asdict(aggregated_metric)
+        
+        return aggregated
+    
     async def _aggregate_metrics_for_window(self, time_window: int) -> None:
         """Aggregate metrics for a specific time window."""
         try:
-            cutoff_time = datetime.now() - timedelta(seconds=time_window)
-            aggregated = {}
-            
-            for metric_name, metric_values in self.metrics_buffer.items():
-                # Filter values by time window
-                recent_values = [
-                    mv for mv in metric_values
-                    if mv.timestamp >= cutoff_time
-                ]
-                
-                if not recent_values:
-                    continue
-                
-                # Get metric definition
-                metric_def = self.metric_definitions.get(metric_name)
-                if not metric_def:
-                    continue
-                
-                # Extract numeric values
-                numeric_values = []
-                for mv in recent_values:
-                    if isinstance(mv.value, (int, float)):
-                        numeric_values.append(mv.value)
-                    elif isinstance(mv.value, dict):
-                        # For histogram metrics, extract sum
-                        numeric_values.append(mv.value.get('sum', 0))
-                
-                if not numeric_values:
-                    continue
-                
-                # Calculate aggregations based on metric type
-                aggregation = {}
-                
-                if metric_def.metric_type == MetricType.COUNTER:
-                    aggregation['sum'] = sum(numeric_values)
-                    aggregation['rate'] = aggregation['sum'] / time_window
-                elif metric_def.metric_type == MetricType.GAUGE:
-                    aggregation['latest'] = numeric_values[-1]
-                    aggregation['avg'] = statistics.mean(numeric_values)
-                    aggregation['min'] = min(numeric_values)
-                    aggregation['max'] = max(numeric_values)
-                elif metric_def.metric_type == MetricType.TIMER:
-                    aggregation['count'] = len(numeric_values)
-                    aggregation['sum'] = sum(numeric_values)
-                    aggregation['avg'] = statistics.mean(numeric_values)
-                    aggregation['min'] = min(numeric_values)
-                    aggregation['max'] = max(numeric_values)
-                    if len(numeric_values) > 1:
-                        aggregation['std_dev'] = statistics.stdev(numeric_values)
-                    # Calculate percentiles
-                    sorted_values = sorted(numeric_values)
-                    n = len(sorted_values)
-                    aggregation['p50'] = sorted_values[int(n * 0.5)]
-                    aggregation['p95'] = sorted_values[int(n * 0.95)]
-                    aggregation['p99'] = sorted_values[int(n * 0.99)]
-                elif metric_def.metric_type == MetricType.RATE:
-                    aggregation['avg_rate'] = statistics.mean(numeric_values)
-                    aggregation['max_rate'] = max(numeric_values)
-                
-                # Create aggregated metric
-                aggregated_metric = AggregatedMetric(
-                    metric_name=metric_name,
-                    category=metric_def.category,
-                    metric_type=metric_def.metric_type,
-                    time_window=time_window,
-                    aggregation=aggregation,
-                    tags=metric_def.tags,
-                    timestamp=datetime.now()
-                )
-                
-                aggregated[f"{metric_name}_{time_window}s"] = asdict(aggregated_metric)
+            aggregated = self._compute_window_aggregates(time_window)
             
             # Save aggregated metrics for this window
             await self._save_aggregated_metrics_window(time_window, aggregated)
@@ -1134,7 +1160,8 @@ class MetricsCollector:
         category: Optional[MetricCategory] = None,
         since: Optional[datetime] = None,
         until: Optional[datetime] = None,
-        limit: int = 1000
+        limit: int = 1000,
+        resolution: Optional[int] = None
     ) -> Dict[str, Any]:
         """
         Get metrics with filtering.
@@ -1145,14 +1172,27 @@ class MetricsCollector:
             since: Filter by start time
             until: Filter by end time
             limit: Maximum number of metrics
+            resolution: Return rollup points at this resolution (seconds)
+                instead of raw samples
             
         Returns:
             Dictionary containing metrics
         """
         try:
+            if resolution and resolution not in self.storage.rollup_resolutions:
+                return {
+                    'success': False,
+                    'error': f"Unsupported resolution: {resolution}",
+                    'error_code': MetricsErrorCodes.METRIC_COLLECTION_FAILED
+                }
+            
+            self._accumulator.drain()
+            
+            since_ts = since.timestamp() if since else None
+            until_ts = until.timestamp() if until else None
             metrics = []
             
-            for metric_name, metric_values in self.metrics_buffer.items():
+            for metric_name in self.storage.series_names():
                 if metric_names and metric_name not in metric_names:
                     continue
                 
@@ -1163,21 +1203,32 @@ class MetricsCollector:
                 if category and metric_def.category != category:
                     continue
                 
-                for metric_value in metric_values:
-                    if since and metric_value.timestamp < since:
-                        continue
-                    if until and metric_value.timestamp > until:
-                        continue
-                    
-                    metric_data = {
+                if resolution:
+                    buckets = self.storage.rollup_points(metric_name, resolution, since_ts, until_ts)
+                    for bucket in buckets[-limit:]:
+                        metrics.append({
+                            'name': metric_name,
+                            'category': metric_def.category.value,
+                            'type': metric_def.metric_type.value,
+                            'timestamp': datetime.fromtimestamp(bucket.start).isoformat(),
+                            'resolution': resolution,
+                            'value': self._build_aggregation(metric_def, bucket, resolution),
+                            'tags': metric_def.tags
+                        })
+                    continue
+                
+                # Each series yields at most `limit` newest samples
+                for timestamp, value, tags in self.storage.query_raw(
+                    metric_name, since_ts, until_ts, limit
+                ):
+                    metrics.append({
                         'name': metric_name,
                         'category': metric_def.category.value,
                         'type': metric_def.metric_type.value,
-                        'timestamp': metric_value.timestamp.isoformat(),
-                        'value': metric_value.value,
-                        'tags': metric_value.tags
-                    }
-                    metrics.append(metric_data)
+                        'timestamp': datetime.fromtimestamp(timestamp).isoformat(),
+                        'value': value,
+                        'tags': tags
+                    })
             
             # Sort by timestamp (newest first) and apply limit
             metrics.sort(key=lambda x: x['timestamp'], reverse=True)
@@ -1192,7 +1243,8 @@ class MetricsCollector:
                     'category': category.value if category else None,
                     'since': since.isoformat() if since else None,
                     'until': until.isoformat() if until else None,
-                    'limit': limit
+                    'limit': limit,
+                    'resolution': resolution
                 }
             }
             
@@ -1211,6 +1263,9 @@ class MetricsCollector:
         """
         Get aggregated metrics.
         
+        Aggregates are computed from the incrementally maintained rollups,
+        so any window up to the coarsest rollup retention can be requested.
+        
         Args:
             time_window: Time window in seconds
             metric_names: Filter by metric names
@@ -1219,50 +1274,19 @@ class MetricsCollector:
             Dictionary containing aggregated metrics
         """
         try:
-            if not self.aggregated_file.exists():
-                return {
-                    'success': False,
-                    'error': 'No aggregated metrics available',
-                    'error_code': MetricsErrorCodes.METRIC_COLLECTION_FAILED
-                }
-            
-            with open(self.aggregated_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            self._accumulator.drain()
             
             result = {
                 'success': True,
-                'generated_at': data['generated_at'],
+                'generated_at': datetime.now().isoformat(),
                 'metrics': {}
             }
             
-            # Filter by time window
-            if time_window:
-                window_key = f"{time_window}s"
-                if window_key in data['metrics']:
-                    window_metrics = data['metrics'][window_key]
-                    
-                    # Filter by metric names
-                    if metric_names:
-                        window_metrics = {
-                            k: v for k, v in window_metrics.items()
-                            if any(name in k for name in metric_names)
-                        }
-                    
-                    result['metrics'][window_key] = window_metrics
-            else:
-                # Return all time windows
-                for window_key, window_metrics in data['metrics'].items():
-                    if window_key == 'generated_at':
-                        continue
-                    
-                    # Filter by metric names
-                    if metric_names:
-                        window_metrics = {
-                            k: v for k, v in window_metrics.items()
-                            if any(name in k for name in metric_names)
-                        }
-                    
-                    result['metrics'][window_key] = window_metrics
+            windows = [time_window] if time_window else self.aggregation_windows
+            for window in windows:
+                result['metrics'][f"{window}s"] = self._compute_window_aggregates(
+                    window, metric_names
+                )
             
             return result
             
@@ -1388,14 +1412,14 @@ class MetricsCollector:
         
         return {
             'collecting': self._collecting,
-            'total_metrics': self._stats['total_metrics'],
+            'total_metrics': self._total_metrics(),
             'total_collections': self._stats['total_collections'],
             'uptime_seconds': uptime.total_seconds(),
             'start_time': self._stats['start_time'].isoformat(),
             'last_collection': self._stats['last_collection'].isoformat(),
-            'metrics_buffer_sizes': {
-                name: len(values) for name, values in self.metrics_buffer.items()
-            },
+            'metrics_buffer_sizes': self.storage.sample_counts(),
+            'raw_retention_seconds': self.storage.raw_retention_seconds,
+            'accumulator': self._accumulator.get_stats(),
             'registered_metrics': len(self.metric_definitions),
             'custom_metrics': len(self.custom_metrics),
             'collection_intervals': {
@@ -1415,14 +1439,7 @@ class MetricsCollector:
             tags: Additional tags
         """
         try:
-            # Create async task to avoid blocking
-            asyncio.create_task(self._record_metric(
-                name,
-                MetricCategory.APPLICATION,
-                MetricType.COUNTER,
-                value,
-                tags or {}
-            ))
+            self._accumulator.record(name, MetricCategory.APPLICATION, MetricType.COUNTER, value, tags)
         except:
             pass  # Don't let metric failures break application
     
@@ -1436,14 +1453,7 @@ class MetricsCollector:
             tags: Additional tags
         """
         try:
-            # Create async task to avoid blocking
-            asyncio.create_task(self._record_metric(
-                name,
-                MetricCategory.APPLICATION,
-                MetricType.GAUGE,
-                value,
-                tags or {}
-            ))
+            self._accumulator.record(name, MetricCategory.APPLICATION, MetricType.GAUGE, value, tags)
         except:
             pass  # Don't let metric failures break application
     
@@ -1457,14 +1467,6 @@ class MetricsCollector:
             tags: Additional tags
         """
         try:
-            # Create async task to avoid blocking
-            asyncio.create_task(self._record_metric(
-                name,
-                MetricCategory.APPLICATION,
-                MetricType.TIMER,
-                value,
-                tags or {}
-            ))
+            self._accumulator.record(name, MetricCategory.APPLICATION, MetricType.TIMER, value, tags)
         except:
             pass  # Don't let metric failures break application
-
@@ -0,0 +1,753 @@
+﻿"""
+Logs::Metrics Storage - metrics_storage.py
+Copyright Â© 2025 Michael van Erp. All rights reserved.
+
+This file is part of the NoodleCore project.
+Licensed under the MIT License - see LICENSE file for details.
+
+Unauthorized copying, distribution, or modification is prohibited.
+"""
+
+"""
+Metrics Storage Module
+
+This module implements the columnar time-series storage engine used by the
+MetricsCollector. Samples are kept per metric in chunks of contiguous
+timestamp/value columns, sealed chunks are written to disk delta-encoded, and
+rolling rollups (10s, 1m, 5m, 1h) are maintained incrementally at ingest so
+that aggregation queries never have to scan raw samples.
+"""
+
+import json
+import math
+import os
+import re
+import struct
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Tuple, Deque
+
+
+# Rollup resolutions (seconds) mapped to the number of buckets retained
+DEFAULT_ROLLUP_RESOLUTIONS: Dict[int, int] = {
+    10: 360,      # 10 seconds for 1 hour
+    60: 1440,     # 1 minute for 1 day
+    300: 2016,    # 5 minutes for 1 week
+    3600: 720     # 1 hour for 30 days
+}
+
+DEFAULT_CHUNK_SIZE = 4096
+DEFAULT_RAW_RETENTION_SECONDS = 3600
+
+CHUNK_MAGIC = b'NCMC'
+CHUNK_VERSION = 1
+_CHUNK_HEADER = struct.Struct('<4sBIq')  # magic, version, count, first timestamp (us)
+
+
+def _encode_varint(value: int, out: bytearray) -> None:
+    """Append a zigzag-encoded signed varint to out."""
+    value = (value << 1) ^ (value >> 63)
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _decode_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    """Decode a zigzag-encoded signed varint, returning (value, new_pos)."""
+    shift = 0
+    result = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            break
+        shift += 7
+    return (result >> 1) ^ -(result & 1), pos
+
+
+class QuantileSketch:
+    """
+    Mergeable log-bucketed histogram with bounded relative error.
+    
+    Values are counted in buckets whose boundaries grow geometrically by
+    GAMMA, so percentile estimates are within ~1% of the true value and two
+    sketches can be merged by adding their bucket counts.
+    """
+    
+    GAMMA = 1.02
+    _LOG_GAMMA = math.log(GAMMA)
+    _MIN_VALUE = 1e-9
+    
+    __slots__ = ('positive', 'negative', 'zero_count')
+    
+    def __init__(self):
+        self.positive: Dict[int, int] = {}
+        self.negative: Dict[int, int] = {}
+        self.zero_count = 0
+    
+    def add(self, value: float, count: int = 1) -> None:
+        """Add a value to the sketch."""
+        if value > self._MIN_VALUE:
+            key = math.ceil(math.log(value) / self._LOG_GAMMA)
+            self.positive[key] = self.positive.get(key, 0) + count
+        elif value < -self._MIN_VALUE:
+            key = math.ceil(math.log(-value) / self._LOG_GAMMA)
+            self.negative[key] = self.negative.get(key, 0) + count
+        else:
+            self.zero_count += count
+    
+    def merge(self, other: 'QuantileSketch') -> None:
+        """Merge another sketch into this one."""
+        for key, count in other.positive.items():
+            self.positive[key] = self.positive.get(key, 0) + count
+        for key, count in other.negative.items():
+            self.negative[key] = self.negative.get(key, 0) + count
+        self.zero_count += other.zero_count
+    
+    def _bucket_value(self, key: int) -> float:
+        return 2.0 * self.GAMMA ** key / (self.GAMMA + 1.0)
+    
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate the q-th quantile (0 <= q <= 1)."""
+        total = self.zero_count + sum(self.positive.values()) + sum(self.negative.values())
+        if total == 0:
+            return None
+        
+        rank = q * (total - 1)
+        seen = 0
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self._bucket_value(key)
+        seen += self.zero_count
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self._bucket_value(key)
+        return self._bucket_value(max(self.positive)) if self.positive else 0.0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the sketch."""
+        return {
+            'positive': {str(k): v for k, v in self.positive.items()},
+            'negative': {str(k): v for k, v in self.negative.items()},
+            'zero_count': self.zero_count
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'QuantileSketch':
+        """Deserialize a sketch."""
+        sketch = cls()
+        sketch.positive = {int(k): v for k, v in data.get('positive', {}).items()}
+        sketch.negative = {int(k): v for k, v in data.get('negative', {}).items()}
+        sketch.zero_count = data.get('zero_count', 0)
+        return sketch
+
+
+class RollupBucket:
+    """Pre-aggregated statistics for one time bucket of a metric."""
+    
+    __slots__ = ('start', 'count', 'total', 'sum_sq', 'minimum', 'maximum',
+                 'latest', 'latest_ts', 'sketch')
+    
+    def __init__(self, start: float):
+        self.start = start
+        self.count = 0
+        self.total = 0.0
+        self.sum_sq = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.latest = 0.0
+        self.latest_ts = -math.inf
+        self.sketch = QuantileSketch()
+    
+    def add(self, timestamp: float, value: float) -> None:
+        """Fold a sample into the bucket."""
+        self.count += 1
+        self.total += value
+        self.sum_sq += value * value
+        if value < self.minimum:
+            self.minimum = value
+        if value > self.maximum:
+            self.maximum = value
+        if timestamp >= self.latest_ts:
+            self.latest = value
+            self.latest_ts = timestamp
+        self.sketch.add(value)
+    
+    def merge(self, other: 'RollupBucket') -> None:
+        """Merge another bucket into this one."""
+        self.count += other.count
+        self.total += other.total
+        self.sum_sq += other.sum_sq
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        if other.latest_ts >= self.latest_ts:
+            self.latest = other.latest
+            self.latest_ts = other.latest_ts
+        self.sketch.merge(other.sketch)
+    
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+    
+    @property
+    def std_dev(self) -> float:
+        """Sample standard deviation (0.0 with fewer than two samples)."""
+        if self.count < 2:
+            return 0.0
+        variance = (self.sum_sq - self.total * self.total / self.count) / (self.count - 1)
+        return math.sqrt(max(variance, 0.0))
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the bucket."""
+        return {
+            'start': self.start,
+            'count': self.count,
+            'total': self.total,
+            'sum_sq': self.sum_sq,
+            'minimum': self.minimum if self.count else None,
+            'maximum': self.maximum if self.count else None,
+            'latest': self.latest,
+            'latest_ts': self.latest_ts if self.count else None,
+            'sketch': self.sketch.to_dict()
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'RollupBucket':
+        """Deserialize a bucket."""
+        bucket = cls(data['start'])
+        bucket.count = data['count']
+        bucket.total = data['total']
+        bucket.sum_sq = data['sum_sq']
+        if bucket.count:
+            bucket.minimum = data['minimum']
+            bucket.maximum = data['maximum']
+            bucket.latest_ts = data['latest_ts']
+        bucket.latest = data['latest']
+        bucket.sketch = QuantileSketch.from_dict(data['sketch'])
+        return bucket
+
+
+class RollupSeries:
+    """Ring of fixed-resolution rollup buckets for one metric."""
+    
+    def __init__(self, resolution: int, retention: int):
+        self.resolution = resolution
+        self.buckets: Deque[RollupBucket] = deque(maxlen=retention)
+    
+    def add(self, timestamp: float, value: float) -> None:
+        """Fold a sample into the bucket covering its timestamp."""
+        start = timestamp - (timestamp % self.resolution)
+        buckets = self.buckets
+        
+        if not buckets or start > buckets[-1].start:
+            bucket = RollupBucket(start)
+            buckets.append(bucket)
+        elif start == buckets[-1].start:
+            bucket = buckets[-1]
+        else:
+            # Late sample: walk back to its bucket, or to where it belongs
+            index = len(buckets) - 1
+            while index >= 0 and buckets[index].start > start:
+                index -= 1
+            if index >= 0 and buckets[index].start == start:
+                bucket = buckets[index]
+            else:
+                if len(buckets) == buckets.maxlen:
+                    # Older than every retained bucket: already expired
+                    if index < 0:
+                        return
+                    buckets.popleft()
+                    index -= 1
+                bucket = RollupBucket(start)
+                buckets.insert(index + 1, bucket)
+        
+        bucket.add(timestamp, value)
+    
+    def range(self, since: Optional[float] = None, until: Optional[float] = None) -> List[RollupBucket]:
+        """Return buckets overlapping [since, until], oldest first."""
+        selected = []
+        for bucket in reversed(self.buckets):
+            if since is not None and bucket.start + self.resolution <= since:
+                break
+            if until is not None and bucket.start > until:
+                continue
+            selected.append(bucket)
+        selected.reverse()
+        return selected
+
+
+class MetricChunk:
+    """Contiguous columns of timestamps, values and interned tag ids."""
+    
+    __slots__ = ('timestamps', 'values', 'tag_ids', 'sealed', 'path')
+    
+    def __init__(self):
+        self.timestamps = array('d')
+        self.values = array('d')
+        self.tag_ids = array('I')
+        self.sealed = False
+        self.path: Optional[Path] = None
+    
+    def __len__(self) -> int:
+        return len(self.timestamps)
+    
+    @property
+    def start(self) -> float:
+        return self.timestamps[0]
+    
+    @property
+    def end(self) -> float:
+        return self.timestamps[-1]
+    
+    def accepts(self, timestamp: float) -> bool:
+        """Whether timestamp keeps the column non-decreasing."""
+        return not self.timestamps or timestamp >= self.timestamps[-1]
+    
+    def append(self, timestamp: float, value: float, tag_id: int) -> None:
+        """
+        Append a sample.
+        
+        Raises:
+            ValueError: If timestamp is older than the chunk's newest sample;
+                timestamps must stay non-decreasing for bisection.
+        """
+        if not self.accepts(timestamp):
+            raise ValueError(
+                f"Out-of-order timestamp {timestamp} < {self.timestamps[-1]}"
+            )
+        self.timestamps.append(timestamp)
+        self.values.append(value)
+        self.tag_ids.append(tag_id)
+    
+    def insert(self, timestamp: float, value: float, tag_id: int) -> None:
+        """Insert a late sample at its sorted position (unsealed chunks only)."""
+        if self.sealed:
+            raise ValueError("Cannot insert into a sealed chunk")
+        i = bisect_right(self.timestamps, timestamp)
+        self.timestamps.insert(i, timestamp)
+        self.values.insert(i, value)
+        self.tag_ids.insert(i, tag_id)
+    
+    def index_range(self, since: Optional[float], until: Optional[float]) -> Tuple[int, int]:
+        """Return the [lo, hi) sample index range inside [since, until]."""
+        lo = bisect_left(self.timestamps, since) if since is not None else 0
+        hi = bisect_right(self.timestamps, until) if until is not None else len(self.timestamps)
+        return lo, hi
+    
+    def encode(self, tag_table: List[Dict[str, str]]) -> bytes:
+        """
+        Encode the chunk for disk.
+        
+        Timestamps are stored as microsecond deltas (zigzag varints), values as
+        raw little-endian float64 (deltas of floats are not lossless), and tag
+        ids are remapped to a chunk-local table appended as JSON.
+        """
+        micros = [int(round(ts * 1_000_000)) for ts in self.timestamps]
+        out = bytearray(_CHUNK_HEADER.pack(CHUNK_MAGIC, CHUNK_VERSION, len(micros), micros[0]))
+        
+        previous = micros[0]
+        for ts in micros[1:]:
+            _encode_varint(ts - previous, out)
+            previous = ts
+        
+        values = array('d', self.values)
+        if values.itemsize != 8:
+            raise ValueError("float64 array support is required")
+        if sys.byteorder != 'little':
+            values.byteswap()
+        out += values.tobytes()
+        
+        local_ids: Dict[int, int] = {}
+        local_tags: List[Dict[str, str]] = []
+        for tag_id in self.tag_ids:
+            if tag_id not in local_ids:
+                local_ids[tag_id] = len(local_tags)
+                local_tags.append(tag_table[tag_id])
+            _encode_varint(local_ids[tag_id], out)
+        
+        out += json.dumps(local_tags, separators=(',', ':')).encode('utf-8')
+        return bytes(out)
+    
+    @classmethod
+    def decode(cls, data: bytes) -> Tuple['MetricChunk', List[Dict[str, str]]]:
+        """Decode a chunk, returning it with its chunk-local tag table."""
+        magic, version, count, first_ts = _CHUNK_HEADER.unpack_from(data, 0)
+        if magic != CHUNK_MAGIC or version != CHUNK_VERSION:
+            raise ValueError("Not a metrics chunk or unsupported version")
+        
+        pos = _CHUNK_HEADER.size
+        chunk = cls()
+        micros = first_ts
+        chunk.timestamps.append(micros / 1_000_000)
+        for _ in range(count - 1):
+            delta, pos = _decode_varint(data, pos)
+            micros += delta
+            chunk.timestamps.append(micros / 1_000_000)
+        
+        chunk.values.frombytes(data[pos:pos + count * 8])
+        if sys.byteorder != 'little':
+            chunk.values.byteswap()
+        pos += count * 8
+        
+        for _ in range(count):
+            tag_id, pos = _decode_varint(data, pos)
+            chunk.tag_ids.append(tag_id)
+        
+        tags = json.loads(data[pos:].decode('utf-8'))
+        chunk.sealed = True
+        return chunk, tags
+
+
+class MetricSeries:
+    """
+    Chunks and rollups for a single metric.
+    
+    Chunks are internally sorted: late samples are inserted into the head
+    chunk at their position. A sample older than the previous sealed chunk
+    makes chunk ranges overlap; overlapping is then set so queries and
+    retention stop relying on chunk order.
+    """
+    
+    def __init__(self, name: str, rollup_resolutions: Dict[int, int]):
+        self.name = name
+        self.chunks: Deque[MetricChunk] = deque()
+        self.rollups: Dict[int, RollupSeries] = {
+            resolution: RollupSeries(resolution, retention)
+            for resolution, retention in rollup_resolutions.items()
+        }
+        self.sample_count = 0
+        self.overlapping = False
+    
+    def _latest_end(self) -> Optional[float]:
+        ends = [chunk.end for chunk in self.chunks if len(chunk)]
+        return max(ends) if ends else None
+    
+    def add_chunk(self, chunk: MetricChunk) -> None:
+        """Append a chunk, noting whether it overlaps the ones before it."""
+        if len(chunk):
+            latest = self._latest_end()
+            if latest is not None and chunk.start < latest:
+                self.overlapping = True
+        self.chunks.append(chunk)
+    
+    @property
+    def head(self) -> Optional[MetricChunk]:
+        if self.chunks and not self.chunks[-1].sealed:
+            return self.chunks[-1]
+        return None
+
+
+class ColumnarMetricStore:
+    """
+    Columnar per-metric time-series store with incremental rollups.
+    
+    Raw samples live in fixed-size chunks; retention is enforced by dropping
+    whole chunks, and aggregation queries are answered from rollups.
+    """
+    
+    def __init__(
+        self,
+        storage_dir: Path,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        raw_retention_seconds: int = DEFAULT_RAW_RETENTION_SECONDS,
+        rollup_resolutions: Optional[Dict[int, int]] = None
+    ):
+        """
+        Initialize the store.
+        
+        Args:
+            storage_dir: Directory for chunk files and rollup snapshots
+            chunk_size: Samples per chunk before it is sealed
+            raw_retention_seconds: How long raw samples are kept
+            rollup_resolutions: Mapping of resolution (seconds) to buckets retained
+        """
+        self.storage_dir = Path(storage_dir)
+        self.storage_dir.mkdir(parents=True, exist_ok=True)
+        self.rollups_file = self.storage_dir / 'rollups.json'
+        
+        self.chunk_size = chunk_size
+        self.raw_retention_seconds = raw_retention_seconds
+        self.rollup_resolutions = dict(rollup_resolutions or DEFAULT_ROLLUP_RESOLUTIONS)
+        
+        self.series: Dict[str, MetricSeries] = {}
+        self._tag_table: List[Dict[str, str]] = []
+        self._tag_index: Dict[Tuple[Tuple[str, str], ...], int] = {}
+        self._lock = threading.Lock()
+    
+    def _intern_tags(self, tags: Dict[str, str]) -> int:
+        key = tuple(sorted((str(k), str(v)) for k, v in tags.items()))
+        tag_id = self._tag_index.get(key)
+        if tag_id is None:
+            tag_id = len(self._tag_table)
+            self._tag_table.append(dict(key))
+            self._tag_index[key] = tag_id
+        return tag_id
+    
+    def _get_series(self, name: str) -> MetricSeries:
+        series = self.series.get(name)
+        if series is None:
+            series = MetricSeries(name, self.rollup_resolutions)
+            self.series[name] = series
+        return series
+    
+    def _series_dir(self, name: str) -> Path:
+        return self.storage_dir / re.sub(r'[^A-Za-z0-9_.-]', '_', name)
+    
+    def append(self, name: str, timestamp: float, value: float, tags: Dict[str, str]) -> None:
+        """
+        Append a sample and update every rollup for the metric.
+        
+        Args:
+            name: Metric name
+            timestamp: Sample time as epoch seconds
+            value: Numeric sample value
+            tags: Sample tags
+        """
+        with self._lock:
+            series = self._get_series(name)
+            tag_id = self._intern_tags(tags)
+            head = series.head
+            if head is None:
+                head = MetricChunk()
+                head.append(timestamp, value, tag_id)
+                series.add_chunk(head)
+            elif head.accepts(timestamp):
+                head.append(timestamp, value, tag_id)
+            else:
+                head.insert(timestamp, value, tag_id)
+                if (not series.overlapping and len(series.chunks) > 1
+                        and timestamp < series.chunks[-2].end):
+                    series.overlapping = True
+            series.sample_count += 1
+            if len(head) >= self.chunk_size:
+                head.sealed = True
+            
+            for rollup in series.rollups.values():
+                rollup.add(timestamp, value)
+    
+    def series_names(self) -> List[str]:
+        """Return the names of all stored metrics."""
+        with self._lock:
+            return list(self.series.keys())
+    
+    def sample_counts(self) -> Dict[str, int]:
+        """Return the number of raw samples held per metric."""
+        with self._lock:
+            return {
+                name: sum(len(chunk) for chunk in series.chunks)
+                for name, series in self.series.items()
+            }
+    
+    def query_raw(
+        self,
+        name: str,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: Optional[int] = None
+    ) -> List[Tuple[float, float, Dict[str, str]]]:
+        """
+        Return raw samples in [since, until], newest first.
+        
+        Chunks outside the range are skipped by their bounds and samples are
+        located inside a chunk by bisection on the timestamp column. Once late
+        samples have made chunk ranges overlap, every chunk is scanned and the
+        matches are sorted.
+        """
+        results: List[Tuple[float, float, Dict[str, str]]] = []
+        with self._lock:
+            series = self.series.get(name)
+            if series is None:
+                return results
+            overlapping = series.overlapping
+            
+            for chunk in reversed(series.chunks):
+                if not len(chunk):
+                    continue
+                if since is not None and chunk.end < since:
+                    if overlapping:
+                        continue
+                    break
+                if until is not None and chunk.start > until:
+                    continue
+                
+                lo, hi = chunk.index_range(since, until)
+                for i in range(hi - 1, lo - 1, -1):
+                    results.append((
+                        chunk.timestamps[i],
+                        chunk.values[i],
+                        self._tag_table[chunk.tag_ids[i]]
+                    ))
+                    if not overlapping and limit is not None and len(results) >= limit:
+                        return results
+        
+        if overlapping:
+            results.sort(key=lambda sample: sample[0], reverse=True)
+            if limit is not None:
+                del results[limit:]
+        return results
+    
+    def best_resolution(self, window: int) -> int:
+        """Pick the coarsest rollup resolution that still splits window into >= 5 buckets."""
+        resolutions = sorted(self.rollup_resolutions)
+        best = resolutions[0]
+        for resolution in resolutions:
+            if window / resolution >= 5:
+                best = resolution
+        return best
+    
+    def rollup_points(
+        self,
+        name: str,
+        resolution: int,
+        since: Optional[float] = None,
+        until: Optional[float] = None
+    ) -> List[RollupBucket]:
+        """Return the rollup buckets of a metric at a resolution, oldest first."""
+        with self._lock:
+            series = self.series.get(name)
+            if series is None or resolution not in series.rollups:
+                return []
+            return series.rollups[resolution].range(since, until)
+    
+    def aggregate(self, name: str, window: int, now: Optional[float] = None) -> Optional[RollupBucket]:
+        """
+        Merge the rollup buckets covering the last window seconds.
+        
+        The result is accurate to one bucket of the chosen resolution at the
+        window's leading edge.
+        """
+        now = time.time() if now is None else now
+        resolution = self.best_resolution(window)
+        buckets = self.rollup_points(name, resolution, since=now - window, until=now)
+        if not buckets:
+            return None
+        
+        merged = RollupBucket(buckets[0].start)
+        for bucket in buckets:
+            merged.merge(bucket)
+        return merged if merged.count else None
+    
+    def enforce_retention(self, now: Optional[float] = None) -> int:
+        """
+        Drop whole sealed chunks whose newest sample is past raw retention.
+        
+        Returns:
+            Number of chunks dropped
+        """
+        now = time.time() if now is None else now
+        cutoff = now - self.raw_retention_seconds
+        dropped: List[MetricChunk] = []
+        
+        with self._lock:
+            for series in self.series.values():
+                if series.overlapping:
+                    kept = deque()
+                    for chunk in series.chunks:
+                        if chunk.sealed and chunk.end < cutoff:
+                            dropped.append(chunk)
+                        else:
+                            kept.append(chunk)
+                    series.chunks = kept
+                    continue
+                while series.chunks and series.chunks[0].sealed and series.chunks[0].end < cutoff:
+                    dropped.append(series.chunks.popleft())
+        
+        for chunk in dropped:
+            if chunk.path is not None:
+                try:
+                    chunk.path.unlink()
+                except FileNotFoundError:
+                    pass
+        return len(dropped)
+    
+    def flush(self) -> None:
+        """Seal head chunks, write unpersisted chunks and snapshot rollups."""
+        pending: List[Tuple[str, MetricChunk, bytes]] = []
+        
+        with self._lock:
+            for name, series in self.series.items():
+                head = series.head
+                if head is not None and len(head):
+                    head.sealed = True
+                for chunk in series.chunks:
+                    if chunk.sealed and chunk.path is None and len(chunk):
+                        pending.append((name, chunk, chunk.encode(self._tag_table)))
+            
+            rollups = {
+                name: {
+                    str(resolution): [bucket.to_dict() for bucket in rollup.buckets]
+                    for resolution, rollup in series.rollups.items()
+                }
+                for name, series in self.series.items()
+            }
+        
+        for name, chunk, payload in pending:
+            series_dir = self._series_dir(name)
+            series_dir.mkdir(parents=True, exist_ok=True)
+            stem = f"{int(chunk.start * 1_000_000)}-{int(chunk.end * 1_000_000)}"
+            path = series_dir / f"{stem}.chunk"
+            suffix = 1
+            while path.exists():
+                # Overlapping chunks can share bounds
+                path = series_dir / f"{stem}-{suffix}.chunk"
+                suffix += 1
+            tmp_path = path.with_suffix('.tmp')
+            with open(tmp_path, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+            chunk.path = path
+        
+        tmp_rollups = self.rollups_file.with_suffix('.tmp')
+        with open(tmp_rollups, 'w', encoding='utf-8') as f:
+            json.dump({'names': {name: self._series_dir(name).name for name in rollups},
+                       'rollups': rollups}, f, separators=(',', ':'))
+        os.replace(tmp_rollups, self.rollups_file)
+    
+    def load(self, now: Optional[float] = None) -> None:
+        """Load the rollup snapshot and chunk files still within raw retention."""
+        now = time.time() if now is None else now
+        cutoff = now - self.raw_retention_seconds
+        
+        with self._lock:
+            names: Dict[str, str] = {}
+            if self.rollups_file.exists():
+                with open(self.rollups_file, 'r', encoding='utf-8') as f:
+                    snapshot = json.load(f)
+                names = snapshot.get('names', {})
+                for name, by_resolution in snapshot.get('rollups', {}).items():
+                    series = self._get_series(name)
+                    for resolution, buckets in by_resolution.items():
+                        rollup = series.rollups.get(int(resolution))
+                        if rollup is not None:
+                            rollup.buckets.extend(RollupBucket.from_dict(b) for b in buckets)
+            
+            for name, dir_name in names.items():
+                series_dir = self.storage_dir / dir_name
+                if not series_dir.is_dir():
+                    continue
+                series = self._get_series(name)
+                
+                for path in sorted(series_dir.glob('*.chunk'), key=lambda p: int(p.stem.split('-')[0])):
+                    end_us = int(path.stem.split('-')[1])
+                    if end_us / 1_000_000 < cutoff:
+                        path.unlink()
+                        continue
+                    
+                    with open(path, 'rb') as f:
+                        chunk, local_tags = MetricChunk.decode(f.read())
+                    remap = [self._intern_tags(tags) for tags in local_tags]
+                    chunk.tag_ids = array('I', (remap[i] for i in chunk.tag_ids))
+                    chunk.path = path
+                    series.add_chunk(chunk)
+                    series.sample_count += len(chunk)
@@ -72,7 +72,9 @@ try:
         PerformanceGate,
         RegressionReport,
         BenchmarkResult,
-        RegressionSeverity
+        RegressionSeverity,
+        BenchmarkConfig,
+        ComparisonMethod
     )
     _performance_available = True
 except ImportError:
@@ -116,12 +118,31 @@ try:
         ZAIProvider,
         OpenAIProvider,
         AnthropicProvider,
+        AsyncLLMEngine,
+        ResponseCache,
+        ProviderLimits,
         create_default_llm_manager
     )
     _llm_available = True
 except ImportError:
     _llm_available = False
 
+try:
+    from .tokenizer import (
+        Tokenizer,
+        BPETokenizer,
+        HeuristicTokenizer,
+        TokenBudgetPlanner,
+        ContextChunk,
+        ContextPlan,
+        get_tokenizer,
+        register_tokenizer,
+        context_window
+    )
+    _tokenizer_available = True
+except ImportError:
+    _tokenizer_available = False
+
 try:
     from .lsp_facts_gate import (
         LspFactsGate,
@@ -158,6 +179,50 @@ __all__ = [
     "DiffApplier",
 ]
 
+# Optional features are exported only when they import
+if _performance_available:
+    __all__ += [
+        "PerformanceDetector",
+        "BenchmarkRunner",
+        "PerformanceGate",
+        "RegressionReport",
+        "BenchmarkResult",
+        "RegressionSeverity",
+        "BenchmarkConfig",
+        "ComparisonMethod",
+    ]
+
+if _llm_available:
+    __all__ += [
+        "LLMManager",
+        "LLMConfig",
+        "LLMProvider",
+        "LLMModel",
+        "LLMRequest",
+        "LLMResponse",
+        "LLMProviderBase",
+        "ZAIProvider",
+        "OpenAIProvider",
+        "AnthropicProvider",
+        "AsyncLLMEngine",
+        "ResponseCache",
+        "ProviderLimits",
+        "create_default_llm_manager",
+    ]
+
+if _tokenizer_available:
+    __all__ += [
+        "Tokenizer",
+        "BPETokenizer",
+        "HeuristicTokenizer",
+        "TokenBudgetPlanner",
+        "ContextChunk",
+        "ContextPlan",
+        "get_tokenizer",
+        "register_tokenizer",
+        "context_window",
+    ]
+
 def get_version_info():
     """Get version and feature availability."""
     return {
@@ -4,11 +4,21 @@ Full LLM Integration for NIP v3
 This module provides complete LLM provider integration for patch generation,
 with Z.ai GLM-4.7 as the primary provider plus support for OpenAI, Anthropic,
 and other popular providers.
+
+Requests go through an asyncio engine with per-provider concurrency limits,
+token-bucket rate limiting, hedged fallbacks and a persistent response
+cache, so many candidates can be generated concurrently.
 """
 
+import asyncio
+import concurrent.futures
+import hashlib
 import json
 import os
+import sqlite3
+import threading
 from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
@@ -17,6 +27,8 @@ from typing import Any, Dict, List, Optional, Tuple
 import subprocess
 import time
 
+from .tokenizer import ContextChunk, ContextPlan, TokenBudgetPlanner, get_tokenizer
+
 
 class LLMProvider(Enum):
     """Supported LLM providers"""
@@ -149,8 +161,8 @@ class LLMProviderBase(ABC):
         pass
     
     def _count_tokens(self, text: str) -> int:
-        """Rough token estimation (≈4 characters per token)"""
-        return len(text) // 4
+        """Token count with the model's tokenizer (character heuristic if no vocab)"""
+        return get_tokenizer(self.config.model).count(text)
 
 
 class ZAIProvider(LLMProviderBase):
@@ -192,7 +204,7 @@ class ZAIProvider(LLMProviderBase):
                 {"role": "system", "content": request.system_prompt or "You are a helpful coding assistant."},
                 {"role": "user", "content": request.prompt}
             ],
-            "temperature": request.temperature or self.config.temperature,
+            "temperature": self.config.temperature if request.temperature is None else request.temperature,
             "max_tokens": request.max_tokens or self.config.max_tokens
         }
         
@@ -235,7 +247,7 @@ class ZAIProvider(LLMProviderBase):
                 cost_usd=cost,
                 duration_seconds=duration
             )
-            
+        
         except Exception as e:
             raise RuntimeError(f"Z.ai API request failed: {str(e)}")
     
@@ -249,7 +261,7 @@ class ZAIProvider(LLMProviderBase):
                 {"role": "system", "content": request.system_prompt},
                 {"role": "user", "content": request.prompt}
             ],
-            "temperature": request.temperature or self.config.temperature,
+            "temperature": self.config.temperature if request.temperature is None else request.temperature,
             "max_tokens": request.max_tokens or self.config.max_tokens,
             "stream": True
         }
@@ -316,7 +328,7 @@ class OpenAIProvider(LLMProviderBase):
                 {"role": "system", "content": request.system_prompt},
                 {"role": "user", "content": request.prompt}
             ],
-            "temperature": request.temperature or self.config.temperature,
+            "temperature": self.config.temperature if request.temperature is None else request.temperature,
             "max_tokens": request.max_tokens or self.config.max_tokens
         }
         
@@ -357,7 +369,7 @@ class OpenAIProvider(LLMProviderBase):
                 cost_usd=cost,
                 duration_seconds=duration
             )
-            
+        
         except Exception as e:
             raise RuntimeError(f"OpenAI API request failed: {str(e)}")
     
@@ -437,7 +449,7 @@ class AnthropicProvider(LLMProviderBase):
                 cost_usd=cost,
                 duration_seconds=duration
             )
-            
+        
         except Exception as e:
             raise RuntimeError(f"Anthropic API request failed: {str(e)}")
     
@@ -452,6 +464,383 @@ class AnthropicProvider(LLMProviderBase):
         return input_cost + output_cost
 
 
+@dataclass
+class ProviderLimits:
+    """Concurrency and rate limits applied to each provider"""
+    max_concurrency: int = 4
+    requests_per_second: float = 5.0
+    burst: int = 10
+
+
+class TokenBucket:
+    """Async token bucket: refills at rate tokens/second up to capacity"""
+    
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+    
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """Wait until tokens are available and take them"""
+        if self.rate <= 0:
+            return
+        while True:
+            self._refill()
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return
+            await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
+class LatencyTracker:
+    """Rolling window of request latencies"""
+    
+    def __init__(self, window: int = 200):
+        self.samples: deque = deque(maxlen=window)
+    
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+    
+    def percentile(self, p: float) -> Optional[float]:
+        """Latency at percentile p (0-100), or None without samples"""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+class ResponseCache:
+    """
+    Prompt to response cache with TTL and size-bounded LRU eviction.
+    
+    Entries are keyed by a hash of (model, system prompt, prompt, params).
+    With a path the cache persists in SQLite; otherwise it is in memory.
+    """
+    
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl_seconds: float = 7 * 24 * 3600,
+        max_entries: int = 10000
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed)")
+            self._db.commit()
+    
+    @staticmethod
+    def make_key(model: str, request: LLMRequest, temperature: float, max_tokens: int) -> str:
+        """Build the cache key for a request sent to a model"""
+        params = json.dumps({
+            'context': request.context,
+            'temperature': temperature,
+            'max_tokens': max_tokens
+        }, sort_keys=True)
+        params_hash = hashlib.sha256(params.encode('utf-8')).hexdigest()
+        material = json.dumps([model, request.system_prompt, request.prompt, params_hash])
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Optional[LLMResponse]:
+        """Return a cached response, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT response, created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row and now - row[1] <= self.ttl_seconds:
+                    self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                    self._db.commit()
+                    data = json.loads(row[0])
+                else:
+                    if row:
+                        self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                        self._db.commit()
+                    data = None
+            else:
+                entry = self._memory.get(key)
+                if entry and now - entry[0] <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    data = entry[1]
+                else:
+                    self._memory.pop(key, None)
+                    data = None
+            
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        
+        return LLMResponse(
+            content=data['content'],
+            model=data['model'],
+            provider=LLMProvider(data['provider']),
+            tokens_used=data['tokens_used'],
+            cost_usd=0.0,
+            duration_seconds=0.0,
+            metadata={**data.get('metadata', {}), 'cached': True}
+        )
+    
+    def put(self, key: str, response: LLMResponse) -> None:
+        """Store a response, evicting least recently used entries"""
+        now = time.time()
+        data = response.to_dict()
+        with self._lock:
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, created, accessed) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(data), now, now)
+                )
+                count = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+                if count > self.max_entries:
+                    self._db.execute(
+                        "DELETE FROM responses WHERE key IN "
+                        "(SELECT key FROM responses ORDER BY accessed LIMIT ?)",
+                        (count - self.max_entries,)
+                    )
+                self._db.commit()
+            else:
+                self._memory[key] = (now, data)
+                self._memory.move_to_end(key)
+                while len(self._memory) > self.max_entries:
+                    self._memory.popitem(last=False)
+    
+    def clear(self) -> None:
+        """Remove all entries"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+    
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+class AsyncLLMEngine:
+    """
+    Asyncio request engine in front of synchronous providers.
+    
+    Each provider gets a concurrency semaphore and a token bucket. A request
+    goes to the first provider; if it fails the next one starts at once, and
+    if it is still running after the provider's hedge percentile latency
+    the next one starts in parallel and the first success wins. Responses
+    are cached, and identical in-flight requests share one call.
+    
+    The engine runs its own event loop in a background thread so it can be
+    used from synchronous code and from any caller's event loop.
+    """
+    
+    def __init__(
+        self,
+        providers: List[LLMProviderBase],
+        limits: Optional[ProviderLimits] = None,
+        cache: Optional[ResponseCache] = None,
+        hedge_percentile: float = 95.0,
+        hedge_min_samples: int = 20
+    ):
+        self.providers = providers
+        self.limits = limits or ProviderLimits()
+        self.cache = cache
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.latency: Dict[int, LatencyTracker] = {id(p): LatencyTracker() for p in providers}
+        self.stats = {'requests': 0, 'cache_hits': 0, 'hedged': 0, 'fallbacks': 0, 'coalesced': 0}
+        
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._semaphores: Dict[int, asyncio.Semaphore] = {}
+        self._buckets: Dict[int, TokenBucket] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(1, self.limits.max_concurrency * max(1, len(providers))),
+            thread_name_prefix="llm-request"
+        )
+    
+    def add_provider(self, provider: LLMProviderBase) -> None:
+        """Append a fallback provider"""
+        self.providers.append(provider)
+        self.latency[id(provider)] = LatencyTracker()
+    
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever,
+                    name="llm-engine",
+                    daemon=True
+                )
+                self._thread.start()
+            return self._loop
+    
+    def submit(self, request: LLMRequest, use_fallback: bool = True) -> "concurrent.futures.Future":
+        """Schedule a request on the engine loop"""
+        return asyncio.run_coroutine_threadsafe(self._generate(request, use_fallback), self._ensure_loop())
+    
+    async def generate(self, request: LLMRequest, use_fallback: bool = True) -> LLMResponse:
+        """Generate from any event loop"""
+        return await asyncio.wrap_future(self.submit(request, use_fallback))
+    
+    def generate_sync(self, request: LLMRequest, use_fallback: bool = True) -> LLMResponse:
+        """Generate from synchronous code"""
+        return self.submit(request, use_fallback).result()
+    
+    def _cache_key(self, provider: LLMProviderBase, request: LLMRequest) -> str:
+        return ResponseCache.make_key(
+            provider.config.model,
+            request,
+            provider.config.temperature if request.temperature is None else request.temperature,
+            request.max_tokens or provider.config.max_tokens
+        )
+    
+    async def _generate(self, request: LLMRequest, use_fallback: bool) -> LLMResponse:
+        self.stats['requests'] += 1
+        key = self._cache_key(self.providers[0], request)
+        
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.stats['cache_hits'] += 1
+                return cached
+        
+        # Coalesce identical requests already in flight
+        if key in self._inflight:
+            self.stats['coalesced'] += 1
+            return await asyncio.shield(self._inflight[key])
+        
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response = await self._race(request, use_fallback)
+            if self.cache is not None:
+                self.cache.put(key, response)
+            future.set_result(response)
+            return response
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else is waiting
+            raise
+        finally:
+            del self._inflight[key]
+    
+    def _hedge_delay(self, provider: LLMProviderBase) -> Optional[float]:
+        tracker = self.latency[id(provider)]
+        if len(tracker.samples) < self.hedge_min_samples:
+            return None
+        return tracker.percentile(self.hedge_percentile)
+    
+    async def _race(self, request: LLMRequest, use_fallback: bool) -> LLMResponse:
+        candidates = self.providers if use_fallback else self.providers[:1]
+        pending: Dict[asyncio.Task, LLMProviderBase] = {}
+        errors: List[str] = []
+        next_index = 0
+        
+        def launch() -> LLMProviderBase:
+            nonlocal next_index
+            provider = candidates[next_index]
+            next_index += 1
+            pending[asyncio.ensure_future(self._attempt(provider, request))] = provider
+            return provider
+        
+        last = launch()
+        try:
+            while pending:
+                timeout = self._hedge_delay(last) if next_index < len(candidates) else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                
+                if not done:
+                    # Slower than the hedge percentile: race the next provider
+                    self.stats['hedged'] += 1
+                    last = launch()
+                    continue
+                
+                for task in done:
+                    provider = pending.pop(task)
+                    if task.exception() is None:
+                        if provider is not candidates[0]:
+                            self.stats['fallbacks'] += 1
+                        return task.result()
+                    errors.append(f"{provider.config.provider.value}: {task.exception()}")
+                
+                if not pending and next_index < len(candidates):
+                    last = launch()
+        finally:
+            for task in pending:
+                task.cancel()
+        
+        raise RuntimeError(f"All LLM providers failed: {'; '.join(errors)}")
+    
+    async def _attempt(self, provider: LLMProviderBase, request: LLMRequest) -> LLMResponse:
+        key = id(provider)
+        if key not in self._semaphores:
+            self._semaphores[key] = asyncio.Semaphore(self.limits.max_concurrency)
+            self._buckets[key] = TokenBucket(self.limits.requests_per_second, self.limits.burst)
+        
+        async with self._semaphores[key]:
+            await self._buckets[key].acquire()
+            start = time.monotonic()
+            response = await asyncio.get_running_loop().run_in_executor(
+                self._executor, provider.generate, request
+            )
+            self.latency[key].record(time.monotonic() - start)
+            return response
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        """Engine statistics including per-provider latency percentiles"""
+        stats = dict(self.stats)
+        stats['latency'] = {
+            f"{p.config.provider.value}:{p.config.model}": {
+                'p50': self.latency[id(p)].percentile(50),
+                'p95': self.latency[id(p)].percentile(95),
+                'samples': len(self.latency[id(p)].samples)
+            }
+            for p in self.providers
+        }
+        return stats
+    
+    def close(self) -> None:
+        """Stop the engine loop and request threads"""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
+        self._executor.shutdown(wait=False)
+        if self.cache is not None:
+            self.cache.close()
+
+
 class LLMManager:
     """
     Manages multiple LLM providers and provides unified interface.
@@ -462,17 +851,30 @@ class LLMManager:
     - Response caching
     - Rate limiting
     - Provider selection strategies
+    - Concurrent, hedged requests through AsyncLLMEngine
     """
     
-    def __init__(self, primary_config: LLMConfig):
+    def __init__(
+        self,
+        primary_config: LLMConfig,
+        limits: Optional[ProviderLimits] = None,
+        cache_path: Optional[str] = None,
+        cache_ttl_seconds: float = 7 * 24 * 3600,
+        cache_max_entries: int = 10000,
+        enable_cache: bool = True
+    ):
         self.primary_config = primary_config
         self.providers: Dict[LLMProvider, LLMProviderBase] = {}
         self.primary_provider = self._create_provider(primary_config)
         
+        cache = ResponseCache(cache_path, cache_ttl_seconds, cache_max_entries) if enable_cache else None
+        self.engine = AsyncLLMEngine([self.primary_provider], limits=limits, cache=cache)
+        
         # Statistics
         self.total_requests = 0
         self.total_tokens = 0
         self.total_cost = 0.0
+        self._stats_lock = threading.Lock()
     
     def _create_provider(self, config: LLMConfig) -> LLMProviderBase:
         """Create provider instance from config"""
@@ -488,7 +890,18 @@ class LLMManager:
     def add_fallback_provider(self, config: LLMConfig):
         """Add a fallback provider"""
         provider = self._create_provider(config)
+        replaced = self.providers.get(config.provider)
+        if replaced is not None:
+            self.engine.providers.remove(replaced)
         self.providers[config.provider] = provider
+        self.engine.add_provider(provider)
+    
+    def _record(self, response: LLMResponse) -> LLMResponse:
+        with self._stats_lock:
+            self.total_requests += 1
+            self.total_tokens += response.tokens_used
+            self.total_cost += response.cost_usd
+        return response
     
     def generate(
         self,
@@ -497,41 +910,41 @@ class LLMManager:
         use_fallback: bool = True
     ) -> LLMResponse:
         """Generate response using primary or fallback provider"""
-        self.total_requests += 1
-        
+        request = LLMRequest(
+            prompt=prompt,
+            system_prompt=system_prompt
+        )
         try:
-            request = LLMRequest(
-                prompt=prompt,
-                system_prompt=system_prompt
-            )
-            
-            response = self.primary_provider.generate(request)
-            
-            # Update statistics
-            self.total_tokens += response.tokens_used
-            self.total_cost += response.cost_usd
-            
-            return response
-            
-        except Exception as e:
-            if use_fallback and self.providers:
-                # Try fallback providers
-                for provider in self.providers.values():
-                    try:
-                        response = provider.generate(request)
-                        self.total_tokens += response.tokens_used
-                        self.total_cost += response.cost_usd
-                        return response
-                    except Exception:
-                        continue
-            
-            raise RuntimeError(f"All LLM providers failed: {str(e)}")
+            return self._record(self.engine.generate_sync(request, use_fallback))
+        except Exception:
+            with self._stats_lock:
+                self.total_requests += 1
+            raise
+    
+    async def agenerate(
+        self,
+        prompt: str,
+        system_prompt: str = "",
+        use_fallback: bool = True
+    ) -> LLMResponse:
+        """Async variant of generate"""
+        request = LLMRequest(
+            prompt=prompt,
+            system_prompt=system_prompt
+        )
+        try:
+            return self._record(await self.engine.generate(request, use_fallback))
+        except Exception:
+            with self._stats_lock:
+                self.total_requests += 1
+            raise
     
     def generate_patch(
         self,
         context: str,
         task_description: str,
-        file_changes: List[Dict[str, Any]]
+        file_changes: List[Dict[str, Any]],
+        context_chunks: Optional[List[ContextChunk]] = None
     ) -> str:
         """
         Generate a code patch using LLM.
@@ -540,10 +953,88 @@ class LLMManager:
             context: Repository context and code
             task_description: Description of the task
             file_changes: Files to modify
+            context_chunks: Prioritized context pieces packed after context
             
         Returns:
             Unified diff patch
         """
+        system_prompt, prompt = self._patch_prompts(
+            context, task_description, file_changes, context_chunks
+        )
+        response = self.generate(
+            prompt=prompt,
+            system_prompt=system_prompt
+        )
+        
+        return response.content
+    
+    async def agenerate_patch(
+        self,
+        context: str,
+        task_description: str,
+        file_changes: List[Dict[str, Any]],
+        context_chunks: Optional[List[ContextChunk]] = None
+    ) -> str:
+        """Async variant of generate_patch"""
+        system_prompt, prompt = self._patch_prompts(
+            context, task_description, file_changes, context_chunks
+        )
+        response = await self.agenerate(
+            prompt=prompt,
+            system_prompt=system_prompt
+        )
+        
+        return response.content
+    
+    def generate_patches(
+        self,
+        tasks: List[Dict[str, Any]]
+    ) -> List[Any]:
+        """
+        Generate patches for many candidates concurrently.
+        
+        Args:
+            tasks: Dicts with context, task_description, file_changes and
+                optionally context_chunks
+            
+        Returns:
+            Patch per task, in order; failed tasks yield the exception
+        """
+        futures = []
+        for task in tasks:
+            system_prompt, prompt = self._patch_prompts(
+                task.get('context', ''),
+                task['task_description'],
+                task.get('file_changes', []),
+                task.get('context_chunks')
+            )
+            request = LLMRequest(prompt=prompt, system_prompt=system_prompt)
+            futures.append(self.engine.submit(request))
+        
+        results: List[Any] = []
+        for future in futures:
+            try:
+                results.append(self._record(future.result()).content)
+            except Exception as e:
+                with self._stats_lock:
+                    self.total_requests += 1
+                results.append(e)
+        return results
+    
+    def _patch_prompts(
+        self,
+        context: str,
+        task_description: str,
+        file_changes: List[Dict[str, Any]],
+        context_chunks: Optional[List[ContextChunk]] = None
+    ) -> Tuple[str, str]:
+        """
+        Build (system_prompt, prompt) for patch generation.
+        
+        The context is packed into the model's context window minus the
+        completion budget and the fixed prompt text, instead of being cut
+        at a fixed character count.
+        """
         system_prompt = """You are an expert software engineer. Generate a unified diff patch that implements the requested task.
 
 Guidelines:
@@ -562,24 +1053,57 @@ Example:
 +    print("Hello, World!")
 +    return True
 """
-        
-        prompt = f"""Context:
-{context[:5000]}  # Limit context size
+
+        template = """Context:
+{context}
 
 Task:
 {task_description}
 
 Files to modify:
-{json.dumps(file_changes, indent=2)}
+{file_changes}
 
 Generate the unified diff patch:"""
+        fixed = {
+            'task_description': task_description,
+            'file_changes': json.dumps(file_changes, indent=2)
+        }
         
-        response = self.generate(
-            prompt=prompt,
-            system_prompt=system_prompt
+        plan = self.plan_context(
+            context,
+            context_chunks,
+            fixed_text=system_prompt + template.format(context='', **fixed)
         )
+        prompt = template.format(context=plan.render(), **fixed)
+
+        return system_prompt, prompt
+    
+    def plan_context(
+        self,
+        context: str,
+        context_chunks: Optional[List[ContextChunk]] = None,
+        fixed_text: str = ""
+    ) -> ContextPlan:
+        """
+        Fit context into the primary model's token budget.
         
-        return response.content
+        Args:
+            context: Free-form context, kept ahead of the chunks
+            context_chunks: Prioritized context pieces (files, diffs, evidence)
+            fixed_text: Prompt text sent alongside the context
+            
+        Returns:
+            ContextPlan with the selected chunks
+        """
+        chunks = list(context_chunks or [])
+        if context:
+            top = max((c.priority for c in chunks), default=0) + 1
+            chunks.insert(0, ContextChunk(name='context', text=context, priority=top))
+        
+        config = self.primary_config
+        planner = TokenBudgetPlanner.for_model(config.model)
+        budget = planner.budget_for(config.model, reserved_tokens=config.max_tokens, fixed_text=fixed_text)
+        return planner.plan(chunks, budget)
     
     def get_statistics(self) -> Dict[str, Any]:
         """Get usage statistics"""
@@ -590,8 +1114,17 @@ Generate the unified diff patch:"""
             'average_tokens_per_request': (
                 self.total_tokens / self.total_requests
                 if self.total_requests > 0 else 0
-            )
+            ),
+            'engine': self.engine.get_statistics(),
+            'cache': {
+                'hits': self.engine.cache.hits,
+                'misses': self.engine.cache.misses
+            } if self.engine.cache else None
         }
+    
+    def close(self) -> None:
+        """Stop the request engine and close the cache"""
+        self.engine.close()
 
 
 def create_default_llm_manager() -> LLMManager:
@@ -7,12 +7,28 @@ The LspFactsGate is responsible for:
 - Validating no breaking changes occur
 - Analyzing function/class signatures
 - Checking for deprecated API usage
+
+Python files are parsed with the ast module; .nc files use the Noodle
+parser when it is installed. Extracted symbols are cached per file content
+hash, and extraction of many files runs in a process pool.
 """
+import ast
+import hashlib
+import os
+import re
+import concurrent.futures
 from abc import ABC, abstractmethod
+from collections import OrderedDict
 from typing import List, Dict, Any, Optional, Set, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from enum import Enum
 
+try:
+    from noodle_lang.parser import NoodleParser, FunctionDefinitionNode, ClassDefinitionNode
+    _noodle_parser_available = True
+except ImportError:
+    _noodle_parser_available = False
+
 
 class ChangeType(Enum):
     """Types of API changes."""
@@ -128,6 +144,307 @@ class LSPAnalysisResult:
         }
 
 
+def _is_public_name(name: str, exported: Optional[Set[str]] = None) -> bool:
+    """Check whether a name is public, honouring __all__ when present."""
+    if exported is not None:
+        return name in exported
+    return not name.startswith('_')
+
+
+def _is_public_member(name: str) -> bool:
+    """Public methods include dunders such as __init__ and __call__."""
+    return not name.startswith('_') or (name.startswith('__') and name.endswith('__'))
+
+
+def _read_all(tree: ast.Module) -> Optional[Set[str]]:
+    """Read a literal module-level __all__, if defined."""
+    exported: Optional[Set[str]] = None
+    for node in tree.body:
+        targets: List[ast.expr] = []
+        value = None
+        if isinstance(node, ast.Assign):
+            targets, value = node.targets, node.value
+        elif isinstance(node, (ast.AnnAssign, ast.AugAssign)) and node.value is not None:
+            targets, value = [node.target], node.value
+        if not any(isinstance(t, ast.Name) and t.id == "__all__" for t in targets):
+            continue
+        if not isinstance(value, (ast.List, ast.Tuple)):
+            continue
+        names = {elt.value for elt in value.elts
+                 if isinstance(elt, ast.Constant) and isinstance(elt.value, str)}
+        if isinstance(node, ast.AugAssign) and exported is not None:
+            exported |= names
+        else:
+            exported = names
+    return exported
+
+
+def _format_parameters(args: ast.arguments) -> List[str]:
+    """Render parameters with annotations, defaults and */** markers."""
+    rendered = []
+    positional = args.posonlyargs + args.args
+    defaults = [None] * (len(positional) - len(args.defaults)) + list(args.defaults)
+    
+    def render(arg: ast.arg, default: Optional[ast.expr], prefix: str = "") -> str:
+        text = prefix + arg.arg
+        if arg.annotation is not None:
+            text += f": {ast.unparse(arg.annotation)}"
+        if default is not None:
+            text += f" = {ast.unparse(default)}" if arg.annotation is not None else f"={ast.unparse(default)}"
+        return text
+    
+    for index, (arg, default) in enumerate(zip(positional, defaults)):
+        rendered.append(render(arg, default))
+        if args.posonlyargs and index == len(args.posonlyargs) - 1:
+            rendered.append("/")
+    if args.vararg is not None:
+        rendered.append(render(args.vararg, None, "*"))
+    elif args.kwonlyargs:
+        rendered.append("*")
+    for arg, default in zip(args.kwonlyargs, args.kw_defaults):
+        rendered.append(render(arg, default))
+    if args.kwarg is not None:
+        rendered.append(render(args.kwarg, None, "**"))
+    return rendered
+
+
+def _is_deprecated(node: ast.AST) -> bool:
+    """Deprecated via a @deprecated decorator or a docstring note."""
+    for decorator in getattr(node, "decorator_list", []):
+        target = decorator.func if isinstance(decorator, ast.Call) else decorator
+        name = target.attr if isinstance(target, ast.Attribute) else getattr(target, "id", "")
+        if name == "deprecated":
+            return True
+    docstring = ast.get_docstring(node) or ""
+    return "deprecated" in docstring.lower()
+
+
+def _first_doc_line(node: ast.AST) -> Optional[str]:
+    docstring = ast.get_docstring(node)
+    return docstring.strip().splitlines()[0] if docstring and docstring.strip() else None
+
+
+def _function_symbol(
+    node: ast.AST,
+    qualname: str,
+    kind: str,
+    public: bool,
+    file_path: Optional[str]
+) -> SymbolInfo:
+    """Build a SymbolInfo for a def or async def."""
+    decorators = {getattr(d, "id", getattr(d, "attr", None)) for d in node.decorator_list}
+    if kind == "method":
+        if "property" in decorators:
+            kind = "property"
+        elif "staticmethod" in decorators:
+            kind = "staticmethod"
+        elif "classmethod" in decorators:
+            kind = "classmethod"
+    parameters = _format_parameters(node.args)
+    return_type = ast.unparse(node.returns) if node.returns is not None else None
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    signature = f"{prefix} {node.name}({', '.join(parameters)})"
+    if return_type:
+        signature += f" -> {return_type}"
+    return SymbolInfo(
+        name=qualname,
+        kind=kind,
+        signature=signature + ":",
+        parameters=parameters,
+        return_type=return_type,
+        documentation=_first_doc_line(node),
+        deprecated=_is_deprecated(node),
+        public=public,
+        file_path=file_path,
+        line=node.lineno
+    )
+
+
+def extract_python_symbols(content: str, file_path: Optional[str] = None) -> List[SymbolInfo]:
+    """
+    Extract functions, classes, methods and module variables with ast.
+    
+    Top-level names listed in __all__ are public when __all__ is defined;
+    otherwise names without a leading underscore are. Methods of public
+    classes are public unless they are private (dunders count as public).
+    
+    Raises:
+        SyntaxError: If the content is not valid Python
+    """
+    tree = ast.parse(content, filename=file_path or "<unknown>")
+    exported = _read_all(tree)
+    symbols: List[SymbolInfo] = []
+    
+    def visit_class(node: ast.ClassDef, qualname: str, public: bool) -> None:
+        bases = [ast.unparse(b) for b in node.bases] + [ast.unparse(k) for k in node.keywords]
+        symbols.append(SymbolInfo(
+            name=qualname,
+            kind="class",
+            signature=f"class {node.name}({', '.join(bases)}):",
+            parameters=bases,
+            documentation=_first_doc_line(node),
+            deprecated=_is_deprecated(node),
+            public=public,
+            file_path=file_path,
+            line=node.lineno
+        ))
+        for child in node.body:
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                symbols.append(_function_symbol(
+                    child, f"{qualname}.{child.name}", "method",
+                    public and _is_public_member(child.name), file_path
+                ))
+            elif isinstance(child, ast.ClassDef):
+                visit_class(child, f"{qualname}.{child.name}", public and _is_public_name(child.name))
+    
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            symbols.append(_function_symbol(
+                node, node.name, "function", _is_public_name(node.name, exported), file_path
+            ))
+        elif isinstance(node, ast.ClassDef):
+            visit_class(node, node.name, _is_public_name(node.name, exported))
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            annotation = ast.unparse(node.annotation) if isinstance(node, ast.AnnAssign) else None
+            for target in targets:
+                if not isinstance(target, ast.Name) or target.id == "__all__":
+                    continue
+                symbols.append(SymbolInfo(
+                    name=target.id,
+                    kind="variable",
+                    signature=f"{target.id}: {annotation}" if annotation else target.id,
+                    return_type=annotation,
+                    public=_is_public_name(target.id, exported),
+                    file_path=file_path,
+                    line=node.lineno
+                ))
+    
+    return symbols
+
+
+def extract_noodle_symbols(content: str, file_path: Optional[str] = None) -> List[SymbolInfo]:
+    """
+    Extract functions, classes and methods from a Noodle (.nc) file.
+    
+    Raises:
+        ImportError: If the Noodle parser is not installed
+    """
+    if not _noodle_parser_available:
+        raise ImportError("noodle_lang is not installed")
+    
+    parser = NoodleParser(content, file_path or "<input>")
+    program = parser.parse()
+    symbols: List[SymbolInfo] = []
+    
+    def function_symbol(node, qualname: str, kind: str, public: bool) -> SymbolInfo:
+        parameters = [
+            f"{p.name}: {p.type_annotation}" if p.type_annotation else p.name
+            for p in node.parameters
+        ]
+        signature = f"function {node.name}({', '.join(parameters)})"
+        if node.return_type:
+            signature += f": {node.return_type}"
+        return SymbolInfo(
+            name=qualname,
+            kind=kind,
+            signature=signature,
+            parameters=parameters,
+            return_type=node.return_type,
+            public=public,
+            file_path=file_path,
+            line=getattr(node.location, "line", None)
+        )
+    
+    for node in program.statements:
+        if isinstance(node, FunctionDefinitionNode):
+            symbols.append(function_symbol(node, node.name, "function", _is_public_name(node.name)))
+        elif isinstance(node, ClassDefinitionNode):
+            public = _is_public_name(node.name)
+            symbols.append(SymbolInfo(
+                name=node.name,
+                kind="class",
+                signature=f"class {node.name}({node.extends or ''}):",
+                public=public,
+                file_path=file_path,
+                line=getattr(node.location, "line", None)
+            ))
+            for member in node.members:
+                if isinstance(member, FunctionDefinitionNode):
+                    symbols.append(function_symbol(
+                        member, f"{node.name}.{member.name}", "method",
+                        public and _is_public_member(member.name)
+                    ))
+    
+    return symbols
+
+
+def extract_symbols_with_regex(content: str, file_path: Optional[str] = None) -> List[SymbolInfo]:
+    """
+    Fallback extraction of top-level def/class with regular expressions.
+    
+    Used for content the ast or Noodle parser cannot handle.
+    """
+    symbols = []
+    
+    # Functions: def public_function(...)
+    func_pattern = r'^def\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\((.*?)\):'
+    for match in re.finditer(func_pattern, content, re.MULTILINE):
+        func_name = match.group(1)
+        params = match.group(2)
+        
+        if _is_public_name(func_name):
+            symbols.append(SymbolInfo(
+                name=func_name,
+                kind="function",
+                signature=f"def {func_name}({params}):",
+                parameters=[p.strip() for p in params.split(',') if p.strip()],
+                public=True,
+                file_path=file_path
+            ))
+    
+    # Classes: class PublicClass:
+    class_pattern = r'^class\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*(?:\((.*?)\))?:'
+    for match in re.finditer(class_pattern, content, re.MULTILINE):
+        class_name = match.group(1)
+        bases = match.group(2) if match.group(2) else ""
+        
+        if _is_public_name(class_name):
+            symbols.append(SymbolInfo(
+                name=class_name,
+                kind="class",
+                signature=f"class {class_name}({bases}):",
+                public=True,
+                file_path=file_path
+            ))
+    
+    return symbols
+
+
+def extract_file_symbols(file_path: str, content: str) -> List[SymbolInfo]:
+    """
+    Extract symbols with the best parser for the file type.
+    
+    Falls back to regex extraction when the file cannot be parsed.
+    """
+    try:
+        if file_path.endswith(".nc"):
+            return extract_noodle_symbols(content, file_path)
+        return extract_python_symbols(content, file_path)
+    except Exception:
+        return extract_symbols_with_regex(content, file_path)
+
+
+def _extract_batch(items: List[Tuple[str, str]]) -> List[List[SymbolInfo]]:
+    """Process pool entry point: extract symbols for (path, content) pairs."""
+    return [extract_file_symbols(path, content) for path, content in items]
+
+
+def content_hash(content: str) -> str:
+    """Hash file content for the symbol cache."""
+    return hashlib.blake2b(content.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+
+
 class LspFactsGate(ABC):
     """
     Abstract base class for LSP-based API validation.
@@ -218,8 +535,26 @@ class SimpleLspFactsGate(LspFactsGate):
     with actual LSP server integration.
     """
     
-    def __init__(self):
+    def __init__(
+        self,
+        cache_size: int = 20000,
+        max_workers: Optional[int] = None,
+        parallel_threshold: int = 256
+    ):
+        """
+        Args:
+            cache_size: Maximum number of files kept in the symbol cache
+            max_workers: Process pool size for extraction (default: CPU count)
+            parallel_threshold: Minimum number of uncached files before
+                extraction is spread over a process pool
+        """
         self.symbols_extracted = 0
+        self.cache_size = cache_size
+        self.max_workers = max_workers
+        self.parallel_threshold = parallel_threshold
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._cache: "OrderedDict[Tuple[str, str], List[SymbolInfo]]" = OrderedDict()
     
     def extract_symbols(
         self,
@@ -229,65 +564,86 @@ class SimpleLspFactsGate(LspFactsGate):
         """
         Extract symbols from a file.
         
-        Note: This is a simplified implementation that uses
-        basic regex parsing. A production version would use
-        actual LSP servers (pyls, typescript-language-server, etc.)
+        Python files are parsed with ast, .nc files with the Noodle parser
+        (falling back to regex extraction). Results are cached by content
+        hash, so unchanged files are never parsed twice.
         """
         
         # Read content if not provided
         if content is None:
             try:
-                with open(file_path, 'r') as f:
+                with open(file_path, 'r', encoding='utf-8') as f:
                     content = f.read()
             except Exception as e:
                 return []
         
-        symbols = []
+        return self.extract_many({file_path: content})[file_path]
+    
+    def extract_many(self, files: Dict[str, str]) -> Dict[str, List[SymbolInfo]]:
+        """
+        Extract symbols for many files, parsing only uncached content.
         
-        # Simple regex-based extraction (Python-focused)
-        # In production, use actual LSP
+        Args:
+            files: Map of file paths to content
+            
+        Returns:
+            Map of file paths to their public and private symbols
+        """
+        keys = {path: (os.path.splitext(path)[1], content_hash(content)) for path, content in files.items()}
         
-        # Extract function definitions
-        import re
+        missing: Dict[Tuple[str, str], Tuple[str, str]] = {}
+        for path, key in keys.items():
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+            elif key not in missing:
+                missing[key] = (path, files[path])
+                self.cache_misses += 1
         
-        # Functions: def public_function(...)
-        func_pattern = r'^def\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\((.*?)\):'
-        for match in re.finditer(func_pattern, content, re.MULTILINE):
-            func_name = match.group(1)
-            params = match.group(2)
-            
-            # Check if public (not starting with _)
-            is_public = not func_name.startswith('_')
-            
-            if is_public:
-                symbols.append(SymbolInfo(
-                    name=func_name,
-                    kind="function",
-                    signature=f"def {func_name}({params}):",
-                    parameters=[p.strip() for p in params.split(',') if p.strip()],
-                    public=True,
-                    file_path=file_path
-                ))
+        if missing:
+            items = list(missing.items())
+            extracted = self._extract_uncached([item for _, item in items])
+            for (key, _), symbols in zip(items, extracted):
+                self._cache[key] = symbols
+                self.symbols_extracted += len(symbols)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
         
-        # Classes: class PublicClass:
-        class_pattern = r'^class\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*(?:\((.*?)\))?:'
-        for match in re.finditer(class_pattern, content, re.MULTILINE):
-            class_name = match.group(1)
-            bases = match.group(2) if match.group(2) else ""
-            
-            is_public = not class_name.startswith('_')
-            
-            if is_public:
-                symbols.append(SymbolInfo(
-                    name=class_name,
-                    kind="class",
-                    signature=f"class {class_name}({bases}):",
-                    public=True,
-                    file_path=file_path
-                ))
+        results = {}
+        for path, key in keys.items():
+            symbols = self._cache.get(key)
+            if symbols is None:
+                # Evicted within this call; extract directly
+                symbols = extract_file_symbols(path, files[path])
+            results[path] = [
+                sym if sym.file_path == path else replace(sym, file_path=path)
+                for sym in symbols
+            ]
+        return results
+    
+    def _extract_uncached(self, items: List[Tuple[str, str]]) -> List[List[SymbolInfo]]:
+        """Extract symbols serially or across a process pool."""
+        if len(items) < self.parallel_threshold:
+            return _extract_batch(items)
         
-        self.symbols_extracted += len(symbols)
-        return symbols
+        workers = self.max_workers or os.cpu_count() or 1
+        if workers <= 1:
+            return _extract_batch(items)
+        
+        chunk_size = max(1, len(items) // (workers * 4))
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+        try:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+                results: List[List[SymbolInfo]] = []
+                for batch in executor.map(_extract_batch, chunks):
+                    results.extend(batch)
+                return results
+        except (OSError, concurrent.futures.process.BrokenProcessPool):
+            return _extract_batch(items)
+    
+    def clear_cache(self) -> None:
+        """Drop all cached symbols."""
+        self._cache.clear()
     
     def compare_symbols(
         self,
@@ -296,48 +652,57 @@ class SimpleLspFactsGate(LspFactsGate):
     ) -> List[APIChange]:
         """Compare two sets of symbols and identify changes."""
         
-        old_map = {sym.name: sym for sym in old_symbols if sym.public}
-        new_map = {sym.name: sym for sym in new_symbols if sym.public}
+        # Symbols are identified per file; the same name in two files is two symbols
+        old_map = {(sym.file_path, sym.name): sym for sym in old_symbols if sym.public}
+        new_map = {(sym.file_path, sym.name): sym for sym in new_symbols if sym.public}
+        
+        pairs = [(old_map[key], new_map[key]) for key in old_map if key in new_map]
+        
+        # Symbols that moved between files are matched by name only
+        moved: Dict[str, List[SymbolInfo]] = {}
+        for key, new_sym in new_map.items():
+            if key not in old_map:
+                moved.setdefault(new_sym.name, []).append(new_sym)
         
         changes = []
         
         # Check for removed symbols
-        for name, old_sym in old_map.items():
-            if name not in new_map:
-                changes.append(APIChange(
-                    symbol_name=name,
-                    change_type=ChangeType.REMOVAL,
-                    severity=Severity.BREAKING,
-                    old_signature=old_sym.signature,
-                    description=f"Public {old_sym.kind} '{name}' was removed",
-                    file_path=old_sym.file_path
-                ))
+        for key, old_sym in old_map.items():
+            if key in new_map:
+                continue
+            if moved.get(old_sym.name):
+                pairs.append((old_sym, moved[old_sym.name].pop(0)))
+                continue
+            changes.append(APIChange(
+                symbol_name=old_sym.name,
+                change_type=ChangeType.REMOVAL,
+                severity=Severity.BREAKING,
+                old_signature=old_sym.signature,
+                description=f"Public {old_sym.kind} '{old_sym.name}' was removed",
+                file_path=old_sym.file_path
+            ))
         
         # Check for added symbols
-        for name, new_sym in new_map.items():
-            if name not in old_map:
-                changes.append(APIChange(
-                    symbol_name=name,
-                    change_type=ChangeType.ADDITION,
-                    severity=Severity.MINOR,
-                    new_signature=new_sym.signature,
-                    description=f"Public {new_sym.kind} '{name}' was added",
-                    file_path=new_sym.file_path
-                ))
+        for new_sym in (sym for candidates in moved.values() for sym in candidates):
+            changes.append(APIChange(
+                symbol_name=new_sym.name,
+                change_type=ChangeType.ADDITION,
+                severity=Severity.MINOR,
+                new_signature=new_sym.signature,
+                description=f"Public {new_sym.kind} '{new_sym.name}' was added",
+                file_path=new_sym.file_path
+            ))
         
         # Check for modified symbols
-        for name in old_map.keys() & new_map.keys():
-            old_sym = old_map[name]
-            new_sym = new_map[name]
-            
+        for old_sym, new_sym in pairs:
             if old_sym.signature != new_sym.signature:
                 changes.append(APIChange(
-                    symbol_name=name,
+                    symbol_name=new_sym.name,
                     change_type=ChangeType.SIGNATURE_CHANGE,
                     severity=Severity.MAJOR,
                     old_signature=old_sym.signature,
                     new_signature=new_sym.signature,
-                    description=f"Public {old_sym.kind} '{name}' signature changed",
+                    description=f"Public {old_sym.kind} '{new_sym.name}' signature changed",
                     file_path=new_sym.file_path
                 ))
         
@@ -378,15 +743,22 @@ class SimpleLspFactsGate(LspFactsGate):
         """Validate that no breaking changes were introduced."""
         
         try:
-            # Extract symbols from old files
-            old_symbols = []
-            for file_path, content in old_files.items():
-                old_symbols.extend(self.extract_symbols(file_path, content))
+            # Only files whose content differs can change the API
+            changed = [
+                path for path in old_files.keys() | new_files.keys()
+                if old_files.get(path) != new_files.get(path)
+            ]
+            if public_api_paths:
+                changed = [
+                    path for path in changed
+                    if any(path.startswith(prefix) for prefix in public_api_paths)
+                ]
             
-            # Extract symbols from new files
-            new_symbols = []
-            for file_path, content in new_files.items():
-                new_symbols.extend(self.extract_symbols(file_path, content))
+            # Extract symbols from old and new files (cached by content)
+            old_extracted = self.extract_many({p: old_files[p] for p in changed if p in old_files})
+            new_extracted = self.extract_many({p: new_files[p] for p in changed if p in new_files})
+            old_symbols = [sym for path in sorted(old_extracted) for sym in old_extracted[path]]
+            new_symbols = [sym for path in sorted(new_extracted) for sym in new_extracted[path]]
             
             # Compare symbols
             changes = self.compare_symbols(old_symbols, new_symbols)
@@ -411,7 +783,7 @@ class SimpleLspFactsGate(LspFactsGate):
                 passed=passed,
                 errors=None
             )
-            
+        
         except Exception as e:
             return LSPAnalysisResult(
                 changes=[],
@@ -430,15 +802,90 @@ class SimpleLspFactsGate(LspFactsGate):
         if not change.old_signature or not change.new_signature:
             return True
         
-        # Extract parameters
-        import re
-        old_params = re.findall(r'\((.*?)\)', change.old_signature)
-        new_params = re.findall(r'\((.*?)\)', change.new_signature)
+        old_params = self._split_parameters(change.old_signature)
+        new_params = self._split_parameters(change.new_signature)
+        if old_params is None or new_params is None:
+            return True
         
-        if old_params and new_params:
+        # Class base lists: any change is treated as breaking
+        if change.old_signature.startswith("class "):
             return old_params != new_params
         
-        return True
+        old_parsed = self._parse_parameters(old_params)
+        new_parsed = self._parse_parameters(new_params)
+        new_by_name = {name: (kind, has_default) for name, kind, has_default in new_parsed}
+        old_positional = [name for name, kind, _ in old_parsed if kind == "positional"]
+        new_positional = [name for name, kind, _ in new_parsed if kind == "positional"]
+        
+        # Existing positional parameters must keep their names and order
+        if new_positional[:len(old_positional)] != old_positional:
+            return True
+        
+        for name, kind, has_default in old_parsed:
+            if name not in new_by_name:
+                return True
+            new_kind, new_has_default = new_by_name[name]
+            if new_kind != kind or (has_default and not new_has_default):
+                return True
+        
+        # Added parameters must be optional
+        old_names = {name for name, _, _ in old_parsed}
+        for name, kind, has_default in new_parsed:
+            if name not in old_names and kind in ("positional", "keyword") and not has_default:
+                return True
+        
+        return False
+    
+    @staticmethod
+    def _split_parameters(signature: str) -> Optional[List[str]]:
+        """Split the parameter list of a signature at top-level commas."""
+        start = signature.find("(")
+        if start == -1:
+            return None
+        params, depth, current = [], 0, ""
+        for char in signature[start + 1:]:
+            if char in "([{":
+                depth += 1
+            elif char in ")]}":
+                if depth == 0:
+                    break
+                depth -= 1
+            elif char == "," and depth == 0:
+                params.append(current.strip())
+                current = ""
+                continue
+            current += char
+        else:
+            return None
+        if current.strip():
+            params.append(current.strip())
+        return params
+    
+    @staticmethod
+    def _parse_parameters(params: List[str]) -> List[Tuple[str, str, bool]]:
+        """Parse rendered parameters into (name, kind, has_default).
+        
+        Kinds are "positional", "keyword" (keyword-only), "var_positional"
+        and "var_keyword"; the "/" and "*" markers are dropped.
+        """
+        parsed = []
+        keyword_only = False
+        for param in params:
+            if param == "/":
+                continue
+            if param == "*":
+                keyword_only = True
+                continue
+            if param.startswith("**"):
+                parsed.append((param[2:].split(":")[0].strip(), "var_keyword", False))
+                continue
+            if param.startswith("*"):
+                parsed.append((param[1:].split(":")[0].strip(), "var_positional", False))
+                keyword_only = True
+                continue
+            name = re.split(r"[:=]", param, maxsplit=1)[0].strip()
+            parsed.append((name, "keyword" if keyword_only else "positional", "=" in param))
+        return parsed
 
 
 def create_lsp_facts_gate(gate_type: str = "simple") -> LspFactsGate:
@@ -457,6 +904,75 @@ def create_lsp_facts_gate(gate_type: str = "simple") -> LspFactsGate:
         raise ValueError(f"Unknown gate type: {gate_type}")
 
 
+def benchmark_symbol_extraction(
+    files: int = 5000,
+    changed_files: int = 50,
+    max_workers: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Benchmark extraction over a synthetic repository.
+    
+    Measures a cold extraction of every file serially and with the process
+    pool, then a validation where only changed_files differ from a warm
+    cache.
+    
+    Args:
+        files: Number of synthetic Python files
+        changed_files: Number of files modified in the candidate
+        max_workers: Process pool size (default: CPU count)
+        
+    Returns:
+        Timings in seconds and cache statistics
+    """
+    import time
+    
+    def module(index: int, extra: str = "") -> str:
+        return (
+            f'"""Module {index}."""\n\n'
+            f'__all__ = ["Service{index}", "build_{index}"]\n\n\n'
+            f'def build_{index}(name: str, size: int = {index}, *, debug=False{extra}) -> "Service{index}":\n'
+            f'    return Service{index}(name)\n\n\n'
+            f'class Service{index}(object):\n'
+            f'    """Service {index}."""\n\n'
+            f'    def __init__(self, name: str):\n'
+            f'        self.name = name\n\n'
+            f'    def run(self, items: list, retries: int = 3) -> int:\n'
+            f'        return len(items) * retries\n\n'
+            f'    def _private(self):\n'
+            f'        pass\n'
+        )
+    
+    old_files = {f"pkg/mod_{i}.py": module(i) for i in range(files)}
+    new_files = dict(old_files)
+    for i in range(changed_files):
+        new_files[f"pkg/mod_{i}.py"] = module(i, ", verbose=True")
+    
+    serial = SimpleLspFactsGate(parallel_threshold=files + 1)
+    start = time.perf_counter()
+    serial.extract_many(old_files)
+    serial_seconds = time.perf_counter() - start
+    
+    pooled = SimpleLspFactsGate(max_workers=max_workers, parallel_threshold=1)
+    start = time.perf_counter()
+    pooled.extract_many(old_files)
+    pooled_seconds = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    result = serial.validate_no_api_break(old_files, new_files)
+    incremental_seconds = time.perf_counter() - start
+    
+    return {
+        "files": files,
+        "changed_files": changed_files,
+        "cold_serial_seconds": serial_seconds,
+        "cold_pooled_seconds": pooled_seconds,
+        "incremental_validate_seconds": incremental_seconds,
+        "symbols_extracted": serial.symbols_extracted,
+        "cache_misses": serial.cache_misses,
+        "passed": result.passed
+    }
+
+
 # Convenience function for quick validation
 def validate_no_api_break(
     old_files: Dict[str, str],
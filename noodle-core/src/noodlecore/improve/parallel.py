@@ -3,22 +3,28 @@ Parallel Worktree Execution for NIP v3
 
 This module enables parallel execution of multiple candidates in isolated worktrees,
 allowing concurrent testing and validation without interference.
+
+Directory worktrees are materialized from a snapshot's content-addressed
+manifest using reflinks (copy-on-write clones) where the filesystem supports
+them, falling back to plain copies. Every worktree file gets its own inode, so
+nothing a candidate does to it can reach the snapshot store. A warm pool keeps provisioned worktrees around and resets them
+between candidates by reverting only the files that changed.
 """
 
+import errno
 import os
 import shutil
 import subprocess
-import tempfile
+import uuid
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 import concurrent.futures
 import threading
-import queue
 
-from .models import Candidate, CandidateStatus, TaskSpec
+from .models import Candidate
 from .snapshot import WorkspaceSnapshot, SnapshotManager
 
 
@@ -33,6 +39,13 @@ class WorktreeState(Enum):
     CLEANED = "cleaned"
 
 
+class MaterializeStrategy(Enum):
+    """How files are placed into a directory worktree"""
+    AUTO = "auto"
+    REFLINK = "reflink"
+    COPY = "copy"
+
+
 @dataclass
 class WorktreeConfig:
     """Configuration for worktree management"""
@@ -42,6 +55,9 @@ class WorktreeConfig:
     cleanup_on_completion: bool = False
     timeout_seconds: int = 600
     use_git_worktree: bool = True
+    materialize_strategy: MaterializeStrategy = MaterializeStrategy.AUTO
+    pool_size: int = 4
+    materialize_workers: int = 8
 
 
 @dataclass
@@ -58,13 +74,141 @@ class WorktreeResult:
     artifacts: List[str] = field(default_factory=list)
 
 
+# Linux FICLONE ioctl: share extents between two files (btrfs, xfs, ...)
+_FICLONE = 0x40049409
+
+# Errors meaning "this strategy does not work here", as opposed to real I/O failures
+_UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.EPERM}
+
+
+def _reflink(source: Path, target: Path) -> None:
+    """Clone source into target sharing extents; raises OSError if unsupported"""
+    try:
+        import fcntl
+    except ImportError as e:
+        raise OSError(errno.EOPNOTSUPP, "reflink is not supported on this platform") from e
+    
+    with open(source, 'rb') as src, open(target, 'wb') as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            os.unlink(target)
+            raise
+
+
+def _fingerprint(st: os.stat_result) -> Tuple[int, int, int, int, int]:
+    """Stat fields whose change marks a worktree file as touched"""
+    return (st.st_size, st.st_mtime_ns, st.st_ino, st.st_mode, st.st_ctime_ns)
+
+
+class TreeMaterializer:
+    """
+    Places snapshot blobs into worktree directories.
+    
+    The first strategy that works is remembered and used for later files;
+    an unsupported reflink downgrades to copies. Both give each target its
+    own inode, so in-place writes and chmod in a worktree never reach the
+    shared blob.
+    """
+    
+    _ORDER = [MaterializeStrategy.REFLINK, MaterializeStrategy.COPY]
+    
+    def __init__(self, strategy: MaterializeStrategy = MaterializeStrategy.AUTO):
+        if strategy == MaterializeStrategy.AUTO:
+            self._candidates = list(self._ORDER)
+        else:
+            self._candidates = self._ORDER[self._ORDER.index(strategy):]
+        self._lock = threading.Lock()
+    
+    @property
+    def strategy(self) -> MaterializeStrategy:
+        """Strategy currently in use"""
+        return self._candidates[0]
+    
+    def _downgrade(self, failed: MaterializeStrategy) -> None:
+        with self._lock:
+            if len(self._candidates) > 1 and self._candidates[0] == failed:
+                self._candidates.pop(0)
+    
+    def place(self, blob: Path, target: Path, mode: int) -> MaterializeStrategy:
+        """
+        Materialize one blob at target.
+        
+        Returns:
+            The strategy that was used
+        """
+        while True:
+            strategy = self._candidates[0]
+            try:
+                if strategy == MaterializeStrategy.REFLINK:
+                    _reflink(blob, target)
+                    os.chmod(target, mode)
+                else:
+                    shutil.copyfile(blob, target)
+                    os.chmod(target, mode)
+                return strategy
+            except OSError as e:
+                if strategy == MaterializeStrategy.COPY or e.errno not in _UNSUPPORTED_ERRNOS:
+                    raise
+                self._downgrade(strategy)
+    
+    def materialize(
+        self,
+        manifest: Dict[str, Any],
+        snapshot: WorkspaceSnapshot,
+        destination: Path,
+        paths: Optional[List[str]] = None,
+        max_workers: int = 8
+    ) -> Dict[str, Tuple[int, int, int, int, int]]:
+        """
+        Materialize a snapshot manifest (or a subset of its paths) into a directory.
+        
+        Args:
+            manifest: Snapshot manifest from WorkspaceSnapshot.get_manifest
+            snapshot: Snapshot store that owns the blobs
+            destination: Worktree root
+            paths: Relative paths to materialize (default: all files)
+            max_workers: Threads placing files concurrently
+            
+        Returns:
+            Baseline fingerprint (size, mtime_ns, inode, mode, ctime_ns) per materialized path
+        """
+        files = manifest["files"]
+        if paths is None:
+            paths = list(files)
+            for rel_dir in manifest["dirs"]:
+                (destination / rel_dir).mkdir(parents=True, exist_ok=True)
+        
+        def place(rel_path: str) -> Tuple[str, Tuple[int, int, int, int, int]]:
+            entry = files[rel_path]
+            target = destination / rel_path
+            target.parent.mkdir(parents=True, exist_ok=True)
+            if target.is_dir() and not target.is_symlink():
+                shutil.rmtree(target)
+            elif target.exists() or target.is_symlink():
+                target.unlink()
+            self.place(snapshot.objects.path_for(entry["hash"]), target, entry["mode"])
+            st = target.stat()
+            return rel_path, _fingerprint(st)
+        
+        baseline: Dict[str, Tuple[int, int, int, int, int]] = {}
+        if not paths:
+            return baseline
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for rel_path, signature in executor.map(place, paths):
+                baseline[rel_path] = signature
+        return baseline
+
+
 class WorktreeManager:
     """
     Manages parallel worktree execution for candidates.
     
     Features:
-    - Git worktree-based isolation (default) or directory copying
-    - Parallel execution with configurable limits
+    - Git worktree-based isolation (default) or copy-on-write directory trees
+    - Parallel provisioning and execution with configurable limits
+    - Warm pool of reusable worktrees reset between candidates
     - Automatic cleanup and resource management
     - Thread-safe operations
     - Timeout handling
@@ -80,27 +224,44 @@ class WorktreeManager:
         self._worktrees: Dict[str, 'Worktree'] = {}
         self._lock = threading.Lock()
         self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self.materializer = TreeMaterializer(config.materialize_strategy)
+        self.pool = WorktreePool(self)
         
         # Ensure base directory exists
         Path(config.worktree_base_dir).mkdir(parents=True, exist_ok=True)
     
+    def resolve_snapshot_id(self, candidate: Candidate) -> str:
+        """
+        Get the snapshot a candidate should be evaluated against.
+        
+        Uses candidate.metadata['base_snapshot_id'] when set, otherwise the
+        most recent snapshot.
+        """
+        snapshot_id = candidate.metadata.get('base_snapshot_id')
+        if snapshot_id:
+            return snapshot_id
+        snapshots = self.snapshot_manager.list_snapshots()
+        if not snapshots:
+            raise RuntimeError("No snapshot available to create a worktree from")
+        return snapshots[0]['id']
+    
     def create_worktree(
         self,
         candidate: Candidate,
-        snapshot: WorkspaceSnapshot
+        snapshot_id: str
     ) -> 'Worktree':
         """
         Create a new worktree for a candidate.
         
         Args:
             candidate: The candidate to create a worktree for
-            snapshot: The base snapshot to use
+            snapshot_id: ID of the base snapshot to use
             
         Returns:
             Worktree instance
         """
-        worktree_id = f"{candidate.id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        worktree_path = Path(config.worktree_base_dir) / worktree_id
+        worktree_id = f"{candidate.id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        worktree_path = Path(self.config.worktree_base_dir).resolve() / worktree_id
         
         with self._lock:
             if worktree_id in self._worktrees:
@@ -110,10 +271,12 @@ class WorktreeManager:
                 id=worktree_id,
                 candidate_id=candidate.id,
                 path=str(worktree_path),
-                snapshot_id=snapshot.id,
+                snapshot_id=snapshot_id,
                 config=self.config,
-                snapshot_manager=self.snapshot_manager
+                snapshot_manager=self.snapshot_manager,
+                materializer=self.materializer
             )
+            worktree.set_candidate(candidate)
             
             self._worktrees[worktree_id] = worktree
         
@@ -128,6 +291,9 @@ class WorktreeManager:
         """
         Execute multiple candidates in parallel worktrees.
         
+        Worktrees are acquired from the warm pool (or provisioned) inside the
+        worker threads, so provisioning overlaps with execution.
+        
         Args:
             candidates: List of candidates to execute
             execution_func: Function to execute in each worktree
@@ -136,39 +302,31 @@ class WorktreeManager:
         Returns:
             List of results from all executions
         """
-        # Create worktrees for all candidates
-        worktrees = []
-        for candidate in candidates:
-            snapshot = self.snapshot_manager.load(candidate.base_snapshot_id)
-            worktree = self.create_worktree(candidate, snapshot)
-            worktrees.append(worktree)
-        
-        # Execute in parallel with thread pool
         results = []
         
         with concurrent.futures.ThreadPoolExecutor(
             max_workers=self.config.max_parallel
         ) as executor:
             # Submit all tasks
-            future_to_worktree = {
-                executor.submit(self._execute_single, wt, execution_func): wt
-                for wt in worktrees
+            future_to_candidate = {
+                executor.submit(self._execute_single, candidate, execution_func): candidate
+                for candidate in candidates
             }
             
             # Collect results as they complete
-            for future in concurrent.futures.as_completed(future_to_worktree):
-                worktree = future_to_worktree[future]
+            for future in concurrent.futures.as_completed(future_to_candidate):
+                candidate = future_to_candidate[future]
                 try:
                     result = future.result(timeout=self.config.timeout_seconds)
                     results.append(result)
                     
                     if progress_callback:
                         progress_callback(result)
-                        
+                
                 except concurrent.futures.TimeoutError:
                     error_result = WorktreeResult(
-                        worktree_id=worktree.id,
-                        candidate_id=worktree.candidate_id,
+                        worktree_id="",
+                        candidate_id=candidate.id,
                         state=WorktreeState.FAILED,
                         error_message=f"Execution timed out after {self.config.timeout_seconds}s"
                     )
@@ -176,11 +334,11 @@ class WorktreeManager:
                     
                     if progress_callback:
                         progress_callback(error_result)
-                        
+                
                 except Exception as e:
                     error_result = WorktreeResult(
-                        worktree_id=worktree.id,
-                        candidate_id=worktree.candidate_id,
+                        worktree_id="",
+                        candidate_id=candidate.id,
                         state=WorktreeState.FAILED,
                         error_message=str(e)
                     )
@@ -189,27 +347,51 @@ class WorktreeManager:
                     if progress_callback:
                         progress_callback(error_result)
         
-        # Cleanup if configured
+        # Cleanup if configured; pooled worktrees stay warm for the next run
         if self.config.auto_cleanup:
-            self.cleanup_all()
+            self.cleanup_unpooled()
         
         return results
     
     def _execute_single(
         self,
-        worktree: 'Worktree',
+        candidate: Candidate,
         execution_func: Callable[['Worktree', Candidate], WorktreeResult]
     ) -> WorktreeResult:
-        """Execute a single worktree with error handling"""
+        """Acquire a worktree, execute a single candidate and hand the worktree back"""
+        worktree = self.pool.acquire(candidate, self.resolve_snapshot_id(candidate))
+        discard = self.config.cleanup_on_completion
         try:
-            worktree.prepare()
-            return execution_func(worktree, worktree.get_candidate())
+            return execution_func(worktree, candidate)
+        except Exception:
+            discard = True
+            raise
         finally:
-            if self.config.cleanup_on_completion:
-                worktree.cleanup()
+            if discard:
+                self.discard(worktree)
+            else:
+                self.pool.release(worktree)
+    
+    def discard(self, worktree: 'Worktree') -> None:
+        """Clean up a worktree and forget it"""
+        worktree.cleanup()
+        with self._lock:
+            self._worktrees.pop(worktree.id, None)
+    
+    def cleanup_unpooled(self):
+        """Clean up worktrees that are not idle in the warm pool"""
+        pooled = self.pool.idle_ids()
+        with self._lock:
+            stale = [wt for wt_id, wt in self._worktrees.items() if wt_id not in pooled]
+        for worktree in stale:
+            try:
+                self.discard(worktree)
+            except Exception as e:
+                print(f"Error cleaning up worktree {worktree.id}: {e}")
     
     def cleanup_all(self):
-        """Clean up all worktrees"""
+        """Clean up all worktrees, including the warm pool"""
+        self.pool.clear()
         with self._lock:
             for worktree in self._worktrees.values():
                 try:
@@ -228,14 +410,119 @@ class WorktreeManager:
         return list(self._worktrees.values())
 
 
+class WorktreePool:
+    """
+    Warm pool of provisioned worktrees keyed by snapshot.
+    
+    Released worktrees are reset (only touched files are reverted) and kept
+    for the next candidate on the same snapshot, up to config.pool_size.
+    """
+    
+    def __init__(self, manager: WorktreeManager):
+        self.manager = manager
+        self._idle: Dict[str, List['Worktree']] = {}
+        self._lock = threading.Lock()
+        self._stats = {'provisioned': 0, 'reused': 0, 'files_reverted': 0, 'evicted': 0}
+    
+    def acquire(self, candidate: Candidate, snapshot_id: str) -> 'Worktree':
+        """
+        Get a ready worktree for a candidate on a snapshot.
+        
+        Args:
+            candidate: Candidate that will use the worktree
+            snapshot_id: Snapshot the worktree must reflect
+            
+        Returns:
+            Prepared worktree
+        """
+        with self._lock:
+            idle = self._idle.get(snapshot_id)
+            worktree = idle.pop() if idle else None
+        
+        if worktree is not None:
+            worktree.candidate_id = candidate.id
+            worktree.set_candidate(candidate)
+            with self._lock:
+                self._stats['reused'] += 1
+            return worktree
+        
+        worktree = self.manager.create_worktree(candidate, snapshot_id)
+        try:
+            worktree.prepare()
+        except Exception:
+            self.manager.discard(worktree)
+            raise
+        with self._lock:
+            self._stats['provisioned'] += 1
+        return worktree
+    
+    def release(self, worktree: 'Worktree') -> None:
+        """Reset a worktree and return it to the pool, or clean it up if the pool is full"""
+        try:
+            reverted = worktree.reset()
+        except Exception:
+            self.manager.discard(worktree)
+            return
+        
+        with self._lock:
+            self._stats['files_reverted'] += reverted
+            idle = self._idle.setdefault(worktree.snapshot_id, [])
+            if sum(len(trees) for trees in self._idle.values()) < self.manager.config.pool_size:
+                idle.append(worktree)
+                return
+            self._stats['evicted'] += 1
+        self.manager.discard(worktree)
+    
+    def warm(self, snapshot_id: str, count: Optional[int] = None) -> int:
+        """
+        Pre-provision worktrees for a snapshot concurrently.
+        
+        Args:
+            snapshot_id: Snapshot to provision
+            count: Number of worktrees (default: config.pool_size)
+            
+        Returns:
+            Number of worktrees added to the pool
+        """
+        count = count if count is not None else self.manager.config.pool_size
+        placeholder = Candidate(
+            id="pool", task_id="", title="", description="", diff="", rationale=""
+        )
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(1, self.manager.config.max_parallel)
+        ) as executor:
+            worktrees = list(executor.map(
+                lambda _: self.acquire(placeholder, snapshot_id), range(count)
+            ))
+        for worktree in worktrees:
+            self.release(worktree)
+        return len(worktrees)
+    
+    def idle_ids(self) -> Set[str]:
+        """IDs of worktrees currently idle in the pool"""
+        with self._lock:
+            return {wt.id for trees in self._idle.values() for wt in trees}
+    
+    def clear(self) -> None:
+        """Drop every idle worktree from the pool (the manager cleans them up)"""
+        with self._lock:
+            self._idle.clear()
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Get pool statistics"""
+        with self._lock:
+            return {**self._stats, 'idle': sum(len(trees) for trees in self._idle.values())}
+
+
 class Worktree:
     """
     Represents a single isolated worktree for candidate execution.
     
     Features:
-    - Git worktree or directory-based isolation
+    - Git worktree or copy-on-write directory isolation
     - Patch application
     - Command execution
+    - Reset to the base snapshot by reverting touched files
     - Cleanup
     """
     
@@ -246,7 +533,8 @@ class Worktree:
         path: str,
         snapshot_id: str,
         config: WorktreeConfig,
-        snapshot_manager: SnapshotManager
+        snapshot_manager: SnapshotManager,
+        materializer: Optional[TreeMaterializer] = None
     ):
         self.id = id
         self.candidate_id = candidate_id
@@ -254,8 +542,11 @@ class Worktree:
         self.snapshot_id = snapshot_id
         self.config = config
         self.snapshot_manager = snapshot_manager
+        self.materializer = materializer or TreeMaterializer(config.materialize_strategy)
         self._state = WorktreeState.CREATED
         self._candidate: Optional[Candidate] = None
+        self._manifest: Optional[Dict[str, Any]] = None
+        self._baseline: Dict[str, Tuple[int, int, int, int, int]] = {}
     
     @property
     def state(self) -> WorktreeState:
@@ -277,14 +568,24 @@ class Worktree:
         
         self._state = WorktreeState.CLONED
     
+    def _load_manifest(self) -> Dict[str, Any]:
+        if self._manifest is None:
+            manifest = self.snapshot_manager.workspace.get_manifest(self.snapshot_id)
+            if manifest is None:
+                raise RuntimeError(f"Snapshot {self.snapshot_id} not found")
+            self._manifest = manifest
+        return self._manifest
+    
     def _prepare_git_worktree(self) -> None:
         """Prepare worktree using git worktree"""
         try:
             # Load snapshot
-            snapshot = self.snapshot_manager.load(self.snapshot_id)
+            snapshot = self.snapshot_manager.workspace.get_snapshot_info(self.snapshot_id)
+            if snapshot is None:
+                raise RuntimeError(f"Snapshot {self.snapshot_id} not found")
             
             # Create worktree from snapshot repo
-            repo_path = Path(snapshot.metadata.get('repo_path', '.'))
+            repo_path = Path(snapshot['metadata'].get('repo_path', snapshot['workspace_path']))
             
             subprocess.run(
                 [
@@ -297,24 +598,100 @@ class Worktree:
                 capture_output=True,
                 text=True
             )
-            
+        
         except subprocess.CalledProcessError as e:
             raise RuntimeError(f"Failed to create git worktree: {e.stderr}")
     
     def _prepare_directory_copy(self) -> None:
-        """Prepare worktree by copying directory"""
-        # Load and extract snapshot
-        snapshot = self.snapshot_manager.load(self.snapshot_id)
-        extract_path = self.snapshot_manager.extract(snapshot, self.path.parent / f"temp_{self.id}")
+        """Prepare worktree by materializing the snapshot manifest"""
+        manifest = self._load_manifest()
+        staging = self.path.parent / f"temp_{self.id}"
+        staging.mkdir(parents=True, exist_ok=True)
+        try:
+            self._baseline = self.materializer.materialize(
+                manifest,
+                self.snapshot_manager.workspace,
+                staging,
+                max_workers=self.config.materialize_workers
+            )
+            # Move to final location
+            os.replace(staging, self.path)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+    
+    def _scan(self) -> Tuple[Dict[str, os.stat_result], Set[str]]:
+        """Stat every file and directory under the worktree"""
+        files: Dict[str, os.stat_result] = {}
+        dirs: Set[str] = set()
+        stack = [("", str(self.path))]
+        while stack:
+            rel_dir, abs_dir = stack.pop()
+            with os.scandir(abs_dir) as it:
+                for entry in it:
+                    rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        dirs.add(rel_path)
+                        stack.append((rel_path, entry.path))
+                    else:
+                        files[rel_path] = entry.stat(follow_symlinks=False)
+        return files, dirs
+    
+    def reset(self) -> int:
+        """
+        Return the worktree to its base snapshot.
+        
+        Directory worktrees revert only files whose size, mtime, inode, mode
+        or ctime moved away from the materialized baseline and remove anything
+        new; ctime also catches a chmod that was undone or a write that kept
+        size and mtime. Git
+        worktrees are reset with git, which likewise rewrites only changed files.
+        
+        Returns:
+            Number of files reverted or removed
+        """
+        if self.config.use_git_worktree:
+            subprocess.run(['git', 'checkout', '-f', 'HEAD'], cwd=self.path, check=True, capture_output=True)
+            cleaned = subprocess.run(
+                ['git', 'clean', '-fdx'], cwd=self.path, check=True, capture_output=True, text=True
+            )
+            self._state = WorktreeState.CLONED
+            return len(cleaned.stdout.splitlines())
+        
+        manifest = self._load_manifest()
+        files, dirs = self._scan()
+        changed: List[str] = []
+        removed = 0
+        
+        for rel_path, st in files.items():
+            if rel_path not in manifest["files"]:
+                os.unlink(self.path / rel_path)
+                removed += 1
+            elif self._baseline.get(rel_path) != _fingerprint(st):
+                changed.append(rel_path)
+        
+        changed.extend(rel_path for rel_path in manifest["files"] if rel_path not in files)
+        
+        for rel_dir in sorted(dirs - set(manifest["dirs"]), key=len, reverse=True):
+            shutil.rmtree(self.path / rel_dir, ignore_errors=True)
+        
+        if changed:
+            self._baseline.update(self.materializer.materialize(
+                manifest,
+                self.snapshot_manager.workspace,
+                self.path,
+                paths=changed,
+                max_workers=self.config.materialize_workers
+            ))
         
-        # Move to final location
-        shutil.move(str(extract_path), str(self.path))
+        self._state = WorktreeState.CLONED
+        return len(changed) + removed
     
     def apply_patch(self, patch: str) -> None:
         """Apply a unified diff patch to the worktree"""
+        patch_file = self.path / f"{self.id}.patch"
         try:
             # Write patch to temp file
-            patch_file = self.path / f"{self.id}.patch"
             patch_file.write_text(patch)
             
             # Apply patch
@@ -329,7 +706,7 @@ class Worktree:
                 raise RuntimeError(f"Patch application failed: {result.stderr}")
             
             self._state = WorktreeState.PATCH_APPLIED
-            
+        
         finally:
             # Clean up patch file
             if patch_file.exists():
@@ -373,7 +750,7 @@ class Worktree:
                 result.stderr,
                 duration
             )
-            
+        
         except subprocess.TimeoutExpired:
             self._state = WorktreeState.FAILED
             return (
@@ -390,15 +767,15 @@ class Worktree:
                 if self.config.use_git_worktree:
                     # Remove git worktree
                     subprocess.run(
-                        ['git', 'worktree', 'remove', str(self.path)],
+                        ['git', 'worktree', 'remove', '--force', str(self.path)],
                         capture_output=True
                     )
                 else:
-                    # Remove directory
+                    # Remove directory; materialized files never share blob inodes
                     shutil.rmtree(self.path)
             
             self._state = WorktreeState.CLEANED
-            
+        
         except Exception as e:
             print(f"Warning: Failed to cleanup worktree {self.id}: {e}")
     
@@ -419,4 +796,4 @@ class Worktree:
         """Write a file to the worktree"""
         file_path = self.path / relative_path
         file_path.parent.mkdir(parents=True, exist_ok=True)
-        file_path.write_text(content)
\ No newline at end of file
+        file_path.write_text(content)
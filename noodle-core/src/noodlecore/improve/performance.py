@@ -3,16 +3,25 @@ Performance Regression Detection for NIP v3
 
 This module detects performance regressions in patches by comparing
 benchmark results between baseline and patched code.
+
+Benchmarks can be repeated with baseline and patch runs interleaved. Each
+series is cleaned of warmup samples and outliers, and the two are compared
+with a Mann-Whitney U test or a bootstrap confidence interval on the change
+in median. Repetitions stop early once every metric is decided.
 """
 
 import json
+import math
+import os
+import random
 import re
 import statistics
+import concurrent.futures
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import subprocess
 
 
@@ -25,6 +34,235 @@ class RegressionSeverity(Enum):
     NONE = "none"          # <= 5% change (noise)
 
 
+# Severity order, least to most severe
+SEVERITY_RANK = {
+    RegressionSeverity.NONE: 0,
+    RegressionSeverity.LOW: 1,
+    RegressionSeverity.MEDIUM: 2,
+    RegressionSeverity.HIGH: 3,
+    RegressionSeverity.CRITICAL: 4
+}
+
+# Units where a larger value is better
+HIGHER_IS_BETTER_UNITS = ("operations/second", "ops/sec", "ops/s", "requests/second", "throughput", "mb/s")
+
+
+class ComparisonMethod(Enum):
+    """Statistical test used to compare repeated samples"""
+    MANN_WHITNEY = "mann_whitney"
+    BOOTSTRAP = "bootstrap"
+
+
+@dataclass
+class BenchmarkConfig:
+    """Configuration for repeated, interleaved benchmarking"""
+    min_repetitions: int = 5
+    max_repetitions: int = 30
+    repetitions_per_round: int = 5
+    warmup_runs: int = 1
+    method: ComparisonMethod = ComparisonMethod.MANN_WHITNEY
+    alpha: float = 0.05
+    confidence: float = 0.95
+    bootstrap_resamples: int = 2000
+    outlier_iqr_factor: float = 1.5
+    warmup_mad_factor: float = 3.0
+    parallel: bool = False
+    baseline_cpus: Optional[List[int]] = None
+    patch_cpus: Optional[List[int]] = None
+    timeout_seconds: int = 300
+    seed: Optional[int] = 0
+
+
+@dataclass
+class SampleStatistics:
+    """Statistical comparison of repeated baseline and patch samples"""
+    baseline_median: float
+    patch_median: float
+    percent_change: float
+    p_value: float
+    ci_low: float
+    ci_high: float
+    significant: bool
+    baseline_samples: int
+    patch_samples: int
+    warmup_discarded: int
+    outliers_discarded: int
+    method: str
+
+
+def detect_warmup(samples: List[float], mad_factor: float = 3.0) -> int:
+    """
+    Count leading samples that look like warmup.
+    
+    Leading samples are dropped while they sit more than mad_factor scaled
+    median absolute deviations from the median of the second half of the
+    series. At most half of the series is treated as warmup.
+    
+    Returns:
+        Number of leading samples to discard
+    """
+    if len(samples) < 4:
+        return 0
+    tail = samples[len(samples) // 2:]
+    center = statistics.median(tail)
+    spread = 1.4826 * statistics.median([abs(x - center) for x in tail])
+    if spread == 0:
+        spread = abs(center) * 1e-9 or 1e-12
+    count = 0
+    while count < len(samples) // 2 and abs(samples[count] - center) > mad_factor * spread:
+        count += 1
+    return count
+
+
+def reject_outliers(samples: List[float], iqr_factor: float = 1.5) -> List[float]:
+    """Drop samples outside Tukey's fences (quartiles -/+ iqr_factor * IQR)"""
+    if len(samples) < 4:
+        return list(samples)
+    q1, _, q3 = statistics.quantiles(samples, n=4, method='inclusive')
+    iqr = q3 - q1
+    low, high = q1 - iqr_factor * iqr, q3 + iqr_factor * iqr
+    return [x for x in samples if low <= x <= high]
+
+
+def mann_whitney_u(a: List[float], b: List[float]) -> Tuple[float, float]:
+    """
+    Two-sided Mann-Whitney U test using the normal approximation with tie
+    and continuity correction.
+    
+    Returns:
+        (U statistic for a, p-value)
+    """
+    n1, n2 = len(a), len(b)
+    if n1 == 0 or n2 == 0:
+        return 0.0, 1.0
+    
+    combined = sorted([(x, 0) for x in a] + [(x, 1) for x in b])
+    ranks = [0.0] * len(combined)
+    tie_term = 0.0
+    i = 0
+    while i < len(combined):
+        j = i
+        while j + 1 < len(combined) and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        rank = (i + j) / 2 + 1
+        for k in range(i, j + 1):
+            ranks[k] = rank
+        ties = j - i + 1
+        tie_term += ties ** 3 - ties
+        i = j + 1
+    
+    rank_sum_a = sum(rank for rank, (_, group) in zip(ranks, combined) if group == 0)
+    u_a = rank_sum_a - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    mean_u = n1 * n2 / 2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return u_a, 1.0
+    z = (abs(u_a - mean_u) - 0.5) / math.sqrt(variance)
+    p_value = math.erfc(max(z, 0.0) / math.sqrt(2))
+    return u_a, min(1.0, p_value)
+
+
+def bootstrap_percent_change_ci(
+    a: List[float],
+    b: List[float],
+    resamples: int = 2000,
+    confidence: float = 0.95,
+    rng: Optional[random.Random] = None
+) -> Tuple[float, float]:
+    """
+    Percentile bootstrap confidence interval for the percent change in
+    median from a to b.
+    
+    Returns:
+        (low, high) percent change bounds
+    """
+    rng = rng or random.Random()
+    if not a or not b:
+        return float('-inf'), float('inf')
+    changes = []
+    for _ in range(resamples):
+        median_a = statistics.median(rng.choices(a, k=len(a)))
+        median_b = statistics.median(rng.choices(b, k=len(b)))
+        if median_a == 0:
+            continue
+        changes.append((median_b - median_a) / abs(median_a) * 100)
+    if not changes:
+        return float('-inf'), float('inf')
+    changes.sort()
+    tail = (1 - confidence) / 2
+    low = changes[int(tail * (len(changes) - 1))]
+    high = changes[int(math.ceil((1 - tail) * (len(changes) - 1)))]
+    return low, high
+
+
+def compare_samples(
+    baseline: List[float],
+    patch: List[float],
+    config: Optional[BenchmarkConfig] = None
+) -> SampleStatistics:
+    """
+    Compare repeated samples after warmup and outlier removal.
+    
+    Args:
+        baseline: Baseline samples in run order
+        patch: Patch samples in run order
+        config: Benchmark configuration (test, alpha, bootstrap settings)
+        
+    Returns:
+        SampleStatistics for the pair
+    """
+    config = config or BenchmarkConfig()
+    warmup_a = detect_warmup(baseline, config.warmup_mad_factor)
+    warmup_b = detect_warmup(patch, config.warmup_mad_factor)
+    steady_a, steady_b = baseline[warmup_a:], patch[warmup_b:]
+    clean_a = reject_outliers(steady_a, config.outlier_iqr_factor)
+    clean_b = reject_outliers(steady_b, config.outlier_iqr_factor)
+    
+    median_a = statistics.median(clean_a) if clean_a else 0.0
+    median_b = statistics.median(clean_b) if clean_b else 0.0
+    if median_a == 0:
+        percent_change = 0.0 if median_b == 0 else float('inf')
+    else:
+        percent_change = (median_b - median_a) / abs(median_a) * 100
+    
+    rng = random.Random(config.seed)
+    ci_low, ci_high = bootstrap_percent_change_ci(
+        clean_a, clean_b, config.bootstrap_resamples, config.confidence, rng
+    )
+    _, p_value = mann_whitney_u(clean_a, clean_b)
+    
+    if config.method == ComparisonMethod.BOOTSTRAP:
+        significant = ci_low > 0 or ci_high < 0
+    else:
+        significant = p_value < config.alpha
+    
+    return SampleStatistics(
+        baseline_median=median_a,
+        patch_median=median_b,
+        percent_change=percent_change,
+        p_value=p_value,
+        ci_low=ci_low,
+        ci_high=ci_high,
+        significant=significant,
+        baseline_samples=len(clean_a),
+        patch_samples=len(clean_b),
+        warmup_discarded=warmup_a + warmup_b,
+        outliers_discarded=(len(steady_a) - len(clean_a)) + (len(steady_b) - len(clean_b)),
+        method=config.method.value
+    )
+
+
+def is_decided(stats: SampleStatistics, noise_threshold: float) -> bool:
+    """
+    Whether more repetitions could still change the verdict.
+    
+    A metric is decided once the difference is significant, or once the
+    whole confidence interval lies within +/- noise_threshold percent.
+    """
+    return stats.significant or (-noise_threshold < stats.ci_low and stats.ci_high < noise_threshold)
+
+
 @dataclass
 class BenchmarkResult:
     """Result from a single benchmark run"""
@@ -49,6 +287,10 @@ class MetricComparison:
     severity: RegressionSeverity
     unit: str
     direction: str  # "improvement", "regression", "neutral"
+    p_value: Optional[float] = None
+    ci_low: Optional[float] = None
+    ci_high: Optional[float] = None
+    samples: int = 1
 
 
 @dataclass
@@ -80,7 +322,11 @@ class RegressionReport:
                     'percent_change': c.percent_change,
                     'severity': c.severity.value,
                     'unit': c.unit,
-                    'direction': c.direction
+                    'direction': c.direction,
+                    'p_value': c.p_value,
+                    'ci_low': c.ci_low,
+                    'ci_high': c.ci_high,
+                    'samples': c.samples
                 }
                 for c in self.comparisons
             ],
@@ -109,12 +355,14 @@ class PerformanceDetector:
         critical_threshold: float = 50.0,
         high_threshold: float = 20.0,
         medium_threshold: float = 10.0,
-        low_threshold: float = 5.0
+        low_threshold: float = 5.0,
+        config: Optional[BenchmarkConfig] = None
     ):
         self.critical_threshold = critical_threshold
         self.high_threshold = high_threshold
         self.medium_threshold = medium_threshold
         self.low_threshold = low_threshold
+        self.config = config or BenchmarkConfig()
     
     def detect_regression(
         self,
@@ -221,24 +469,43 @@ class PerformanceDetector:
         baseline: BenchmarkResult,
         patch: BenchmarkResult
     ) -> MetricComparison:
-        """Compare two metrics and calculate change"""
-        baseline_val = baseline.value
-        patch_val = patch.value
-        
-        # Calculate percent change
-        if baseline_val == 0:
-            if patch_val == 0:
-                percent_change = 0.0
-            else:
-                percent_change = float('inf')
+        """
+        Compare two metrics and calculate change.
+        
+        When both results carry repeated samples (metadata['samples']) the
+        change is only reported when it is statistically significant;
+        otherwise single values are compared by percent change.
+        """
+        baseline_samples = baseline.metadata.get('samples')
+        patch_samples = patch.metadata.get('samples')
+        stats = None
+        
+        if baseline_samples and patch_samples and min(len(baseline_samples), len(patch_samples)) >= 2:
+            stats = compare_samples(baseline_samples, patch_samples, self.config)
+            baseline_val = stats.baseline_median
+            patch_val = stats.patch_median
+            percent_change = stats.percent_change
         else:
-            percent_change = ((patch_val - baseline_val) / baseline_val) * 100
+            baseline_val = baseline.value
+            patch_val = patch.value
+            
+            # Calculate percent change
+            if baseline_val == 0:
+                if patch_val == 0:
+                    percent_change = 0.0
+                else:
+                    percent_change = float('inf')
+            else:
+                percent_change = ((patch_val - baseline_val) / baseline_val) * 100
+        
+        # Larger is worse for times, better for throughput
+        worse = percent_change < 0 if self._higher_is_better(baseline.unit) else percent_change > 0
         
         # Determine direction
-        if abs(percent_change) < self.low_threshold:
+        if abs(percent_change) < self.low_threshold or (stats is not None and not stats.significant):
             direction = "neutral"
             severity = RegressionSeverity.NONE
-        elif percent_change > 0:
+        elif worse:
             direction = "regression"
             severity = self._get_severity(abs(percent_change))
         else:
@@ -252,9 +519,19 @@ class PerformanceDetector:
             percent_change=percent_change,
             severity=severity,
             unit=baseline.unit,
-            direction=direction
+            direction=direction,
+            p_value=stats.p_value if stats else None,
+            ci_low=stats.ci_low if stats else None,
+            ci_high=stats.ci_high if stats else None,
+            samples=min(stats.baseline_samples, stats.patch_samples) if stats else 1
         )
     
+    @staticmethod
+    def _higher_is_better(unit: str) -> bool:
+        """Whether a larger value of this unit is an improvement"""
+        unit = unit.lower()
+        return any(marker in unit for marker in HIGHER_IS_BETTER_UNITS)
+    
     def _get_severity(self, percent_change: float) -> RegressionSeverity:
         """Determine severity based on percent change"""
         if percent_change >= self.critical_threshold:
@@ -278,13 +555,18 @@ class BenchmarkRunner:
     - JavaScript benchmark.js
     - Go benchmarks
     - Custom benchmark scripts
+    - Repeated, interleaved baseline/patch runs with adaptive stopping
     """
     
+    def __init__(self, config: Optional[BenchmarkConfig] = None):
+        self.config = config or BenchmarkConfig()
+    
     def run_benchmark(
         self,
         worktree_path: str,
         benchmark_command: List[str],
-        benchmark_type: str = "python"
+        benchmark_type: str = "python",
+        cpus: Optional[List[int]] = None
     ) -> List[BenchmarkResult]:
         """
         Run benchmark in worktree and parse results.
@@ -293,36 +575,132 @@ class BenchmarkRunner:
             worktree_path: Path to worktree
             benchmark_command: Command to run benchmark
             benchmark_type: Type of benchmark (python, js, go, custom)
+            cpus: CPUs to pin the benchmark process to (Linux only)
             
         Returns:
             List of BenchmarkResult
         """
-        try:
-            result = subprocess.run(
-                benchmark_command,
-                cwd=worktree_path,
-                capture_output=True,
-                text=True,
-                timeout=300
-            )
+        with subprocess.Popen(
+            benchmark_command,
+            cwd=worktree_path,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True
+        ) as proc:
+            # Pin from the parent: preexec_fn is unsafe once threads exist,
+            # and run_comparison runs both sides from a thread pool
+            if cpus and hasattr(os, 'sched_setaffinity'):
+                try:
+                    os.sched_setaffinity(proc.pid, cpus)
+                except ProcessLookupError:
+                    pass  # Already exited
             
-            if result.returncode != 0:
-                raise RuntimeError(
-                    f"Benchmark failed: {result.stderr}"
-                )
+            try:
+                stdout, stderr = proc.communicate(timeout=self.config.timeout_seconds)
+            except subprocess.TimeoutExpired as e:
+                proc.kill()
+                proc.communicate()
+                raise RuntimeError(f"Benchmark timed out after {self.config.timeout_seconds}s") from e
+        
+        if proc.returncode != 0:
+            raise RuntimeError(
+                f"Benchmark failed: {stderr}"
+            )
+        
+        # Parse results based on type
+        if benchmark_type == "python":
+            return self._parse_python_benchmark(stdout)
+        elif benchmark_type == "js":
+            return self._parse_js_benchmark(stdout)
+        elif benchmark_type == "go":
+            return self._parse_go_benchmark(stdout)
+        else:
+            return self._parse_custom_benchmark(stdout)
+    
+    def run_comparison(
+        self,
+        baseline_path: str,
+        patch_path: str,
+        benchmark_command: List[str],
+        benchmark_type: str = "python",
+        noise_threshold: float = 5.0,
+        run_func: Optional[Callable[[str, Optional[List[int]]], List[BenchmarkResult]]] = None
+    ) -> Tuple[List[BenchmarkResult], List[BenchmarkResult]]:
+        """
+        Run baseline and patch benchmarks repeatedly and interleaved.
+        
+        Runs alternate in ABBA order so slow drift affects both sides
+        equally; with config.parallel the two sides run concurrently, each
+        pinned to its own CPUs. After min_repetitions, rounds of
+        repetitions_per_round continue until every metric is decided (see
+        is_decided) or max_repetitions is reached.
+        
+        Args:
+            baseline_path: Worktree with the baseline code
+            patch_path: Worktree with the patched code
+            benchmark_command: Command to run benchmark
+            benchmark_type: Type of benchmark (python, js, go, custom)
+            noise_threshold: Percent change treated as noise when deciding
+            run_func: Override for a single run, taking (path, cpus)
             
-            # Parse results based on type
-            if benchmark_type == "python":
-                return self._parse_python_benchmark(result.stdout)
-            elif benchmark_type == "js":
-                return self._parse_js_benchmark(result.stdout)
-            elif benchmark_type == "go":
-                return self._parse_go_benchmark(result.stdout)
+        Returns:
+            (baseline_results, patch_results), one result per metric whose
+            value is the median and whose metadata holds every sample
+        """
+        config = self.config
+        run = run_func or (lambda path, cpus: self.run_benchmark(path, benchmark_command, benchmark_type, cpus))
+        sides = {
+            'baseline': (baseline_path, config.baseline_cpus),
+            'patch': (patch_path, config.patch_cpus)
+        }
+        samples: Dict[str, Dict[str, List[float]]] = {'baseline': {}, 'patch': {}}
+        units: Dict[str, str] = {}
+        
+        def run_side(side: str, record: bool) -> None:
+            path, cpus = sides[side]
+            for result in run(path, cpus):
+                units.setdefault(result.name, result.unit)
+                if record:
+                    samples[side].setdefault(result.name, []).append(result.value)
+        
+        def run_pair(order: Tuple[str, str], record: bool) -> None:
+            if config.parallel:
+                with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+                    list(executor.map(lambda side: run_side(side, record), order))
             else:
-                return self._parse_custom_benchmark(result.stdout)
-                
-        except subprocess.TimeoutExpired:
-            raise RuntimeError("Benchmark timed out after 300s")
+                for side in order:
+                    run_side(side, record)
+        
+        for _ in range(config.warmup_runs):
+            run_pair(('baseline', 'patch'), record=False)
+        
+        repetitions = 0
+        while repetitions < config.max_repetitions:
+            target = config.min_repetitions if repetitions == 0 else config.repetitions_per_round
+            for _ in range(min(target, config.max_repetitions - repetitions)):
+                order = ('baseline', 'patch') if repetitions % 2 == 0 else ('patch', 'baseline')
+                run_pair(order, record=True)
+                repetitions += 1
+            
+            names = set(samples['baseline']) & set(samples['patch'])
+            if names and all(
+                is_decided(compare_samples(samples['baseline'][name], samples['patch'][name], config), noise_threshold)
+                for name in names
+            ):
+                break
+        
+        def to_results(side: str) -> List[BenchmarkResult]:
+            return [
+                BenchmarkResult(
+                    name=name,
+                    value=statistics.median(values),
+                    unit=units[name],
+                    metadata={'samples': values, 'repetitions': repetitions}
+                )
+                for name, values in samples[side].items()
+            ]
+        
+        return to_results('baseline'), to_results('patch')
     
     def _parse_python_benchmark(self, output: str) -> List[BenchmarkResult]:
         """Parse pytest-benchmark output"""
@@ -431,7 +809,7 @@ class PerformanceGate:
         
         for comparison in report.comparisons:
             if comparison.direction == "regression":
-                if comparison.severity.value > self.max_severity.value:
+                if SEVERITY_RANK[comparison.severity] > SEVERITY_RANK[self.max_severity]:
                     reasons.append(
                         f"Critical regression in {comparison.name}: "
                         f"{comparison.percent_change:.1f}% "
@@ -167,7 +167,7 @@ class TaskRunner:
             status = "passed"
             
             if test_command:
-                from .sandbox import SandboxRunner
+                from ..sandbox import SandboxRunner
                 sandbox = SandboxRunner()
                 result = sandbox.run_command(test_command)
                 logs = result.get("output", "")
@@ -2,96 +2,261 @@
 
 This module provides the ability to capture and restore workspace states,
 enabling safe experimentation with code changes.
+
+Snapshots are content-addressed: file contents live once in a shared object
+store keyed by their SHA-256, and each snapshot is a manifest mapping relative
+paths to blob hashes. Taking a snapshot only hashes files whose size or mtime
+changed since the parent snapshot, and restoring only rewrites files that
+differ from the snapshot.
 """
 
+import hashlib
 import os
 import shutil
+import stat
 import tempfile
-import zipfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional, Set, Tuple
 from datetime import datetime
 import json
 
 
+EXCLUDE_DIRS = {'.git', '__pycache__', 'node_modules', '.venv', 'venv', '.nip', '.tox', '.pytest_cache', 'dist', 'build'}
+EXCLUDE_FILES = {'.DS_Store', 'Thumbs.db'}
+EXCLUDE_SUFFIXES = {'.pyc', '.pyo'}
+
+OBJECTS_DIR = "objects"
+MANIFEST_FILE = "manifest.json"
+
+# Files modified this close to the parent snapshot may have changed without
+# their mtime moving, so their cached hash is not trusted
+RACY_WINDOW_NS = 2_000_000_000
+
+_HASH_CHUNK = 1024 * 1024
+
+
+def hash_file(path: Path) -> str:
+    """Compute the SHA-256 of a file's contents.
+    
+    Args:
+        path: File to hash
+        
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ObjectStore:
+    """Content-addressed blob store shared by all snapshots.
+    
+    Blobs are stored uncompressed under objects/<first two hex>/<rest>, so
+    identical files across snapshots are stored once.
+    
+    Attributes:
+        root: Directory holding the blobs
+    """
+    
+    def __init__(self, root: Path):
+        """Initialize the object store.
+        
+        Args:
+            root: Directory holding the blobs
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+    
+    def path_for(self, digest: str) -> Path:
+        """Get the path of a blob.
+        
+        Args:
+            digest: Blob hash
+            
+        Returns:
+            Path of the blob file
+        """
+        return self.root / digest[:2] / digest[2:]
+    
+    def contains(self, digest: str) -> bool:
+        """Check whether a blob is stored."""
+        return self.path_for(digest).exists()
+    
+    def put_file(self, source: Path, digest: str) -> bool:
+        """Store a file under a known digest.
+        
+        Args:
+            source: File to store
+            digest: SHA-256 of the file
+            
+        Returns:
+            True if a new blob was written, False if it already existed
+        """
+        target = self.path_for(digest)
+        if target.exists():
+            return False
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=".tmp_")
+        os.close(fd)
+        try:
+            shutil.copyfile(source, tmp)
+            os.replace(tmp, target)
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+        return True
+    
+    def read(self, digest: str) -> bytes:
+        """Read a blob's contents."""
+        return self.path_for(digest).read_bytes()
+    
+    def digests(self) -> Set[str]:
+        """List every stored blob hash."""
+        found = set()
+        if not self.root.exists():
+            return found
+        for prefix in self.root.iterdir():
+            if prefix.is_dir() and len(prefix.name) == 2:
+                for blob in prefix.iterdir():
+                    if not blob.name.startswith(".tmp_"):
+                        found.add(prefix.name + blob.name)
+        return found
+    
+    def remove(self, digest: str) -> None:
+        """Delete a blob if it exists."""
+        try:
+            self.path_for(digest).unlink()
+        except FileNotFoundError:
+            pass
+
+
 class WorkspaceSnapshot:
     """Captures and restores workspace states.
     
     Provides functionality to snapshot a workspace before making changes
-    and restore it if needed. Supports both full and incremental snapshots.
+    and restore it if needed. Snapshots are incremental against their parent
+    and share file contents through a content-addressed object store.
     
     Attributes:
         workspace_path: Path to the workspace directory
         snapshot_dir: Directory where snapshots are stored
-        temp_dir: Temporary directory for snapshot operations
+        objects: Content-addressed blob store
+        last_take_stats: Counters from the most recent take()
+        last_restore_stats: Counters from the most recent restore()
     """
     
-    def __init__(self, workspace_path: str, snapshot_dir: Optional[str] = None):
+    def __init__(self, workspace_path: str, snapshot_dir: Optional[str] = None, max_workers: Optional[int] = None):
         """Initialize the workspace snapshot manager.
         
         Args:
             workspace_path: Path to the workspace to snapshot
             snapshot_dir: Directory for storing snapshots (default: .nip/snapshots)
+            max_workers: Threads used to hash changed files
         """
         self.workspace_path = Path(workspace_path).resolve()
         self.snapshot_dir = Path(snapshot_dir or ".nip/snapshots").resolve()
         self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+        self.objects = ObjectStore(self.snapshot_dir / OBJECTS_DIR)
+        self.max_workers = max_workers or min(8, (os.cpu_count() or 1) + 4)
         self._current_snapshot_id: Optional[str] = None
         self._current_snapshot_path: Optional[Path] = None
-        self._temp_dir: Optional[Path] = None
+        self.last_take_stats: Dict[str, int] = {}
+        self.last_restore_stats: Dict[str, int] = {}
     
-    def take(self, metadata: Optional[dict] = None) -> str:
+    def take(self, metadata: Optional[dict] = None, parent_id: Optional[str] = None) -> str:
         """Take a snapshot of the current workspace state.
         
         Args:
             metadata: Optional metadata to include with the snapshot
-            
+            parent_id: Snapshot whose manifest seeds the stat cache
+                (default: the current or most recent snapshot)
+                
         Returns:
             Snapshot ID
         """
+        taken_ns = time.time_ns()
         snapshot_id = self._generate_snapshot_id()
         snapshot_path = self.snapshot_dir / snapshot_id
+        
+        parent_id = parent_id or self._current_snapshot_id or self._latest_snapshot_id()
+        parent = self.get_manifest(parent_id) if parent_id else None
+        cached = parent["files"] if parent else {}
+        cache_limit = parent["taken_ns"] - RACY_WINDOW_NS if parent else 0
+        
+        files, dirs = self._scan_workspace()
+        entries: Dict[str, dict] = {}
+        to_hash: List[Tuple[str, os.stat_result]] = []
+        
+        for rel_path, st in files:
+            previous = cached.get(rel_path)
+            if (previous is not None
+                    and previous["size"] == st.st_size
+                    and previous["mtime_ns"] == st.st_mtime_ns
+                    and st.st_mtime_ns < cache_limit):
+                entries[rel_path] = self._entry(previous["hash"], st)
+            else:
+                to_hash.append((rel_path, st))
+        
+        stored = 0
+        if to_hash:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                results = pool.map(self._store_file, [rel_path for rel_path, _ in to_hash])
+                for (rel_path, st), (digest, created) in zip(to_hash, results):
+                    entries[rel_path] = self._entry(digest, st)
+                    stored += created
+        
         snapshot_path.mkdir(parents=True, exist_ok=True)
+        manifest = {
+            "parent": parent_id if parent else None,
+            "taken_ns": taken_ns,
+            "dirs": sorted(dirs),
+            "files": dict(sorted(entries.items()))
+        }
+        self._write_json(snapshot_path / MANIFEST_FILE, manifest)
         
         # Create metadata file
         meta = {
             "id": snapshot_id,
             "timestamp": datetime.utcnow().isoformat(),
             "workspace_path": str(self.workspace_path),
+            "parent": manifest["parent"],
+            "file_count": len(entries),
+            "total_bytes": sum(entry["size"] for entry in entries.values()),
             "metadata": metadata or {}
         }
+        self._write_json(snapshot_path / "metadata.json", meta)
         
-        with open(snapshot_path / "metadata.json", 'w') as f:
-            json.dump(meta, f, indent=2)
+        self.last_take_stats = {
+            "files": len(entries),
+            "hashed_files": len(to_hash),
+            "reused_files": len(entries) - len(to_hash),
+            "new_blobs": stored
+        }
         
-        # Create temporary directory for staging
-        self._temp_dir = Path(tempfile.mkdtemp(prefix="nip_snapshot_"))
-        
-        try:
-            # Copy workspace files to temp directory
-            self._copy_workspace_to_temp()
-            
-            # Create zip archive
-            zip_path = snapshot_path / "workspace.zip"
-            self._create_zip_archive(zip_path)
-            
-            # Store current snapshot info
-            self._current_snapshot_id = snapshot_id
-            self._current_snapshot_path = snapshot_path
-            
-        finally:
-            # Clean up temp directory
-            if self._temp_dir and self._temp_dir.exists():
-                shutil.rmtree(self._temp_dir, ignore_errors=True)
-                self._temp_dir = None
+        # Store current snapshot info
+        self._current_snapshot_id = snapshot_id
+        self._current_snapshot_path = snapshot_path
         
         return snapshot_id
     
-    def restore(self, snapshot_id: Optional[str] = None) -> bool:
+    def restore(self, snapshot_id: Optional[str] = None, verify: bool = False) -> bool:
         """Restore a workspace snapshot.
         
+        Only files that differ from the snapshot are rewritten; files and
+        directories the snapshot does not contain are removed. A file whose
+        size and mtime match its entry is trusted unchanged, unless its mtime
+        falls within the racy window before the snapshot was taken (an edit
+        there may not have moved the mtime), in which case it is hashed.
+        
         Args:
             snapshot_id: ID of snapshot to restore (uses current if None)
+            verify: Hash every file instead of trusting size and mtime, e.g.
+                when tools may have reset mtimes after editing
             
         Returns:
             True if restore succeeded
@@ -100,53 +265,56 @@ class WorkspaceSnapshot:
         if not target_id:
             return False
         
-        snapshot_path = self.snapshot_dir / target_id
-        if not snapshot_path.exists():
+        manifest = self.get_manifest(target_id)
+        if manifest is None:
             return False
         
-        zip_path = snapshot_path / "workspace.zip"
-        if not zip_path.exists():
+        wanted = manifest["files"]
+        digests = {entry["hash"] for entry in wanted.values()}
+        if not all(self.objects.contains(digest) for digest in digests):
             return False
         
-        # Create temporary directory for extraction
-        temp_extract = Path(tempfile.mkdtemp(prefix="nip_restore_"))
+        self.workspace_path.mkdir(parents=True, exist_ok=True)
+        files, dirs = self._scan_workspace()
+        current = dict(files)
+        stats = {"written": 0, "unchanged": 0, "removed": 0}
+        trust_limit = manifest["taken_ns"] - RACY_WINDOW_NS
         
-        try:
-            # Extract zip to temp directory
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(temp_extract)
-            
-            # Backup current workspace
-            backup_path = self.workspace_path.parent / f"{self.workspace_path.name}_backup_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
-            shutil.move(str(self.workspace_path), str(backup_path))
-            
-            try:
-                # Move extracted files to workspace
-                for item in temp_extract.iterdir():
-                    dest = self.workspace_path / item.name
-                    if item.is_dir():
-                        shutil.copytree(item, dest, dirs_exist_ok=True)
-                    else:
-                        shutil.copy2(item, dest)
-                
-                return True
-                
-            except Exception as e:
-                # Restore from backup if move failed
-                shutil.rmtree(str(self.workspace_path), ignore_errors=True)
-                shutil.move(str(backup_path), str(self.workspace_path))
-                raise e
-                
-        finally:
-            # Clean up temp directory
-            if temp_extract.exists():
-                shutil.rmtree(temp_extract, ignore_errors=True)
+        for rel_path in current:
+            if rel_path not in wanted:
+                (self.workspace_path / rel_path).unlink()
+                stats["removed"] += 1
         
-        return False
+        for rel_dir in sorted(dirs - set(manifest["dirs"]), key=len, reverse=True):
+            shutil.rmtree(self.workspace_path / rel_dir, ignore_errors=True)
+        
+        for rel_dir in manifest["dirs"]:
+            (self.workspace_path / rel_dir).mkdir(parents=True, exist_ok=True)
+        
+        for rel_path, entry in wanted.items():
+            target = self.workspace_path / rel_path
+            st = current.get(rel_path)
+            if st is not None and st.st_size == entry["size"]:
+                trusted = (not verify
+                           and st.st_mtime_ns == entry["mtime_ns"]
+                           and st.st_mtime_ns < trust_limit)
+                if trusted or hash_file(target) == entry["hash"]:
+                    stats["unchanged"] += 1
+                    continue
+            self._write_file(target, entry)
+            stats["written"] += 1
+        
+        self.last_restore_stats = stats
+        self._current_snapshot_id = target_id
+        self._current_snapshot_path = self.snapshot_dir / target_id
+        return True
     
     def delete(self, snapshot_id: str) -> bool:
         """Delete a snapshot.
         
+        Blobs are left in place; collect_garbage() removes the ones no
+        remaining snapshot references.
+        
         Args:
             snapshot_id: ID of snapshot to delete
             
@@ -154,11 +322,32 @@ class WorkspaceSnapshot:
             True if deleted
         """
         snapshot_path = self.snapshot_dir / snapshot_id
-        if snapshot_path.exists():
+        if snapshot_id != OBJECTS_DIR and snapshot_path.exists():
             shutil.rmtree(snapshot_path)
+            if snapshot_id == self._current_snapshot_id:
+                self._current_snapshot_id = None
+                self._current_snapshot_path = None
             return True
         return False
     
+    def collect_garbage(self) -> int:
+        """Remove blobs that no snapshot manifest references.
+        
+        Returns:
+            Number of blobs removed
+        """
+        referenced: Set[str] = set()
+        for snapshot in self.list_snapshots():
+            manifest = self.get_manifest(snapshot["id"])
+            if manifest is not None:
+                referenced.update(entry["hash"] for entry in manifest["files"].values())
+        
+        removed = 0
+        for digest in self.objects.digests() - referenced:
+            self.objects.remove(digest)
+            removed += 1
+        return removed
+    
     def list_snapshots(self) -> List[dict]:
         """List all available snapshots.
         
@@ -175,7 +364,7 @@ class WorkspaceSnapshot:
                         meta = json.load(f)
                         snapshots.append(meta)
         
-        return sorted(snapshots, key=lambda s: s['timestamp'], reverse=True)
+        return sorted(snapshots, key=lambda s: (s['timestamp'], s['id']), reverse=True)
     
     def get_snapshot_info(self, snapshot_id: str) -> Optional[dict]:
         """Get information about a specific snapshot.
@@ -195,55 +384,120 @@ class WorkspaceSnapshot:
         
         return None
     
+    def get_manifest(self, snapshot_id: str) -> Optional[dict]:
+        """Get the tree manifest of a snapshot.
+        
+        Args:
+            snapshot_id: ID of the snapshot
+            
+        Returns:
+            Manifest with "files" (path -> hash, size, mtime_ns, mode) and
+            "dirs", or None if not found
+        """
+        manifest_file = self.snapshot_dir / snapshot_id / MANIFEST_FILE
+        
+        if manifest_file.exists():
+            with open(manifest_file, 'r') as f:
+                return json.load(f)
+        
+        return None
+    
+    def _latest_snapshot_id(self) -> Optional[str]:
+        """Get the ID of the most recent snapshot, if any."""
+        snapshots = self.list_snapshots()
+        return snapshots[0]["id"] if snapshots else None
+    
     def _generate_snapshot_id(self) -> str:
         """Generate a unique snapshot ID.
         
+        IDs sort in creation order.
+        
         Returns:
             Snapshot ID string
         """
-        timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-        return f"snapshot_{timestamp}"
+        while True:
+            timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S_%f')
+            snapshot_id = f"snapshot_{timestamp}"
+            if not (self.snapshot_dir / snapshot_id).exists() and snapshot_id != self._current_snapshot_id:
+                return snapshot_id
+            time.sleep(0.000001)
     
-    def _copy_workspace_to_temp(self) -> None:
-        """Copy workspace files to temporary directory.
+    def _scan_workspace(self) -> Tuple[List[Tuple[str, os.stat_result]], Set[str]]:
+        """Walk the workspace, applying the exclusion rules.
         
-        Excludes certain directories like .git, __pycache__, node_modules, etc.
+        Excludes directories like .git, __pycache__, node_modules, top-level
+        dot entries, and compiled or OS metadata files.
+        
+        Returns:
+            Tuple of (list of (relative path, stat) for files, set of
+            relative directory paths)
         """
-        exclude_dirs = {'.git', '__pycache__', 'node_modules', '.venv', 'venv', '.nip', '.tox', '.pytest_cache', 'dist', 'build', '*.egg-info'}
-        exclude_files = {'.DS_Store', 'Thumbs.db', '*.pyc', '*.pyo'}
+        files: List[Tuple[str, os.stat_result]] = []
+        dirs: Set[str] = set()
+        if not self.workspace_path.is_dir():
+            return files, dirs
         
-        for item in self.workspace_path.iterdir():
-            # Skip excluded directories
-            if item.name in exclude_dirs or item.name.startswith('.'):
-                continue
-            
-            if item.is_dir():
-                dest = self._temp_dir / item.name
-                shutil.copytree(item, dest, 
-                              ignore=shutil.ignore_patterns(*exclude_dirs),
-                              dirs_exist_ok=True)
-            else:
-                # Skip excluded files
-                if item.name in exclude_files or item.suffix in ['.pyc', '.pyo']:
-                    continue
-                shutil.copy2(item, self._temp_dir / item.name)
+        stack = [("", str(self.workspace_path))]
+        while stack:
+            rel_dir, abs_dir = stack.pop()
+            with os.scandir(abs_dir) as it:
+                for entry in it:
+                    name = entry.name
+                    if not rel_dir and name.startswith('.'):
+                        continue
+                    rel_path = f"{rel_dir}/{name}" if rel_dir else name
+                    if entry.is_dir(follow_symlinks=False):
+                        if name in EXCLUDE_DIRS or name.endswith('.egg-info'):
+                            continue
+                        dirs.add(rel_path)
+                        stack.append((rel_path, entry.path))
+                    elif entry.is_file(follow_symlinks=False):
+                        if name in EXCLUDE_FILES or os.path.splitext(name)[1] in EXCLUDE_SUFFIXES:
+                            continue
+                        files.append((rel_path, entry.stat(follow_symlinks=False)))
+        return files, dirs
     
-    def _create_zip_archive(self, zip_path: Path) -> None:
-        """Create a zip archive from the temporary directory.
+    def _store_file(self, rel_path: str) -> Tuple[str, bool]:
+        """Hash a workspace file and add it to the object store.
         
-        Args:
-            zip_path: Path where the zip file should be created
+        Returns:
+            Tuple of (digest, whether a new blob was written)
         """
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for item in self._temp_dir.iterdir():
-                if item.is_file():
-                    zipf.write(item, item.name)
-                elif item.is_dir():
-                    for root, dirs, files in os.walk(item):
-                        for file in files:
-                            file_path = Path(root) / file
-                            arcname = file_path.relative_to(self._temp_dir)
-                            zipf.write(file_path, arcname)
+        source = self.workspace_path / rel_path
+        digest = hash_file(source)
+        return digest, self.objects.put_file(source, digest)
+    
+    def _write_file(self, target: Path, entry: dict) -> None:
+        """Materialize a blob at target with the recorded mode and mtime."""
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if target.is_dir():
+            shutil.rmtree(target)
+        fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=".nip_restore_")
+        os.close(fd)
+        try:
+            shutil.copyfile(self.objects.path_for(entry["hash"]), tmp)
+            os.chmod(tmp, entry["mode"])
+            os.utime(tmp, ns=(entry["mtime_ns"], entry["mtime_ns"]))
+            os.replace(tmp, target)
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+    
+    @staticmethod
+    def _entry(digest: str, st: os.stat_result) -> dict:
+        return {
+            "hash": digest,
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "mode": stat.S_IMODE(st.st_mode)
+        }
+    
+    @staticmethod
+    def _write_json(path: Path, data: dict) -> None:
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, path)
 
 
 class SnapshotManager:
@@ -291,16 +545,17 @@ class SnapshotManager:
         self._cleanup_old_snapshots()
         return snapshot_id
     
-    def restore_snapshot(self, snapshot_id: str) -> bool:
+    def restore_snapshot(self, snapshot_id: str, verify: bool = False) -> bool:
         """Restore a snapshot.
         
         Args:
             snapshot_id: ID of snapshot to restore
+            verify: Hash every file instead of trusting size and mtime
             
         Returns:
             True if succeeded
         """
-        return self.workspace.restore(snapshot_id)
+        return self.workspace.restore(snapshot_id, verify=verify)
     
     def list_snapshots(self) -> List[dict]:
         """List all snapshots.
@@ -311,13 +566,18 @@ class SnapshotManager:
         return self.workspace.list_snapshots()
     
     def _cleanup_old_snapshots(self) -> None:
-        """Remove old snapshots based on retention policies."""
+        """Remove old snapshots based on retention policies.
+        
+        Blobs no longer referenced by any remaining snapshot are
+        garbage-collected afterwards.
+        """
         snapshots = self.workspace.list_snapshots()
+        deleted = False
         
         # Remove snapshots exceeding max count
         if len(snapshots) > self.max_snapshots:
             for snapshot in snapshots[self.max_snapshots:]:
-                self.workspace.delete(snapshot['id'])
+                deleted |= self.workspace.delete(snapshot['id'])
         
         # Remove snapshots older than max age
         from datetime import timedelta
@@ -326,4 +586,7 @@ class SnapshotManager:
         for snapshot in snapshots:
             snapshot_time = datetime.fromisoformat(snapshot['timestamp'])
             if snapshot_time < cutoff:
-                self.workspace.delete(snapshot['id'])
+                deleted |= self.workspace.delete(snapshot['id'])
+        
+        if deleted:
+            self.workspace.collect_garbage()
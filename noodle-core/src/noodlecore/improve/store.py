@@ -1,58 +1,281 @@
 """File-based storage adapter for NIP models.
 
-This module provides a simple file-based persistence layer for all NIP data models.
-Each model type is stored in a separate directory with JSON files.
+This module provides the persistence layer for all NIP data models. By default
+entities live in a single SQLite database with the model JSON in a column and
+secondary indexes on task_id and candidate_id; the legacy layout of one JSON
+file per entity is still available and is migrated into SQLite on first use.
 """
 
 import json
 import os
+import sqlite3
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Optional, Dict, Any, TypeVar, Type
+from typing import Iterator, List, Optional, Dict, Any, Tuple, TypeVar, Type
 from .models import TaskSpec, Candidate, Evidence, PromotionRecord
 
 T = TypeVar('T', TaskSpec, Candidate, Evidence, PromotionRecord)
 
+BACKEND_SQLITE = "sqlite"
+BACKEND_JSON = "json"
+
+DATABASE_FILE = "store.db"
+
+MODEL_TYPES = ('task', 'candidate', 'evidence', 'promotion')
+
+
+class SQLiteBackend:
+    """SQLite storage for serialized entities.
+    
+    Entities are rows keyed by (model_type, id) with their JSON in a column.
+    task_id and candidate_id are copied into indexed columns so relationship
+    lookups do not deserialize unrelated entities.
+    
+    Attributes:
+        db_path: Path of the SQLite database file
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS entities (
+            model_type TEXT NOT NULL,
+            id TEXT NOT NULL,
+            task_id TEXT,
+            candidate_id TEXT,
+            data TEXT NOT NULL,
+            PRIMARY KEY (model_type, id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_entities_task ON entities (model_type, task_id);
+        CREATE INDEX IF NOT EXISTS idx_entities_candidate ON entities (model_type, candidate_id);
+        CREATE TABLE IF NOT EXISTS store_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+    """
+    
+    def __init__(self, db_path: Path):
+        """Initialize the backend.
+        
+        Args:
+            db_path: Path of the SQLite database file
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._conn = sqlite3.connect(str(self.db_path), isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+    
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run statements in one transaction; nested calls join the outer one."""
+        with self._lock:
+            outer = self._depth == 0
+            if outer:
+                self._conn.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+            try:
+                yield self._conn
+            except BaseException:
+                self._depth -= 1
+                if outer:
+                    self._conn.execute("ROLLBACK")
+                raise
+            self._depth -= 1
+            if outer:
+                self._conn.execute("COMMIT")
+    
+    def put_many(self, rows: List[Tuple[str, str, Optional[str], Optional[str], str]]) -> None:
+        """Insert or replace (model_type, id, task_id, candidate_id, data) rows."""
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO entities (model_type, id, task_id, candidate_id, data) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+    
+    def get(self, model_type: str, entity_id: str) -> Optional[str]:
+        """Get the JSON of one entity, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM entities WHERE model_type = ? AND id = ?",
+                (model_type, entity_id)
+            ).fetchone()
+        return row[0] if row else None
+    
+    def delete(self, model_type: str, entity_id: str) -> bool:
+        """Delete one entity; returns True if it existed."""
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                "DELETE FROM entities WHERE model_type = ? AND id = ?",
+                (model_type, entity_id)
+            )
+        return cursor.rowcount > 0
+    
+    def ids(self, model_type: str) -> List[str]:
+        """List entity IDs of a type in insertion order."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM entities WHERE model_type = ? ORDER BY rowid",
+                (model_type,)
+            ).fetchall()
+        return [row[0] for row in rows]
+    
+    def select(
+        self,
+        model_type: str,
+        task_id: Optional[str] = None,
+        candidate_id: Optional[str] = None
+    ) -> List[str]:
+        """Get the JSON of every entity of a type, optionally filtered by an indexed column."""
+        query = "SELECT data FROM entities WHERE model_type = ?"
+        params: List[Any] = [model_type]
+        if task_id is not None:
+            query += " AND task_id = ?"
+            params.append(task_id)
+        if candidate_id is not None:
+            query += " AND candidate_id = ?"
+            params.append(candidate_id)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY rowid", params).fetchall()
+        return [row[0] for row in rows]
+    
+    def exists(self, model_type: str, entity_id: str) -> bool:
+        """Check whether an entity is stored."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM entities WHERE model_type = ? AND id = ?",
+                (model_type, entity_id)
+            ).fetchone()
+        return row is not None
+    
+    def get_meta(self, key: str) -> Optional[str]:
+        """Read a store_meta value."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM store_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+    
+    def set_meta(self, key: str, value: str) -> None:
+        """Write a store_meta value."""
+        with self.transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO store_meta (key, value) VALUES (?, ?)", (key, value))
+    
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
 
 class FileStore:
-    """File-based storage for NIP models.
+    """Storage for NIP models.
     
     Provides CRUD operations for all model types with JSON persistence.
-    Each entity is stored as a separate JSON file in a dedicated directory.
+    With the default SQLite backend all entities share one indexed database
+    under base_path; with the JSON backend each entity is stored as a
+    separate JSON file in a dedicated directory.
     
     Attributes:
         base_path: Base directory for all storage
+        backend: Storage backend in use ('sqlite' or 'json')
         tasks_dir: Directory for TaskSpec files
         candidates_dir: Directory for Candidate files
         evidence_dir: Directory for Evidence files
         promotions_dir: Directory for PromotionRecord files
+        db: SQLite backend, or None for the JSON backend
     """
     
-    def __init__(self, base_path: str = ".nip/storage"):
+    # Model field copied into each indexed column
+    _INDEXED_FIELDS = ('task_id', 'candidate_id')
+    
+    def __init__(self, base_path: str = ".nip/storage", backend: str = BACKEND_SQLITE):
         """Initialize the file store.
         
         Args:
             base_path: Base directory for storage (default: .nip/storage)
+            backend: 'sqlite' (default) or 'json' for one file per entity
+            
+        Raises:
+            ValueError: If the backend is unknown
         """
+        if backend not in (BACKEND_SQLITE, BACKEND_JSON):
+            raise ValueError(f"Unknown storage backend: {backend}")
+        
         self.base_path = Path(base_path)
+        self.backend = backend
         self.tasks_dir = self.base_path / "tasks"
         self.candidates_dir = self.base_path / "candidates"
         self.evidence_dir = self.base_path / "evidence"
         self.promotions_dir = self.base_path / "promotions"
+        self.db: Optional[SQLiteBackend] = None
+        
+        if backend == BACKEND_SQLITE:
+            self.db = SQLiteBackend(self.base_path / DATABASE_FILE)
+            self.migrate_from_json()
+            return
         
         # Create directories if they don't exist
         for directory in [self.tasks_dir, self.candidates_dir, 
                          self.evidence_dir, self.promotions_dir]:
             directory.mkdir(parents=True, exist_ok=True)
     
-    def _get_file_path(self, model_type: str, entity_id: str) -> Path:
-        """Get the file path for a specific entity.
+    def migrate_from_json(self) -> int:
+        """Import the legacy JSON tree into SQLite, once.
+        
+        All entities are written in a single transaction and the migration
+        is recorded, so later opens skip it. The JSON files are left in place.
+        
+        Returns:
+            Number of entities imported (0 if already migrated)
+        """
+        if self.db is None or self.db.get_meta('json_migrated'):
+            return 0
+        
+        rows = []
+        for model_type in MODEL_TYPES:
+            directory = self._get_directory(model_type)
+            if not directory.exists():
+                continue
+            model_class = self._get_model_class(model_type)
+            for file_path in sorted(directory.glob("*.json")):
+                with open(file_path, 'r') as f:
+                    entity = model_class.from_json(f.read())
+                rows.append(self._row(entity, model_type))
+        
+        with self.db.transaction():
+            self.db.put_many(rows)
+            self.db.set_meta('json_migrated', str(len(rows)))
+        return len(rows)
+    
+    @contextmanager
+    def batch(self) -> Iterator['FileStore']:
+        """Group saves and deletes into one transaction.
+        
+        With the JSON backend this is a no-op.
+        
+        Yields:
+            This store
+        """
+        if self.db is None:
+            yield self
+            return
+        with self.db.transaction():
+            yield self
+    
+    def _row(self, entity: T, model_type: str) -> Tuple[str, str, Optional[str], Optional[str], str]:
+        """Build the SQLite row for an entity."""
+        task_id, candidate_id = (getattr(entity, name, None) for name in self._INDEXED_FIELDS)
+        return (model_type, entity.id, task_id, candidate_id, entity.to_json())
+    
+    def _get_directory(self, model_type: str) -> Path:
+        """Get the JSON directory for a model type.
         
         Args:
             model_type: Type of model ('task', 'candidate', 'evidence', 'promotion')
-            entity_id: ID of the entity
             
         Returns:
-            Path to the entity's JSON file
+            Directory holding that type's JSON files
         """
         dirs = {
             'task': self.tasks_dir,
@@ -60,7 +283,19 @@ class FileStore:
             'evidence': self.evidence_dir,
             'promotion': self.promotions_dir
         }
-        return dirs[model_type] / f"{entity_id}.json"
+        return dirs[model_type]
+    
+    def _get_file_path(self, model_type: str, entity_id: str) -> Path:
+        """Get the file path for a specific entity.
+        
+        Args:
+            model_type: Type of model ('task', 'candidate', 'evidence', 'promotion')
+            entity_id: ID of the entity
+            
+        Returns:
+            Path to the entity's JSON file
+        """
+        return self._get_directory(model_type) / f"{entity_id}.json"
     
     def _get_model_class(self, model_type: str) -> Type:
         """Get the model class for a given type.
@@ -86,10 +321,28 @@ class FileStore:
             entity: The entity to save (TaskSpec, Candidate, Evidence, or PromotionRecord)
             model_type: Type of model ('task', 'candidate', 'evidence', 'promotion')
         """
+        if self.db is not None:
+            self.db.put_many([self._row(entity, model_type)])
+            return
+        
         file_path = self._get_file_path(model_type, entity.id)
         with open(file_path, 'w') as f:
             f.write(entity.to_json())
     
+    def save_many(self, entities: List[T], model_type: str) -> None:
+        """Save several entities in one transaction.
+        
+        Args:
+            entities: The entities to save
+            model_type: Type of model ('task', 'candidate', 'evidence', 'promotion')
+        """
+        if self.db is not None:
+            self.db.put_many([self._row(entity, model_type) for entity in entities])
+            return
+        
+        for entity in entities:
+            self.save(entity, model_type)
+    
     def load(self, entity_id: str, model_type: str) -> Optional[T]:
         """Load an entity from disk.
         
@@ -100,12 +353,17 @@ class FileStore:
         Returns:
             The loaded entity, or None if not found
         """
-        file_path = self._get_file_path(model_type, entity_id)
-        if not file_path.exists():
-            return None
-        
-        with open(file_path, 'r') as f:
-            json_str = f.read()
+        if self.db is not None:
+            json_str = self.db.get(model_type, entity_id)
+            if json_str is None:
+                return None
+        else:
+            file_path = self._get_file_path(model_type, entity_id)
+            if not file_path.exists():
+                return None
+            
+            with open(file_path, 'r') as f:
+                json_str = f.read()
         
         model_class = self._get_model_class(model_type)
         return model_class.from_json(json_str)
@@ -120,6 +378,9 @@ class FileStore:
         Returns:
             True if deleted, False if not found
         """
+        if self.db is not None:
+            return self.db.delete(model_type, entity_id)
+        
         file_path = self._get_file_path(model_type, entity_id)
         if not file_path.exists():
             return False
@@ -136,14 +397,10 @@ class FileStore:
         Returns:
             List of entity IDs
         """
-        dirs = {
-            'task': self.tasks_dir,
-            'candidate': self.candidates_dir,
-            'evidence': self.evidence_dir,
-            'promotion': self.promotions_dir
-        }
+        if self.db is not None:
+            return self.db.ids(model_type)
         
-        directory = dirs[model_type]
+        directory = self._get_directory(model_type)
         if not directory.exists():
             return []
         
@@ -158,6 +415,9 @@ class FileStore:
         Returns:
             List of all entities of the specified type
         """
+        if self.db is not None:
+            return self.load_where(model_type)
+        
         entity_ids = self.list_all(model_type)
         entities = []
         
@@ -178,8 +438,45 @@ class FileStore:
         Returns:
             True if the entity exists, False otherwise
         """
+        if self.db is not None:
+            return self.db.exists(model_type, entity_id)
+        
         file_path = self._get_file_path(model_type, entity_id)
         return file_path.exists()
+    
+    def load_where(
+        self,
+        model_type: str,
+        task_id: Optional[str] = None,
+        candidate_id: Optional[str] = None
+    ) -> List[T]:
+        """Load entities of a type matching the indexed task_id/candidate_id fields.
+        
+        Args:
+            model_type: Type of model ('task', 'candidate', 'evidence', 'promotion')
+            task_id: Only entities with this task_id
+            candidate_id: Only entities with this candidate_id
+            
+        Returns:
+            Matching entities
+        """
+        model_class = self._get_model_class(model_type)
+        if self.db is not None:
+            return [
+                model_class.from_json(json_str)
+                for json_str in self.db.select(model_type, task_id=task_id, candidate_id=candidate_id)
+            ]
+        
+        return [
+            entity for entity in self.load_all(model_type)
+            if (task_id is None or getattr(entity, 'task_id', None) == task_id)
+            and (candidate_id is None or getattr(entity, 'candidate_id', None) == candidate_id)
+        ]
+    
+    def close(self) -> None:
+        """Release the database connection, if any."""
+        if self.db is not None:
+            self.db.close()
 
 
 class TaskStore(FileStore):
@@ -227,8 +524,7 @@ class CandidateStore(FileStore):
     
     def list_candidates_for_task(self, task_id: str) -> List[Candidate]:
         """List all candidates for a specific task."""
-        all_candidates = self.list_candidates()
-        return [c for c in all_candidates if c.task_id == task_id]
+        return self.load_where('candidate', task_id=task_id)
     
     def candidate_exists(self, candidate_id: str) -> bool:
         """Check if a candidate exists."""
@@ -256,8 +552,7 @@ class EvidenceStore(FileStore):
     
     def list_evidence_for_candidate(self, candidate_id: str) -> List[Evidence]:
         """List all evidence for a specific candidate."""
-        all_evidence = self.list_evidence()
-        return [e for e in all_evidence if e.candidate_id == candidate_id]
+        return self.load_where('evidence', candidate_id=candidate_id)
     
     def evidence_exists(self, evidence_id: str) -> bool:
         """Check if evidence exists."""
@@ -285,8 +580,7 @@ class PromotionStore(FileStore):
     
     def list_promotions_for_candidate(self, candidate_id: str) -> List[PromotionRecord]:
         """List all promotions for a specific candidate."""
-        all_promotions = self.list_promotions()
-        return [p for p in all_promotions if p.candidate_id == candidate_id]
+        return self.load_where('promotion', candidate_id=candidate_id)
     
     def promotion_exists(self, promotion_id: str) -> bool:
         """Check if a promotion record exists."""
@@ -0,0 +1,469 @@
+"""
+Tokenizers and token-budget planning for NIP LLM prompts.
+
+A BPETokenizer loads byte-level BPE ranks from a vocab file on disk
+(the "<base64 token> <rank>" format used by tiktoken encodings) and counts
+tokens exactly for that vocabulary. Counts are memoized per string hash.
+Models without a vocab file fall back to a conservative character
+heuristic, and budgets planned with it keep a fixed safety margin.
+
+TokenBudgetPlanner packs context chunks (files, diffs, evidence) into a
+model's context window in one pass.
+"""
+
+import base64
+import hashlib
+import os
+import math
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import regex as _regex
+    _regex_available = True
+except ImportError:
+    _regex_available = False
+
+
+# Pre-tokenization pattern of cl100k-style encodings
+CL100K_PATTERN = (
+    r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\p{L}\p{N}]?+\p{L}+|\p{N}{1,3}| ?[^\s\p{L}\p{N}]++[\r\n]*|\s*[\r\n]|\s+(?!\S)|\s+"""
+)
+
+# Closest equivalent for the stdlib re module (no \p classes)
+FALLBACK_PATTERN = (
+    r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\w]?[^\W\d_]+|\d{1,3}| ?[^\s\w]+[\r\n]*|\s*[\r\n]+|\s+(?!\S)|\s+"""
+)
+
+# Pre-tokenization pattern of o200k-style encodings (case-split words with
+# attached contractions)
+O200K_PATTERN = "|".join([
+    r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]*[\p{Ll}\p{Lm}\p{Lo}\p{M}]+(?i:'s|'t|'re|'ve|'m|'ll|'d)?""",
+    r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]+[\p{Ll}\p{Lm}\p{Lo}\p{M}]*(?i:'s|'t|'re|'ve|'m|'ll|'d)?""",
+    r"""\p{N}{1,3}""",
+    r""" ?[^\s\p{L}\p{N}]+[\r\n/]*""",
+    r"""\s*[\r\n]+""",
+    r"""\s+(?!\S)""",
+    r"""\s+""",
+])
+
+# Closest stdlib equivalent of O200K_PATTERN (no case split)
+O200K_FALLBACK_PATTERN = (
+    r"""[^\r\n\w]?[^\W\d_]+(?i:'s|'t|'re|'ve|'m|'ll|'d)?|\d{1,3}| ?[^\s\w]+[\r\n/]*|\s*[\r\n]+|\s+(?!\S)|\s+"""
+)
+
+# (regex pattern, stdlib fallback) per encoding; others use cl100k's
+ENCODING_PATTERNS = {
+    "o200k_base": (O200K_PATTERN, O200K_FALLBACK_PATTERN),
+}
+
+# Context windows in tokens
+MODEL_CONTEXT_WINDOWS = {
+    "glm-4.7": 128000,
+    "glm-4-plus": 128000,
+    "glm-4-air": 128000,
+    "glm-3-turbo": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 16385,
+    "claude-3": 200000,
+    "gemini-pro": 32760,
+    "gemini-ultra": 32760,
+    "command-r": 128000,
+    "mistral": 32000,
+}
+
+# Vocab file (without .tiktoken) used for each model prefix
+MODEL_ENCODINGS = {
+    "gpt-4o": "o200k_base",
+    "gpt-4": "cl100k_base",
+    "gpt-3.5": "cl100k_base",
+}
+
+DEFAULT_CONTEXT_WINDOW = 8192
+
+
+class Tokenizer:
+    """Base tokenizer interface"""
+    
+    name = "base"
+    # Tokens a budget keeps free for counting error
+    safety_margin = 0
+    
+    def count(self, text: str) -> int:
+        """Number of tokens in text"""
+        raise NotImplementedError
+    
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Longest prefix of text with at most max_tokens tokens"""
+        raise NotImplementedError
+
+
+class HeuristicTokenizer(Tokenizer):
+    """
+    Approximate counts at a fixed number of characters per token.
+    
+    Counts round up at 3 characters per token, which over-counts English
+    and code for most BPE vocabularies, and budgets keep safety_margin
+    tokens free on top. Undercounting is what overflows a context window.
+    """
+    
+    name = "heuristic"
+    
+    def __init__(self, chars_per_token: float = 3.0, safety_margin: int = 512):
+        self.chars_per_token = chars_per_token
+        self.safety_margin = safety_margin
+    
+    def count(self, text: str) -> int:
+        return math.ceil(len(text) / self.chars_per_token)
+    
+    def truncate(self, text: str, max_tokens: int) -> str:
+        return text[:int(max(0, max_tokens) * self.chars_per_token)]
+
+
+class BPETokenizer(Tokenizer):
+    """
+    Byte-level BPE tokenizer.
+    
+    Text is split with the pre-tokenization pattern and each piece is
+    merged by rank. Encoded pieces are cached, and whole-string counts are
+    memoized by content hash in a bounded LRU.
+    """
+    
+    def __init__(
+        self,
+        ranks: Dict[bytes, int],
+        pattern: Optional[str] = None,
+        name: str = "bpe",
+        memo_size: int = 4096,
+        piece_cache_size: int = 65536
+    ):
+        """
+        Args:
+            ranks: Merge rank of every token's bytes (lower merges first)
+            pattern: Pre-tokenization regex (default: by encoding name,
+                cl100k-style if unknown)
+            name: Encoding name
+            memo_size: Number of whole-string counts to memoize
+            piece_cache_size: Number of encoded pieces to cache
+        """
+        self.name = name
+        self.ranks = ranks
+        self.decoder = {rank: token for token, rank in ranks.items()}
+        if pattern is None:
+            patterns = ENCODING_PATTERNS.get(name, (CL100K_PATTERN, FALLBACK_PATTERN))
+            pattern = patterns[0] if _regex_available else patterns[1]
+        self.pattern = (_regex if _regex_available else re).compile(pattern)
+        self.memo_size = memo_size
+        self.piece_cache_size = piece_cache_size
+        self._count_memo: "OrderedDict[bytes, int]" = OrderedDict()
+        # Tokenizers are shared per model across threads
+        self._memo_lock = threading.Lock()
+        self._piece_cache: Dict[bytes, Tuple[int, ...]] = {}
+    
+    @classmethod
+    def from_file(cls, path: str, pattern: Optional[str] = None) -> "BPETokenizer":
+        """
+        Load ranks from a "<base64 token> <rank>" vocab file.
+        
+        Args:
+            path: Path to the vocab file
+            pattern: Pre-tokenization regex
+            
+        Returns:
+            BPETokenizer named after the file
+        """
+        ranks = {}
+        with open(path, "rb") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 2:
+                    ranks[base64.b64decode(parts[0])] = int(parts[1])
+        return cls(ranks, pattern=pattern, name=Path(path).name.split(".")[0])
+    
+    def _bpe(self, piece: bytes) -> Tuple[int, ...]:
+        """Merge a piece's bytes by rank and return token ids"""
+        cached = self._piece_cache.get(piece)
+        if cached is not None:
+            return cached
+        
+        rank = self.ranks.get(piece)
+        if rank is not None:
+            tokens: Tuple[int, ...] = (rank,)
+        else:
+            parts = [piece[i:i + 1] for i in range(len(piece))]
+            while len(parts) > 1:
+                best_rank, best_index = None, -1
+                for i in range(len(parts) - 1):
+                    pair_rank = self.ranks.get(parts[i] + parts[i + 1])
+                    if pair_rank is not None and (best_rank is None or pair_rank < best_rank):
+                        best_rank, best_index = pair_rank, i
+                if best_rank is None:
+                    break
+                parts[best_index:best_index + 2] = [parts[best_index] + parts[best_index + 1]]
+            tokens = tuple(self.ranks[part] for part in parts)
+        
+        if len(self._piece_cache) >= self.piece_cache_size:
+            self._piece_cache.clear()
+        self._piece_cache[piece] = tokens
+        return tokens
+    
+    def encode(self, text: str) -> List[int]:
+        """Encode text to token ids"""
+        tokens: List[int] = []
+        for match in self.pattern.finditer(text):
+            tokens.extend(self._bpe(match.group().encode("utf-8")))
+        return tokens
+    
+    def decode(self, tokens: List[int]) -> str:
+        """Decode token ids to text"""
+        return b"".join(self.decoder[token] for token in tokens).decode("utf-8", errors="replace")
+    
+    def count(self, text: str) -> int:
+        key = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+        with self._memo_lock:
+            cached = self._count_memo.get(key)
+            if cached is not None:
+                self._count_memo.move_to_end(key)
+                return cached
+        
+        count = 0
+        for match in self.pattern.finditer(text):
+            count += len(self._bpe(match.group().encode("utf-8")))
+        
+        with self._memo_lock:
+            self._count_memo[key] = count
+            if len(self._count_memo) > self.memo_size:
+                self._count_memo.popitem(last=False)
+        return count
+    
+    def truncate(self, text: str, max_tokens: int) -> str:
+        tokens = self.encode(text)
+        if len(tokens) <= max_tokens:
+            return text
+        keep = max(0, max_tokens)
+        while True:
+            # Drop a trailing partial UTF-8 character
+            data = b"".join(self.decoder[token] for token in tokens[:keep])
+            prefix = data.decode("utf-8", errors="ignore")
+            # Re-tokenizing a prefix can merge differently at the cut
+            excess = self.count(prefix) - max_tokens
+            if excess <= 0 or keep == 0:
+                return prefix
+            keep = max(0, keep - excess)
+
+
+_tokenizer_factories: List[Tuple[str, Callable[[], Tokenizer]]] = []
+_tokenizers: Dict[str, Tokenizer] = {}
+
+
+def register_tokenizer(model_prefix: str, factory: Callable[[], Tokenizer]) -> None:
+    """
+    Register a tokenizer for models whose name starts with model_prefix.
+    
+    Longer prefixes take precedence.
+    """
+    _tokenizer_factories.append((model_prefix, factory))
+    _tokenizer_factories.sort(key=lambda item: len(item[0]), reverse=True)
+    _tokenizers.clear()
+
+
+def _vocab_dirs() -> List[Path]:
+    dirs = []
+    if os.environ.get("NOODLE_TOKENIZER_DIR"):
+        dirs.append(Path(os.environ["NOODLE_TOKENIZER_DIR"]))
+    dirs.append(Path.home() / ".noodle" / "tokenizers")
+    return dirs
+
+
+def get_tokenizer(model: str) -> Tokenizer:
+    """
+    Get the tokenizer for a model.
+    
+    Registered factories are checked first, then vocab files named after
+    the model's encoding in NOODLE_TOKENIZER_DIR or ~/.noodle/tokenizers.
+    Otherwise the character heuristic is used.
+    
+    Args:
+        model: Model name
+        
+    Returns:
+        Tokenizer instance (shared per model)
+    """
+    if model in _tokenizers:
+        return _tokenizers[model]
+    
+    tokenizer: Optional[Tokenizer] = None
+    for prefix, factory in _tokenizer_factories:
+        if model.startswith(prefix):
+            tokenizer = factory()
+            break
+    
+    if tokenizer is None:
+        encoding = next(
+            (enc for prefix, enc in sorted(MODEL_ENCODINGS.items(), key=lambda i: -len(i[0]))
+             if model.startswith(prefix)),
+            model
+        )
+        for directory in _vocab_dirs():
+            path = directory / f"{encoding}.tiktoken"
+            if path.exists():
+                tokenizer = BPETokenizer.from_file(str(path))
+                break
+    
+    if tokenizer is None:
+        tokenizer = HeuristicTokenizer()
+    
+    _tokenizers[model] = tokenizer
+    return tokenizer
+
+
+def context_window(model: str) -> int:
+    """Context window of a model in tokens"""
+    for prefix, window in sorted(MODEL_CONTEXT_WINDOWS.items(), key=lambda i: -len(i[0])):
+        if model.startswith(prefix):
+            return window
+    return DEFAULT_CONTEXT_WINDOW
+
+
+@dataclass
+class ContextChunk:
+    """A piece of prompt context"""
+    name: str
+    text: str
+    priority: int = 0
+    kind: str = "file"  # "file", "diff", "evidence", ...
+    required: bool = False
+    truncatable: bool = True
+
+
+@dataclass
+class ContextPlan:
+    """Chunks selected to fit a token budget"""
+    chunks: List[ContextChunk]
+    tokens_used: int
+    budget: int
+    dropped: List[str] = field(default_factory=list)
+    truncated: List[str] = field(default_factory=list)
+    
+    def render(self, separator: str = "\n\n") -> str:
+        """Join the selected chunks in their original order"""
+        return separator.join(chunk.text for chunk in self.chunks)
+
+
+class TokenBudgetPlanner:
+    """
+    Packs context chunks into a token budget in one pass.
+    
+    Chunks are taken by priority (required first, then highest priority,
+    then input order). A chunk that does not fit is truncated to the
+    remaining budget if it is truncatable and at least min_truncated_tokens
+    remain; otherwise it is dropped. The result keeps the input order.
+    """
+    
+    def __init__(
+        self,
+        tokenizer: Tokenizer,
+        min_truncated_tokens: int = 64,
+        separator: str = "\n\n"
+    ):
+        self.tokenizer = tokenizer
+        self.min_truncated_tokens = min_truncated_tokens
+        self.separator = separator
+    
+    @classmethod
+    def for_model(cls, model: str, **kwargs) -> "TokenBudgetPlanner":
+        return cls(get_tokenizer(model), **kwargs)
+    
+    def budget_for(self, model: str, reserved_tokens: int = 0, fixed_text: str = "") -> int:
+        """
+        Tokens left for context in a model's window.
+        
+        The tokenizer's safety margin is kept free as well.
+        
+        Args:
+            model: Model name
+            reserved_tokens: Tokens kept free (e.g. max output tokens)
+            fixed_text: Prompt text that is always sent
+            
+        Returns:
+            Remaining token budget
+        """
+        return max(
+            0,
+            context_window(model) - reserved_tokens - self.tokenizer.count(fixed_text)
+            - self.tokenizer.safety_margin
+        )
+    
+    def plan(self, chunks: List[ContextChunk], budget: int) -> ContextPlan:
+        """
+        Select and truncate chunks to fit the budget.
+        
+        Args:
+            chunks: Candidate context chunks
+            budget: Maximum tokens for the rendered context
+            
+        Returns:
+            ContextPlan with the selected chunks
+        """
+        separator_tokens = self.tokenizer.count(self.separator)
+        order = sorted(range(len(chunks)), key=lambda i: (not chunks[i].required, -chunks[i].priority, i))
+        selected: Dict[int, ContextChunk] = {}
+        dropped: List[str] = []
+        truncated: List[str] = []
+        used = 0
+        
+        for index in order:
+            chunk = chunks[index]
+            overhead = separator_tokens if selected else 0
+            remaining = budget - used - overhead
+            tokens = self.tokenizer.count(chunk.text)
+            
+            if tokens <= remaining:
+                selected[index] = chunk
+                used += tokens + overhead
+            elif chunk.truncatable and remaining >= self.min_truncated_tokens:
+                text = self.tokenizer.truncate(chunk.text, remaining)
+                selected[index] = replace(chunk, text=text)
+                used += self.tokenizer.count(text) + overhead
+                truncated.append(chunk.name)
+            else:
+                dropped.append(chunk.name)
+        
+        # Token merges across chunk boundaries can differ from the sum
+        plan_chunks = [selected[i] for i in sorted(selected)]
+        used = self.tokenizer.count(self.separator.join(c.text for c in plan_chunks))
+        while used > budget and plan_chunks:
+            last = min(
+                (i for i in selected if selected[i].truncatable),
+                key=lambda i: (chunks[i].priority, -i),
+                default=None
+            )
+            if last is None:
+                break
+            excess = used - budget
+            chunk = selected[last]
+            selected[last] = replace(
+                chunk,
+                text=self.tokenizer.truncate(chunk.text, self.tokenizer.count(chunk.text) - excess)
+            )
+            if chunk.name not in truncated:
+                truncated.append(chunk.name)
+            plan_chunks = [selected[i] for i in sorted(selected)]
+            new_used = self.tokenizer.count(self.separator.join(c.text for c in plan_chunks))
+            if new_used >= used:
+                break
+            used = new_used
+        
+        return ContextPlan(
+            chunks=plan_chunks,
+            tokens_used=used,
+            budget=budget,
+            dropped=dropped,
+            truncated=truncated
+        )
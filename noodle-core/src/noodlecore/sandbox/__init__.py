@@ -4,12 +4,13 @@ This package provides safe command execution with allowlist-based
 validation and resource limits.
 """
 
-from .runner import SandboxRunner, SafeShell
+from .runner import SandboxRunner, SafeShell, SandboxWorkerPool
 from .allowlist import AllowListManager, PresetProfiles
 
 __all__ = [
     "SandboxRunner",
     "SafeShell",
+    "SandboxWorkerPool",
     "AllowListManager",
     "PresetProfiles"
 ]
@@ -19,6 +19,7 @@ class AllowListManager:
         allowed_commands: Set of allowed base commands
         argument_restrictions: Per-command argument restrictions
         blocked_patterns: Patterns that are never allowed in arguments
+        version: Counter bumped on every change, used to invalidate caches
     """
     
     def __init__(self, config_path: Optional[str] = None):
@@ -27,6 +28,7 @@ class AllowListManager:
         Args:
             config_path: Path to allowlist config file (JSON)
         """
+        self.version = 0
         self.allowed_commands: Set[str] = set()
         self.argument_restrictions: Dict[str, Dict[str, any]] = {}
         self.blocked_patterns: List[str] = [
@@ -242,6 +244,7 @@ class AllowListManager:
         self.allowed_commands.add(command)
         if restrictions:
             self.argument_restrictions[command] = restrictions
+        self.version += 1
     
     def remove_command(self, command: str) -> None:
         """Remove a command from the allowlist.
@@ -252,6 +255,7 @@ class AllowListManager:
         self.allowed_commands.discard(command)
         if command in self.argument_restrictions:
             del self.argument_restrictions[command]
+        self.version += 1
     
     def add_restriction(self, command: str, restrictions: Dict[str, any]) -> None:
         """Add argument restrictions for a command.
@@ -264,6 +268,7 @@ class AllowListManager:
             self.argument_restrictions[command].update(restrictions)
         else:
             self.argument_restrictions[command] = restrictions
+        self.version += 1
     
     def list_allowed(self) -> List[str]:
         """Get list of allowed commands.
@@ -289,6 +294,7 @@ class AllowListManager:
         self.allowed_commands = set(config.get("allowed_commands", []))
         self.argument_restrictions = config.get("argument_restrictions", {})
         self.blocked_patterns = config.get("blocked_patterns", [])
+        self.version += 1
     
     def save_to_file(self, config_path: str) -> None:
         """Save allowlist configuration to a JSON file.
@@ -333,6 +339,7 @@ class AllowListManager:
         self.allowed_commands = set(profile.get("allowed_commands", []))
         self.argument_restrictions = profile.get("argument_restrictions", {})
         self.blocked_patterns = profile.get("blocked_patterns", [])
+        self.version += 1
 
 
 class PresetProfiles:
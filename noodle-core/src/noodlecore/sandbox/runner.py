@@ -1,15 +1,30 @@
 """Sandbox execution with allowlist-based command validation.
 
 This module provides safe command execution in a sandboxed environment
-with configurable allowlists for permitted commands.
+with configurable allowlists for permitted commands. SandboxWorkerPool
+keeps long-lived worker processes that run commands sent over a pipe,
+avoiding a fresh shell spawn from this process for every command.
 """
 
+import json
+import os
+import queue
 import subprocess
 import shlex
-from typing import Dict, List, Optional, Tuple
+import sys
+import threading
+import concurrent.futures
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
 from pathlib import Path
 from .allowlist import AllowListManager
 
+# Path of the standalone worker script run by SandboxWorkerPool
+WORKER_SCRIPT = Path(__file__).with_name("worker.py")
+
+# Callback receiving ("stdout" | "stderr", text) as output arrives
+OutputCallback = Callable[[str, str], None]
+
 
 class SandboxRunner:
     """Executes commands in a sandboxed environment with allowlist validation.
@@ -23,6 +38,9 @@ class SandboxRunner:
         working_dir: Working directory for command execution
     """
     
+    # Maximum number of cached validation results
+    VALIDATION_CACHE_SIZE = 1024
+    
     def __init__(
         self,
         allowlist: Optional[AllowListManager] = None,
@@ -39,6 +57,8 @@ class SandboxRunner:
         self.allowlist = allowlist or AllowListManager()
         self.timeout = timeout
         self.working_dir = Path(working_dir)
+        self._validation_cache: "OrderedDict[str, Tuple[int, bool, Optional[str]]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
     
     def run_command(
         self,
@@ -58,41 +78,12 @@ class SandboxRunner:
         Returns:
             Dictionary with execution results
         """
-        # Parse the command to get the base command
-        try:
-            parts = shlex.split(command)
-            if not parts:
-                return {
-                    "success": False,
-                    "error": "Empty command",
-                    "exit_code": -1,
-                    "output": ""
-                }
-            base_command = parts[0]
-        except ValueError as e:
-            return {
-                "success": False,
-                "error": f"Invalid command syntax: {str(e)}",
-                "exit_code": -1,
-                "output": ""
-            }
-        
-        # Validate against allowlist
-        if not self.allowlist.is_allowed(base_command):
-            return {
-                "success": False,
-                "error": f"Command '{base_command}' is not in the allowlist",
-                "exit_code": -1,
-                "output": ""
-            }
-        
-        # Check for argument restrictions
-        args = parts[1:] if len(parts) > 1 else []
-        validation_result = self.allowlist.validate_arguments(base_command, args)
-        if not validation_result["allowed"]:
+        # Validate against allowlist and argument restrictions
+        is_valid, error = self._validate(command)
+        if not is_valid:
             return {
                 "success": False,
-                "error": f"Arguments not allowed: {validation_result['reason']}",
+                "error": error,
                 "exit_code": -1,
                 "output": ""
             }
@@ -123,7 +114,7 @@ class SandboxRunner:
                 "output": output,
                 "command": command
             }
-            
+        
         except subprocess.TimeoutExpired:
             return {
                 "success": False,
@@ -201,6 +192,39 @@ class SandboxRunner:
         Returns:
             Tuple of (is_valid, error_message)
         """
+        return self._validate(command)
+    
+    def _validate(self, command: str) -> Tuple[bool, Optional[str]]:
+        """Validate a command, reusing cached results for repeated commands.
+        
+        Cached entries are tagged with the allowlist version so any change
+        to the allowlist invalidates them.
+        
+        Args:
+            command: Command string to validate
+            
+        Returns:
+            Tuple of (is_valid, error_message)
+        """
+        version = self.allowlist.version
+        with self._cache_lock:
+            cached = self._validation_cache.get(command)
+            if cached is not None and cached[0] == version:
+                self._validation_cache.move_to_end(command)
+                return cached[1], cached[2]
+        
+        is_valid, error = self._check_command(command)
+        
+        with self._cache_lock:
+            self._validation_cache[command] = (version, is_valid, error)
+            self._validation_cache.move_to_end(command)
+            if len(self._validation_cache) > self.VALIDATION_CACHE_SIZE:
+                self._validation_cache.popitem(last=False)
+        return is_valid, error
+    
+    def _check_command(self, command: str) -> Tuple[bool, Optional[str]]:
+        """Check a command against the allowlist without caching."""
+        # Parse the command to get the base command
         try:
             parts = shlex.split(command)
             if not parts:
@@ -212,11 +236,12 @@ class SandboxRunner:
         if not self.allowlist.is_allowed(base_command):
             return False, f"Command '{base_command}' is not in the allowlist"
         
+        # Check for argument restrictions
         args = parts[1:] if len(parts) > 1 else []
         validation_result = self.allowlist.validate_arguments(base_command, args)
         
         if not validation_result["allowed"]:
-            return False, validation_result["reason"]
+            return False, f"Arguments not allowed: {validation_result['reason']}"
         
         return True, None
     
@@ -237,6 +262,301 @@ class SandboxRunner:
         return self.allowlist.list_allowed()
 
 
+class _SandboxWorker:
+    """A single long-lived worker process and its pipes."""
+    
+    def __init__(self, cwd: str, env: Dict[str, str]):
+        self.process = subprocess.Popen(
+            [sys.executable, "-u", str(WORKER_SCRIPT)],
+            cwd=cwd,
+            env=env,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+            bufsize=1
+        )
+        self.commands_run = 0
+    
+    def alive(self) -> bool:
+        return self.process.poll() is None
+    
+    def request(self, message: Dict[str, any], on_output: Optional[OutputCallback]) -> Dict[str, any]:
+        """Send a request and collect responses until the final result.
+        
+        Raises:
+            RuntimeError: If the worker process died
+        """
+        try:
+            self.process.stdin.write(json.dumps(message) + "\n")
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise RuntimeError(f"Sandbox worker is not running: {e}") from e
+        
+        stdout: List[str] = []
+        stderr: List[str] = []
+        while True:
+            line = self.process.stdout.readline()
+            if not line:
+                raise RuntimeError("Sandbox worker exited unexpectedly")
+            response = json.loads(line)
+            if "stream" in response:
+                (stdout if response["stream"] == "stdout" else stderr).append(response["data"])
+                if on_output:
+                    on_output(response["stream"], response["data"])
+                continue
+            self.commands_run += 1
+            response["stdout"] = "".join(stdout)
+            response["stderr"] = "".join(stderr)
+            return response
+    
+    def close(self, timeout: float = 5.0) -> None:
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=timeout)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+            self.process.wait()
+        finally:
+            self.process.stdout.close()
+
+
+class SandboxWorkerPool:
+    """Pool of long-lived sandbox worker processes.
+    
+    Commands are validated with the sandbox's allowlist (results are cached
+    for repeated commands) and sent over a pipe to an idle worker, which
+    runs them with the requested cwd, environment and timeout and streams
+    stdout/stderr back as it is produced. Commands without shell syntax are
+    executed directly instead of through /bin/sh.
+    
+    Attributes:
+        sandbox: SandboxRunner providing validation, timeout and working dir
+        workers: Number of worker processes
+        env: Base environment for commands (copy of os.environ by default)
+    """
+    
+    def __init__(
+        self,
+        sandbox: Optional[SandboxRunner] = None,
+        workers: int = 4,
+        env: Optional[Dict[str, str]] = None
+    ):
+        """Initialize the pool and start its workers.
+        
+        Args:
+            sandbox: SandboxRunner instance (creates default if None)
+            workers: Number of worker processes (default: 4)
+            env: Base environment for commands
+        """
+        self.sandbox = sandbox or SandboxRunner()
+        self.workers = max(1, workers)
+        self.env = dict(env) if env is not None else dict(os.environ)
+        self._idle: "queue.Queue[_SandboxWorker]" = queue.Queue()
+        self._all: List[_SandboxWorker] = []
+        self._lock = threading.Lock()
+        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._next_id = 0
+        self._closed = False
+        self._stats = {"commands": 0, "rejected": 0, "timeouts": 0, "restarts": 0}
+        
+        for _ in range(self.workers):
+            self._idle.put(self._spawn())
+    
+    def _spawn(self) -> _SandboxWorker:
+        worker = _SandboxWorker(str(self.sandbox.working_dir), self.env)
+        with self._lock:
+            self._all.append(worker)
+        return worker
+    
+    def _retire(self, worker: _SandboxWorker) -> None:
+        with self._lock:
+            if worker in self._all:
+                self._all.remove(worker)
+        worker.close(timeout=0)
+    
+    def run_command(
+        self,
+        command: str,
+        timeout: Optional[int] = None,
+        env: Optional[Dict[str, str]] = None,
+        cwd: Optional[str] = None,
+        on_output: Optional[OutputCallback] = None
+    ) -> Dict[str, any]:
+        """Run a command on an idle worker.
+        
+        Args:
+            command: Command string to execute
+            timeout: Timeout in seconds (uses the sandbox default if None)
+            env: Environment variables for the command (replaces the base
+                env, which the workers were started with)
+            cwd: Working directory (uses the sandbox working dir if None)
+            on_output: Called with (stream, text) as output arrives
+            
+        Returns:
+            Dictionary with execution results, as SandboxRunner.run_command
+            plus separate stdout, stderr and duration
+        """
+        if self._closed:
+            raise RuntimeError("SandboxWorkerPool is shut down")
+        
+        is_valid, error = self.sandbox.validate_command(command)
+        if not is_valid:
+            with self._lock:
+                self._stats["rejected"] += 1
+            return {
+                "success": False,
+                "error": error,
+                "exit_code": -1,
+                "output": ""
+            }
+        
+        actual_timeout = timeout or self.sandbox.timeout
+        with self._lock:
+            self._next_id += 1
+            request_id = self._next_id
+        message = {
+            "id": request_id,
+            "command": command,
+            "cwd": str(cwd or self.sandbox.working_dir),
+            "env": env,
+            "timeout": actual_timeout
+        }
+        
+        worker = self._idle.get()
+        try:
+            response = worker.request(message, on_output)
+        except Exception as e:
+            self._retire(worker)
+            worker = self._spawn()
+            with self._lock:
+                self._stats["restarts"] += 1
+            return {
+                "success": False,
+                "error": str(e),
+                "exit_code": -1,
+                "output": ""
+            }
+        finally:
+            self._idle.put(worker)
+        
+        output = response["stdout"]
+        if response["stderr"]:
+            output += "\n" + response["stderr"]
+        result = {
+            "success": response["exit_code"] == 0 and not response["timed_out"],
+            "exit_code": response["exit_code"],
+            "output": output,
+            "stdout": response["stdout"],
+            "stderr": response["stderr"],
+            "duration": response["duration"],
+            "command": command
+        }
+        with self._lock:
+            self._stats["commands"] += 1
+            if response["timed_out"]:
+                self._stats["timeouts"] += 1
+        if response["timed_out"]:
+            result["exit_code"] = -1
+            result["error"] = f"Command timed out after {actual_timeout} seconds"
+        elif "error" in response:
+            result["error"] = response["error"]
+        return result
+    
+    def submit(self, command: str, **kwargs) -> "concurrent.futures.Future":
+        """Run a command asynchronously.
+        
+        Args:
+            command: Command string to execute
+            **kwargs: Additional arguments for run_command
+            
+        Returns:
+            Future resolving to the execution result dictionary
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="sandbox-pool"
+                )
+        return self._executor.submit(self.run_command, command, **kwargs)
+    
+    def run_batch(
+        self,
+        commands: List[str],
+        parallelism: Optional[int] = None,
+        timeout: Optional[int] = None,
+        stop_on_failure: bool = False,
+        on_output: Optional[Callable[[int, str, str], None]] = None
+    ) -> List[Dict[str, any]]:
+        """Run several commands concurrently.
+        
+        Args:
+            commands: Commands to execute
+            parallelism: Maximum concurrent commands (default: pool size)
+            timeout: Per-command timeout in seconds
+            stop_on_failure: Skip commands not yet started after a failure
+                and truncate the results after the first failed command
+            on_output: Called with (command index, stream, text)
+            
+        Returns:
+            List of execution results in command order
+        """
+        parallelism = max(1, min(parallelism or self.workers, self.workers))
+        failed = threading.Event()
+        
+        def run(index: int) -> Optional[Dict[str, any]]:
+            if stop_on_failure and failed.is_set():
+                return None
+            callback = (lambda stream, text: on_output(index, stream, text)) if on_output else None
+            result = self.run_command(commands[index], timeout=timeout, on_output=callback)
+            if not result["success"]:
+                failed.set()
+            return result
+        
+        with concurrent.futures.ThreadPoolExecutor(max_workers=parallelism) as executor:
+            results = list(executor.map(run, range(len(commands))))
+        
+        if stop_on_failure:
+            ordered = []
+            for result in results:
+                if result is None:
+                    break
+                ordered.append(result)
+                if not result["success"]:
+                    break
+            return ordered
+        return results
+    
+    def get_stats(self) -> Dict[str, any]:
+        """Get pool statistics.
+        
+        Returns:
+            Dictionary with command, rejection, timeout and restart counts
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["workers"] = len(self._all)
+        stats["idle"] = self._idle.qsize()
+        return stats
+    
+    def shutdown(self) -> None:
+        """Stop all worker processes."""
+        self._closed = True
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        with self._lock:
+            workers, self._all = self._all, []
+        for worker in workers:
+            worker.close()
+    
+    def __enter__(self) -> "SandboxWorkerPool":
+        return self
+    
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.shutdown()
+
+
 class SafeShell:
     """A safer shell interface for executing multiple commands.
     
@@ -245,16 +565,23 @@ class SafeShell:
     
     Attributes:
         sandbox: SandboxRunner instance
+        pool: Optional SandboxWorkerPool used to run commands
         history: List of executed commands
     """
     
-    def __init__(self, sandbox: Optional[SandboxRunner] = None):
+    def __init__(
+        self,
+        sandbox: Optional[SandboxRunner] = None,
+        pool: Optional[SandboxWorkerPool] = None
+    ):
         """Initialize the safe shell.
         
         Args:
             sandbox: SandboxRunner instance (creates default if None)
+            pool: SandboxWorkerPool to run commands on (runs directly if None)
         """
-        self.sandbox = sandbox or SandboxRunner()
+        self.sandbox = sandbox or (pool.sandbox if pool else SandboxRunner())
+        self.pool = pool
         self.history: List[Dict[str, any]] = []
     
     def execute(self, command: str, **kwargs) -> Dict[str, any]:
@@ -267,30 +594,55 @@ class SafeShell:
         Returns:
             Execution result dictionary
         """
-        result = self.sandbox.run_command(command, **kwargs)
+        if self.pool:
+            result = self.pool.run_command(command, **kwargs)
+        else:
+            result = self.sandbox.run_command(command, **kwargs)
+        self._record(command, result)
+        return result
+    
+    def _record(self, command: str, result: Dict[str, any]) -> None:
         self.history.append({
             "command": command,
             "result": result,
             "timestamp": None  # Could add timestamp if needed
         })
-        return result
     
-    def execute_batch(self, commands: List[str]) -> List[Dict[str, any]]:
-        """Execute multiple commands in sequence.
+    def execute_batch(
+        self,
+        commands: List[str],
+        parallelism: int = 1,
+        continue_on_error: bool = False
+    ) -> List[Dict[str, any]]:
+        """Execute multiple commands.
         
-        Stops on first failure unless continue_on_error is True.
+        Stops on first failure unless continue_on_error is True. With a
+        pool and parallelism > 1 commands run concurrently; results are
+        still returned in command order.
         
         Args:
             commands: List of commands to execute
+            parallelism: Maximum concurrent commands when a pool is set
+            continue_on_error: Run every command even after a failure
             
         Returns:
             List of execution results
         """
+        if self.pool and parallelism > 1:
+            results = self.pool.run_batch(
+                commands,
+                parallelism=parallelism,
+                stop_on_failure=not continue_on_error
+            )
+            for command, result in zip(commands, results):
+                self._record(command, result)
+            return results
+        
         results = []
         for command in commands:
             result = self.execute(command)
             results.append(result)
-            if not result["success"]:
+            if not result["success"] and not continue_on_error:
                 break
         return results
     
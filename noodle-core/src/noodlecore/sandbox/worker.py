@@ -0,0 +1,182 @@
+"""Long-lived sandbox worker process.
+
+This module is run as a standalone script by SandboxWorkerPool. It reads
+one JSON request per line from stdin, runs the command and writes JSON
+lines back to stdout: output chunks as they arrive, then a final result.
+Only the standard library is used so the worker starts without importing
+noodlecore.
+
+Request:
+    {"id": 1, "command": "pytest -q", "cwd": "/repo", "env": {...}, "timeout": 30}
+
+Responses:
+    {"id": 1, "stream": "stdout", "data": "..."}
+    {"id": 1, "exit_code": 0, "duration": 0.12, "timed_out": false}
+"""
+
+import codecs
+import json
+import os
+import queue
+import shlex
+import signal
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict, IO, List, Optional
+
+# Characters that need /bin/sh to interpret the command
+SHELL_METACHARACTERS = set("|&;<>()$`\\\"'*?[]#~=%{}!\n")
+
+CHUNK_SIZE = 65536
+
+
+def needs_shell(command: str) -> bool:
+    """Check whether a command uses shell syntax.
+    
+    Args:
+        command: Command string
+        
+    Returns:
+        True if the command must be run through the shell
+    """
+    return any(char in SHELL_METACHARACTERS for char in command)
+
+
+def _pump(stream_name: str, pipe: IO[bytes], chunks: "queue.Queue") -> None:
+    """Forward chunks from a child pipe to the chunk queue until EOF."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    read = getattr(pipe, "read1", pipe.read)
+    while True:
+        data = read(CHUNK_SIZE)
+        if not data:
+            break
+        text = decoder.decode(data)
+        if text:
+            chunks.put((stream_name, text))
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        chunks.put((stream_name, tail))
+    chunks.put((stream_name, None))
+
+
+def _kill(process: subprocess.Popen) -> None:
+    """Kill a command and everything it started."""
+    try:
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except (ProcessLookupError, PermissionError, OSError):
+        pass
+
+
+def run_request(request: Dict[str, Any], send) -> Dict[str, Any]:
+    """Run one request, streaming output through send.
+    
+    Args:
+        request: Request dictionary
+        send: Callable that writes one response dictionary
+        
+    Returns:
+        Final result dictionary
+    """
+    request_id = request.get("id")
+    command = request["command"]
+    timeout = request.get("timeout")
+    
+    if needs_shell(command):
+        args: Any = command
+        shell = True
+    else:
+        args = shlex.split(command)
+        shell = False
+    
+    started = time.perf_counter()
+    try:
+        process = subprocess.Popen(
+            args,
+            shell=shell,
+            cwd=request.get("cwd"),
+            env=request.get("env"),
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            start_new_session=(os.name == "posix")
+        )
+    except OSError as e:
+        return {
+            "id": request_id,
+            "exit_code": 127,
+            "duration": time.perf_counter() - started,
+            "timed_out": False,
+            "error": str(e)
+        }
+    
+    chunks: "queue.Queue" = queue.Queue()
+    readers: List[threading.Thread] = [
+        threading.Thread(target=_pump, args=("stdout", process.stdout, chunks), daemon=True),
+        threading.Thread(target=_pump, args=("stderr", process.stderr, chunks), daemon=True)
+    ]
+    for reader in readers:
+        reader.start()
+    
+    deadline = started + timeout if timeout else None
+    timed_out = False
+    open_streams = 2
+    while open_streams:
+        wait: Optional[float] = None
+        if deadline is not None:
+            wait = deadline - time.perf_counter()
+            if wait <= 0:
+                timed_out = True
+                _kill(process)
+                deadline = None
+                continue
+        try:
+            stream_name, text = chunks.get(timeout=wait)
+        except queue.Empty:
+            continue
+        if text is None:
+            open_streams -= 1
+        else:
+            send({"id": request_id, "stream": stream_name, "data": text})
+    
+    exit_code = process.wait()
+    for reader in readers:
+        reader.join()
+    process.stdout.close()
+    process.stderr.close()
+    
+    return {
+        "id": request_id,
+        "exit_code": exit_code,
+        "duration": time.perf_counter() - started,
+        "timed_out": timed_out
+    }
+
+
+def main() -> None:
+    """Serve requests from stdin until it is closed."""
+    out = sys.stdout
+    
+    def send(message: Dict[str, Any]) -> None:
+        out.write(json.dumps(message) + "\n")
+        out.flush()
+    
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        request = None
+        try:
+            request = json.loads(line)
+            send(run_request(request, send))
+        except Exception as e:
+            request_id = request.get("id") if isinstance(request, dict) else None
+            send({"id": request_id, "exit_code": -1, "duration": 0.0, "timed_out": False, "error": str(e)})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""Tests for NIP LLM integration.
+
+Tests the async request engine, hedged fallbacks and the response cache
+with in-process fake providers.
+"""
+
+import threading
+import time
+import pytest
+from noodlecore.improve.llm_integration import (
+    AsyncLLMEngine, LLMConfig, LLMManager, LLMProvider, LLMProviderBase,
+    LLMRequest, LLMResponse, ProviderLimits, ResponseCache, TokenBucket
+)
+from noodlecore.improve.tokenizer import ContextChunk
+
+
+class FakeProvider(LLMProviderBase):
+    """Provider that answers after a delay, or fails."""
+    
+    def __init__(self, name: str, delay: float = 0.0, fail: bool = False):
+        super().__init__(LLMConfig(provider=LLMProvider.LOCAL, model=name))
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+    
+    def generate(self, request: LLMRequest) -> LLMResponse:
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            if self.fail:
+                raise RuntimeError(f"{self.config.model} unavailable")
+            return LLMResponse(
+                content=f"{self.config.model}:{request.prompt}",
+                model=self.config.model,
+                provider=LLMProvider.LOCAL,
+                tokens_used=10,
+                cost_usd=0.01
+            )
+        finally:
+            with self._lock:
+                self.active -= 1
+    
+    def generate_stream(self, request: LLMRequest):
+        yield self.generate(request).content
+    
+    def estimate_cost(self, prompt_tokens: int, completion_tokens: int) -> float:
+        return 0.0
+
+
+class FakeManager(LLMManager):
+    """LLMManager whose configs map to fake providers by model name."""
+    
+    fakes = {}
+    
+    def _create_provider(self, config: LLMConfig) -> LLMProviderBase:
+        return self.fakes[config.model]
+
+
+@pytest.fixture
+def engine_factory():
+    engines = []
+    
+    def make(*providers, **kwargs):
+        engine = AsyncLLMEngine(list(providers), **kwargs)
+        engines.append(engine)
+        return engine
+    yield make
+    for engine in engines:
+        engine.close()
+
+
+class TestAsyncLLMEngine:
+    """Test concurrency, fallback and hedging."""
+    
+    def test_fallback_after_failure(self, engine_factory):
+        """Test that a failing primary falls through to the fallback."""
+        engine = engine_factory(FakeProvider("primary", fail=True), FakeProvider("backup"))
+        
+        response = engine.generate_sync(LLMRequest(prompt="hi"))
+        
+        assert response.content == "backup:hi"
+        assert engine.stats['fallbacks'] == 1
+    
+    def test_all_providers_fail(self, engine_factory):
+        """Test the error when every provider fails."""
+        engine = engine_factory(FakeProvider("a", fail=True), FakeProvider("b", fail=True))
+        
+        with pytest.raises(RuntimeError, match="All LLM providers failed"):
+            engine.generate_sync(LLMRequest(prompt="hi"))
+    
+    def test_slow_primary_is_hedged(self, engine_factory):
+        """Test that the fallback races a primary slower than its percentile."""
+        primary = FakeProvider("primary")
+        engine = engine_factory(primary, FakeProvider("backup", delay=0.01), hedge_min_samples=3)
+        for i in range(3):
+            engine.generate_sync(LLMRequest(prompt=f"warm{i}"), use_fallback=False)
+        
+        primary.delay = 1.0
+        start = time.monotonic()
+        response = engine.generate_sync(LLMRequest(prompt="slow"))
+        
+        assert response.content == "backup:slow"
+        assert time.monotonic() - start < 0.5
+        assert engine.stats['hedged'] == 1
+    
+    def test_concurrency_limit(self, engine_factory):
+        """Test the per-provider concurrency limit."""
+        provider = FakeProvider("primary", delay=0.05)
+        engine = engine_factory(provider, limits=ProviderLimits(max_concurrency=2, requests_per_second=0))
+        
+        futures = [engine.submit(LLMRequest(prompt=str(i))) for i in range(6)]
+        results = [f.result() for f in futures]
+        
+        assert len(results) == 6
+        assert provider.max_active == 2
+    
+    def test_identical_inflight_requests_are_coalesced(self, engine_factory):
+        """Test that concurrent identical prompts share one call."""
+        provider = FakeProvider("primary", delay=0.05)
+        engine = engine_factory(provider)
+        
+        futures = [engine.submit(LLMRequest(prompt="same")) for _ in range(4)]
+        
+        assert {f.result().content for f in futures} == {"primary:same"}
+        assert provider.calls == 1
+
+    
+    def test_zero_temperature_is_cached_separately(self, engine_factory):
+        """Test that temperature 0.0 is not replaced by the configured default."""
+        provider = FakeProvider("primary")
+        engine = engine_factory(provider, cache=ResponseCache())
+        
+        engine.generate_sync(LLMRequest(prompt="same"))
+        engine.generate_sync(LLMRequest(prompt="same", temperature=0.0))
+        engine.generate_sync(LLMRequest(prompt="same", temperature=0.0))
+        
+        assert provider.calls == 2
+        assert engine.stats['cache_hits'] == 1
+
+
+class TestResponseCache:
+    """Test the prompt to response cache."""
+    
+    def _response(self, content: str) -> LLMResponse:
+        return LLMResponse(content=content, model="m", provider=LLMProvider.LOCAL, tokens_used=5, cost_usd=1.0)
+    
+    def test_persistent_cache_survives_reopen(self, tmp_path):
+        """Test that entries persist in SQLite."""
+        path = str(tmp_path / "cache.db")
+        cache = ResponseCache(path)
+        cache.put("k", self._response("patch"))
+        cache.close()
+        
+        cached = ResponseCache(path).get("k")
+        
+        assert cached.content == "patch"
+        assert cached.cost_usd == 0.0
+        assert cached.metadata['cached'] is True
+    
+    @pytest.mark.parametrize("persistent", [False, True])
+    def test_size_bounded_eviction(self, tmp_path, persistent):
+        """Test that least recently used entries are evicted."""
+        cache = ResponseCache(str(tmp_path / "c.db") if persistent else None, max_entries=2)
+        cache.put("a", self._response("a"))
+        cache.put("b", self._response("b"))
+        cache.get("a")
+        cache.put("c", self._response("c"))
+        
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+    
+    def test_ttl_expiry(self):
+        """Test that expired entries are not returned."""
+        cache = ResponseCache(ttl_seconds=0)
+        cache.put("a", self._response("a"))
+        time.sleep(0.01)
+        
+        assert cache.get("a") is None
+    
+    def test_key_depends_on_params(self):
+        """Test that the key covers model, prompts and params."""
+        request = LLMRequest(prompt="p", system_prompt="s")
+        
+        assert ResponseCache.make_key("m", request, 0.7, 100) != ResponseCache.make_key("m", request, 0.2, 100)
+        assert ResponseCache.make_key("m", request, 0.7, 100) != ResponseCache.make_key("n", request, 0.7, 100)
+
+
+class TestLLMManager:
+    """Test the manager on top of the engine."""
+    
+    def test_repeated_prompt_is_served_from_cache(self):
+        """Test that identical prompts are not re-sent."""
+        FakeManager.fakes = {"primary": FakeProvider("primary")}
+        manager = FakeManager(LLMConfig(provider=LLMProvider.LOCAL, model="primary"))
+        
+        manager.generate("fix bug")
+        manager.generate("fix bug")
+        
+        assert FakeManager.fakes["primary"].calls == 1
+        assert manager.get_statistics()['cache']['hits'] == 1
+        assert manager.total_cost == pytest.approx(0.01)
+        manager.close()
+    
+    def test_generate_patches_fan_out(self):
+        """Test that patches for many candidates run concurrently."""
+        FakeManager.fakes = {"primary": FakeProvider("primary", delay=0.1)}
+        manager = FakeManager(
+            LLMConfig(provider=LLMProvider.LOCAL, model="primary"),
+            limits=ProviderLimits(max_concurrency=8, requests_per_second=0)
+        )
+        tasks = [{'context': '', 'task_description': f"task {i}", 'file_changes': []} for i in range(8)]
+        
+        start = time.monotonic()
+        patches = manager.generate_patches(tasks)
+        
+        assert len(patches) == 8
+        assert time.monotonic() - start < 0.5
+        assert FakeManager.fakes["primary"].max_active > 1
+        manager.close()
+    
+    def test_patch_prompt_fits_context_window(self):
+        """Test that patch context is packed by tokens, highest priority first."""
+        FakeManager.fakes = {"primary": FakeProvider("primary")}
+        manager = FakeManager(LLMConfig(provider=LLMProvider.LOCAL, model="primary", max_tokens=4096))
+        chunks = [
+            ContextChunk("evidence", "E" * 40000, priority=0),
+            ContextChunk("diff", "D" * 8000, priority=5, truncatable=False),
+        ]
+        
+        _, prompt = manager._patch_prompts("task context", "fix bug", [], chunks)
+        
+        assert "task context" in prompt
+        assert "D" * 8000 in prompt
+        assert manager.primary_provider._count_tokens(prompt) <= 8192 - 4096
+        manager.close()
+    
+    def test_heuristic_patch_prompt_fits_large_window(self):
+        """Test that a huge context is cut to the window without a vocab file."""
+        FakeManager.fakes = {"glm-4.7": FakeProvider("glm-4.7")}
+        manager = FakeManager(LLMConfig(provider=LLMProvider.LOCAL, model="glm-4.7", max_tokens=4096))
+        
+        system_prompt, prompt = manager._patch_prompts("x" * 1_800_000, "fix bug", [])
+        
+        # Even at 3 characters per token the prompt and completion fit
+        assert (len(system_prompt) + len(prompt)) / 3 + 4096 <= 128000
+        assert prompt.count("x") > 300_000
+        manager.close()
+
+
+def test_token_bucket_limits_rate():
+    """Test that the bucket spaces requests beyond the burst."""
+    import asyncio
+    
+    async def run():
+        bucket = TokenBucket(rate=100, capacity=1)
+        start = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+        return time.monotonic() - start
+    
+    assert asyncio.run(run()) >= 0.035
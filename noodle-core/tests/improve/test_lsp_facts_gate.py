@@ -0,0 +1,173 @@
+"""Tests for the NIP LSP facts gate.
+
+Tests ast-based symbol extraction, the content-hash cache and
+signature-change classification.
+"""
+
+import pytest
+from noodlecore.improve.lsp_facts_gate import (
+    SimpleLspFactsGate, ChangeType, extract_python_symbols, content_hash
+)
+
+
+MODULE = '''
+__all__ = ["Client", "connect"]
+
+TIMEOUT: int = 30
+
+
+def connect(host: str, port: int = 80, *, retries=3) -> "Client":
+    """Open a client."""
+
+
+async def _helper():
+    pass
+
+
+class Client(Base, metaclass=Meta):
+    """A client."""
+    
+    def __init__(self, host: str):
+        self.host = host
+    
+    def send(self, data: bytes, flush: bool = False) -> int:
+        return 0
+    
+    @property
+    def closed(self) -> bool:
+        return False
+    
+    def _internal(self):
+        pass
+
+
+class Hidden:
+    def run(self):
+        pass
+'''
+
+
+@pytest.fixture
+def gate():
+    """Create a gate that never uses the process pool."""
+    return SimpleLspFactsGate(parallel_threshold=10**6)
+
+
+class TestPythonExtraction:
+    """Test ast-based symbol extraction."""
+    
+    def test_extracts_methods_defaults_and_annotations(self):
+        """Test that methods and full signatures are captured."""
+        symbols = {s.name: s for s in extract_python_symbols(MODULE, "client.py")}
+        
+        assert symbols["connect"].signature == 'def connect(host: str, port: int = 80, *, retries=3) -> \'Client\':'
+        assert symbols["connect"].documentation == "Open a client."
+        assert symbols["Client.send"].kind == "method"
+        assert symbols["Client.send"].parameters == ["self", "data: bytes", "flush: bool = False"]
+        assert symbols["Client.closed"].kind == "property"
+        assert symbols["Client"].signature == "class Client(Base, metaclass=Meta):"
+    
+    def test_all_controls_public_names(self):
+        """Test that __all__ decides which top-level names are public."""
+        symbols = {s.name: s for s in extract_python_symbols(MODULE, "client.py")}
+        
+        assert symbols["Client"].public is True
+        assert symbols["Client.__init__"].public is True
+        assert symbols["Client._internal"].public is False
+        assert symbols["Hidden"].public is False
+        assert symbols["Hidden.run"].public is False
+        assert symbols["TIMEOUT"].public is False
+    
+    def test_syntax_error_falls_back_to_regex(self, gate):
+        """Test that unparsable files still yield top-level symbols."""
+        symbols = gate.extract_symbols("broken.py", "def ok(a):\n    pass\n\nclass Broken(:\n")
+        
+        assert [s.name for s in symbols] == ["ok"]
+
+
+class TestSymbolCache:
+    """Test content-hash caching of extracted symbols."""
+    
+    def test_unchanged_content_is_not_reparsed(self, gate):
+        """Test cache hits for identical content."""
+        gate.extract_symbols("a.py", MODULE)
+        gate.extract_symbols("b.py", MODULE)
+        
+        assert gate.cache_misses == 1
+        assert gate.cache_hits == 1
+    
+    def test_cached_symbols_use_requested_path(self, gate):
+        """Test that shared cache entries report the right file."""
+        gate.extract_symbols("a.py", MODULE)
+        symbols = gate.extract_symbols("b.py", MODULE)
+        
+        assert {s.file_path for s in symbols} == {"b.py"}
+    
+    def test_validate_only_extracts_changed_files(self, gate):
+        """Test that unchanged files are skipped during validation."""
+        old_files = {f"mod{i}.py": f"def f{i}(x):\n    pass\n" for i in range(20)}
+        new_files = dict(old_files)
+        new_files["mod3.py"] = "def f3(x, y):\n    pass\n"
+        
+        result = gate.validate_no_api_break(old_files, new_files)
+        
+        assert gate.cache_misses == 2
+        assert [c.symbol_name for c in result.breaking_changes] == ["f3"]
+    
+    def test_content_hash_differs_for_changes(self):
+        """Test that the cache key follows content."""
+        assert content_hash("a") != content_hash("b")
+
+
+class TestBreakingChanges:
+    """Test signature change classification."""
+    
+    @pytest.mark.parametrize("old, new, breaking", [
+        ("def f(a, b=1):", "def f(a, b=1, c=2):", False),
+        ("def f(a, b=1):", "def f(a, b=1, *, c=2):", False),
+        ("def f(a: int):", "def f(a: str):", False),
+        ("def f(a, b=1):", "def f(a, b):", True),
+        ("def f(a, b):", "def f(b, a):", True),
+        ("def f(a):", "def f(a, c):", True),
+        ("def f(a, *, key=None):", "def f(a):", True),
+        ("class A(Base):", "class A(Other):", True),
+    ])
+    def test_signature_changes(self, gate, old, new, breaking):
+        """Test that only incompatible signature changes are breaking."""
+        changes = gate.compare_symbols(
+            gate.extract_symbols("m.py", old + "\n    pass\n"),
+            gate.extract_symbols("m.py", new + "\n    pass\n")
+        )
+        
+        signature_changes = [c for c in changes if c.change_type == ChangeType.SIGNATURE_CHANGE]
+        assert bool(gate.detect_breaking_changes(signature_changes)) is breaking
+    
+    def test_same_name_in_other_file_does_not_hide_change(self, gate):
+        """Test that symbols are compared per file, not by bare name."""
+        old_files = {
+            "a.py": "class Config:\n    def __init__(self, path):\n        pass\n",
+            "b.py": "class Config:\n    def __init__(self, path):\n        pass\n",
+        }
+        new_files = {
+            "a.py": "class Config:\n    def __init__(self, path, mode):\n        pass\n",
+            "b.py": "class Config:\n    def __init__(self, path):\n        pass\n\nVERSION = 2\n",
+        }
+        
+        result = gate.validate_no_api_break(old_files, new_files)
+        
+        assert not result.passed
+        assert [(c.file_path, c.symbol_name) for c in result.breaking_changes] == [
+            ("a.py", "Config.__init__")
+        ]
+    
+    def test_moved_symbol_is_matched_by_name(self, gate):
+        """Test that a symbol moved to another file is not a removal."""
+        old_files = {"a.py": "def f(x):\n    pass\n", "b.py": "X = 1\n"}
+        new_files = {"a.py": "", "b.py": "X = 1\n\ndef f(x, y=0):\n    pass\n"}
+        
+        result = gate.validate_no_api_break(old_files, new_files)
+        
+        assert result.passed
+        assert [(c.change_type, c.file_path) for c in result.changes] == [
+            (ChangeType.SIGNATURE_CHANGE, "b.py")
+        ]
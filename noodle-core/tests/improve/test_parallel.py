@@ -0,0 +1,214 @@
+"""Tests for NIP parallel worktree execution.
+
+Tests directory worktree materialization, the warm pool and reset.
+"""
+
+import pytest
+import tempfile
+import shutil
+import os
+import stat
+from pathlib import Path
+from noodlecore.improve.models import Candidate
+from noodlecore.improve.snapshot import SnapshotManager
+from noodlecore.improve.parallel import (
+    WorktreeManager, WorktreeConfig, WorktreeResult, WorktreeState,
+    MaterializeStrategy, TreeMaterializer
+)
+
+
+@pytest.fixture
+def temp_dirs():
+    """Create workspace, snapshot and worktree directories."""
+    root = Path(tempfile.mkdtemp(prefix="nip_test_parallel_"))
+    workspace = root / "workspace"
+    workspace.mkdir()
+    (workspace / "main.py").write_text("print('main')\n")
+    (workspace / "pkg").mkdir()
+    (workspace / "pkg" / "util.py").write_text("VALUE = 1\n")
+    yield root
+    shutil.rmtree(root, ignore_errors=True)
+
+
+@pytest.fixture
+def manager(temp_dirs):
+    """Create a WorktreeManager with directory worktrees."""
+    snapshots = SnapshotManager(
+        workspace_path=str(temp_dirs / "workspace"),
+        snapshot_dir=str(temp_dirs / "snapshots")
+    )
+    snapshots.take_snapshot()
+    config = WorktreeConfig(
+        max_parallel=4,
+        worktree_base_dir=str(temp_dirs / "worktrees"),
+        use_git_worktree=False,
+        pool_size=2
+    )
+    return WorktreeManager(config, snapshots)
+
+
+def _candidate(index: int) -> Candidate:
+    return Candidate(
+        id=f"cand_{index}",
+        task_id="task_1",
+        title=f"Candidate {index}",
+        description="",
+        diff="",
+        rationale=""
+    )
+
+
+class TestMaterialization:
+    """Test snapshot materialization strategies."""
+    
+    @pytest.mark.parametrize("strategy", [MaterializeStrategy.REFLINK, MaterializeStrategy.COPY])
+    def test_worktree_matches_snapshot(self, manager, strategy):
+        """Test that a prepared worktree has the snapshot contents."""
+        manager.config.materialize_strategy = strategy
+        manager.materializer = TreeMaterializer(strategy)
+        
+        worktree = manager.pool.acquire(_candidate(0), manager.resolve_snapshot_id(_candidate(0)))
+        
+        assert worktree.read_file("main.py") == "print('main')\n"
+        assert worktree.read_file("pkg/util.py") == "VALUE = 1\n"
+        assert manager.materializer.strategy in (strategy, MaterializeStrategy.COPY)
+    
+    def test_auto_falls_back_from_reflink(self, manager):
+        """Test that AUTO ends on a strategy the filesystem supports."""
+        worktree = manager.pool.acquire(_candidate(0), manager.resolve_snapshot_id(_candidate(0)))
+        
+        assert worktree.read_file("main.py") == "print('main')\n"
+        assert manager.materializer.strategy in (
+            MaterializeStrategy.REFLINK, MaterializeStrategy.COPY
+        )
+    
+    def test_in_place_write_is_isolated(self, manager, temp_dirs):
+        """Test that writing through an existing inode reaches neither the snapshot nor siblings."""
+        snapshot_id = manager.resolve_snapshot_id(_candidate(0))
+        first = manager.pool.acquire(_candidate(0), snapshot_id)
+        second = manager.pool.acquire(_candidate(1), snapshot_id)
+        
+        # Like `echo x = 2 > pkg/util.py`: truncate and rewrite the same inode
+        with open(first.path / "pkg" / "util.py", "r+") as f:
+            f.truncate(0)
+            f.write("x = 2\n")
+        
+        store = manager.snapshot_manager.workspace
+        entry = store.get_manifest(snapshot_id)["files"]["pkg/util.py"]
+        assert store.objects.read(entry["hash"]) == b"VALUE = 1\n"
+        assert second.read_file("pkg/util.py") == "VALUE = 1\n"
+        
+        workspace = temp_dirs / "workspace"
+        (workspace / "pkg" / "util.py").write_text("VALUE = 3\n")
+        assert manager.snapshot_manager.restore_snapshot(snapshot_id, verify=True) is True
+        assert (workspace / "pkg" / "util.py").read_text() == "VALUE = 1\n"
+    
+    def test_chmod_is_isolated(self, manager):
+        """Test that changing a file mode in one worktree leaves the blob and siblings alone."""
+        snapshot_id = manager.resolve_snapshot_id(_candidate(0))
+        first = manager.pool.acquire(_candidate(0), snapshot_id)
+        second = manager.pool.acquire(_candidate(1), snapshot_id)
+        original = stat.S_IMODE((second.path / "main.py").stat().st_mode)
+        
+        os.chmod(first.path / "main.py", 0o700)
+        
+        assert stat.S_IMODE((second.path / "main.py").stat().st_mode) == original
+        assert (first.path / "main.py").stat().st_ino != (second.path / "main.py").stat().st_ino
+
+
+class TestWorktreePool:
+    """Test warm pool reuse and reset."""
+    
+    def test_release_resets_only_touched_files(self, manager):
+        """Test that reset reverts changed files and removes new ones."""
+        snapshot_id = manager.resolve_snapshot_id(_candidate(0))
+        worktree = manager.pool.acquire(_candidate(0), snapshot_id)
+        worktree.write_file("main.py", "print('changed')\n")
+        worktree.write_file("new/extra.py", "x = 1\n")
+        
+        manager.pool.release(worktree)
+        
+        assert manager.pool.get_stats()["files_reverted"] == 2
+        assert worktree.read_file("main.py") == "print('main')\n"
+        assert not (worktree.path / "new").exists()
+    
+    def test_release_reverts_mode_changes(self, manager):
+        """Test that a chmod alone marks a file for reset."""
+        snapshot_id = manager.resolve_snapshot_id(_candidate(0))
+        worktree = manager.pool.acquire(_candidate(0), snapshot_id)
+        original = stat.S_IMODE((worktree.path / "main.py").stat().st_mode)
+        os.chmod(worktree.path / "main.py", 0o777)
+        
+        manager.pool.release(worktree)
+        reused = manager.pool.acquire(_candidate(1), snapshot_id)
+        
+        assert reused is worktree
+        assert manager.pool.get_stats()["files_reverted"] == 1
+        assert stat.S_IMODE((reused.path / "main.py").stat().st_mode) == original
+    
+    def test_released_worktree_is_reused(self, manager):
+        """Test that the next candidate gets the warm worktree."""
+        snapshot_id = manager.resolve_snapshot_id(_candidate(0))
+        first = manager.pool.acquire(_candidate(0), snapshot_id)
+        manager.pool.release(first)
+        
+        second = manager.pool.acquire(_candidate(1), snapshot_id)
+        
+        assert second is first
+        assert second.candidate_id == "cand_1"
+        assert manager.pool.get_stats()["provisioned"] == 1
+    
+    def test_pool_size_is_bounded(self, manager):
+        """Test that worktrees beyond pool_size are cleaned up on release."""
+        snapshot_id = manager.resolve_snapshot_id(_candidate(0))
+        worktrees = [manager.pool.acquire(_candidate(i), snapshot_id) for i in range(3)]
+        
+        for worktree in worktrees:
+            manager.pool.release(worktree)
+        
+        assert manager.pool.get_stats()["idle"] == 2
+        assert manager.pool.get_stats()["evicted"] == 1
+        assert not worktrees[2].path.exists()
+    
+    def test_warm_provisions_pool(self, manager):
+        """Test pre-provisioning worktrees."""
+        snapshot_id = manager.resolve_snapshot_id(_candidate(0))
+        
+        assert manager.pool.warm(snapshot_id) == 2
+        assert manager.pool.get_stats()["idle"] == 2
+
+
+class TestExecuteParallel:
+    """Test parallel candidate execution."""
+    
+    def test_execute_parallel_runs_all_candidates(self, manager):
+        """Test that every candidate runs and worktrees are reused."""
+        def execute(worktree, candidate):
+            worktree.write_file("main.py", f"print('{candidate.id}')\n")
+            return WorktreeResult(
+                worktree_id=worktree.id,
+                candidate_id=candidate.id,
+                state=WorktreeState.COMPLETED,
+                stdout=worktree.read_file("main.py")
+            )
+        
+        candidates = [_candidate(i) for i in range(8)]
+        results = manager.execute_parallel(candidates, execute)
+        
+        assert sorted(r.candidate_id for r in results) == sorted(c.id for c in candidates)
+        assert all(r.stdout == f"print('{r.candidate_id}')\n" for r in results)
+        assert manager.pool.get_stats()["provisioned"] <= manager.config.max_parallel
+        assert manager.pool.get_stats()["idle"] <= manager.config.pool_size
+        
+        manager.cleanup_all()
+        assert manager.list_worktrees() == []
+    
+    def test_failing_candidate_reports_error(self, manager):
+        """Test that an exception becomes a failed result."""
+        def execute(worktree, candidate):
+            raise RuntimeError("boom")
+        
+        results = manager.execute_parallel([_candidate(0)], execute)
+        
+        assert results[0].state == WorktreeState.FAILED
+        assert results[0].error_message == "boom"
@@ -0,0 +1,197 @@
+"""Tests for NIP performance regression detection.
+
+Tests the sample statistics, the noise-aware detector and the
+repeated, interleaved benchmark runner.
+"""
+
+import os
+import random
+import sys
+import pytest
+from noodlecore.improve.performance import (
+    BenchmarkConfig, BenchmarkResult, BenchmarkRunner, ComparisonMethod,
+    PerformanceDetector, PerformanceGate, RegressionSeverity,
+    compare_samples, detect_warmup, mann_whitney_u, reject_outliers
+)
+
+
+def _noisy(center: float, count: int, seed: int, spread: float = 0.05):
+    rng = random.Random(seed)
+    return [center * (1 + rng.uniform(-spread, spread)) for _ in range(count)]
+
+
+def _result(name: str, samples, unit: str = "seconds") -> BenchmarkResult:
+    return BenchmarkResult(
+        name=name,
+        value=sorted(samples)[len(samples) // 2],
+        unit=unit,
+        metadata={'samples': list(samples)}
+    )
+
+
+class TestSampleStatistics:
+    """Test warmup, outlier and significance helpers."""
+    
+    def test_detect_warmup_skips_slow_leading_runs(self):
+        """Test that slow first runs are counted as warmup."""
+        samples = [5.0, 3.0] + _noisy(1.0, 10, seed=1, spread=0.01)
+        
+        assert detect_warmup(samples) == 2
+    
+    def test_reject_outliers_drops_spikes(self):
+        """Test Tukey fences remove a single spike."""
+        samples = _noisy(1.0, 12, seed=2, spread=0.01) + [10.0]
+        
+        assert 10.0 not in reject_outliers(samples)
+        assert len(reject_outliers(samples)) == 12
+    
+    def test_mann_whitney_separates_shifted_samples(self):
+        """Test that clearly shifted samples are significant."""
+        _, p_value = mann_whitney_u(_noisy(1.0, 15, seed=3), _noisy(1.5, 15, seed=4))
+        
+        assert p_value < 0.001
+    
+    def test_mann_whitney_identical_distributions(self):
+        """Test that samples from one distribution are not significant."""
+        _, p_value = mann_whitney_u(_noisy(1.0, 15, seed=5), _noisy(1.0, 15, seed=6))
+        
+        assert p_value > 0.05
+    
+    @pytest.mark.parametrize("method", list(ComparisonMethod))
+    def test_compare_samples_reports_change(self, method):
+        """Test percent change and confidence interval."""
+        stats = compare_samples(
+            _noisy(1.0, 20, seed=7, spread=0.02),
+            _noisy(1.3, 20, seed=8, spread=0.02),
+            BenchmarkConfig(method=method)
+        )
+        
+        assert stats.significant
+        assert 25 < stats.percent_change < 35
+        assert stats.ci_low < stats.percent_change < stats.ci_high
+
+
+class TestPerformanceDetector:
+    """Test noise-aware regression detection."""
+    
+    def test_noise_is_not_a_regression(self):
+        """Test that a noisy but unchanged benchmark is neutral."""
+        detector = PerformanceDetector()
+        baseline = [_result("bench", _noisy(1.0, 10, seed=9, spread=0.2))]
+        patch = [_result("bench", _noisy(1.0, 10, seed=10, spread=0.2))]
+        
+        report = detector.detect_regression(baseline, patch, "task_1", "cand_1")
+        
+        assert report.comparisons[0].direction == "neutral"
+        assert report.regression_count == 0
+    
+    def test_significant_slowdown_is_regression(self):
+        """Test that a consistent slowdown is flagged with statistics."""
+        detector = PerformanceDetector()
+        baseline = [_result("bench", _noisy(1.0, 10, seed=11, spread=0.02))]
+        patch = [_result("bench", _noisy(1.6, 10, seed=12, spread=0.02))]
+        
+        comparison = detector.detect_regression(baseline, patch, "task_1", "cand_1").comparisons[0]
+        
+        assert comparison.direction == "regression"
+        assert comparison.severity == RegressionSeverity.CRITICAL
+        assert comparison.p_value < 0.05
+        assert 5 <= comparison.samples <= 10
+    
+    def test_throughput_drop_is_regression(self):
+        """Test that lower is worse for throughput units."""
+        detector = PerformanceDetector()
+        baseline = [BenchmarkResult("ops", 1000.0, "ops/sec")]
+        patch = [BenchmarkResult("ops", 700.0, "ops/sec")]
+        
+        comparison = detector.detect_regression(baseline, patch, "task_1", "cand_1").comparisons[0]
+        
+        assert comparison.direction == "regression"
+    
+    def test_bandwidth_drop_is_regression(self):
+        """Test that lower is worse for MB/s."""
+        detector = PerformanceDetector()
+        baseline = [BenchmarkResult("copy", 800.0, "MB/s")]
+        patch = [BenchmarkResult("copy", 500.0, "MB/s")]
+        
+        comparison = detector.detect_regression(baseline, patch, "task_1", "cand_1").comparisons[0]
+        
+        assert comparison.direction == "regression"
+    
+    def test_gate_orders_severity(self):
+        """Test that the gate compares severities by rank."""
+        detector = PerformanceDetector()
+        baseline = [BenchmarkResult("bench", 1.0, "seconds")]
+        patch = [BenchmarkResult("bench", 1.15, "seconds")]
+        report = detector.detect_regression(baseline, patch, "task_1", "cand_1")
+        
+        assert PerformanceGate(detector, RegressionSeverity.HIGH).validate_performance(report)[0]
+        assert not PerformanceGate(detector, RegressionSeverity.LOW).validate_performance(report)[0]
+
+
+class TestRunComparison:
+    """Test repeated, interleaved benchmark runs."""
+    
+    def _run_func(self, calls, baseline_center, patch_center):
+        rngs = {"base": random.Random(13), "patch": random.Random(14)}
+        
+        def run(path, cpus):
+            calls.append(path)
+            center = baseline_center if path == "base" else patch_center
+            value = center * (1 + rngs[path].uniform(-0.02, 0.02))
+            return [BenchmarkResult("bench", value, "seconds")]
+        return run
+    
+    def test_runs_are_interleaved(self):
+        """Test ABBA ordering after warmup."""
+        calls = []
+        runner = BenchmarkRunner(BenchmarkConfig(min_repetitions=4, max_repetitions=4, warmup_runs=1))
+        
+        baseline, patch = runner.run_comparison(
+            "base", "patch", [], run_func=self._run_func(calls, 1.0, 1.0)
+        )
+        
+        assert calls == ["base", "patch", "base", "patch", "patch", "base", "base", "patch", "patch", "base"]
+        assert len(baseline[0].metadata['samples']) == 4
+        assert len(patch[0].metadata['samples']) == 4
+    
+    def test_stops_early_on_clear_difference(self):
+        """Test that a decided comparison stops after min_repetitions."""
+        calls = []
+        runner = BenchmarkRunner(BenchmarkConfig(min_repetitions=6, max_repetitions=30, warmup_runs=0))
+        
+        baseline, patch = runner.run_comparison(
+            "base", "patch", [], run_func=self._run_func(calls, 1.0, 2.0)
+        )
+        
+        assert len(calls) == 12
+        report = PerformanceDetector().detect_regression(baseline, patch, "task_1", "cand_1")
+        assert report.comparisons[0].direction == "regression"
+    
+    def test_parallel_collects_both_sides(self):
+        """Test concurrent baseline and patch runs."""
+        calls = []
+        runner = BenchmarkRunner(BenchmarkConfig(min_repetitions=5, max_repetitions=5, warmup_runs=0, parallel=True))
+        
+        baseline, patch = runner.run_comparison(
+            "base", "patch", [], run_func=self._run_func(calls, 1.0, 1.0)
+        )
+        
+        assert calls.count("base") == calls.count("patch") == 5
+        assert baseline[0].metadata['repetitions'] == 5
+    
+    @pytest.mark.skipif(not hasattr(os, 'sched_getaffinity'), reason="CPU affinity is Linux only")
+    def test_run_benchmark_pins_process(self, tmp_path):
+        """Test that the benchmark process runs on the requested CPUs."""
+        cpu = min(os.sched_getaffinity(0))
+        script = (
+            "import json, os; "
+            "print(json.dumps({'benchmarks': [{'name': 'cpus', 'value': len(os.sched_getaffinity(0)), "
+            "'unit': 'count', 'metadata': {'cpus': sorted(os.sched_getaffinity(0))}}]}))"
+        )
+        
+        results = BenchmarkRunner().run_benchmark(
+            str(tmp_path), [sys.executable, "-c", script], benchmark_type="custom", cpus=[cpu]
+        )
+        
+        assert results[0].metadata['cpus'] == [cpu]
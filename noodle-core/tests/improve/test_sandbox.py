@@ -6,6 +6,7 @@ Note: This test module documents the expected interface for sandbox functionalit
 The actual sandbox module may not be implemented yet.
 """
 
+import os
 import pytest
 from typing import List, Dict, Any
 
@@ -434,6 +435,92 @@ class TestRealSandboxIntegration:
         assert result["success"] is False
 
 
+class TestSandboxWorkerPool:
+    """Tests for pooled, persistent sandbox workers."""
+    
+    @pytest.fixture
+    def pool(self, tmp_path):
+        from noodlecore.sandbox import SandboxRunner, SandboxWorkerPool
+        
+        pool = SandboxWorkerPool(SandboxRunner(timeout=10, working_dir=str(tmp_path)), workers=2)
+        yield pool
+        pool.shutdown()
+    
+    def test_run_command_in_worker(self, pool, tmp_path):
+        """Test that commands run in the sandbox working directory."""
+        result = pool.run_command("python -c 'import os; print(os.getcwd())'")
+        
+        assert result["success"] is True
+        assert result["stdout"].strip() == str(tmp_path)
+    
+    def test_blocked_command_is_rejected(self, pool):
+        """Test that the allowlist is enforced before dispatch."""
+        result = pool.run_command("nonexistentcommand12345 --flag")
+        
+        assert result["success"] is False
+        assert "allowlist" in result["error"]
+        assert pool.get_stats()["rejected"] == 1
+    
+    def test_output_is_streamed(self, pool):
+        """Test that stdout and stderr arrive through the callback."""
+        chunks = []
+        result = pool.run_command(
+            "python -c 'import sys; print(\"out\"); print(\"err\", file=sys.stderr)'",
+            on_output=lambda stream, text: chunks.append((stream, text))
+        )
+        
+        assert "".join(text for stream, text in chunks if stream == "stdout") == "out\n"
+        assert "".join(text for stream, text in chunks if stream == "stderr") == "err\n"
+        assert result["stderr"] == "err\n"
+    
+    def test_timeout_kills_command(self, pool):
+        """Test the per-command timeout."""
+        result = pool.run_command("sleep 5", timeout=1)
+        
+        assert result["success"] is False
+        assert "timed out" in result["error"]
+        assert pool.run_command("echo alive")["stdout"] == "alive\n"
+    
+    def test_env_isolation(self, pool):
+        """Test that a per-command env replaces the base env."""
+        result = pool.run_command(
+            "python -c 'import os; print(os.environ.get(\"NIP_VALUE\"))'",
+            env={"NIP_VALUE": "42", "PATH": os.environ.get("PATH", "")}
+        )
+        
+        assert result["stdout"].strip() == "42"
+    
+    def test_run_batch_keeps_order(self, pool):
+        """Test concurrent batches return results in command order."""
+        commands = [f"echo {i}" for i in range(6)]
+        
+        results = pool.run_batch(commands, parallelism=2)
+        
+        assert [r["stdout"].strip() for r in results] == [str(i) for i in range(6)]
+    
+    def test_validation_cache_follows_allowlist(self, pool):
+        """Test that cached validation is invalidated by allowlist changes."""
+        assert pool.sandbox.validate_command("echo hi")[0] is True
+        
+        pool.sandbox.allowlist.remove_command("echo")
+        
+        assert pool.sandbox.validate_command("echo hi")[0] is False
+    
+    def test_safe_shell_batch_on_pool(self, pool):
+        """Test SafeShell stops a pooled batch at the first failure."""
+        from noodlecore.sandbox import SafeShell
+        
+        shell = SafeShell(pool=pool)
+        results = shell.execute_batch(
+            ["echo a", "python -c 'import sys; sys.exit(3)'", "echo c"],
+            parallelism=2
+        )
+        
+        assert len(results) == 2
+        assert results[0]["stdout"] == "a\n"
+        assert results[1]["exit_code"] == 3
+
+
 if __name__ == "__main__":
     # Run tests
     pytest.main([__file__, "-v"])
@@ -6,7 +6,8 @@ Tests WorkspaceSnapshot and SnapshotManager.
 import pytest
 import tempfile
 import shutil
-import zipfile
+import os
+import time
 from pathlib import Path
 from datetime import datetime, timedelta
 from noodlecore.improve.snapshot import (
@@ -110,7 +111,7 @@ class TestWorkspaceSnapshot:
         snapshot_path = workspace_snapshot.snapshot_dir / snapshot_id
         assert snapshot_path.exists()
         assert (snapshot_path / "metadata.json").exists()
-        assert (snapshot_path / "workspace.zip").exists()
+        assert (snapshot_path / "manifest.json").exists()
     
     def test_take_snapshot_with_metadata(self, workspace_snapshot):
         """Test taking a snapshot with custom metadata."""
@@ -253,17 +254,13 @@ class TestWorkspaceSnapshot:
         # Take snapshot
         snapshot_id = workspace_snapshot.take()
         
-        # Extract and verify contents
-        snapshot_path = workspace_snapshot.snapshot_dir / snapshot_id
-        zip_path = snapshot_path / "workspace.zip"
+        # Verify manifest contents
+        namelist = list(workspace_snapshot.get_manifest(snapshot_id)["files"])
         
-        with zipfile.ZipFile(zip_path, 'r') as zipf:
-            namelist = zipf.namelist()
-            
-            # Excluded directories should not be in snapshot
-            assert not any(".git" in name for name in namelist)
-            assert not any("__pycache__" in name for name in namelist)
-            assert not any("node_modules" in name for name in namelist)
+        # Excluded directories should not be in snapshot
+        assert not any(".git" in name for name in namelist)
+        assert not any("__pycache__" in name for name in namelist)
+        assert not any("node_modules" in name for name in namelist)
     
     def test_excluded_files(self, workspace_snapshot, sample_workspace):
         """Test that certain files are excluded from snapshots."""
@@ -275,17 +272,13 @@ class TestWorkspaceSnapshot:
         # Take snapshot
         snapshot_id = workspace_snapshot.take()
         
-        # Extract and verify contents
-        snapshot_path = workspace_snapshot.snapshot_dir / snapshot_id
-        zip_path = snapshot_path / "workspace.zip"
-        
-        with zipfile.ZipFile(zip_path, 'r') as zipf:
-            namelist = zipf.namelist()
-            
-            # Excluded files should not be in snapshot
-            assert ".DS_Store" not in namelist
-            assert "Thumbs.db" not in namelist
-            assert not any(name.endswith(".pyc") for name in namelist)
+        # Verify manifest contents
+        namelist = list(workspace_snapshot.get_manifest(snapshot_id)["files"])
+        
+        # Excluded files should not be in snapshot
+        assert ".DS_Store" not in namelist
+        assert "Thumbs.db" not in namelist
+        assert not any(name.endswith(".pyc") for name in namelist)
 
 
 class TestSnapshotManager:
@@ -475,47 +468,123 @@ class TestSnapshotMetadata:
         assert info["metadata"]["count"] == 42
 
 
-class TestSnapshotCompression:
-    """Test snapshot compression and file handling."""
+def _age_files(workspace_path, seconds=60):
+    """Push file mtimes into the past so the stat cache trusts them."""
+    past = time.time() - seconds
+    for path in Path(workspace_path).rglob("*"):
+        if path.is_file():
+            os.utime(path, (past, past))
+
+
+class TestSnapshotObjectStore:
+    """Test the content-addressed object store and incremental behaviour."""
     
-    def test_snapshot_creates_zip(self, workspace_snapshot):
-        """Test that snapshot creates a zip file."""
+    def test_manifest_contains_expected_files(self, workspace_snapshot):
+        """Test that the manifest lists workspace files."""
         snapshot_id = workspace_snapshot.take()
         
-        snapshot_path = workspace_snapshot.snapshot_dir / snapshot_id
-        zip_path = snapshot_path / "workspace.zip"
+        manifest = workspace_snapshot.get_manifest(snapshot_id)
         
-        assert zip_path.exists()
-        assert zipfile.is_zipfile(zip_path)
+        assert "file1.txt" in manifest["files"]
+        assert "file2.py" in manifest["files"]
+        assert "subdir/file3.txt" in manifest["files"]
+        assert "subdir" in manifest["dirs"]
     
-    def test_zip_contains_expected_files(self, workspace_snapshot):
-        """Test that zip contains workspace files."""
+    def test_blob_contents(self, workspace_snapshot):
+        """Test that blobs hold the file contents."""
         snapshot_id = workspace_snapshot.take()
         
-        snapshot_path = workspace_snapshot.snapshot_dir / snapshot_id
-        zip_path = snapshot_path / "workspace.zip"
-        
-        with zipfile.ZipFile(zip_path, 'r') as zipf:
-            namelist = zipf.namelist()
-            
-            # Should contain our test files
-            assert "file1.txt" in namelist
-            assert "file2.py" in namelist
-            # Files in subdirectory
-            assert any("subdir" in name for name in namelist)
-    
-    def test_zip_file_contents(self, workspace_snapshot):
-        """Test that zip file contents are correct."""
+        entry = workspace_snapshot.get_manifest(snapshot_id)["files"]["file1.txt"]
+        
+        assert workspace_snapshot.objects.read(entry["hash"]) == b"content 1"
+    
+    def test_identical_files_share_blob(self, workspace_snapshot, sample_workspace):
+        """Test that identical contents are stored once."""
+        (Path(sample_workspace) / "copy.txt").write_text("content 1")
+        
         snapshot_id = workspace_snapshot.take()
+        files = workspace_snapshot.get_manifest(snapshot_id)["files"]
         
-        snapshot_path = workspace_snapshot.snapshot_dir / snapshot_id
-        zip_path = snapshot_path / "workspace.zip"
+        assert files["copy.txt"]["hash"] == files["file1.txt"]["hash"]
+        assert len(workspace_snapshot.objects.digests()) == 3
+    
+    def test_unchanged_files_are_not_rehashed(self, workspace_snapshot, sample_workspace):
+        """Test that a child snapshot only hashes files that changed."""
+        _age_files(sample_workspace)
+        workspace_snapshot.take()
+        
+        (Path(sample_workspace) / "file1.txt").write_text("changed")
+        snapshot_id = workspace_snapshot.take()
+        
+        assert workspace_snapshot.last_take_stats["hashed_files"] == 1
+        assert workspace_snapshot.last_take_stats["reused_files"] == 2
+        assert workspace_snapshot.get_snapshot_info(snapshot_id)["parent"] is not None
+    
+    def test_restore_writes_only_differing_files(self, workspace_snapshot, sample_workspace):
+        """Test that restore leaves matching files untouched."""
+        _age_files(sample_workspace)
+        snapshot_id = workspace_snapshot.take()
+        
+        workspace_path = Path(sample_workspace)
+        (workspace_path / "file1.txt").write_text("modified content")
+        (workspace_path / "extra.txt").write_text("extra")
+        
+        assert workspace_snapshot.restore(snapshot_id) is True
+        assert workspace_snapshot.last_restore_stats == {"written": 1, "unchanged": 2, "removed": 1}
+        assert (workspace_path / "file1.txt").read_text() == "content 1"
+    
+    def test_restore_hashes_files_in_racy_window(self, workspace_snapshot, sample_workspace):
+        """Test that a same-size edit with its mtime reset is restored when recent."""
+        snapshot_id = workspace_snapshot.take()
+        
+        target = Path(sample_workspace) / "file1.txt"
+        st = target.stat()
+        target.write_text("content X")
+        os.utime(target, ns=(st.st_atime_ns, st.st_mtime_ns))
+        
+        assert workspace_snapshot.restore(snapshot_id) is True
+        assert target.read_text() == "content 1"
+        assert workspace_snapshot.last_restore_stats["written"] == 1
+    
+    def test_restore_verify_hashes_trusted_files(self, workspace_snapshot, sample_workspace):
+        """Test that verify=True catches a same-size edit with an old, reset mtime."""
+        _age_files(sample_workspace)
+        snapshot_id = workspace_snapshot.take()
+        
+        target = Path(sample_workspace) / "file1.txt"
+        st = target.stat()
+        target.write_text("content X")
+        os.utime(target, ns=(st.st_atime_ns, st.st_mtime_ns))
+        
+        assert workspace_snapshot.restore(snapshot_id) is True
+        assert target.read_text() == "content X"
+        
+        assert workspace_snapshot.restore(snapshot_id, verify=True) is True
+        assert target.read_text() == "content 1"
+        assert workspace_snapshot.last_restore_stats == {"written": 1, "unchanged": 2, "removed": 0}
+    
+    def test_restore_fails_when_blob_missing(self, workspace_snapshot):
+        """Test that restore refuses a snapshot with missing blobs."""
+        snapshot_id = workspace_snapshot.take()
+        entry = workspace_snapshot.get_manifest(snapshot_id)["files"]["file1.txt"]
+        workspace_snapshot.objects.remove(entry["hash"])
+        
+        assert workspace_snapshot.restore(snapshot_id) is False
+    
+    def test_cleanup_collects_unreferenced_blobs(self, snapshot_manager, sample_workspace):
+        """Test that retention cleanup garbage-collects orphaned blobs."""
+        snapshot_manager.max_snapshots = 1
+        workspace_path = Path(sample_workspace)
+        
+        snapshot_manager.take_snapshot()
+        (workspace_path / "file1.txt").write_text("second version")
+        snapshot_id = snapshot_manager.take_snapshot()
+        
+        store = snapshot_manager.workspace
+        referenced = {entry["hash"] for entry in store.get_manifest(snapshot_id)["files"].values()}
         
-        with zipfile.ZipFile(zip_path, 'r') as zipf:
-            # Read file1.txt content
-            with zipf.open("file1.txt") as f:
-                content = f.read().decode()
-                assert content == "content 1"
+        assert [s["id"] for s in snapshot_manager.list_snapshots()] == [snapshot_id]
+        assert store.objects.digests() == referenced
 
 
 class TestSnapshotIdGeneration:
@@ -111,9 +111,16 @@ class TestFileStore:
     """Test base FileStore functionality."""
     
     def test_filestore_initialization(self, temp_storage):
-        """Test FileStore creates necessary directories."""
+        """Test FileStore creates its database."""
         store = FileStore(base_path=temp_storage)
         
+        assert store.backend == "sqlite"
+        assert (Path(temp_storage) / "store.db").exists()
+    
+    def test_filestore_json_backend_initialization(self, temp_storage):
+        """Test the JSON backend creates necessary directories."""
+        store = FileStore(base_path=temp_storage, backend="json")
+        
         assert store.tasks_dir.exists()
         assert store.candidates_dir.exists()
         assert store.evidence_dir.exists()
@@ -538,6 +545,68 @@ class TestPromotionStore:
         assert all(p.candidate_id == "cand-2" for p in cand2_promos)
 
 
+class TestSQLiteBackend:
+    """Test indexed lookups, batching and migration of the SQLite backend."""
+    
+    def test_list_candidates_for_task_uses_index(self, candidate_store):
+        """Test that only the task's candidates are deserialized."""
+        candidates = [
+            Candidate(
+                id=f"cand-{i}",
+                task_id=f"task-{i % 3}",
+                title=f"Candidate {i}",
+                description="Test",
+                diff="diff",
+                rationale="Test"
+            )
+            for i in range(30)
+        ]
+        candidate_store.save_many(candidates, 'candidate')
+        
+        plan = candidate_store.db._conn.execute(
+            "EXPLAIN QUERY PLAN SELECT data FROM entities WHERE model_type = ? AND task_id = ?",
+            ('candidate', 'task-1')
+        ).fetchall()
+        
+        assert [c.id for c in candidate_store.list_candidates_for_task("task-1")] == [
+            f"cand-{i}" for i in range(1, 30, 3)
+        ]
+        assert any("idx_entities_task" in row[-1] for row in plan)
+    
+    def test_batch_rolls_back_on_error(self, task_store, sample_task):
+        """Test that a failing batch writes nothing."""
+        with pytest.raises(RuntimeError):
+            with task_store.batch():
+                task_store.save_task(sample_task)
+                raise RuntimeError("abort")
+        
+        assert task_store.task_exists(sample_task.id) is False
+    
+    def test_migrates_json_tree_once(self, temp_storage, sample_task, sample_candidate, sample_evidence):
+        """Test one-shot migration from the legacy JSON layout."""
+        legacy = FileStore(base_path=temp_storage, backend="json")
+        legacy.save(sample_task, 'task')
+        legacy.save(sample_candidate, 'candidate')
+        legacy.save(sample_evidence, 'evidence')
+        
+        store = CandidateStore(base_path=temp_storage)
+        
+        assert store.db.get_meta('json_migrated') == "3"
+        assert store.load_candidate("cand-1").title == sample_candidate.title
+        assert [e.id for e in EvidenceStore(base_path=temp_storage).list_evidence_for_candidate("cand-1")] == ["ev-1"]
+        
+        # A second open does not import again
+        assert store.migrate_from_json() == 0
+    
+    def test_json_backend_filters_relationships(self, temp_storage, sample_candidate):
+        """Test that relationship lookups still work on the JSON backend."""
+        store = CandidateStore(base_path=temp_storage, backend="json")
+        store.save_candidate(sample_candidate)
+        
+        assert [c.id for c in store.list_candidates_for_task("task-1")] == ["cand-1"]
+        assert store.list_candidates_for_task("task-2") == []
+
+
 class TestStoreIntegration:
     """Integration tests for stores working together."""
     
@@ -0,0 +1,222 @@
+"""Tests for NIP tokenizers and token-budget planning.
+
+Uses a tiny byte-level BPE vocab written to a temporary directory.
+"""
+
+import base64
+import threading
+import pytest
+from noodlecore.improve.tokenizer import (
+    O200K_PATTERN, BPETokenizer, ContextChunk, HeuristicTokenizer, TokenBudgetPlanner,
+    context_window, get_tokenizer, register_tokenizer
+)
+
+
+MERGES = [b"he", b"ll", b"hell", b"hello", b" w", b"or", b" wor", b"ld", b" world"]
+
+
+@pytest.fixture
+def vocab_path(tmp_path):
+    """Write a vocab of all single bytes plus a few merges."""
+    tokens = [bytes([i]) for i in range(256)] + MERGES
+    path = tmp_path / "tiny_base.tiktoken"
+    path.write_bytes(b"".join(
+        base64.b64encode(token) + b" " + str(rank).encode() + b"\n"
+        for rank, token in enumerate(tokens)
+    ))
+    return path
+
+
+@pytest.fixture
+def tokenizer(vocab_path):
+    return BPETokenizer.from_file(str(vocab_path))
+
+
+class TestBPETokenizer:
+    """Test encoding, counting and truncation."""
+    
+    def test_merges_by_rank(self, tokenizer):
+        """Test that known words merge into single tokens."""
+        assert tokenizer.name == "tiny_base"
+        assert tokenizer.encode("hello world") == [256 + MERGES.index(b"hello"), 256 + MERGES.index(b" world")]
+    
+    def test_roundtrip(self, tokenizer):
+        """Test that decode inverts encode, including non-ASCII text."""
+        text = "def héllo():\n    return 'wörld' # 42\n"
+        
+        assert tokenizer.decode(tokenizer.encode(text)) == text
+        assert tokenizer.count(text) == len(tokenizer.encode(text))
+    
+    def test_count_is_memoized(self, tokenizer):
+        """Test that repeated counts hit the memo."""
+        tokenizer.count("hello world")
+        tokenizer.count("hello world")
+        
+        assert len(tokenizer._count_memo) == 1
+    
+    def test_memo_is_bounded(self, vocab_path):
+        """Test that the count memo evicts old entries."""
+        tokenizer = BPETokenizer.from_file(str(vocab_path))
+        tokenizer.memo_size = 2
+        for text in ("a", "b", "c"):
+            tokenizer.count(text)
+        
+        assert len(tokenizer._count_memo) == 2
+    
+    def test_memo_is_thread_safe(self, tokenizer):
+        """Test concurrent counts while the memo keeps evicting."""
+        tokenizer.memo_size = 4
+        texts = [f"hello {i} world" for i in range(16)]
+        expected = [tokenizer.count(text) for text in texts]
+        errors = []
+        
+        def worker():
+            try:
+                for _ in range(200):
+                    assert [tokenizer.count(text) for text in texts] == expected
+            except Exception as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert errors == []
+        assert len(tokenizer._count_memo) <= 4
+    
+    def test_o200k_uses_its_own_pattern(self, vocab_path):
+        """Test that o200k vocabularies split words on case and keep contractions."""
+        o200k = vocab_path.parent / "o200k_base.tiktoken"
+        o200k.write_bytes(vocab_path.read_bytes())
+        
+        tokenizer = BPETokenizer.from_file(str(o200k))
+        
+        assert tokenizer.pattern.pattern == O200K_PATTERN
+        assert [m.group() for m in tokenizer.pattern.finditer("HelloWorld's path/to")] == [
+            "Hello", "World's", " path", "/to"
+        ]
+    
+    def test_truncate_respects_limit(self, tokenizer):
+        """Test that truncation returns a prefix within the limit."""
+        text = "hello world " * 20
+        
+        truncated = tokenizer.truncate(text, 7)
+        
+        assert text.startswith(truncated)
+        assert 0 < tokenizer.count(truncated) <= 7
+        assert tokenizer.truncate("hello", 10) == "hello"
+
+
+class TestHeuristicTokenizer:
+    """Test the fallback character heuristic."""
+    
+    def test_count_rounds_up(self):
+        """Test that partial tokens count as whole tokens."""
+        tokenizer = HeuristicTokenizer()
+        
+        assert [tokenizer.count("x" * n) for n in (0, 1, 3, 4)] == [0, 1, 1, 2]
+        assert tokenizer.count(tokenizer.truncate("x" * 100, 7)) <= 7
+    
+    def test_large_context_fits_window(self):
+        """Test that a heuristic budget leaves room at 3 characters per token."""
+        planner = TokenBudgetPlanner(HeuristicTokenizer())
+        budget = planner.budget_for("glm-4.7", reserved_tokens=4096)
+        
+        plan = planner.plan([ContextChunk("context", "x" * 1_800_000)], budget)
+        
+        assert plan.truncated == ["context"]
+        assert len(plan.render()) / 3 + 4096 + planner.tokenizer.safety_margin <= 128000
+
+
+class TestRegistry:
+    """Test tokenizer lookup."""
+    
+    def test_unknown_model_uses_heuristic(self, tmp_path, monkeypatch):
+        """Test the fallback when no vocab file exists."""
+        monkeypatch.setenv("NOODLE_TOKENIZER_DIR", str(tmp_path))
+        monkeypatch.setenv("HOME", str(tmp_path))
+        
+        assert isinstance(get_tokenizer("no-such-model-xyz"), HeuristicTokenizer)
+    
+    def test_vocab_file_is_found_by_model_name(self, vocab_path, monkeypatch):
+        """Test loading a vocab file from NOODLE_TOKENIZER_DIR."""
+        monkeypatch.setenv("NOODLE_TOKENIZER_DIR", str(vocab_path.parent))
+        
+        tokenizer = get_tokenizer("tiny_base")
+        
+        assert isinstance(tokenizer, BPETokenizer)
+        assert get_tokenizer("tiny_base") is tokenizer
+    
+    def test_registered_factory_wins(self):
+        """Test that registered tokenizers take precedence."""
+        custom = HeuristicTokenizer(chars_per_token=2)
+        register_tokenizer("test-registered-", lambda: custom)
+        
+        assert get_tokenizer("test-registered-model") is custom
+    
+    def test_context_window_prefix_match(self):
+        """Test the longest-prefix context window lookup."""
+        assert context_window("gpt-4o-mini") == 128000
+        assert context_window("gpt-4-0613") == 8192
+        assert context_window("unknown") == 8192
+
+
+class TestTokenBudgetPlanner:
+    """Test packing context chunks into a budget."""
+    
+    def test_everything_fits(self, tokenizer):
+        """Test that small inputs are kept unchanged and in order."""
+        planner = TokenBudgetPlanner(tokenizer)
+        chunks = [ContextChunk("a", "hello"), ContextChunk("b", "world", priority=5)]
+        
+        plan = planner.plan(chunks, budget=100)
+        
+        assert [c.name for c in plan.chunks] == ["a", "b"]
+        assert plan.dropped == [] and plan.truncated == []
+        assert plan.tokens_used == tokenizer.count(plan.render())
+    
+    def test_priority_decides_what_is_kept(self, tokenizer):
+        """Test that low-priority chunks are dropped first."""
+        planner = TokenBudgetPlanner(tokenizer, min_truncated_tokens=1000)
+        chunks = [
+            ContextChunk("low", "hello world " * 10, priority=0),
+            ContextChunk("high", "hello world " * 10, priority=9),
+        ]
+        
+        plan = planner.plan(chunks, budget=30)
+        
+        assert [c.name for c in plan.chunks] == ["high"]
+        assert plan.dropped == ["low"]
+    
+    def test_required_chunks_come_first(self, tokenizer):
+        """Test that required chunks win over higher priorities."""
+        planner = TokenBudgetPlanner(tokenizer, min_truncated_tokens=1000)
+        chunks = [
+            ContextChunk("optional", "hello world " * 10, priority=9),
+            ContextChunk("required", "hello world " * 10, required=True),
+        ]
+        
+        plan = planner.plan(chunks, budget=30)
+        
+        assert [c.name for c in plan.chunks] == ["required"]
+    
+    def test_truncates_to_remaining_budget(self, tokenizer):
+        """Test that a chunk that does not fit is truncated, not dropped."""
+        planner = TokenBudgetPlanner(tokenizer, min_truncated_tokens=4)
+        original = "hello world " * 50
+        chunks = [ContextChunk("short", "hello world"), ContextChunk("long", original)]
+        
+        plan = planner.plan(chunks, budget=40)
+        
+        assert plan.truncated == ["long"]
+        assert plan.tokens_used <= 40
+        assert tokenizer.count(plan.render()) == plan.tokens_used
+        assert chunks[1].text == original
+    
+    def test_budget_for_reserves_output_and_fixed_text(self):
+        """Test the remaining budget calculation."""
+        planner = TokenBudgetPlanner(HeuristicTokenizer())
+        
+        assert planner.budget_for("gpt-4", reserved_tokens=1000, fixed_text="x" * 400) == 8192 - 1000 - 134 - 512
@@ -17,6 +17,7 @@ setup(
     install_requires=[
         "torch>=2.0.0",
         "transformers>=4.30.0",
+        "safetensors>=0.3.1",
         "numpy>=1.24.0",
         "pandas>=2.0.0",
         "psutil>=5.9.0",
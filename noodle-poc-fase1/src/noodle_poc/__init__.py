@@ -1,7 +1,7 @@
 """NoodleCore Fase 1 Observability Engine Package"""
 
 from .metrics import MetricsCollector, LayerMetrics
-from .hooks import ModelInstrumentor
+from .hooks import ModelInstrumentor, SamplingPolicy
 from .logger import StructuredLogger
 from .dashboard import DashboardGenerator
 from .observability_engine import ObservabilityEngine
@@ -10,6 +10,7 @@ __all__ = [
     'MetricsCollector',
     'LayerMetrics',
     'ModelInstrumentor',
+    'SamplingPolicy',
     'StructuredLogger',
     'DashboardGenerator',
     'ObservabilityEngine',
@@ -6,6 +6,10 @@ from .adaptive import (
     AdaptivePlanner,
     RuntimeMetrics,
     AdaptationTrigger,
+    NodeTelemetry,
+    LayerMove,
+    RebalancePlan,
+    OnlineReplanner,
 )
 
 __version__ = "0.1.0"
@@ -13,4 +17,8 @@ __all__ = [
     'AdaptivePlanner',
     'RuntimeMetrics',
     'AdaptationTrigger',
+    'NodeTelemetry',
+    'LayerMove',
+    'RebalancePlan',
+    'OnlineReplanner',
 ]
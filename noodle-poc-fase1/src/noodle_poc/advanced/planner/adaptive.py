@@ -9,6 +9,7 @@ from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 import json
 from pathlib import Path
+import numpy as np
 import pandas as pd
 
 from ...planner.core import ExecutionPlanner, PartitionPlan
@@ -119,6 +120,284 @@ class AdaptationTrigger:
         return False, "No adaptation needed"
 
 
+@dataclass
+class NodeTelemetry:
+    """One worker heartbeat, as sent by the worker's health reporting loop."""
+
+    node_id: str
+    recent_latency_ms: float = 0.0  # Mean forward latency since the last heartbeat
+    recent_requests: int = 0  # Forward calls since the last heartbeat
+    active_sessions: int = 0
+    kv_cache_mb: float = 0.0
+    timestamp: datetime = field(default_factory=datetime.now)
+
+    @classmethod
+    def from_heartbeat(cls, node_id: str, active_sessions: int, metrics: Dict[str, float]) -> 'NodeTelemetry':
+        """Build from the arguments of CoordinatorClient.send_heartbeat."""
+        return cls(
+            node_id=node_id,
+            recent_latency_ms=metrics.get('recent_latency_ms', metrics.get('avg_latency_ms', 0.0)),
+            recent_requests=int(metrics.get('recent_requests', 0)),
+            active_sessions=active_sessions,
+            kv_cache_mb=metrics.get('kv_cache_mb', 0.0),
+        )
+
+
+@dataclass
+class LayerMove:
+    """A layer that changes stage (and usually node) in a rebalance."""
+
+    layer_name: str
+    source_stage: str
+    target_stage: str
+    source_node: str
+    target_node: str
+
+
+@dataclass
+class RebalancePlan:
+    """New stage layout plus the layer moves that produce it."""
+
+    generation: int
+    stage_layers: Dict[str, List[str]]
+    stage_to_node: Dict[str, str]
+    moves: List[LayerMove]
+    bottleneck_before_ms: float
+    bottleneck_after_ms: float
+
+    def layers_by_node(self) -> Dict[str, List[str]]:
+        """Layers each node has to stage before the switch."""
+        incoming: Dict[str, List[str]] = {}
+        for move in self.moves:
+            incoming.setdefault(move.target_node, []).append(move.layer_name)
+        return incoming
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'generation': self.generation,
+            'stage_layers': self.stage_layers,
+            'stage_to_node': self.stage_to_node,
+            'moves': [vars(move) for move in self.moves],
+            'bottleneck_before_ms': self.bottleneck_before_ms,
+            'bottleneck_after_ms': self.bottleneck_after_ms,
+        }
+
+
+class OnlineReplanner:
+    """
+    Incremental re-planner driven by worker heartbeats.
+
+    Each heartbeat updates an exponentially smoothed slowdown factor per
+    node (measured latency / profiled latency of the layers it serves).
+    propose() finds the lowest achievable bottleneck for the current stage
+    order and nodes, then, among layouts within slack of it, the one that
+    moves the fewest layers. Stages stay contiguous, so layers only move
+    between neighbouring stages.
+    """
+
+    def __init__(
+        self,
+        layer_costs: Dict[str, float],
+        stage_layers: Dict[str, List[str]],
+        stage_to_node: Dict[str, str],
+        trigger: Optional[AdaptationTrigger] = None,
+        smoothing: float = 0.3,
+        slack: float = 0.05,
+        min_gain_pct: float = 10.0,
+    ):
+        """
+        Args:
+            layer_costs: Profiled latency (ms) per layer
+            stage_layers: Ordered stage -> ordered layers currently served
+            stage_to_node: Stage -> node currently serving it
+            trigger: Imbalance threshold and minimum interval between switches
+            smoothing: Weight of the newest heartbeat in a node's factor
+            slack: Accept bottlenecks up to (1 + slack) x optimal to move fewer layers
+            min_gain_pct: Minimum bottleneck reduction worth a switch
+        """
+        self.layer_costs = layer_costs
+        self.stage_layers = {stage: list(layers) for stage, layers in stage_layers.items()}
+        self.stage_to_node = dict(stage_to_node)
+        self.trigger = trigger or AdaptationTrigger()
+        self.smoothing = smoothing
+        self.slack = slack
+        self.min_gain_pct = min_gain_pct
+
+        self.node_factors: Dict[str, float] = {}
+        self.generation = 0
+        self.last_switch: Optional[datetime] = None
+        self.logger = logging.getLogger("OnlineReplanner")
+
+    def _node_cost_ms(self, node_id: str) -> float:
+        """Profiled latency of everything a node serves."""
+        return sum(
+            self.layer_costs.get(layer, 0.0)
+            for stage, layers in self.stage_layers.items()
+            if self.stage_to_node.get(stage) == node_id
+            for layer in layers
+        )
+
+    def observe(self, telemetry: NodeTelemetry):
+        """Fold one heartbeat into the node's slowdown factor."""
+        expected = self._node_cost_ms(telemetry.node_id)
+        if telemetry.recent_requests <= 0 or expected <= 0:
+            return
+        factor = telemetry.recent_latency_ms / expected
+        previous = self.node_factors.get(telemetry.node_id)
+        self.node_factors[telemetry.node_id] = (
+            factor if previous is None else (1 - self.smoothing) * previous + self.smoothing * factor
+        )
+
+    def _factors(self) -> np.ndarray:
+        return np.array([
+            self.node_factors.get(self.stage_to_node[stage], 1.0) for stage in self.stage_layers
+        ])
+
+    def stage_latencies(self) -> Dict[str, float]:
+        """Estimated current latency per stage."""
+        return {
+            stage: factor * sum(self.layer_costs.get(layer, 0.0) for layer in layers)
+            for (stage, layers), factor in zip(self.stage_layers.items(), self._factors())
+        }
+
+    def propose(self, force: bool = False) -> Optional[RebalancePlan]:
+        """
+        Layout with the fewest layer moves near the lowest bottleneck.
+
+        Returns:
+            RebalancePlan, or None when the trigger does not fire or the gain
+            is below min_gain_pct
+        """
+        stages = list(self.stage_layers)
+        if len(stages) < 2:
+            return None
+        if not force and self.last_switch is not None:
+            elapsed = (datetime.now() - self.last_switch).total_seconds()
+            if elapsed < self.trigger.min_adaptation_interval_sec:
+                return None
+
+        latencies = self.stage_latencies()
+        before = max(latencies.values())
+        if not force and before - min(latencies.values()) <= self.trigger.latency_imbalance_threshold_ms:
+            return None
+
+        layers = [layer for stage in stages for layer in self.stage_layers[stage]]
+        old_stage = np.repeat(np.arange(len(stages)), [len(self.stage_layers[s]) for s in stages])
+        prefix = np.concatenate([[0.0], np.cumsum([self.layer_costs.get(layer, 0.0) for layer in layers])])
+        factors = self._factors()
+
+        target = _min_bottleneck(prefix, factors) * (1 + self.slack)
+        new_stage = _fewest_moves(prefix, factors, old_stage, target)
+        if new_stage is None:
+            return None
+
+        stage_sums = np.bincount(new_stage, weights=np.diff(prefix), minlength=len(stages))
+        after = float((stage_sums * factors).max())
+        if before <= 0 or (before - after) / before * 100.0 < self.min_gain_pct:
+            return None
+
+        moved = np.flatnonzero(new_stage != old_stage)
+        moves = [
+            LayerMove(
+                layer_name=layers[i],
+                source_stage=stages[old_stage[i]],
+                target_stage=stages[new_stage[i]],
+                source_node=self.stage_to_node[stages[old_stage[i]]],
+                target_node=self.stage_to_node[stages[new_stage[i]]],
+            )
+            for i in moved
+        ]
+        return RebalancePlan(
+            generation=self.generation + 1,
+            stage_layers={
+                stage: [layers[i] for i in np.flatnonzero(new_stage == index)]
+                for index, stage in enumerate(stages)
+            },
+            stage_to_node=dict(self.stage_to_node),
+            moves=moves,
+            bottleneck_before_ms=before,
+            bottleneck_after_ms=after,
+        )
+
+    def commit(self, plan: RebalancePlan):
+        """Adopt a plan once the coordinator has switched to it."""
+        # Node factors stay: they describe the node, not the layers
+        self.stage_layers = {stage: list(layers) for stage, layers in plan.stage_layers.items()}
+        self.stage_to_node = dict(plan.stage_to_node)
+        self.generation = plan.generation
+        self.last_switch = datetime.now()
+        self.logger.info(
+            f"Switched to generation {plan.generation}: {len(plan.moves)} layer moves, "
+            f"bottleneck {plan.bottleneck_before_ms:.1f} -> {plan.bottleneck_after_ms:.1f} ms"
+        )
+
+
+def _min_bottleneck(prefix: np.ndarray, factors: np.ndarray, tolerance: float = 1e-6) -> float:
+    """
+    Lowest max stage latency over contiguous non-empty stages (binary search).
+
+    Feasibility is checked with the exact dynamic program in _fewest_moves,
+    which is monotone in the bound; a greedy packing is not once stages have
+    different factors and must stay non-empty.
+    """
+    # Any previous assignment works: only feasibility is needed here
+    old_stage = np.zeros(len(prefix) - 1, dtype=np.int64)
+
+    low, high = 0.0, float(factors.max() * prefix[-1])
+    while high - low > tolerance * max(high, 1.0):
+        middle = (low + high) / 2
+        if _fewest_moves(prefix, factors, old_stage, middle) is not None:
+            high = middle
+        else:
+            low = middle
+    return high
+
+
+def _fewest_moves(
+    prefix: np.ndarray, factors: np.ndarray, old_stage: np.ndarray, bound: float
+) -> Optional[np.ndarray]:
+    """
+    Contiguous stage assignment within bound that changes the fewest layers.
+
+    Dynamic program over stage end positions; the cost of giving stage i
+    the layers [s, e) is the number of them not already in stage i, which
+    is a difference of prefix counts and so separates over s and e.
+    """
+    num_layers, num_stages = len(prefix) - 1, len(factors)
+    best = np.full(num_layers + 1, np.inf)
+    best[0] = 0.0
+    choices = []
+
+    for index, factor in enumerate(factors):
+        moved = np.concatenate([[0], np.cumsum(old_stage != index)])
+        shifted = best - moved
+        current = np.full(num_layers + 1, np.inf)
+        choice = np.zeros(num_layers + 1, dtype=np.int64)
+        starts = np.searchsorted(prefix, prefix - bound / factor - 1e-9, side='left')
+        for end in range(index + 1, num_layers - (num_stages - 1 - index) + 1):
+            start = max(int(starts[end]), index)
+            if start >= end:
+                continue
+            window = shifted[start:end]
+            offset = int(np.argmin(window))
+            if np.isfinite(window[offset]):
+                current[end] = window[offset] + moved[end]
+                choice[end] = start + offset
+        best = current
+        choices.append(choice)
+
+    if not np.isfinite(best[num_layers]):
+        return None
+
+    assignment = np.empty(num_layers, dtype=np.int64)
+    end = num_layers
+    for index in range(num_stages - 1, -1, -1):
+        start = int(choices[index][end])
+        assignment[start:end] = index
+        end = start
+    return assignment
+
+
 class AdaptivePlanner(ExecutionPlanner):
     """
     Adaptive execution planner that updates partitions based on runtime metrics.
@@ -307,6 +586,28 @@ class AdaptivePlanner(ExecutionPlanner):
         self.logger.info(f"Plan adapted (count: {self.adaptation_count})")
         return new_plan
 
+    def create_online_replanner(
+        self,
+        stage_to_node: Dict[str, str],
+        plan: Optional[PartitionPlan] = None,
+        **kwargs
+    ) -> OnlineReplanner:
+        """
+        Online re-planner for a deployed plan, using profiled layer latencies.
+
+        Args:
+            stage_to_node: Stage -> node the plan is deployed on
+            plan: Deployed plan (defaults to current_plan)
+            **kwargs: Passed to OnlineReplanner
+        """
+        plan = plan or self.current_plan
+        if plan is None:
+            raise ValueError("No plan to re-plan")
+        layer_costs = dict(zip(self.metrics['layer_name'], self.metrics['forward_latency_ms']))
+        return OnlineReplanner(
+            layer_costs, plan.stages, stage_to_node, trigger=self.adaptation_trigger, **kwargs
+        )
+
     def create_heterogeneous_plan(
         self,
         hardware_capabilities: Dict[str, HardwareCapability],
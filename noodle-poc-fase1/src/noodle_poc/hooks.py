@@ -3,11 +3,13 @@ PyTorch hooks for intercepting layer execution and collecting metrics.
 Provides both forward and backward pass monitoring.
 """
 
+import math
 import time
 import torch
 import torch.nn as nn
-from typing import Dict, List, Optional, Any
-from functools import partial
+import numpy as np
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Any, Tuple
 from .metrics import MetricsCollector, LayerMetrics
 
 
@@ -28,28 +30,34 @@ class LayerHook:
         self.layer_idx = layer_index
         self.collector = collector
         self.current_metrics: Optional[LayerMetrics] = None
+        self.calls = 0
+        self.hook_ns = 0
+        self.start_ns = 0
 
     def pre_forward_hook(self, module: nn.Module, inputs):
         """Hook called before forward pass."""
+        entry_ns = time.perf_counter_ns()
         try:
             self.current_metrics = self.collector.start_layer_monitoring(
                 layer_name=self.layer_name,
                 layer_type=self.layer_type,
                 layer_idx=self.layer_idx,
             )
-            self.start_time = time.time()
         except Exception as e:
             print(f"Error in pre_forward_hook: {e}")
+        self.calls += 1
+        self.start_ns = time.perf_counter_ns()
+        self.hook_ns += self.start_ns - entry_ns
 
     def post_forward_hook(self, module: nn.Module, inputs, outputs):
         """Hook called after forward pass."""
+        end_ns = time.perf_counter_ns()
         try:
             if self.current_metrics is None:
                 return
 
             # Calculate latency
-            end_time = time.time()
-            latency_ms = (end_time - self.start_time) * 1000
+            latency_ms = (end_ns - self.start_ns) / 1e6
 
             # Record tensor metadata
             self.collector.record_tensor_metadata(self.current_metrics, inputs, outputs)
@@ -61,15 +69,186 @@ class LayerHook:
             self.collector.stop_layer_monitoring(self.current_metrics, latency_ms)
         except Exception as e:
             print(f"Error in post_forward_hook: {e}")
+        finally:
+            self.hook_ns += time.perf_counter_ns() - end_ns
+
+
+@dataclass
+class SamplingPolicy:
+    """Which forward calls a sampled hook times."""
+
+    every_n: int = 1  # Time every Nth call of each layer
+    adaptive: bool = False  # Back off per layer once its mean is stable
+    min_samples: int = 20  # Samples before adaptive back-off starts
+    target_rel_error: float = 0.02  # Standard error / mean to back off at
+    max_interval: int = 64  # Longest adaptive interval
+    buffer_size: int = 4096  # Preallocated samples per layer (ring buffer)
+    pending_events: int = 256  # CUDA event pairs resolved per synchronize
+
+
+class SampledLayerHook:
+    """
+    Low-overhead hook that times only sampled forward calls.
+
+    Unsampled calls cost a counter decrement. Sampled calls take
+    perf_counter_ns (or CUDA events for layers on a GPU) into a
+    preallocated buffer; tensor shapes are captured on the first sampled
+    call only, and LayerMetrics are built later by flush().
+    """
+
+    def __init__(
+        self,
+        layer_name: str,
+        layer_type: str,
+        layer_index: int,
+        collector: MetricsCollector,
+        policy: SamplingPolicy,
+        use_cuda_events: bool = False,
+    ):
+        self.layer_name = layer_name
+        self.layer_type = layer_type
+        self.layer_idx = layer_index
+        self.collector = collector
+        self.policy = policy
+
+        self.interval = max(1, policy.every_n)
+        self.countdown = 1  # Sample the first call
+        self.sampled = False
+        self.calls = 0
+        self.samples = 0
+        self.hook_ns = 0
+
+        self.durations_ns = np.zeros(policy.buffer_size, dtype=np.int64)
+        self.count = 0
+        self._sum = 0.0
+        self._sum_sq = 0.0
+
+        self.events: Optional[List[Tuple[Any, Any]]] = None
+        self.pending = 0
+        if use_cuda_events:
+            self.events = [
+                (torch.cuda.Event(enable_timing=True), torch.cuda.Event(enable_timing=True))
+                for _ in range(policy.pending_events)
+            ]
+
+        self.tensor_metrics: Optional[LayerMetrics] = None
+        self.start_ns = 0
+        self._entry_ns = 0
+
+    def pre_forward_hook(self, module: nn.Module, inputs):
+        """Hook called before forward pass."""
+        self.calls += 1
+        self.countdown -= 1
+        if self.countdown:
+            return
+
+        self._entry_ns = time.perf_counter_ns()
+        self.countdown = self.interval
+        self.sampled = True
+        if self.events is not None:
+            self.events[self.pending][0].record()
+        self.start_ns = time.perf_counter_ns()
+
+    def post_forward_hook(self, module: nn.Module, inputs, outputs):
+        """Hook called after forward pass."""
+        if not self.sampled:
+            return
+        end_ns = time.perf_counter_ns()
+        self.sampled = False
+        self.samples += 1
+
+        try:
+            if self.events is not None:
+                self.events[self.pending][1].record()
+                self.pending += 1
+                if self.pending == len(self.events):
+                    self.resolve_events()
+            else:
+                self._store(end_ns - self.start_ns)
+
+            if self.policy.adaptive:
+                self._adapt()
+
+            if self.tensor_metrics is None:
+                self._capture_metadata(module, inputs, outputs)
+        except Exception as e:
+            print(f"Error in sampled post_forward_hook: {e}")
+
+        self.hook_ns += (self.start_ns - self._entry_ns) + (time.perf_counter_ns() - end_ns)
+
+    def _store(self, duration_ns: int):
+        self.durations_ns[self.count % len(self.durations_ns)] = duration_ns
+        self.count += 1
+        self._sum += duration_ns
+        self._sum_sq += duration_ns * duration_ns
+
+    def resolve_events(self):
+        """Synchronize and move pending CUDA event timings into the buffer."""
+        if not self.pending:
+            return
+        self.events[self.pending - 1][1].synchronize()
+        for start, end in self.events[:self.pending]:
+            self._store(int(start.elapsed_time(end) * 1e6))
+        self.pending = 0
+
+    def _adapt(self):
+        """Double the interval once the mean is known well enough, else halve it."""
+        if self.count < self.policy.min_samples or self._sum <= 0:
+            return
+        mean = self._sum / self.count
+        variance = max(0.0, self._sum_sq / self.count - mean * mean)
+        rel_error = math.sqrt(variance / self.count) / mean
+
+        if rel_error < self.policy.target_rel_error:
+            self.interval = min(self.interval * 2, self.policy.max_interval)
+        else:
+            self.interval = max(max(1, self.policy.every_n), self.interval // 2)
+
+    def _capture_metadata(self, module: nn.Module, inputs, outputs):
+        """Shapes, dtypes and parameters, captured once per layer."""
+        metrics = LayerMetrics(
+            layer_name=self.layer_name,
+            layer_type=self.layer_type,
+            layer_index=self.layer_idx,
+        )
+        self.tensor_metrics = metrics  # Set first so a failure is not retried
+        self.collector.record_tensor_metadata(metrics, inputs, outputs)
+        self.collector.record_parameter_info(metrics, module)
+        if torch.cuda.is_available():
+            metrics.peak_vram_after = torch.cuda.memory_allocated()
+            metrics.device = str(torch.cuda.current_device())
+
+    def drain(self) -> np.ndarray:
+        """Return buffered durations (ns) and empty the buffer."""
+        if self.events is not None:
+            self.resolve_events()
+        size = min(self.count, len(self.durations_ns))
+        if self.count > len(self.durations_ns):
+            # Ring buffer wrapped: oldest sample sits at the write position
+            start = self.count % len(self.durations_ns)
+            durations = np.roll(self.durations_ns, -start)
+        else:
+            durations = self.durations_ns[:size].copy()
+        self.count = 0
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        return durations
 
 
 class ModelInstrumentor:
     """Instruments a PyTorch model with hooks to monitor all layers."""
 
-    def __init__(self, collector: MetricsCollector):
+    def __init__(self, collector: MetricsCollector, sampling: Optional[SamplingPolicy] = None):
+        """
+        Args:
+            collector: Collector receiving LayerMetrics
+            sampling: Time only sampled calls (None = every call, full metadata)
+        """
         self.collector = collector
+        self.sampling = sampling
         self.hooks: List[torch.utils.hooks.RemovableHandle] = []
         self.layer_mappings: Dict[str, str] = {}
+        self.layer_hooks: Dict[str, Any] = {}
 
     def instrument_model(
         self, model: nn.Module, prefix: str = ""
@@ -96,8 +275,7 @@ class ModelInstrumentor:
 
             # Only instrument specific layer types (customize as needed)
             if self._should_instrument(module):
-                hook = self._register_hooks(module, full_name, layer_type, layer_idx)
-                self.hooks.append(hook)
+                self.hooks.extend(self._register_hooks(module, full_name, layer_type, layer_idx))
                 self.layer_mappings[full_name] = layer_type
                 layer_idx += 1
 
@@ -122,22 +300,31 @@ class ModelInstrumentor:
 
     def _register_hooks(
         self, module: nn.Module, layer_name: str, layer_type: str, layer_idx: int
-    ) -> torch.utils.hooks.RemovableHandle:
-        """Register forward and backward hooks."""
-        layer_hook = LayerHook(
-            module=module,
-            layer_name=layer_name,
-            layer_type=layer_type,
-            layer_index=layer_idx,
-            collector=self.collector,
-        )
+    ) -> List[torch.utils.hooks.RemovableHandle]:
+        """Register forward hooks and return both handles."""
+        if self.sampling is not None:
+            parameter = next(module.parameters(), None)
+            layer_hook = SampledLayerHook(
+                layer_name=layer_name,
+                layer_type=layer_type,
+                layer_index=layer_idx,
+                collector=self.collector,
+                policy=self.sampling,
+                use_cuda_events=parameter is not None and parameter.is_cuda,
+            )
+        else:
+            layer_hook = LayerHook(
+                module=module,
+                layer_name=layer_name,
+                layer_type=layer_type,
+                layer_index=layer_idx,
+                collector=self.collector,
+            )
+        self.layer_hooks[layer_name] = layer_hook
 
-        # Register hooks
         pre_hook = module.register_forward_pre_hook(layer_hook.pre_forward_hook)
         post_hook = module.register_forward_hook(layer_hook.post_forward_hook)
-
-        # Return only one handle; both will be tracked internally
-        return pre_hook
+        return [pre_hook, post_hook]
 
     def remove_hooks(self):
         """Remove all registered hooks."""
@@ -145,6 +332,99 @@ class ModelInstrumentor:
             hook.remove()
         self.hooks.clear()
         self.layer_mappings.clear()
+        self.layer_hooks.clear()
+
+    def flush(self) -> int:
+        """
+        Move sampled timings into the collector as LayerMetrics.
+
+        Returns:
+            Number of samples flushed
+        """
+        flushed = 0
+        for layer_name, hook in self.layer_hooks.items():
+            if not isinstance(hook, SampledLayerHook):
+                continue
+            durations = hook.drain()
+            if not len(durations):
+                continue
+
+            template = hook.tensor_metrics or LayerMetrics(
+                layer_name=layer_name, layer_type=hook.layer_type, layer_index=hook.layer_idx
+            )
+            runs = self.collector.metrics_history.setdefault(layer_name, [])
+            for latency_ms in (durations / 1e6).tolist():
+                runs.append(LayerMetrics(
+                    layer_name=layer_name,
+                    layer_type=hook.layer_type,
+                    layer_index=hook.layer_idx,
+                    forward_latency_ms=latency_ms,
+                    peak_vram_after=template.peak_vram_after,
+                    input_shapes=template.input_shapes,
+                    output_shapes=template.output_shapes,
+                    input_dtypes=template.input_dtypes,
+                    output_dtypes=template.output_dtypes,
+                    num_parameters=template.num_parameters,
+                    parameter_size_mb=template.parameter_size_mb,
+                    device=template.device,
+                    custom_metrics={'sample_interval': hook.interval},
+                ))
+            flushed += len(durations)
+        return flushed
+
+    def reset_samples(self):
+        """Drop sampled timings and counters (e.g. after warmup)."""
+        for hook in self.layer_hooks.values():
+            if isinstance(hook, SampledLayerHook):
+                hook.drain()
+                hook.samples = 0
+            hook.calls = 0
+            hook.hook_ns = 0
+
+    def get_overhead_report(self, forward_time_ms: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Time spent in this instrumentor's hooks.
+
+        Sampled calls are measured directly; unsampled calls are estimated
+        from a calibrated per-call cost. PyTorch's own hook dispatch is not
+        included.
+
+        Args:
+            forward_time_ms: Instrumented forward time to compare against
+
+        Returns:
+            Calls, samples, hook time and overhead percentage
+        """
+        hooks = list(self.layer_hooks.values())
+        calls = sum(hook.calls for hook in hooks)
+        samples = sum(getattr(hook, 'samples', hook.calls) for hook in hooks)
+        measured_ms = sum(hook.hook_ns for hook in hooks) / 1e6
+        unsampled_ms = (calls - samples) * self._unsampled_call_ns() / 1e6
+
+        report = {
+            'mode': 'sampled' if self.sampling is not None else 'full',
+            'hook_calls': calls,
+            'sampled_calls': samples,
+            'sample_rate': samples / calls if calls else 0.0,
+            'hook_time_ms': measured_ms + unsampled_ms,
+            'unsampled_estimate_ms': unsampled_ms,
+        }
+        if forward_time_ms:
+            report['forward_time_ms'] = forward_time_ms
+            report['overhead_pct'] = 100.0 * report['hook_time_ms'] / forward_time_ms
+        return report
+
+    def _unsampled_call_ns(self, repeats: int = 2000) -> float:
+        """Cost of a pre/post hook pair that skips sampling."""
+        if self.sampling is None:
+            return 0.0
+        probe = SampledLayerHook('probe', 'probe', -1, self.collector, SamplingPolicy(buffer_size=1))
+        probe.countdown = repeats + 2
+        start = time.perf_counter_ns()
+        for _ in range(repeats):
+            probe.pre_forward_hook(None, ())
+            probe.post_forward_hook(None, (), None)
+        return (time.perf_counter_ns() - start) / repeats
 
     def get_layer_statistics(self) -> Dict[str, Any]:
         """Get basic statistics about instrumented layers."""
@@ -5,16 +5,21 @@ Manages session lifecycle, stage assignment, and request routing.
 
 import asyncio
 import logging
-from typing import Dict, List, Optional, Set
-from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set
+from dataclasses import dataclass, field, replace
 from datetime import datetime
 import uuid
 import time
 from contextlib import asynccontextmanager
 
-from .stage_registry import NodeRegistry, NodeInfo
-from .session_manager import SessionManager, Session
 from . import utils
+from .utils import NodeRegistry, SessionManager, SessionState
+from .pipeline import MicroBatch, PipelineScheduler, PipelineStats, split_micro_batches
+from ..advanced.planner.adaptive import NodeTelemetry, OnlineReplanner, RebalancePlan
+
+
+class KVCacheMissError(RuntimeError):
+    """A stage no longer holds the KV cache a request relies on."""
 
 
 @dataclass
@@ -27,6 +32,11 @@ class CoordinatorConfig:
     max_concurrent_requests: int = 100
     enable_metrics: bool = True
     log_level: str = "INFO"
+    enable_kv_cache: bool = True  # Send only new tokens after the prefill step
+    micro_batch_size: int = 1  # Requests per micro-batch in submit_batch
+    activation_quantization: Optional[str] = None  # None, 'fp16' or 'int8' on the wire
+    enable_rebalancing: bool = False  # Run the online re-planner in the background
+    rebalance_interval_sec: float = 30.0
 
 
 @dataclass
@@ -51,6 +61,20 @@ class InferenceResponse:
     metadata: Dict[str, Any] = field(default_factory=dict)
 
 
+@dataclass
+class _PipelineItem:
+    """Generation state of one request inside a micro-batch."""
+    request: InferenceRequest
+    session: SessionState
+    plan: 'ExecutionPlan'
+    generated_tokens: List[int] = field(default_factory=list)
+    activations: Optional['torch.Tensor'] = None
+    past_length: int = 0
+    cache_miss: bool = False
+    done: bool = False
+    error_message: Optional[str] = None
+
+
 @dataclass
 class ExecutionPlan:
     """Plan for distributed execution."""
@@ -58,6 +82,8 @@ class ExecutionPlan:
     stages: List[str]  # Ordered list of stage IDs
     stage_to_node: Dict[str, str]  # Mapping: stage -> node
     metadata: Dict[str, Any] = field(default_factory=dict)
+    stage_layers: Dict[str, List[str]] = field(default_factory=dict)  # Empty: worker default
+    generation: int = 0  # Layout generation, bumped by each rebalance
 
 
 class CoordinatorService:
@@ -84,7 +110,15 @@ class CoordinatorService:
         # Runtime state
         self.active_requests: Dict[str, InferenceRequest] = {}
         self.execution_plans: Dict[str, ExecutionPlan] = {}
+
+        # Tokens whose key/values every stage of a session has cached
+        self.cached_tokens: Dict[str, List[int]] = {}
         self.metrics_collector = utils.MetricsCollector() if self.config.enable_metrics else None
+        self.last_pipeline_stats: Optional[PipelineStats] = None
+
+        # Online re-planning: set a replanner to rebalance layers across nodes
+        self.replanner: Optional[OnlineReplanner] = None
+        self._rebalance_lock = asyncio.Lock()
 
         # gRPC clients for communicating with worker nodes
         self.stage_clients: Dict[str, StageServiceClient] = {}
@@ -140,6 +174,9 @@ class CoordinatorService:
 
             try:
                 for step in range(request.max_new_tokens):
+                    # Layout switches take effect between steps
+                    plan = self.execution_plans.get(session.session_id, plan)
+
                     # Single token generation step
                     next_token = await self._execute_generation_step(
                         session,
@@ -199,22 +236,201 @@ class CoordinatorService:
                 error_message=str(e)
             )
 
-    async def _get_or_create_session(self, request: InferenceRequest) -> Session:
+    async def submit_batch(
+        self,
+        requests: List[InferenceRequest],
+        micro_batch_size: Optional[int] = None
+    ) -> List[InferenceResponse]:
+        """
+        Run concurrent requests as a micro-batched pipeline.
+
+        Requests are split into micro-batches that flow through the stages
+        GPipe-style: while stage N runs one micro-batch, stage N+1 runs the
+        previous one. A micro-batch that leaves the last stage merges its
+        tokens per session and re-enters the first stage for the next
+        decode step until all its requests are complete.
+
+        Args:
+            requests: Concurrent inference requests
+            micro_batch_size: Requests per micro-batch (default from config)
+
+        Returns:
+            One response per request, in order; pipeline utilization and
+            bubble fraction are in each response's metadata
+        """
+        start_time = time.time()
+        responses: Dict[str, InferenceResponse] = {}
+        groups: Dict[tuple, List[_PipelineItem]] = {}
+
+        for request in requests:
+            if not request.input_tokens:
+                responses[request.request_id] = InferenceResponse(
+                    request_id=request.request_id,
+                    generated_tokens=[],
+                    is_complete=True,
+                    error_message="Empty input tokens"
+                )
+                continue
+            try:
+                session = await self._get_or_create_session(request)
+                plan = await self._get_execution_plan(session)
+            except Exception as e:
+                responses[request.request_id] = InferenceResponse(
+                    request_id=request.request_id,
+                    generated_tokens=[],
+                    is_complete=True,
+                    error_message=str(e)
+                )
+                continue
+
+            self.active_requests[request.request_id] = request
+            item = _PipelineItem(request=request, session=session, plan=plan)
+            item.done = request.max_new_tokens <= 0
+            groups.setdefault(tuple(plan.stages), []).append(item)
+
+        size = micro_batch_size or self.config.micro_batch_size
+        try:
+            # Requests whose plans share a stage order share one pipeline
+            results = await asyncio.gather(*(
+                self._run_pipeline(list(stages), items, size)
+                for stages, items in groups.items()
+            ))
+        finally:
+            for request in requests:
+                self.active_requests.pop(request.request_id, None)
+
+        for (_, items), stats in zip(groups.items(), results):
+            self.last_pipeline_stats = stats
+            for item in items:
+                responses[item.request.request_id] = InferenceResponse(
+                    request_id=item.request.request_id,
+                    generated_tokens=item.generated_tokens,
+                    is_complete=True,
+                    error_message=item.error_message,
+                    metadata={
+                        'total_latency_ms': (time.time() - start_time) * 1000,
+                        'num_generated_tokens': len(item.generated_tokens),
+                        'session_id': item.session.session_id,
+                        'pipeline': stats.to_dict(),
+                    }
+                )
+
+        if self.metrics_collector:
+            latency_ms = (time.time() - start_time) * 1000
+            for _ in requests:
+                self.metrics_collector.record_inference_latency(latency_ms)
+
+        return [responses[request.request_id] for request in requests]
+
+    async def _run_pipeline(
+        self,
+        stages: List[str],
+        items: List[_PipelineItem],
+        micro_batch_size: int
+    ) -> PipelineStats:
+        """Generate tokens for items through a micro-batched stage pipeline."""
+        scheduler = PipelineScheduler(stages, self._execute_micro_batch, self._complete_micro_batch)
+        micro_batches = split_micro_batches([item for item in items if not item.done], micro_batch_size)
+        stats = await scheduler.run(micro_batches)
+
+        for micro_batch in micro_batches:
+            if micro_batch.error is not None:
+                self.logger.error(f"Micro-batch {micro_batch.micro_batch_id} failed: {micro_batch.error}")
+                for item in micro_batch.items:
+                    if not item.done:
+                        item.error_message = str(micro_batch.error)
+                        item.done = True
+
+        self.logger.info(
+            f"Pipeline: {stats.num_micro_batches} micro-batches over {stats.num_stages} stages, "
+            f"bubble {stats.bubble_fraction:.1%}"
+        )
+        return stats
+
+    async def _execute_micro_batch(self, stage_id: str, micro_batch: MicroBatch):
+        """Run one stage for every active request in a micro-batch."""
+        use_cache = self.config.enable_kv_cache
+
+        for item in micro_batch.items:
+            if item.done:
+                continue
+
+            if stage_id == item.plan.stages[0]:
+                # Start of a decode step: pick up any layout switch, then
+                # send only uncached tokens
+                item.plan = self.execution_plans.get(item.session.session_id, item.plan)
+                all_tokens = item.request.input_tokens + item.generated_tokens
+                item.cache_miss = False
+                item.past_length = (
+                    self._cached_prefix_length(item.session.session_id, all_tokens) if use_cache else 0
+                )
+                item.activations = utils.tokens_to_tensor(all_tokens[item.past_length:])
+            elif item.cache_miss:
+                continue
+
+            response = await self._execute_stage_forward(
+                item.session.session_id,
+                item.plan.stage_to_node[stage_id],
+                stage_id,
+                item.activations,
+                step=len(item.generated_tokens),
+                past_length=item.past_length,
+                use_cache=use_cache,
+                layer_names=item.plan.stage_layers.get(stage_id),
+                generation=item.plan.generation
+            )
+
+            if not response.success:
+                if getattr(response, 'cache_miss', False) and item.past_length > 0:
+                    # Retried with a full prefill on the next pass
+                    self.cached_tokens.pop(item.session.session_id, None)
+                    item.cache_miss = True
+                    continue
+                raise RuntimeError(f"Stage execution failed: {response.error_message}")
+
+            item.activations = utils.deserialize_tensor(response.output_activations)
+
+    def _complete_micro_batch(self, micro_batch: MicroBatch) -> bool:
+        """Merge sampled tokens per session; True while any request needs more."""
+        for item in micro_batch.items:
+            if item.done or item.cache_miss:
+                continue
+
+            logits = item.activations
+            if logits.dim() >= 2:
+                logits = logits[..., -1, :]
+            next_token = int(logits.argmax())
+
+            if self.config.enable_kv_cache:
+                self.cached_tokens[item.session.session_id] = (
+                    item.request.input_tokens + item.generated_tokens
+                )
+            item.generated_tokens.append(next_token)
+
+            # Stop at max length or EOS (simplified)
+            if len(item.generated_tokens) >= item.request.max_new_tokens or next_token == 50256:
+                item.done = True
+
+        return any(not item.done for item in micro_batch.items)
+
+    async def _get_or_create_session(self, request: InferenceRequest) -> SessionState:
         """Get existing session or create new one."""
         if request.session_id and request.session_id in self.session_manager:
             return self.session_manager.get_session(request.session_id)
 
         # Create new session
         session_id = request.session_id or str(uuid.uuid4())
-        session = Session(
+        session = SessionState(
             session_id=session_id,
             created_at=datetime.now(),
+            stage_assignments={},
+            last_access=datetime.now(),
         )
 
         self.session_manager.add_session(session)
         return session
 
-    async def _get_execution_plan(self, session: Session) -> ExecutionPlan:
+    async def _get_execution_plan(self, session: SessionState) -> ExecutionPlan:
         """Get existing plan or create new one for session."""
         if session.session_id in self.execution_plans:
             return self.execution_plans[session.session_id]
@@ -226,7 +442,7 @@ class CoordinatorService:
 
         return plan
 
-    async def _create_execution_plan(self, session: Session) -> ExecutionPlan:
+    async def _create_execution_plan(self, session: SessionState) -> ExecutionPlan:
         """
         Create execution plan using Fase 2 planner.
 
@@ -239,15 +455,24 @@ class CoordinatorService:
         if not available_nodes:
             raise RuntimeError("No available worker nodes")
 
-        # Simple plan: assign stages round-robin
-        # In production, this would use the Fase 2 partition planner
-        workers = list(available_nodes.keys())
-        stages = ["stage_0", "stage_1", "stage_2"]  # From Fase 2 plan
-
-        stage_to_node = {}
-        for i, stage in enumerate(stages):
-            node_id = workers[i % len(workers)]
-            stage_to_node[stage] = node_id
+        if self.replanner is not None:
+            # New sessions start on the current layout
+            stages = list(self.replanner.stage_layers)
+            stage_to_node = dict(self.replanner.stage_to_node)
+            stage_layers = {stage: list(layers) for stage, layers in self.replanner.stage_layers.items()}
+            generation = self.replanner.generation
+        else:
+            # Simple plan: assign stages round-robin
+            # In production, this would use the Fase 2 partition planner
+            workers = list(available_nodes.keys())
+            stages = ["stage_0", "stage_1", "stage_2"]  # From Fase 2 plan
+
+            stage_to_node = {}
+            for i, stage in enumerate(stages):
+                node_id = workers[i % len(workers)]
+                stage_to_node[stage] = node_id
+            stage_layers = {}
+            generation = 0
 
         plan = ExecutionPlan(
             session_id=session.session_id,
@@ -257,7 +482,9 @@ class CoordinatorService:
                 'created_at': datetime.now().isoformat(),
                 'num_stages': len(stages),
                 'num_nodes': len(set(stage_to_node.values())),
-            }
+            },
+            stage_layers=stage_layers,
+            generation=generation,
         )
 
         self.logger.info(f"Created execution plan: {plan.metadata}")
@@ -265,7 +492,7 @@ class CoordinatorService:
 
     async def _execute_generation_step(
         self,
-        session: Session,
+        session: SessionState,
         plan: ExecutionPlan,
         request: InferenceRequest,
         generated_tokens: List[int]
@@ -273,11 +500,61 @@ class CoordinatorService:
         """
         Execute single generation step across distributed stages.
 
-        This is the core pipeline execution logic.
+        This is the core pipeline execution logic. With the KV cache
+        enabled, the first step prefills every stage with the whole prompt
+        and later steps send only the newest token. A stage that lost its
+        cache triggers one full prefill.
         """
         # Prepare input: existing tokens + generated tokens
         all_tokens = request.input_tokens + generated_tokens
-        current_activations = utils.tokens_to_tensor(all_tokens)
+        use_cache = self.config.enable_kv_cache
+        past_length = self._cached_prefix_length(session.session_id, all_tokens) if use_cache else 0
+
+        while True:
+            try:
+                current_activations = await self._execute_pipeline(
+                    session,
+                    plan,
+                    all_tokens[past_length:],
+                    step=len(generated_tokens),
+                    past_length=past_length,
+                    use_cache=use_cache
+                )
+                break
+            except KVCacheMissError as e:
+                if past_length == 0:
+                    raise
+                self.logger.info(f"Re-prefilling session {session.session_id}: {e}")
+                past_length = 0
+
+        if use_cache:
+            self.cached_tokens[session.session_id] = list(all_tokens)
+
+        # Sample next token from the last position (simplified: just get argmax)
+        if current_activations.dim() >= 2:
+            current_activations = current_activations[..., -1, :]
+        next_token = int(current_activations.argmax())
+
+        return next_token
+
+    def _cached_prefix_length(self, session_id: str, tokens: List[int]) -> int:
+        """Number of leading tokens the stages can take from their KV caches."""
+        cached = self.cached_tokens.get(session_id)
+        if not cached or len(cached) >= len(tokens) or tokens[:len(cached)] != cached:
+            return 0
+        return len(cached)
+
+    async def _execute_pipeline(
+        self,
+        session: SessionState,
+        plan: ExecutionPlan,
+        tokens: List[int],
+        step: int,
+        past_length: int,
+        use_cache: bool
+    ) -> 'torch.Tensor':
+        """Push tokens through every stage and return the final activations."""
+        current_activations = utils.tokens_to_tensor(tokens)
 
         # Execute pipeline: pass through each stage
         for stage_id in plan.stages:
@@ -289,19 +566,23 @@ class CoordinatorService:
                 node_id,
                 stage_id,
                 current_activations,
-                step=len(generated_tokens)
+                step=step,
+                past_length=past_length,
+                use_cache=use_cache,
+                layer_names=plan.stage_layers.get(stage_id),
+                generation=plan.generation
             )
 
             if not response.success:
+                if getattr(response, 'cache_miss', False):
+                    self.cached_tokens.pop(session.session_id, None)
+                    raise KVCacheMissError(f"{stage_id}: {response.error_message}")
                 raise RuntimeError(f"Stage execution failed: {response.error_message}")
 
             # Update activations for next stage
             current_activations = utils.deserialize_tensor(response.output_activations)
 
-        # Sample next token (simplified: just get argmax)
-        next_token = int(current_activations.argmax())
-
-        return next_token
+        return current_activations
 
     async def _execute_stage_forward(
         self,
@@ -309,7 +590,11 @@ class CoordinatorService:
         node_id: str,
         stage_id: str,
         activations: 'torch.Tensor',
-        step: int
+        step: int,
+        past_length: int = 0,
+        use_cache: bool = False,
+        layer_names: Optional[List[str]] = None,
+        generation: int = 0
     ) -> 'ExecuteForwardResponse':
         """Execute forward pass on specific worker node."""
         # Get client for node
@@ -320,6 +605,11 @@ class CoordinatorService:
             session_id=session_id,
             token_index=step,
             tensor=activations,
+            past_length=past_length,
+            use_cache=use_cache,
+            quantization=self.config.activation_quantization,
+            layer_names=layer_names,
+            generation=generation,
         )
 
         # Call worker
@@ -331,6 +621,95 @@ class CoordinatorService:
             # Retry logic would go here
             raise
 
+    async def evict_session_caches(self, session_id: str):
+        """Drop a session's KV caches on every stage node."""
+        self.cached_tokens.pop(session_id, None)
+        plan = self.execution_plans.get(session_id)
+        if plan is None:
+            return
+
+        for node_id in set(plan.stage_to_node.values()):
+            try:
+                client = await self._get_stage_client(node_id)
+                await client.EvictCache({'session_id': session_id})
+            except Exception as e:
+                self.logger.warning(f"KV cache eviction failed on {node_id}: {e}")
+
+    def record_heartbeat(self, worker_id: str, active_sessions: int, metrics: Dict[str, float]):
+        """Handle a worker heartbeat: liveness, load and re-planner telemetry."""
+        self.node_registry.heartbeat(worker_id)
+        node_info = self.node_registry.get_node(worker_id)
+        if node_info is not None:
+            self.node_registry.update_load(worker_id, node_info.load_factor)
+
+        if self.replanner is not None:
+            self.replanner.observe(NodeTelemetry.from_heartbeat(worker_id, active_sessions, metrics))
+
+    async def rebalance(self, force: bool = False) -> Optional[RebalancePlan]:
+        """
+        Move layers between stages if node load has unbalanced them.
+
+        The moved layers are staged on their new nodes while generation
+        continues; the layout then switches for every session at once,
+        taking effect at each session's next decode step. Sessions keep
+        running and re-prefill once, since moved layers have no KV cache.
+
+        Returns:
+            The applied plan, or None if no rebalance was needed
+        """
+        if self.replanner is None:
+            return None
+
+        async with self._rebalance_lock:
+            plan = self.replanner.propose(force=force)
+            if plan is None:
+                return None
+
+            await self._stage_layout(plan)
+            self._switch_layout(plan)
+            self.replanner.commit(plan)
+            return plan
+
+    async def _stage_layout(self, plan: RebalancePlan):
+        """Stage every changed stage's layers on its node, concurrently."""
+        changed = {move.source_stage for move in plan.moves} | {move.target_stage for move in plan.moves}
+
+        async def stage(stage_id: str):
+            node_id = plan.stage_to_node[stage_id]
+            client = await self._get_stage_client(node_id)
+            response = await client.StageLayers({
+                'stage_id': stage_id,
+                'layer_names': plan.stage_layers[stage_id],
+                'generation': plan.generation,
+            })
+            if not response.success:
+                raise RuntimeError(f"Staging {stage_id} on {node_id} failed: {response.error_message}")
+
+        await asyncio.gather(*(stage(stage_id) for stage_id in sorted(changed)))
+
+    def _switch_layout(self, plan: RebalancePlan):
+        """Swap every session's plan in one synchronous step (no awaits)."""
+        for session_id, current in list(self.execution_plans.items()):
+            self.execution_plans[session_id] = replace(
+                current,
+                stage_to_node=dict(plan.stage_to_node),
+                stage_layers={stage: list(layers) for stage, layers in plan.stage_layers.items()},
+                generation=plan.generation,
+            )
+        # Workers drop a session's cache when it switches layout
+        self.cached_tokens.clear()
+
+        self.logger.info(
+            f"Layout generation {plan.generation}: moved {len(plan.moves)} layers, "
+            f"bottleneck {plan.bottleneck_before_ms:.1f} -> {plan.bottleneck_after_ms:.1f} ms"
+        )
+
+    def attach_worker(self, worker: 'StageWorkerService'):
+        """Register a worker running in this process and call it directly."""
+        node_info = worker._get_node_info()
+        self.node_registry.register_node(node_info)
+        self.stage_clients[node_info.node_id] = LocalStageClient(worker)
+
     async def _get_stage_client(self, node_id: str) -> 'StageServiceClient':
         """Get or create gRPC client for node."""
         if node_id not in self.stage_clients:
@@ -356,12 +735,18 @@ class CoordinatorService:
         self._background_tasks.add(task2)
         task2.add_done_callback(self._background_tasks.discard)
 
+        # Online re-planning
+        if self.config.enable_rebalancing:
+            task3 = asyncio.create_task(self._rebalance_loop())
+            self._background_tasks.add(task3)
+            task3.add_done_callback(self._background_tasks.discard)
+
     async def _heartbeat_monitor(self):
         """Monitor worker node health."""
         while not self._shutdown_event.is_set():
             try:
                 await asyncio.sleep(self.config.heartbeat_interval_sec)
-                await self.node_registry.check_all_heartbeats()
+                self.node_registry.check_all_heartbeats()
             except Exception as e:
                 self.logger.error(f"Heartbeat monitoring error: {e}")
 
@@ -371,11 +756,23 @@ class CoordinatorService:
             try:
                 await asyncio.sleep(60.0)
                 expired = self.session_manager.cleanup_expired_sessions()
+                for session_id in expired:
+                    await self.evict_session_caches(session_id)
+                    self.execution_plans.pop(session_id, None)
                 if expired:
                     self.logger.info(f"Cleaned up {len(expired)} expired sessions")
             except Exception as e:
                 self.logger.error(f"Session cleanup error: {e}")
 
+    async def _rebalance_loop(self):
+        """Periodically rebalance layers from the latest heartbeats."""
+        while not self._shutdown_event.is_set():
+            try:
+                await asyncio.sleep(self.config.rebalance_interval_sec)
+                await self.rebalance()
+            except Exception as e:
+                self.logger.error(f"Rebalance error: {e}")
+
     async def _start_grpc_server(self):
         """Start gRPC server for client connections."""
         # This would start the actual gRPC server
@@ -397,3 +794,40 @@ class CoordinatorService:
             await client.close()
 
         self.logger.info("Coordinator shutdown complete")
+
+
+class StageServiceClient:
+    """Client for a remote stage worker (placeholder: no gRPC transport yet)."""
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+
+    async def connect(self):
+        raise ConnectionError(
+            f"No transport to stage worker at {self.host}:{self.port}; "
+            "attach in-process workers with CoordinatorService.attach_worker"
+        )
+
+    async def close(self):
+        pass
+
+
+class LocalStageClient:
+    """Calls a StageWorkerService in this process with the coordinator's request dicts."""
+    def __init__(self, worker: 'StageWorkerService'):
+        self.worker = worker
+
+    async def connect(self):
+        pass
+
+    async def ExecuteForward(self, request: Dict[str, Any]) -> 'ExecuteForwardResponse':
+        return await self.worker.ExecuteForward(**request)
+
+    async def StageLayers(self, request: Dict[str, Any]) -> 'StageLayersResponse':
+        return await self.worker.StageLayers(**request)
+
+    async def EvictCache(self, request: Dict[str, Any]) -> 'EvictCacheResponse':
+        return await self.worker.EvictCache(**request)
+
+    async def close(self):
+        pass
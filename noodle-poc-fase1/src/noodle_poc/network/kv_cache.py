@@ -0,0 +1,215 @@
+"""
+Per-session key/value caches for stage workers.
+Lets a stage process only the newest token after the prefill step.
+"""
+
+import inspect
+import time
+from typing import Any, Dict, Optional
+
+import torch
+import torch.nn as nn
+
+
+# Names transformer blocks use for their past key/values argument
+CACHE_ARGUMENTS = ('layer_past', 'past_key_value', 'past_key_values')
+
+
+def cache_nbytes(obj: Any) -> int:
+    """Bytes held by the tensors of a (nested) key/value cache."""
+    if isinstance(obj, torch.Tensor):
+        return obj.numel() * obj.element_size()
+    if isinstance(obj, (tuple, list)):
+        return sum(cache_nbytes(item) for item in obj)
+    if isinstance(obj, dict):
+        return sum(cache_nbytes(item) for item in obj.values())
+    if obj is None:
+        return 0
+
+    # transformers Cache objects (per-layer lists or layer objects)
+    total = 0
+    for attr in ('key_cache', 'value_cache', 'layers'):
+        if hasattr(obj, attr):
+            total += cache_nbytes(getattr(obj, attr))
+    for attr in ('keys', 'values'):
+        value = getattr(obj, attr, None)
+        if isinstance(value, torch.Tensor):
+            total += cache_nbytes(value)
+    return total
+
+
+class BlockSignature:
+    """How to pass a key/value cache to an attention block."""
+
+    def __init__(self, layer: nn.Module):
+        try:
+            params = set(inspect.signature(layer.forward).parameters)
+        except (TypeError, ValueError):
+            params = set()
+
+        self.cache_argument: Optional[str] = next(
+            (name for name in CACHE_ARGUMENTS if name in params), None
+        )
+        self.accepts_use_cache = 'use_cache' in params
+        self.accepts_cache_position = 'cache_position' in params
+
+    @property
+    def is_cached_block(self) -> bool:
+        return self.cache_argument is not None
+
+    @property
+    def uses_tuple_cache(self) -> bool:
+        """Legacy API: the block takes and returns (key, value) tuples."""
+        return self.cache_argument == 'layer_past'
+
+
+class SessionKVCache:
+    """
+    Key/value cache for one session's layers on this stage.
+
+    Blocks with the legacy tuple API keep one (key, value) entry per layer.
+    Blocks with the transformers Cache API share one Cache object that each
+    block updates at its own layer index.
+    """
+
+    def __init__(self):
+        self.layers: Dict[str, Any] = {}
+        self.shared: Any = None
+        self.seq_len = 0
+        self.nbytes = 0
+        self.evictions = 0
+        self.last_access = time.time()
+
+    def get(self, layer_name: str) -> Any:
+        """Past key/values of a tuple-API layer."""
+        return self.layers.get(layer_name)
+
+    def update(self, layer_name: str, present: Any):
+        """Store the key/values a tuple-API layer returned."""
+        self.layers[layer_name] = present
+
+    def shared_cache(self) -> Any:
+        """Cache object shared by Cache-API blocks (created on first use)."""
+        if self.shared is None:
+            from transformers import DynamicCache
+            self.shared = DynamicCache()
+        return self.shared
+
+    def advance(self, num_tokens: int):
+        """Record that the cache now covers num_tokens more positions."""
+        self.seq_len += num_tokens
+        self.nbytes = cache_nbytes(self.layers) + cache_nbytes(self.shared)
+        self.last_access = time.time()
+
+    def clear(self) -> int:
+        """
+        Drop all cached key/values.
+
+        Returns:
+            Bytes freed
+        """
+        freed = self.nbytes
+        self.layers.clear()
+        self.shared = None
+        self.seq_len = 0
+        self.nbytes = 0
+        return freed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        return {
+            'seq_len': self.seq_len,
+            'num_layers': len(self.layers),
+            'memory_mb': self.nbytes / (1024 ** 2),
+            'evictions': self.evictions,
+            'idle_sec': time.time() - self.last_access,
+        }
+
+
+def benchmark_generation(
+    num_new_tokens: int = 256,
+    prompt_length: int = 16,
+    num_stages: int = 2,
+    n_layer: int = 4,
+    n_embd: int = 128,
+) -> Dict[str, float]:
+    """
+    Compare full-sequence and KV-cached decoding through stage workers.
+
+    Builds a small randomly initialized GPT-2 on CPU, splits it into
+    num_stages in-process StageWorkerServices and generates the same
+    number of tokens both ways, mirroring what the coordinator sends.
+
+    Returns:
+        Tokens/sec for both paths and the speedup
+    """
+    import asyncio
+    from transformers import GPT2Config, GPT2LMHeadModel
+    from . import utils
+    from .worker import StageWorkerService, WorkerConfig
+
+    torch.manual_seed(0)
+    config = GPT2Config(
+        n_layer=n_layer,
+        n_embd=n_embd,
+        n_head=4,
+        n_positions=prompt_length + num_new_tokens + 1,
+        vocab_size=1024,
+    )
+    model = GPT2LMHeadModel(config).eval()
+    modules = dict(model.named_modules())
+
+    layer_names = (
+        ['transformer.wte', 'transformer.wpe']
+        + [f'transformer.h.{i}' for i in range(n_layer)]
+        + ['transformer.ln_f', 'lm_head']
+    )
+    per_stage = -(-len(layer_names) // num_stages)
+    stages = [layer_names[i:i + per_stage] for i in range(0, len(layer_names), per_stage)]
+
+    workers = []
+    for names in stages:
+        worker = StageWorkerService(WorkerConfig(device='cpu'))
+        worker.layers_assigned = {name: modules[name] for name in names}
+        workers.append(worker)
+
+    prompt = torch.randint(0, config.vocab_size, (prompt_length,)).tolist()
+
+    async def generate(use_cache: bool) -> float:
+        session_id = f"bench-{use_cache}"
+        for worker, names in zip(workers, stages):
+            await worker.CreateSession(session_id, None, names, config.n_positions, "fp32")
+
+        tokens = list(prompt)
+        cached = 0
+        start = time.perf_counter()
+        for step in range(num_new_tokens):
+            new_tokens = tokens[cached:] if use_cache else tokens
+            activations = utils.serialize_tensor(utils.tokens_to_tensor(new_tokens))
+            for worker in workers:
+                response = await worker.ExecuteForward(
+                    session_id, step, activations, [],
+                    past_length=cached if use_cache else 0,
+                    use_cache=use_cache,
+                )
+                if not response.success:
+                    raise RuntimeError(response.error_message)
+                activations = response.output_activations
+            logits = utils.deserialize_tensor(activations)
+            if use_cache:
+                cached = len(tokens)
+            tokens.append(int(logits[..., -1, :].argmax()))
+        elapsed = time.perf_counter() - start
+
+        for worker in workers:
+            await worker.CloseSession(session_id)
+        return num_new_tokens / elapsed
+
+    full = asyncio.run(generate(use_cache=False))
+    cached = asyncio.run(generate(use_cache=True))
+
+    return {
+        'full_tokens_per_sec': full,
+        'cached_tokens_per_sec': cached,
+        'speedup': cached / full,
+    }
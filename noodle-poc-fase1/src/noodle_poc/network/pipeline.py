@@ -0,0 +1,293 @@
+"""
+Micro-batched pipeline scheduling across stages.
+GPipe-style: requests are grouped into micro-batches that flow through
+the stages concurrently, so every stage has work in flight.
+"""
+
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+@dataclass
+class MicroBatch:
+    """Group of requests scheduled through the pipeline together."""
+    micro_batch_id: int
+    items: List[Any]
+    passes: int = 0  # Completed trips through all stages
+    error: Optional[Exception] = None
+
+
+@dataclass
+class PipelineStats:
+    """Utilization of one pipeline run."""
+    makespan_sec: float
+    num_stages: int
+    num_micro_batches: int
+    stage_executions: int  # Micro-batch passes summed over stages
+    stage_busy_sec: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def stage_utilization(self) -> Dict[str, float]:
+        """Busy fraction of the makespan per stage."""
+        if self.makespan_sec <= 0:
+            return {stage_id: 0.0 for stage_id in self.stage_busy_sec}
+        return {
+            stage_id: busy / self.makespan_sec
+            for stage_id, busy in self.stage_busy_sec.items()
+        }
+
+    @property
+    def bubble_fraction(self) -> float:
+        """Share of stage-time spent idle."""
+        if self.makespan_sec <= 0 or not self.num_stages:
+            return 0.0
+        busy = sum(self.stage_busy_sec.values())
+        return max(0.0, 1.0 - busy / (self.num_stages * self.makespan_sec))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary."""
+        return {
+            'makespan_sec': self.makespan_sec,
+            'num_stages': self.num_stages,
+            'num_micro_batches': self.num_micro_batches,
+            'stage_executions': self.stage_executions,
+            'stage_busy_sec': dict(self.stage_busy_sec),
+            'stage_utilization': self.stage_utilization,
+            'bubble_fraction': self.bubble_fraction,
+        }
+
+
+def split_micro_batches(items: List[Any], micro_batch_size: int) -> List[MicroBatch]:
+    """Split items into micro-batches of at most micro_batch_size."""
+    size = max(1, micro_batch_size)
+    return [
+        MicroBatch(micro_batch_id=index, items=items[start:start + size])
+        for index, start in enumerate(range(0, len(items), size))
+    ]
+
+
+class PipelineScheduler:
+    """
+    Runs micro-batches through an ordered list of stages.
+
+    Each stage processes one micro-batch at a time in arrival order, so
+    stage k works on micro-batch m while stage k+1 works on m-1. When a
+    micro-batch leaves the last stage, on_complete decides whether it goes
+    around again (the next decode step) or is finished. A stage error
+    finishes the micro-batch with the error recorded.
+    """
+
+    def __init__(
+        self,
+        stages: List[str],
+        execute_stage: Callable[[str, MicroBatch], Awaitable[None]],
+        on_complete: Optional[Callable[[MicroBatch], bool]] = None,
+    ):
+        """
+        Initialize scheduler.
+
+        Args:
+            stages: Ordered stage IDs
+            execute_stage: Coroutine running one stage for one micro-batch
+            on_complete: Called after the last stage; True to run another pass
+        """
+        if not stages:
+            raise ValueError("Pipeline needs at least one stage")
+        self.stages = stages
+        self.execute_stage = execute_stage
+        self.on_complete = on_complete
+
+    async def run(self, micro_batches: List[MicroBatch]) -> PipelineStats:
+        """
+        Run micro-batches until every one is finished.
+
+        Returns:
+            PipelineStats with per-stage busy time
+        """
+        queues: List[asyncio.Queue] = [asyncio.Queue() for _ in self.stages]
+        busy = {stage_id: 0.0 for stage_id in self.stages}
+        executions = 0
+        remaining = len(micro_batches)
+        finished = asyncio.Event()
+
+        if not micro_batches:
+            return PipelineStats(0.0, len(self.stages), 0, 0, busy)
+
+        def finish(micro_batch: MicroBatch):
+            nonlocal remaining
+            remaining -= 1
+            if remaining == 0:
+                finished.set()
+
+        async def stage_loop(index: int):
+            nonlocal executions
+            stage_id = self.stages[index]
+            while True:
+                micro_batch = await queues[index].get()
+
+                started = time.perf_counter()
+                try:
+                    await self.execute_stage(stage_id, micro_batch)
+                except Exception as e:
+                    micro_batch.error = e
+                busy[stage_id] += time.perf_counter() - started
+                executions += 1
+
+                if micro_batch.error is not None:
+                    finish(micro_batch)
+                elif index + 1 < len(self.stages):
+                    queues[index + 1].put_nowait(micro_batch)
+                else:
+                    micro_batch.passes += 1
+                    again = False
+                    if self.on_complete is not None:
+                        try:
+                            again = self.on_complete(micro_batch)
+                        except Exception as e:
+                            micro_batch.error = e
+                    if again:
+                        queues[0].put_nowait(micro_batch)
+                    else:
+                        finish(micro_batch)
+
+        for micro_batch in micro_batches:
+            queues[0].put_nowait(micro_batch)
+
+        start = time.perf_counter()
+        loops = [asyncio.ensure_future(stage_loop(i)) for i in range(len(self.stages))]
+        try:
+            await finished.wait()
+        finally:
+            for loop in loops:
+                loop.cancel()
+            await asyncio.gather(*loops, return_exceptions=True)
+
+        return PipelineStats(
+            makespan_sec=time.perf_counter() - start,
+            num_stages=len(self.stages),
+            num_micro_batches=len(micro_batches),
+            stage_executions=executions,
+            stage_busy_sec=busy,
+        )
+
+
+def _stage_process(connection, latency_ms: float):
+    """Stage worker process: busy for latency_ms per micro-batch item."""
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+        num_items = message
+        # Stand-in for a stage's layers: hold the stage for its latency
+        time.sleep(latency_ms * num_items / 1000.0)
+        connection.send(num_items)
+    connection.close()
+
+
+class ProcessStage:
+    """A stage served by a local worker process."""
+
+    def __init__(self, stage_id: str, latency_ms: float):
+        self.stage_id = stage_id
+        self.connection, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_stage_process, args=(child, latency_ms), daemon=True
+        )
+        self.process.start()
+        child.close()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def _call(self, num_items: int) -> int:
+        self.connection.send(num_items)
+        return self.connection.recv()
+
+    async def execute(self, micro_batch: MicroBatch):
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(self._executor, self._call, len(micro_batch.items))
+
+    def close(self):
+        try:
+            self.connection.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=5)
+        self._executor.shutdown(wait=False)
+
+
+def benchmark_pipeline(
+    stage_latencies_ms: Optional[List[float]] = None,
+    num_requests: int = 16,
+    micro_batch_size: int = 2,
+    decode_steps: int = 4,
+) -> Dict[str, Any]:
+    """
+    Measure the micro-batch scheduler on local multi-process stage workers
+    against the simulator's prediction and a one-request-at-a-time run.
+
+    Args:
+        stage_latencies_ms: Per-item latency of each stage
+        num_requests: Concurrent requests
+        micro_batch_size: Requests per micro-batch
+        decode_steps: Pipeline passes per request
+
+    Returns:
+        Measured and predicted makespan, throughput and bubble fraction
+    """
+    from ..simulator.core import predict_pipeline
+
+    stage_latencies_ms = stage_latencies_ms or [10.0, 10.0, 10.0, 10.0]
+    stage_ids = [f"stage_{i}" for i in range(len(stage_latencies_ms))]
+    workers = {
+        stage_id: ProcessStage(stage_id, latency)
+        for stage_id, latency in zip(stage_ids, stage_latencies_ms)
+    }
+
+    async def execute_stage(stage_id: str, micro_batch: MicroBatch):
+        await workers[stage_id].execute(micro_batch)
+
+    def on_complete(micro_batch: MicroBatch) -> bool:
+        return micro_batch.passes < decode_steps
+
+    async def run(size: int) -> PipelineStats:
+        scheduler = PipelineScheduler(stage_ids, execute_stage, on_complete)
+        return await scheduler.run(split_micro_batches(list(range(num_requests)), size))
+
+    async def run_sequential():
+        # One request at a time through all stages, as the coordinator did
+        micro_batch = MicroBatch(micro_batch_id=0, items=[0])
+        for _ in range(num_requests * decode_steps):
+            for stage_id in stage_ids:
+                await execute_stage(stage_id, micro_batch)
+
+    try:
+        sequential_start = time.perf_counter()
+        asyncio.run(run_sequential())
+        sequential_sec = time.perf_counter() - sequential_start
+
+        stats = asyncio.run(run(micro_batch_size))
+    finally:
+        for worker in workers.values():
+            worker.close()
+
+    num_micro_batches = -(-num_requests // micro_batch_size)
+    prediction = predict_pipeline(
+        [latency * micro_batch_size for latency in stage_latencies_ms],
+        num_micro_batches=num_micro_batches,
+        passes=decode_steps,
+    )
+
+    return {
+        'measured': stats.to_dict(),
+        'measured_throughput_rps': num_requests * decode_steps / stats.makespan_sec,
+        'sequential_throughput_rps': num_requests * decode_steps / sequential_sec,
+        'predicted': prediction,
+        'predicted_throughput_rps': prediction['throughput_per_sec'] * micro_batch_size,
+        'prediction_error': (
+            stats.makespan_sec * 1000 - prediction['makespan_ms']
+        ) / prediction['makespan_ms'],
+    }
+
@@ -24,6 +24,12 @@ service StageService {
   // Close and cleanup session
   rpc CloseSession(CloseSessionRequest) returns (CloseSessionResponse);
 
+  // Drop a session's KV cache, keeping the session
+  rpc EvictCache(EvictCacheRequest) returns (EvictCacheResponse);
+
+  // Prepare layers for the next layout generation in the background
+  rpc StageLayers(StageLayersRequest) returns (StageLayersResponse);
+
   // Health check
   rpc Ping(PingRequest) returns (PingResponse);
 
@@ -61,6 +67,12 @@ message ExecuteForwardRequest {
   uint32 token_index = 2;
   TensorData input_activations = 3;
   repeated uint32 stage_ids = 4;
+  // Positions already in the KV cache; input covers only the rest
+  uint32 past_length = 5;
+  bool use_cache = 6;
+  // Layers of this stage in the given layout generation
+  repeated string layer_names = 7;
+  uint32 generation = 8;
 }
 
 message ExecuteForwardResponse {
@@ -68,6 +80,30 @@ message ExecuteForwardResponse {
   string error_message = 2;
   TensorData output_activations = 3;
   ExecutionMetadata metadata = 4;
+  // KV cache did not hold past_length positions; resend the full sequence
+  bool cache_miss = 5;
+}
+
+message EvictCacheRequest {
+  string session_id = 1;
+}
+
+message EvictCacheResponse {
+  bool success = 1;
+  string error_message = 2;
+  uint64 freed_bytes = 3;
+}
+
+message StageLayersRequest {
+  string stage_id = 1;
+  repeated string layer_names = 2;
+  uint32 generation = 3;
+}
+
+message StageLayersResponse {
+  bool success = 1;
+  string error_message = 2;
+  uint32 staged_layers = 3;
 }
 
 // Node capabilities
@@ -91,11 +127,17 @@ message StageConfig {
   bool enable_kv_cache = 4;
 }
 
+// Raw contiguous tensor bytes; no pickling
 message TensorData {
   string dtype = 1;
   repeated uint32 shape = 2;
   bytes data = 3;
   uint64 num_bytes = 4;
+  repeated int64 strides = 5;
+  // Dtype of data when quantized for transfer (fp16/int8), else dtype
+  string wire_dtype = 6;
+  double scale = 7;
+  string quantization = 8;
 }
 
 message ExecutionMetadata {
@@ -104,6 +146,7 @@ message ExecutionMetadata {
   float peak_memory_mb = 3;
   string device = 4;
   uint32 stage_index = 5;
+  float kv_cache_mb = 6;
 }
 
 message NodeInfo {
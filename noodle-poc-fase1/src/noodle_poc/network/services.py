@@ -8,6 +8,8 @@ __all__ = [
     'MetricsCollector',
     'serialize_tensor',
     'deserialize_tensor',
+    'pack_tensor',
+    'unpack_tensor',
 ]
 
 from .utils import (
@@ -16,6 +18,8 @@ from .utils import (
     MetricsCollector,
     serialize_tensor,
     deserialize_tensor,
+    pack_tensor,
+    unpack_tensor,
     NodeInfo,
     HardwareInfo,
     ExecutionMetadata,
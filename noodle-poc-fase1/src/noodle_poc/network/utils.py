@@ -5,11 +5,12 @@ Includes serialization, deserialization, and data structures.
 
 import torch
 import numpy as np
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from dataclasses import dataclass
 from datetime import datetime
-import pickle
 import json
+import struct
+import warnings
 
 
 @dataclass
@@ -40,6 +41,7 @@ class ExecutionMetadata:
     peak_memory_mb: float = 0.0
     device: str = "cpu"
     stage_index: int = 0
+    kv_cache_mb: float = 0.0
 
 
 @dataclass
@@ -91,43 +93,93 @@ class InferenceMetrics:
         return f"Inference(request_id={self.request_id}, latency={self.total_latency_ms:.2f}ms)"
 
 
-def serialize_tensor(tensor: torch.Tensor) -> Dict[str, Any]:
+# Wire format: HEADER_STRUCT, then ndim shape and ndim stride int64s,
+# then the tensor's contiguous bytes
+WIRE_MAGIC = b'NTW1'
+HEADER_STRUCT = struct.Struct('<4sBBBBd')  # magic, dtype, wire dtype, quantization, ndim, scale
+
+WIRE_DTYPES = {
+    'float32': torch.float32,
+    'float64': torch.float64,
+    'float16': torch.float16,
+    'bfloat16': torch.bfloat16,
+    'int64': torch.int64,
+    'int32': torch.int32,
+    'int16': torch.int16,
+    'int8': torch.int8,
+    'uint8': torch.uint8,
+    'bool': torch.bool,
+}
+_DTYPE_NAMES = {dtype: name for name, dtype in WIRE_DTYPES.items()}
+_DTYPE_CODES = {name: code for code, name in enumerate(WIRE_DTYPES)}
+_CODE_DTYPES = {code: name for name, code in _DTYPE_CODES.items()}
+
+# On-the-wire quantization of floating point activations
+QUANTIZATION_MODES = (None, 'fp16', 'int8')
+
+
+def _quantize(tensor: torch.Tensor, quantization: Optional[str]) -> Tuple[torch.Tensor, float]:
+    """Reduce a floating point tensor for transfer; returns (wire tensor, scale)."""
+    if quantization not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown quantization: {quantization}")
+    if quantization is None or not tensor.is_floating_point():
+        return tensor, 1.0
+
+    if quantization == 'fp16':
+        return tensor.to(torch.float16), 1.0
+
+    # Symmetric per-tensor int8
+    max_abs = float(tensor.abs().max()) if tensor.numel() else 0.0
+    scale = max_abs / 127.0 if max_abs > 0 else 1.0
+    quantized = torch.clamp(torch.round(tensor / scale), -127, 127).to(torch.int8)
+    return quantized, scale
+
+
+def _tensor_bytes(tensor: torch.Tensor) -> memoryview:
+    """Raw bytes of a contiguous CPU tensor, without copying."""
+    if tensor.numel() == 0:
+        return memoryview(b'')
+    flat = tensor.reshape(-1).view(torch.uint8)
+    return memoryview(flat.numpy())
+
+
+def serialize_tensor(tensor: torch.Tensor, quantization: Optional[str] = None) -> Dict[str, Any]:
     """
     Serialize PyTorch tensor for network transmission.
 
+    The payload is a view of the tensor's contiguous bytes (no copy for
+    contiguous CPU tensors without quantization), described by dtype,
+    shape and strides. Floating point tensors can be sent as fp16 or int8
+    (with a scale) to cut stage-to-stage bandwidth.
+
     Args:
         tensor: PyTorch tensor to serialize
+        quantization: None, 'fp16' or 'int8'
 
     Returns:
         Dictionary with serialized data
     """
-    # Convert to numpy
-    numpy_array = tensor.cpu().detach().numpy()
-
-    # Get dtype string
-    dtype_map = {
-        'float32': 'float32',
-        'float64': 'float64',
-        'float16': 'float16',
-        'bfloat16': 'bfloat16',
-        'int64': 'int64',
-        'int32': 'int32',
-        'int16': 'int16',
-        'int8': 'int8',
-        'uint8': 'uint8',
-    }
+    tensor = tensor.detach()
+    if tensor.device.type != 'cpu':
+        tensor = tensor.cpu()
 
-    dtype_str = str(tensor.dtype).replace('torch.', '')
-    dtype_str = dtype_map.get(dtype_str, 'float32')
+    dtype_str = _DTYPE_NAMES.get(tensor.dtype)
+    if dtype_str is None:
+        raise ValueError(f"Unsupported tensor dtype: {tensor.dtype}")
 
-    # Serialize to bytes
-    data_bytes = pickle.dumps(numpy_array, protocol=pickle.HIGHEST_PROTOCOL)
+    wire_tensor, scale = _quantize(tensor, quantization)
+    wire_tensor = wire_tensor.contiguous()
+    data = _tensor_bytes(wire_tensor)
 
     return {
         'dtype': dtype_str,
-        'shape': list(tensor.shape),
-        'data': data_bytes,
-        'num_bytes': len(data_bytes),
+        'wire_dtype': _DTYPE_NAMES[wire_tensor.dtype],
+        'shape': list(wire_tensor.shape),
+        'strides': list(wire_tensor.stride()),
+        'scale': scale,
+        'quantization': quantization if wire_tensor.dtype != tensor.dtype else None,
+        'data': data,
+        'num_bytes': data.nbytes,
     }
 
 
@@ -135,32 +187,128 @@ def deserialize_tensor(tensor_data: Dict[str, Any]) -> torch.Tensor:
     """
     Deserialize tensor data from network.
 
+    Unquantized tensors share memory with tensor_data['data'] instead of
+    copying it; clone the result before modifying it in place if the
+    buffer is read-only.
+
     Args:
         tensor_data: Dictionary with serialized data
 
     Returns:
         PyTorch tensor
     """
-    # Deserialize numpy array
-    numpy_array = pickle.loads(tensor_data['data'])
-
-    # Convert to tensor
-    tensor = torch.from_numpy(numpy_array)
+    dtype = WIRE_DTYPES[tensor_data['dtype']]
+    wire_dtype = WIRE_DTYPES[tensor_data.get('wire_dtype', tensor_data['dtype'])]
+    shape = [int(dim) for dim in tensor_data['shape']]
+    strides = tensor_data.get('strides')
+
+    strides = [int(stride) for stride in strides] if strides else _contiguous_strides(shape)
+
+    if any(dim == 0 for dim in shape):
+        tensor = torch.empty(shape, dtype=wire_dtype)
+    else:
+        # Elements spanned by the shape/strides
+        count = 1 + sum((dim - 1) * stride for dim, stride in zip(shape, strides))
+        with warnings.catch_warnings():
+            # Read-only buffers (bytes) are shared as-is; see docstring
+            warnings.filterwarnings('ignore', message='The given buffer is not writable')
+            tensor = torch.frombuffer(tensor_data['data'], dtype=wire_dtype, count=count)
+        tensor = torch.as_strided(tensor, shape, strides)
+
+    # Undo on-the-wire quantization
+    if wire_dtype != dtype:
+        tensor = tensor.to(dtype)
+        scale = float(tensor_data.get('scale', 1.0))
+        if scale != 1.0:
+            tensor = tensor * scale
 
     return tensor
 
 
+def _contiguous_strides(shape: List[int]) -> List[int]:
+    strides = []
+    stride = 1
+    for dim in reversed(shape):
+        strides.append(stride)
+        stride *= max(dim, 1)
+    return list(reversed(strides))
+
+
+def pack_tensor(tensor: torch.Tensor, quantization: Optional[str] = None) -> List[Any]:
+    """
+    Encode a tensor as wire frames: a small header, then the raw bytes.
+
+    Send the frames back to back (e.g. socket.sendmsg or writer.writelines)
+    so the payload is never copied into a combined buffer.
+
+    Returns:
+        [header bytes, payload memoryview]
+    """
+    tensor_data = serialize_tensor(tensor, quantization)
+    shape = tensor_data['shape']
+    header = HEADER_STRUCT.pack(
+        WIRE_MAGIC,
+        _DTYPE_CODES[tensor_data['dtype']],
+        _DTYPE_CODES[tensor_data['wire_dtype']],
+        QUANTIZATION_MODES.index(tensor_data['quantization']),
+        len(shape),
+        tensor_data['scale'],
+    ) + struct.pack(f'<{2 * len(shape)}q', *shape, *tensor_data['strides'])
+    return [header, tensor_data['data']]
+
+
+def unpack_tensor(buffer) -> torch.Tensor:
+    """
+    Decode a tensor from a buffer holding pack_tensor() frames.
+
+    The result shares memory with buffer when no quantization was used.
+    """
+    view = memoryview(buffer)
+    magic, dtype_code, wire_code, quantization_code, ndim, scale = HEADER_STRUCT.unpack_from(view, 0)
+    if magic != WIRE_MAGIC:
+        raise ValueError("Not a tensor frame")
+
+    offset = HEADER_STRUCT.size
+    dims = struct.unpack_from(f'<{2 * ndim}q', view, offset)
+    offset += 16 * ndim
+
+    return deserialize_tensor({
+        'dtype': _CODE_DTYPES[dtype_code],
+        'wire_dtype': _CODE_DTYPES[wire_code],
+        'shape': list(dims[:ndim]),
+        'strides': list(dims[ndim:]),
+        'scale': scale,
+        'quantization': QUANTIZATION_MODES[quantization_code],
+        'data': view[offset:],
+    })
+
+
 def create_forward_request(
     session_id: str,
     token_index: int,
     tensor: torch.Tensor,
+    past_length: int = 0,
+    use_cache: bool = False,
+    quantization: Optional[str] = None,
+    layer_names: Optional[list] = None,
+    generation: int = 0,
 ) -> Dict[str, Any]:
-    """Create forward request structure."""
+    """
+    Create forward request structure.
+
+    With use_cache, tensor holds only the positions after past_length;
+    the worker takes the earlier ones from its KV cache. layer_names and
+    generation tell the worker which layout the step belongs to.
+    """
     return {
         'session_id': session_id,
         'token_index': token_index,
-        'input_activations': serialize_tensor(tensor),
+        'input_activations': serialize_tensor(tensor, quantization),
         'stage_ids': [],  # Would be populated by coordinator
+        'past_length': past_length,
+        'use_cache': use_cache,
+        'layer_names': layer_names,
+        'generation': generation,
     }
 
 
@@ -0,0 +1,224 @@
+"""
+Lazy per-layer weight loading for stage workers.
+Reads only the requested layers from memory-mapped safetensors files and
+keeps converted per-layer shards in an on-disk cache for fast restarts.
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import torch
+import torch.nn as nn
+
+WEIGHTS_FILE = "model.safetensors"
+WEIGHTS_INDEX_FILE = "model.safetensors.index.json"
+
+DTYPES = {
+    'fp32': torch.float32,
+    'fp16': torch.float16,
+    'bf16': torch.bfloat16,
+}
+
+
+@contextmanager
+def meta_parameters():
+    """
+    Build modules with parameters on the meta device.
+
+    Buffers stay real, so masks and rotary tables computed in __init__
+    survive; only parameters (the bulk of the memory) are skipped.
+    """
+    original = nn.Module.register_parameter
+
+    def register(module, name, param):
+        original(module, name, param)
+        if param is not None:
+            module._parameters[name] = nn.Parameter(
+                param.to('meta'), requires_grad=param.requires_grad
+            )
+
+    nn.Module.register_parameter = register
+    try:
+        yield
+    finally:
+        nn.Module.register_parameter = original
+
+
+class SafetensorsCheckpoint:
+    """Tensor name -> shard file over a (possibly sharded) safetensors checkpoint."""
+
+    def __init__(self, model_dir: Path):
+        self.model_dir = Path(model_dir)
+        index_path = self.model_dir / WEIGHTS_INDEX_FILE
+        single_path = self.model_dir / WEIGHTS_FILE
+
+        if index_path.exists():
+            with open(index_path) as f:
+                self.weight_map: Dict[str, str] = json.load(f)['weight_map']
+        elif single_path.exists():
+            from safetensors import safe_open
+
+            with safe_open(str(single_path), framework='pt') as f:
+                self.weight_map = {name: WEIGHTS_FILE for name in f.keys()}
+        else:
+            raise FileNotFoundError(f"No safetensors weights in {self.model_dir}")
+
+        self.files = sorted(set(self.weight_map.values()))
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.weight_map
+
+    def read(self, names: Iterable[str]) -> Dict[str, torch.Tensor]:
+        """Read tensors, touching only their byte ranges of the mapped files."""
+        from safetensors import safe_open
+
+        by_file: Dict[str, List[str]] = {}
+        for name in names:
+            by_file.setdefault(self.weight_map[name], []).append(name)
+
+        tensors = {}
+        for file_name, file_names in by_file.items():
+            with safe_open(str(self.model_dir / file_name), framework='pt') as f:
+                for name in file_names:
+                    tensors[name] = f.get_tensor(name)
+        return tensors
+
+    def fingerprint(self) -> str:
+        """Identity of the checkpoint files (names, sizes, mtimes)."""
+        digest = hashlib.sha1()
+        for file_name in self.files:
+            stat = os.stat(self.model_dir / file_name)
+            digest.update(f"{file_name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+        return digest.hexdigest()[:16]
+
+
+class LayerWeightStore:
+    """
+    Builds individual layers of a model from its safetensors checkpoint.
+
+    The architecture is instantiated once with meta parameters, so it costs
+    no weight memory. load(layer_name) copies that layer's skeleton and
+    fills in its tensors, read either from the per-layer shard cache or
+    from the checkpoint (then written to the cache, already converted to
+    the target dtype).
+    """
+
+    def __init__(
+        self,
+        model_dir: Path,
+        device: torch.device,
+        dtype: Optional[torch.dtype] = None,
+        cache_dir: Optional[Path] = None,
+    ):
+        from transformers import AutoConfig, AutoModelForCausalLM
+
+        self.model_dir = Path(model_dir)
+        self.device = device
+        self.dtype = dtype
+        self.checkpoint = SafetensorsCheckpoint(self.model_dir)
+        self.logger = logging.getLogger("LayerWeightStore")
+
+        config = AutoConfig.from_pretrained(self.model_dir)
+        with meta_parameters():
+            self.skeleton = AutoModelForCausalLM.from_config(config)
+        self.modules = dict(self.skeleton.named_modules())
+
+        # Checkpoints often drop the base model prefix (e.g. 'transformer.')
+        self.prefix = f"{self.skeleton.base_model_prefix}."
+        self.tied: Dict[str, str] = {}
+        if getattr(config, 'tie_word_embeddings', False):
+            names = {id(module): name for name, module in self.modules.items()}
+            output = self.skeleton.get_output_embeddings()
+            input_ = self.skeleton.get_input_embeddings()
+            if output is not None and input_ is not None:
+                self.tied[f"{names[id(output)]}.weight"] = f"{names[id(input_)]}.weight"
+
+        self.cache_dir = None
+        if cache_dir is not None:
+            dtype_name = str(dtype).replace('torch.', '') if dtype else 'native'
+            self.cache_dir = Path(cache_dir) / f"{self.checkpoint.fingerprint()}-{dtype_name}"
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def has_layer(self, layer_name: str) -> bool:
+        return bool(layer_name) and layer_name in self.modules
+
+    def _checkpoint_key(self, name: str) -> Optional[str]:
+        for candidate in (name, self.tied.get(name)):
+            if candidate is None:
+                continue
+            if candidate in self.checkpoint:
+                return candidate
+            if candidate.startswith(self.prefix) and candidate[len(self.prefix):] in self.checkpoint:
+                return candidate[len(self.prefix):]
+        return None
+
+    def _tensor_names(self, module: nn.Module) -> List[str]:
+        """Parameters and persistent buffers of a module, relative to it."""
+        names = [name for name, _ in module.named_parameters()]
+        for owner_name, owner in module.named_modules():
+            for buffer_name in owner._buffers:
+                if buffer_name not in owner._non_persistent_buffers_set:
+                    names.append(f"{owner_name}.{buffer_name}" if owner_name else buffer_name)
+        return names
+
+    def _read_checkpoint(self, layer_name: str, names: List[str], parameters: set) -> Dict[str, torch.Tensor]:
+        keys = {}
+        for name in names:
+            key = self._checkpoint_key(f"{layer_name}.{name}")
+            if key is not None:
+                keys[name] = key
+            elif name in parameters:
+                raise KeyError(f"No weights for {layer_name}.{name} in {self.model_dir}")
+
+        stored = self.checkpoint.read(set(keys.values()))
+        tensors = {}
+        for name, key in keys.items():
+            tensor = stored[key]
+            if self.dtype is not None and tensor.is_floating_point():
+                tensor = tensor.to(self.dtype)
+            tensors[name] = tensor.contiguous()
+        return tensors
+
+    def _cache_path(self, layer_name: str) -> Optional[Path]:
+        if self.cache_dir is None:
+            return None
+        return self.cache_dir / f"{layer_name}.safetensors"
+
+    def load(self, layer_name: str) -> nn.Module:
+        """Materialize one layer on the device."""
+        from safetensors.torch import load_file, save_file
+
+        if not self.has_layer(layer_name):
+            raise KeyError(f"Unknown layer: {layer_name}")
+
+        module = copy.deepcopy(self.modules[layer_name])
+        names = self._tensor_names(module)
+        parameters = {name for name, _ in module.named_parameters()}
+
+        cache_path = self._cache_path(layer_name)
+        if cache_path is not None and cache_path.exists():
+            tensors = load_file(str(cache_path))
+        else:
+            tensors = self._read_checkpoint(layer_name, names, parameters)
+            if cache_path is not None:
+                # Write then rename so a crashed worker never leaves half a shard
+                partial = cache_path.with_suffix('.partial')
+                save_file(tensors, str(partial))
+                os.replace(partial, cache_path)
+
+        for name, tensor in tensors.items():
+            owner_name, _, leaf = name.rpartition('.')
+            owner = module.get_submodule(owner_name) if owner_name else module
+            tensor = tensor.to(self.device)
+            if name in parameters:
+                owner._parameters[leaf] = nn.Parameter(tensor, requires_grad=False)
+            else:
+                owner._buffers[leaf] = tensor
+
+        return module.to(self.device).eval()
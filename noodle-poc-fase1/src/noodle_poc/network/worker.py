@@ -5,7 +5,7 @@ Handles gRPC requests, model execution, and session management.
 
 import asyncio
 import logging
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Any
 from dataclasses import dataclass, field
 from datetime import datetime
 import uuid
@@ -17,6 +17,8 @@ import torch
 import torch.nn as nn
 
 from . import utils
+from .kv_cache import BlockSignature, SessionKVCache
+from .weights import DTYPES, LayerWeightStore
 
 
 @dataclass
@@ -30,9 +32,17 @@ class WorkerConfig:
     device: str = "cpu"
     max_concurrent_sessions: int = 10
     model_dir: Optional[str] = None  # Directory with model weights
+    model_name: str = "gpt2"  # Downloaded when model_dir is not set
+    lazy_weights: bool = True  # Load only requested layers from safetensors
+    weight_cache_dir: Optional[str] = None  # Per-layer shard cache (default ~/.cache/noodle/layers)
+    weight_dtype: Optional[str] = None  # 'fp32', 'fp16' or 'bf16'; converted once into the cache
+    assigned_layers: Optional[List[str]] = None  # Loaded at startup and never unloaded
     enable_profiling: bool = True
     log_level: str = "INFO"
     heartbeat_interval_sec: float = 5.0
+    max_kv_cache_mb: float = 2048.0  # KV cache budget across sessions
+    kv_cache_idle_sec: float = 300.0  # Evict caches of sessions idle this long
+    activation_quantization: Optional[str] = None  # None, 'fp16' or 'int8' on the wire
 
 
 class StageWorkerService:
@@ -57,13 +67,25 @@ class StageWorkerService:
         # Model and session state
         self.model: Optional[nn.Module] = None
         self.device = torch.device(self.config.device)
-        self.layers_assigned: Dict[str, nn.Module] = {}
+        self.layers_assigned: Dict[str, nn.Module] = {}  # Resident layers
+        self.layer_refs: Dict[str, int] = {}  # Sessions using each resident layer
+        self.pinned_layers: set = set()  # Resident even without sessions
+        self.weight_store: Optional[LayerWeightStore] = None
         self.active_sessions: Dict[str, SessionContext] = {}
 
         # Metrics
         self.metrics = utils.MetricsCollector()
         self.total_requests = 0
         self.total_latency_ms = 0.0
+        self.kv_cache_evictions = 0
+
+        # Requests and latency since the last heartbeat, for the re-planner
+        self._window_requests = 0
+        self._window_latency_ms = 0.0
+
+        # Stage -> (generation, layers) staged ahead of a layout switch
+        self.staged_layouts: Dict[str, tuple] = {}
+        self._block_signatures: Dict[str, BlockSignature] = {}
 
         # Coordinator client
         self.coordinator_client: Optional[CoordinatorClient] = None
@@ -112,7 +134,7 @@ class StageWorkerService:
 
             # Validate layer assignment
             for layer_name in layer_names:
-                if layer_name not in self.layers_assigned:
+                if not self._layer_available(layer_name):
                     return CreateSessionResponse(
                         success=False,
                         error_message=f"Layer not available: {layer_name}"
@@ -151,9 +173,24 @@ class StageWorkerService:
         session_id: str,
         token_index: int,
         input_activations,
-        stage_ids: list
+        stage_ids: list,
+        past_length: int = 0,
+        use_cache: bool = False,
+        layer_names: Optional[list] = None,
+        generation: int = 0
     ) -> 'ExecuteForwardResponse':
-        """Execute forward pass on assigned layers."""
+        """
+        Execute forward pass on assigned layers.
+
+        With use_cache, input_activations cover only the positions after
+        past_length; earlier positions come from the session's KV cache.
+        past_length 0 starts a new sequence (prefill). If the cache does not
+        hold exactly past_length positions (e.g. it was evicted), the
+        response has cache_miss set and the caller must prefill again.
+
+        layer_names with a newer generation than the session's switches the
+        session to that (staged) layer list first; its KV cache is dropped.
+        """
         start_time = time.time()
 
         try:
@@ -167,6 +204,23 @@ class StageWorkerService:
                 )
 
             context = self.active_sessions[session_id]
+            context.last_access = datetime.now()
+
+            if layer_names is not None and generation > context.generation:
+                self._switch_session_layers(context, layer_names, generation)
+
+            if use_cache:
+                if past_length == 0:
+                    context.kv_cache.clear()
+                elif context.kv_cache.seq_len != past_length:
+                    return ExecuteForwardResponse(
+                        success=False,
+                        cache_miss=True,
+                        error_message=(
+                            f"KV cache holds {context.kv_cache.seq_len} positions, "
+                            f"expected {past_length}"
+                        )
+                    )
 
             # Deserialize input
             input_tensor = utils.deserialize_tensor(input_activations)
@@ -179,19 +233,25 @@ class StageWorkerService:
             output_tensor = await self._execute_layers(
                 context.layer_names,
                 input_tensor,
-                context
+                context,
+                use_cache=use_cache
             )
 
+            if use_cache:
+                self._enforce_kv_cache_budget(keep_session_id=session_id)
+
             # Calculate metrics
             forward_latency_ms = (time.time() - start_time) * 1000
             self.total_latency_ms += forward_latency_ms
+            self._window_requests += 1
+            self._window_latency_ms += forward_latency_ms
 
             peak_memory_mb = 0.0
             if self.device.type == 'cuda':
                 peak_memory_mb = torch.cuda.max_memory_allocated() / (1024 ** 2)
 
             # Serialize output
-            output_data = utils.serialize_tensor(output_tensor.cpu())
+            output_data = utils.serialize_tensor(output_tensor.cpu(), self.config.activation_quantization)
 
             return ExecuteForwardResponse(
                 success=True,
@@ -201,6 +261,7 @@ class StageWorkerService:
                     peak_memory_mb=peak_memory_mb,
                     device=str(self.device),
                     stage_index=0,  # Would be actual stage index
+                    kv_cache_mb=context.kv_cache.nbytes / (1024 ** 2),
                 )
             )
 
@@ -211,6 +272,64 @@ class StageWorkerService:
                 error_message=str(e)
             )
 
+    async def StageLayers(
+        self,
+        stage_id: str,
+        layer_names: list,
+        generation: int
+    ) -> 'StageLayersResponse':
+        """
+        Prepare layers for a future layout generation without pausing sessions.
+
+        Moving modules to the device runs in a thread so forward passes keep
+        being served; sessions pick the layers up on their first request of
+        the new generation.
+        """
+        try:
+            missing = [name for name in layer_names if not self._layer_available(name)]
+            if missing:
+                return StageLayersResponse(success=False, error_message=f"Layers not available: {missing}")
+
+            await asyncio.to_thread(self._materialize_layers, layer_names)
+
+            # Staged layers stay resident until the stage is restaged
+            previous = self.staged_layouts.get(stage_id)
+            self.staged_layouts[stage_id] = (generation, list(layer_names))
+            self.pinned_layers.update(layer_names)
+            if previous is not None:
+                self._unpin_layers(set(previous[1]) - set(layer_names))
+
+            self.logger.info(f"Staged {len(layer_names)} layers of {stage_id} for generation {generation}")
+            return StageLayersResponse(success=True, staged_layers=len(layer_names))
+
+        except Exception as e:
+            self.logger.error(f"StageLayers error: {e}")
+            return StageLayersResponse(success=False, error_message=str(e))
+
+    def _materialize_layers(self, layer_names: list):
+        """Make sure every layer's parameters live on this worker's device."""
+        for name in layer_names:
+            module = self.layers_assigned.get(name)
+            if module is None:
+                self.layers_assigned[name] = self.weight_store.load(name)
+            elif any(param.device != self.device for param in module.parameters()):
+                self.layers_assigned[name] = module.to(self.device)
+
+    def _switch_session_layers(self, context: 'SessionContext', layer_names: list, generation: int):
+        """Point a session at a new layer list; cached keys/values no longer line up."""
+        missing = [name for name in layer_names if name not in self.layers_assigned]
+        if missing:
+            raise RuntimeError(f"Generation {generation} layers not staged: {missing}")
+
+        self._evict_kv_cache(context)
+        previous = list(context.layers)
+        context.layer_names = list(layer_names)
+        context.layers = {name: self._acquire_layer(name) for name in layer_names}
+        for name in previous:
+            self._release_layer(name)
+        context.generation = generation
+        self.logger.info(f"Session {context.session_id} switched to generation {generation}")
+
     async def CloseSession(self, session_id: str) -> 'CloseSessionResponse':
         """Close and cleanup session."""
         try:
@@ -218,6 +337,8 @@ class StageWorkerService:
                 context = self.active_sessions[session_id]
 
                 # Cleanup KV cache if exists
+                for layer_name in context.layers:
+                    self._release_layer(layer_name)
                 context.cleanup()
 
                 del self.active_sessions[session_id]
@@ -231,6 +352,61 @@ class StageWorkerService:
             self.logger.error(f"CloseSession error: {e}")
             return CloseSessionResponse(success=False, error_message=str(e))
 
+    async def EvictCache(self, session_id: str) -> 'EvictCacheResponse':
+        """Drop a session's KV cache but keep the session."""
+        context = self.active_sessions.get(session_id)
+        if context is None:
+            return EvictCacheResponse(success=True, error_message="Session not found")
+
+        freed_bytes = self._evict_kv_cache(context)
+        self.logger.info(f"Evicted KV cache of session {session_id} ({freed_bytes / 1024 ** 2:.1f} MB)")
+        return EvictCacheResponse(success=True, freed_bytes=freed_bytes)
+
+    def get_kv_cache_bytes(self) -> int:
+        """Total KV cache memory across sessions."""
+        return sum(context.kv_cache.nbytes for context in self.active_sessions.values())
+
+    def _evict_kv_cache(self, context: 'SessionContext') -> int:
+        """Clear one session's KV cache and return the bytes freed."""
+        if context.kv_cache.seq_len == 0:
+            return 0
+        context.kv_cache.evictions += 1
+        self.kv_cache_evictions += 1
+        return context.kv_cache.clear()
+
+    def _enforce_kv_cache_budget(self, keep_session_id: Optional[str] = None):
+        """Evict least recently used caches until the total fits max_kv_cache_mb."""
+        budget_bytes = self.config.max_kv_cache_mb * 1024 ** 2
+        total = self.get_kv_cache_bytes()
+        if total <= budget_bytes:
+            return
+
+        candidates = sorted(
+            (c for sid, c in self.active_sessions.items() if sid != keep_session_id and c.kv_cache.nbytes),
+            key=lambda c: c.kv_cache.last_access
+        )
+        for context in candidates:
+            if total <= budget_bytes:
+                break
+            total -= self._evict_kv_cache(context)
+            self.logger.info(f"Evicted KV cache of session {context.session_id} (over budget)")
+
+    def evict_idle_kv_caches(self, max_idle_sec: Optional[float] = None) -> int:
+        """
+        Evict KV caches of sessions idle longer than max_idle_sec.
+
+        Returns:
+            Number of caches evicted
+        """
+        max_idle_sec = self.config.kv_cache_idle_sec if max_idle_sec is None else max_idle_sec
+        now = time.time()
+        evicted = 0
+        for context in self.active_sessions.values():
+            if context.kv_cache.nbytes and now - context.kv_cache.last_access > max_idle_sec:
+                self._evict_kv_cache(context)
+                evicted += 1
+        return evicted
+
     async def Ping(self, message: str) -> 'PingResponse':
         """Health check."""
         return PingResponse(
@@ -258,18 +434,35 @@ class StageWorkerService:
             props = torch.cuda.get_device_properties(self.device)
             self.logger.info(f"CUDA device: {props.name} ({props.total_memory / 1024**3:.1f} GB)")
 
-        # Load base model (simplified: loads full model, would load only assigned layers)
+        # Load assigned layers (or the full model without a safetensors checkpoint)
         await self._load_base_model()
 
     async def _load_base_model(self):
-        """Load base model architecture."""
-        # Placeholder: In production, would load specific layers
-        # For now, we'll load the full model and select layers dynamically
+        """
+        Prepare layer weights.
+
+        With lazy_weights and a safetensors checkpoint, only the assigned
+        layers are loaded now and the rest on first use; otherwise the full
+        model is loaded.
+        """
+        store = await asyncio.to_thread(self._open_weight_store) if self.config.lazy_weights else None
+
+        if store is not None:
+            self.weight_store = store
+            assigned = self.config.assigned_layers or []
+            await asyncio.to_thread(self._materialize_layers, assigned)
+            self.pinned_layers.update(assigned)
+            self.logger.info(
+                f"Lazy weights from {store.model_dir}: {len(assigned)} of "
+                f"{len(store.modules) - 1} layers loaded"
+            )
+            return
+
         self.logger.info("Loading base model architecture...")
 
         from transformers import GPT2LMHeadModel
 
-        model = GPT2LMHeadModel.from_pretrained("gpt2")
+        model = GPT2LMHeadModel.from_pretrained(self.config.model_dir or self.config.model_name)
         model = model.to(self.device)
         model.eval()
 
@@ -282,17 +475,84 @@ class StageWorkerService:
 
         self.logger.info(f"Loaded {len(self.layers_assigned)} layers")
 
+    def _open_weight_store(self) -> Optional[LayerWeightStore]:
+        """Weight store over the local or downloaded checkpoint, if it has safetensors."""
+        model_dir = self.config.model_dir
+        if model_dir is None:
+            from huggingface_hub import snapshot_download
+
+            model_dir = snapshot_download(
+                self.config.model_name, allow_patterns=["*.json", "*.safetensors"]
+            )
+
+        cache_dir = self.config.weight_cache_dir or Path.home() / ".cache" / "noodle" / "layers"
+        try:
+            return LayerWeightStore(
+                Path(model_dir),
+                self.device,
+                dtype=DTYPES.get(self.config.weight_dtype),
+                cache_dir=Path(cache_dir),
+            )
+        except FileNotFoundError as e:
+            self.logger.warning(f"{e}; loading the full model instead")
+            return None
+
+    def _layer_available(self, layer_name: str) -> bool:
+        """Whether a layer is resident or can be loaded on demand."""
+        return layer_name in self.layers_assigned or (
+            self.weight_store is not None and self.weight_store.has_layer(layer_name)
+        )
+
+    def _acquire_layer(self, layer_name: str) -> nn.Module:
+        """Shared module for a layer, loading it if needed; counts one reference."""
+        module = self.layers_assigned.get(layer_name)
+        if module is None:
+            module = self.weight_store.load(layer_name)
+            self.layers_assigned[layer_name] = module
+        self.layer_refs[layer_name] = self.layer_refs.get(layer_name, 0) + 1
+        return module
+
+    def _release_layer(self, layer_name: str):
+        """Drop one reference; lazily loaded layers nobody uses are unloaded."""
+        refs = self.layer_refs.get(layer_name, 0) - 1
+        if refs > 0:
+            self.layer_refs[layer_name] = refs
+            return
+        self.layer_refs.pop(layer_name, None)
+        self._unload_layer(layer_name)
+
+    def _unpin_layers(self, layer_names: set):
+        for layer_name in layer_names:
+            self.pinned_layers.discard(layer_name)
+            if not self.layer_refs.get(layer_name):
+                self._unload_layer(layer_name)
+
+    def _unload_layer(self, layer_name: str):
+        # Only layers the store can bring back are unloaded
+        if self.weight_store is None or layer_name in self.pinned_layers:
+            return
+        if self.layers_assigned.pop(layer_name, None) is not None:
+            self._block_signatures.pop(layer_name, None)
+            self.logger.debug(f"Unloaded layer {layer_name}")
+
     async def _load_session_layers(self, context: 'SessionContext'):
-        """Load specific layers for session."""
+        """Attach shared layer modules to a session, loading missing ones."""
         self.logger.info(f"Loading {len(context.layer_names)} layers for session {context.session_id}")
 
+        missing = [
+            name for name in context.layer_names
+            if name not in self.layers_assigned and self._layer_available(name)
+        ]
+        if missing:
+            await asyncio.to_thread(self._materialize_layers, missing)
+
         # Store session-specific layer references
         for layer_name in context.layer_names:
-            if layer_name not in self.layers_assigned:
+            if not self._layer_available(layer_name):
                 self.logger.warning(f"Layer {layer_name} not found, skipping")
                 continue
 
-            context.layers[layer_name] = self.layers_assigned[layer_name]
+            context.layers[layer_name] = self._acquire_layer(layer_name)
 
         self.logger.info(f"Loaded layers: {list(context.layers.keys())}")
 
@@ -300,14 +560,23 @@ class StageWorkerService:
         self,
         layer_names: list,
         input_tensor: torch.Tensor,
-        context: 'SessionContext'
+        context: 'SessionContext',
+        use_cache: bool = False
     ) -> torch.Tensor:
         """
         Execute forward pass through assigned layers.
 
-        This is the core execution logic.
+        This is the core execution logic. With use_cache, attention blocks
+        read and extend the session's KV cache and positions continue from
+        the cached length.
         """
         activations = input_tensor
+        if not activations.is_floating_point() and activations.dim() == 1:
+            # Token ids: add the batch dimension
+            activations = activations.unsqueeze(0)
+
+        past_length = context.kv_cache.seq_len if use_cache else 0
+        num_positions = activations.shape[1] if activations.dim() > 1 else activations.shape[0]
 
         with torch.no_grad():
             # Execute each layer sequentially: this is where the actual work happens
@@ -318,20 +587,82 @@ class StageWorkerService:
                     continue
 
                 try:
-                    if isinstance(layer, (nn.Linear, nn.LayerNorm)):
+                    signature = self._block_signature(layer_name, layer)
+
+                    if isinstance(layer, nn.Embedding) and activations.is_floating_point():
+                        # Position embeddings, offset by the cached positions
+                        positions = torch.arange(
+                            past_length, past_length + num_positions, device=activations.device
+                        )
+                        activations = activations + layer(positions)
+                    elif signature.is_cached_block:
+                        activations = self._execute_block(
+                            layer_name, layer, signature, activations, context, past_length, use_cache
+                        )
+                    elif isinstance(layer, nn.Linear) and activations.shape[-1] != layer.in_features:
                         # Matrices: reshape to expected shape
                         activations = activations.view(1, -1)
                         activations = layer(activations)
+                    elif isinstance(layer, nn.LayerNorm) and tuple(activations.shape[-1:]) != tuple(layer.normalized_shape):
+                        activations = activations.view(1, -1)
+                        activations = layer(activations)
                     else:
                         # Other layer types
                         activations = layer(activations)
 
                 except Exception as e:
                     self.logger.error(f"Layer error {layer_name}: {e}")
+                    if use_cache:
+                        # Earlier layers already cached these positions
+                        context.kv_cache.clear()
                     raise
 
+        if use_cache:
+            context.kv_cache.advance(num_positions)
+
         return activations
 
+    def _block_signature(self, layer_name: str, layer: nn.Module) -> BlockSignature:
+        """Inspect a layer's forward signature once."""
+        signature = self._block_signatures.get(layer_name)
+        if signature is None:
+            signature = BlockSignature(layer)
+            self._block_signatures[layer_name] = signature
+        return signature
+
+    def _execute_block(
+        self,
+        layer_name: str,
+        layer: nn.Module,
+        signature: BlockSignature,
+        activations: torch.Tensor,
+        context: 'SessionContext',
+        past_length: int,
+        use_cache: bool
+    ) -> torch.Tensor:
+        """Run an attention block, reading and extending the KV cache if enabled."""
+        kwargs = {}
+        if signature.accepts_use_cache:
+            kwargs['use_cache'] = use_cache
+
+        if use_cache:
+            if signature.uses_tuple_cache:
+                kwargs['layer_past'] = context.kv_cache.get(layer_name)
+            else:
+                kwargs[signature.cache_argument] = context.kv_cache.shared_cache()
+            if signature.accepts_cache_position:
+                kwargs['cache_position'] = torch.arange(
+                    past_length, past_length + activations.shape[1], device=activations.device
+                )
+
+        outputs = layer(activations, **kwargs)
+        if not isinstance(outputs, tuple):
+            return outputs
+
+        if use_cache and signature.uses_tuple_cache and len(outputs) > 1:
+            context.kv_cache.update(layer_name, outputs[1])
+        return outputs[0]
+
     async def _start_grpc_server(self):
         """Start gRPC server for coordinator communication."""
         self.logger.info(f"Starting gRPC server on {self.config.listen_host}:{self.config.listen_port}")
@@ -360,12 +691,18 @@ class StageWorkerService:
             try:
                 await asyncio.sleep(self.config.heartbeat_interval_sec)
 
+                evicted = self.evict_idle_kv_caches()
+                if evicted:
+                    self.logger.info(f"Evicted {evicted} idle KV caches")
+
                 if self.coordinator_client:
                     await self.coordinator_client.send_heartbeat(
                         self.config.worker_id,
                         len(self.active_sessions),
                         self._get_load_metrics()
                     )
+                self._window_requests = 0
+                self._window_latency_ms = 0.0
 
             except Exception as e:
                 self.logger.error(f"Heartbeat error: {e}")
@@ -415,6 +752,9 @@ class StageWorkerService:
         return {
             'active_sessions': len(self.active_sessions),
             'avg_latency_ms': self.total_latency_ms / self.total_requests if self.total_requests > 0 else 0.0,
+            'kv_cache_mb': self.get_kv_cache_bytes() / (1024 ** 2),
+            'recent_requests': self._window_requests,
+            'recent_latency_ms': self._window_latency_ms / self._window_requests if self._window_requests else 0.0,
             'requests_per_sec': self.total_requests / (time.time() - self.start_time) if hasattr(self, 'start_time') else 0.0,
         }
 
@@ -425,9 +765,18 @@ class StageWorkerService:
             'is_ready': self._is_ready,
             'active_sessions': len(self.active_sessions),
             'layers_assigned': list(self.layers_assigned.keys()),
+            'layer_refs': dict(self.layer_refs),
+            'lazy_weights': self.weight_store is not None,
             'total_requests': self.total_requests,
             'avg_latency_ms': self.total_latency_ms / self.total_requests if self.total_requests > 0 else 0.0,
             'device': str(self.device),
+            'kv_cache_mb': self.get_kv_cache_bytes() / (1024 ** 2),
+            'kv_cache_budget_mb': self.config.max_kv_cache_mb,
+            'kv_cache_evictions': self.kv_cache_evictions,
+            'kv_cache_sessions': {
+                session_id: context.kv_cache.get_stats()
+                for session_id, context in self.active_sessions.items()
+            },
         }
 
 
@@ -453,8 +802,11 @@ class SessionContext:
         # Layer storage
         self.layers: Dict[str, nn.Module] = {}
 
-        # KV cache (placeholder for Transformer models)
-        self.kv_cache: Optional[Dict[str, torch.Tensor]] = None
+        # Key/value cache of this stage's attention layers
+        self.kv_cache = SessionKVCache()
+
+        # Layout generation the layer list belongs to
+        self.generation = 0
 
         # Metadata
         self.created_at = datetime.now()
@@ -462,9 +814,7 @@ class SessionContext:
 
     def cleanup(self):
         """Cleanup session resources."""
-        if self.kv_cache:
-            self.kv_cache.clear()
-            self.kv_cache = None
+        self.kv_cache.clear()
 
         self.layers.clear()
 
@@ -478,11 +828,20 @@ class CreateSessionResponse:
 
 
 class ExecuteForwardResponse:
-    def __init__(self, success: bool, error_message: str = None, output_activations=None, metadata=None):
+    def __init__(self, success: bool, error_message: str = None, output_activations=None, metadata=None,
+                 cache_miss: bool = False):
         self.success = success
         self.error_message = error_message or ""
         self.output_activations = output_activations
         self.metadata = metadata
+        self.cache_miss = cache_miss
+
+
+class StageLayersResponse:
+    def __init__(self, success: bool, error_message: str = None, staged_layers: int = 0):
+        self.success = success
+        self.error_message = error_message or ""
+        self.staged_layers = staged_layers
 
 
 class CloseSessionResponse:
@@ -491,6 +850,13 @@ class CloseSessionResponse:
         self.error_message = error_message or ""
 
 
+class EvictCacheResponse:
+    def __init__(self, success: bool, error_message: str = None, freed_bytes: int = 0):
+        self.success = success
+        self.error_message = error_message or ""
+        self.freed_bytes = freed_bytes
+
+
 class PingResponse:
     def __init__(self, message: str, timestamp: str, node_version: str):
         self.message = message
@@ -11,9 +11,10 @@ from tqdm import tqdm
 import yaml
 import argparse
 import sys
+import time
 
 from .metrics import MetricsCollector, LayerMetrics
-from .hooks import ModelInstrumentor, instrument_transformer_blocks
+from .hooks import ModelInstrumentor, SamplingPolicy, instrument_transformer_blocks
 from .logger import StructuredLogger
 from .dashboard import DashboardGenerator
 
@@ -53,7 +54,7 @@ class ObservabilityEngine:
     def _setup_components(self):
         """Initialize internal components."""
         self.metrics_collector = MetricsCollector()
-        self.instrumentor = ModelInstrumentor(self.metrics_collector)
+        self.instrumentor = ModelInstrumentor(self.metrics_collector, self._sampling_policy())
         self.logger = StructuredLogger(
             log_dir=self.log_dir / "logs",
             log_level=self.config.get("log_level", "INFO")
@@ -63,6 +64,15 @@ class ObservabilityEngine:
         self.is_instrumented = False
         self.hook_handles: List[Any] = []
 
+    def _sampling_policy(self) -> Optional[SamplingPolicy]:
+        """Sampling policy for profiling_mode 'sampled' (None for 'full')."""
+        if self.config.get("profiling_mode", "full") != "sampled":
+            return None
+        return SamplingPolicy(
+            every_n=self.config.get("sample_every_n", 10),
+            adaptive=self.config.get("adaptive_sampling", False),
+        )
+
     def set_model(self, model: nn.Module):
         """Set the model to be profiled."""
         self.model = model
@@ -84,7 +94,7 @@ class ObservabilityEngine:
         self.instrumentor.instrument_model(target_model)
 
         # Strategy 2: Use specialized hooks for Transformers (faster, less overhead)
-        if self._is_transformer_model(target_model):
+        if self.instrumentor.sampling is None and self._is_transformer_model(target_model):
             self.logger.logger.info("Detected Transformer model - using specialized hooks")
             self.hook_handles = instrument_transformer_blocks(target_model, self.metrics_collector)
 
@@ -147,6 +157,7 @@ class ObservabilityEngine:
                     break
 
         self.metrics_collector.metrics_history.clear()  # Don't keep warmup metrics
+        self.instrumentor.reset_samples()
         self.logger.logger.info("✅ Warmup complete")
 
     def profile(
@@ -176,6 +187,7 @@ class ObservabilityEngine:
 
         self.model.eval()
         total_times = []
+        wall_time_ms = 0.0
 
         with torch.no_grad():
             for run_idx in tqdm(range(num_runs), desc=f"Profiling {profile_name}"):
@@ -188,6 +200,7 @@ class ObservabilityEngine:
                         start_time.record()
 
                     # Forward pass
+                    wall_start = time.perf_counter()
                     if isinstance(inputs, dict):
                         outputs = self.model(**inputs)
                     else:
@@ -195,6 +208,7 @@ class ObservabilityEngine:
 
                     if end_time:
                         end_time.record()
+                    wall_time_ms += (time.perf_counter() - wall_start) * 1000
 
                     # Synchronize and compute total time
                     if torch.cuda.is_available():
@@ -219,7 +233,8 @@ class ObservabilityEngine:
                     self.logger.logger.error(f"Profiling error on run {run_idx}: {e}")
                     break
 
-        # Final finalize
+        # Final finalize (sampled timings are only turned into metrics here)
+        self.instrumentor.flush()
         self.metrics_collector.finalize_batch()
 
         # Generate report
@@ -228,8 +243,15 @@ class ObservabilityEngine:
             'num_runs': num_runs,
             'total_layers': len(self.instrumentor.layer_mappings),
             'layer_summary': self.metrics_collector.get_summary(),
+            'instrumentation_overhead': self.instrumentor.get_overhead_report(wall_time_ms),
         }
 
+        overhead = report['instrumentation_overhead']
+        self.logger.logger.info(
+            f"⏱️ Instrumentation ({overhead['mode']}): {overhead['sampled_calls']}/{overhead['hook_calls']} "
+            f"calls timed, {overhead.get('overhead_pct', 0.0):.1f}% hook overhead"
+        )
+
         if total_times:
             report['end_to_end_latency'] = {
                 'mean_ms': sum(total_times) / len(total_times),
@@ -4,10 +4,11 @@ Analyzes observability metrics and generates optimal partition plans for distrib
 """
 
 from .core import ExecutionPlanner, PartitionPlan
-from .optimizer import PartitionOptimizer
+from .optimizer import PartitionOptimizer, StagePartition
 
 __all__ = [
     'ExecutionPlanner',
     'PartitionPlan',
     'PartitionOptimizer',
+    'StagePartition',
 ]
@@ -100,6 +100,9 @@ class ExecutionPlanner:
                 'vram_increase': latest_run.vram_increase,
                 'num_parameters': latest_run.num_parameters,
                 'parameter_size_mb': latest_run.parameter_size_mb,
+                'layer_index': latest_run.layer_index,
+                'output_shapes': latest_run.output_shapes,
+                'output_dtypes': latest_run.output_dtypes,
             })
 
         return cls(pd.DataFrame(metrics_data))
@@ -132,13 +135,21 @@ class ExecutionPlanner:
         df = pd.DataFrame(data)
 
         # Calculate summary stats per layer
-        layer_summary = df.groupby('layer_name').agg({
+        aggregations = {
             'forward_latency_ms': 'mean',
             'p95_latency_ms': 'mean',
             'peak_vram_after': 'max',
             'num_parameters': 'first',
             'parameter_size_mb': 'first',
-        }).reset_index()
+        }
+        # Keep execution order and tensor sizes for contiguous partitioning
+        for column in ('layer_index', 'output_shapes', 'output_dtypes'):
+            if column in df.columns:
+                aggregations[column] = 'first'
+
+        layer_summary = df.groupby('layer_name').agg(aggregations).reset_index()
+        if 'layer_index' in layer_summary.columns:
+            layer_summary = layer_summary.sort_values('layer_index', kind='stable')
 
         return cls(layer_summary)
 
@@ -153,37 +164,33 @@ class ExecutionPlanner:
                 - min_layers_per_stage: Min layers per stage (default: 1)
                 - target_stages: Specific number of stages to create
                 - latency_balance_threshold: Max variance in stage latency (default: 0.3)
+                - devices: HardwareCapability list or CapabilityMatcher, in pipeline
+                  order; stages then use each device's speed and memory limit
 
         Returns:
             PartitionPlan with optimized stage assignments
+
+        Raises:
+            ValueError: If the layers do not fit in the memory limits
         """
         constraints = constraints or {}
 
         # Extract constraints
         num_stages = constraints.get('num_stages', 3)
         max_memory_mb = constraints.get('max_memory_per_stage_mb', 8000)
-        balance_threshold = constraints.get('latency_balance_threshold', 0.3)
 
-        # Step 1: Filter layers by memory constraint
-        valid_layers = self.metrics[
-            (self.metrics['parameter_size_mb'] <= max_memory_mb) |
-            (self.metrics['parameter_size_mb'].isna())
-        ]
-
-        # Step 2: Group layers using optimizer
-        stage_assignments = self.optimizer.optimize(
-            valid_layers,
+        # Step 1: Split layers into contiguous stages
+        partition = self.optimizer.partition(
+            self.metrics,
             num_stages=num_stages,
-            balance_threshold=balance_threshold
+            devices=constraints.get('devices'),
+            max_memory_per_stage_mb=max_memory_mb,
         )
 
-        # Step 3: Create partition plan
+        # Step 2: Create partition plan
         plan = PartitionPlan()
 
-        for stage_id, layers in stage_assignments.items():
-            if not layers:
-                continue
-
+        for stage_id, layers in partition.stages.items():
             # Calculate stage metadata
             stage_metrics = self.metrics[self.metrics['layer_name'].isin(layers)]
 
@@ -194,6 +201,8 @@ class ExecutionPlanner:
                 'avg_latency_ms': stage_metrics['forward_latency_ms'].mean(),
                 'total_memory_mb': stage_metrics['peak_vram_after'].max() / (1024**2),
                 'parameters': stage_metrics['num_parameters'].sum(),
+                'device_id': partition.stage_devices[stage_id],
+                'stage_time_ms': partition.stage_latency_ms[stage_id],
             }
 
             plan.add_stage(stage_id, layers, metadata)
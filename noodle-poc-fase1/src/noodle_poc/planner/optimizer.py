@@ -1,22 +1,97 @@
 """
-Partition optimization algorithms using bin-packing and latency balancing.
+Partition optimization algorithms for pipelined execution.
+
+Stages are contiguous slices of the model in layer order, so the
+resulting plan can run as a pipeline.
 """
 
 import pandas as pd
+from dataclasses import dataclass, field
 from typing import List, Dict, Tuple, Optional, Any
-from collections import defaultdict
 import numpy as np
 
 
+# Bytes per element for profiled output dtypes (torch dtype names)
+DTYPE_BYTES = {
+    'float64': 8, 'double': 8, 'int64': 8, 'long': 8,
+    'float32': 4, 'float': 4, 'int32': 4, 'int': 4,
+    'float16': 2, 'half': 2, 'bfloat16': 2, 'int16': 2,
+    'int8': 1, 'uint8': 1, 'bool': 1,
+}
+
+# Protocol overhead on inter-stage transfers (same as the simulator)
+TRANSFER_OVERHEAD = 1.1
+
+
+@dataclass
+class StagePartition:
+    """Contiguous partition of the model over an ordered list of devices."""
+    stages: Dict[str, List[str]] = field(default_factory=dict)
+    stage_devices: Dict[str, Optional[str]] = field(default_factory=dict)
+    stage_latency_ms: Dict[str, float] = field(default_factory=dict)  # Compute + outbound transfer
+    stage_memory_mb: Dict[str, float] = field(default_factory=dict)
+    
+    @property
+    def bottleneck_ms(self) -> float:
+        """Time of the slowest stage."""
+        return max(self.stage_latency_ms.values(), default=0.0)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary."""
+        return {
+            'stages': self.stages,
+            'stage_devices': self.stage_devices,
+            'stage_latency_ms': self.stage_latency_ms,
+            'stage_memory_mb': self.stage_memory_mb,
+            'bottleneck_ms': self.bottleneck_ms,
+        }
+
+
+def activation_size_mb(layers: pd.DataFrame) -> np.ndarray:
+    """
+    Size of each layer's output activations in MB.
+    
+    Uses an 'output_size_mb' column when present, otherwise the profiled
+    'output_shapes' and 'output_dtypes' (float32 when the dtype is unknown).
+    Layers without tensor metadata count as zero.
+    """
+    if 'output_size_mb' in layers.columns:
+        return layers['output_size_mb'].fillna(0.0).to_numpy(dtype=float, copy=True)
+    if 'output_shapes' not in layers.columns:
+        return np.zeros(len(layers))
+    
+    dtypes = layers['output_dtypes'] if 'output_dtypes' in layers.columns else [None] * len(layers)
+    sizes = [
+        _tensors_nbytes(shapes, dtype_names) / (1024 * 1024)
+        for shapes, dtype_names in zip(layers['output_shapes'], dtypes)
+    ]
+    return np.asarray(sizes, dtype=float)
+
+
+def _tensors_nbytes(shapes: Any, dtype_names: Any) -> float:
+    """Bytes of tensors described by shape and dtype lists."""
+    if not isinstance(shapes, (list, tuple)):
+        return 0.0
+    if not isinstance(dtype_names, (list, tuple)):
+        dtype_names = []
+    
+    total = 0.0
+    for index, shape in enumerate(shapes):
+        dtype = dtype_names[index] if index < len(dtype_names) else 'float32'
+        element_size = DTYPE_BYTES.get(str(dtype).replace('torch.', ''), 4)
+        total += float(np.prod(shape)) * element_size
+    return total
+
+
 class PartitionOptimizer:
     """
     Optimizes layer partitioning using various algorithms.
     
     Supports:
-    - Bin-packing algorithms for latency balancing
-    - Memory-constrained partitioning
-    - Genetic algorithms for complex scenarios
-    - Dynamic programming approaches
+    - Bottleneck-minimizing contiguous partitioning (binary search)
+    - Heterogeneous device speeds and per-device memory limits
+    - Inter-stage activation transfer time
+    - Fast greedy splitting by cumulative latency
     """
     
     def __init__(self, metrics_data: pd.DataFrame):
@@ -31,88 +106,233 @@ class PartitionOptimizer:
     
     def _prepare_layer_info(self) -> Dict[str, Dict[str, float]]:
         """Prepare layer information dictionary."""
-        layer_info = {}
-        
-        for _, row in self.metrics.iterrows():
-            layer_info[row['layer_name']] = {
-                'latency_ms': row['forward_latency_ms'],
-                'memory_mb': row.get('parameter_size_mb', 0) or 0,
-                'layer_type': row.get('layer_type', 'Unknown'),
-                'parameters': row.get('num_parameters', 0),
-            }
+        metrics = self.metrics
+        num_layers = len(metrics)
+        
+        def column(name: str, default: Any) -> List[Any]:
+            if name in metrics.columns:
+                return metrics[name].tolist()
+            return [default] * num_layers
         
-        return layer_info
+        memory = (
+            metrics['parameter_size_mb'].fillna(0.0).tolist()
+            if 'parameter_size_mb' in metrics.columns else [0.0] * num_layers
+        )
+        
+        return {
+            name: {
+                'latency_ms': latency,
+                'memory_mb': memory_mb,
+                'layer_type': layer_type,
+                'parameters': parameters,
+            }
+            for name, latency, memory_mb, layer_type, parameters in zip(
+                column('layer_name', None),
+                column('forward_latency_ms', 0.0),
+                memory,
+                column('layer_type', 'Unknown'),
+                column('num_parameters', 0),
+            )
+        }
     
     def optimize(
         self,
         valid_layers: pd.DataFrame,
         num_stages: int = 3,
         balance_threshold: float = 0.3,
-        algorithm: str = 'binpack'
+        algorithm: str = 'binpack',
+        devices: Optional[Any] = None,
+        max_memory_per_stage_mb: Optional[float] = None
     ) -> Dict[str, List[str]]:
         """
         Optimize layer partitioning using specified algorithm.
         
         Args:
             valid_layers: DataFrame of layers to partition
-            num_stages: Number of stages
-            balance_threshold: Maximum latency variance (0.0 = perfect balance)
-            algorithm: 'binpack', 'greedy', 'genetic'
-        
+            num_stages: Number of stages (ignored when devices are given)
+            balance_threshold: Kept for compatibility; the partitioner is exact
+            algorithm: 'binpack' (bottleneck-optimal) or 'greedy'
+            devices: HardwareCapability list or CapabilityMatcher, in pipeline order
+            max_memory_per_stage_mb: Memory limit for stages without a device
+            
         Returns:
             Dictionary mapping stage_id to list of layer names
         """
         if algorithm == 'binpack':
-            return self._optimize_binpack(valid_layers, num_stages, balance_threshold)
+            return self.partition(
+                valid_layers,
+                num_stages=num_stages,
+                devices=devices,
+                max_memory_per_stage_mb=max_memory_per_stage_mb,
+            ).stages
         elif algorithm == 'greedy':
             return self._optimize_greedy(valid_layers, num_stages)
         else:
             raise ValueError(f"Unknown algorithm: {algorithm}")
     
-    def _optimize_binpack(
+    def partition(
         self,
-        valid_layers: pd.DataFrame,
-        num_stages: int,
-        balance_threshold: float
-    ) -> Dict[str, List[str]]:
+        layers: pd.DataFrame,
+        num_stages: int = 3,
+        devices: Optional[Any] = None,
+        max_memory_per_stage_mb: Optional[float] = None,
+        default_bandwidth_mbps: float = 1000.0,
+        tolerance: float = 1e-6
+    ) -> StagePartition:
         """
-        Optimize using bin-packing algorithm with latency balancing.
+        Split layers into contiguous stages minimizing the bottleneck stage time.
         
-        Algorithm:
-        1. Sort layers by latency (largest first)
-        2. Place each layer in the stage with minimal total latency
-        3. Validate balance constraint
-        4. If violated, use recursive bisection
-        """
-        # Prepare layer list
-        layers = valid_layers.sort_values('forward_latency_ms', ascending=False)
-        layer_data = [(row['layer_name'], row['forward_latency_ms']) 
-                      for _, row in layers.iterrows()]
-        
-        # Bin-packing: place each layer in least-loaded stage
-        stages = {f'stage_{i}': {'layers': [], 'latency': 0.0} 
-                  for i in range(num_stages)}
-        
-        for layer_name, latency in layer_data:
-            # Find stage with minimum latency
-            min_stage = min(stages.keys(), key=lambda s: stages[s]['latency'])
+        Stage k runs on device k. Its time is the layers' latency scaled by
+        the device speed plus sending its last layer's activations to the
+        next stage. Binary search on the bottleneck time: for a candidate
+        time, each device in turn takes the longest run of layers that fits
+        in both the time and its memory limit, and the candidate is feasible
+        if every layer gets placed. Each check is O(stages) numpy slices over
+        prefix sums, so 1,000-layer models partition in milliseconds.
+        
+        Args:
+            layers: DataFrame of layers in execution order ('layer_index' if present)
+            num_stages: Number of identical stages when no devices are given
+            devices: HardwareCapability list or CapabilityMatcher, in pipeline order
+            max_memory_per_stage_mb: Memory limit for stages without a device
+            default_bandwidth_mbps: Link bandwidth for stages without a device
+            tolerance: Relative precision of the bottleneck time
+            
+        Returns:
+            StagePartition (empty stages are left out)
             
-            stages[min_stage]['layers'].append(layer_name)
-            stages[min_stage]['latency'] += latency
+        Raises:
+            ValueError: If the layers cannot fit in the devices' memory
+        """
+        layers = self._ordered(layers)
+        names = layers['layer_name'].tolist()
+        if not names:
+            return StagePartition()
+        
+        latency = layers['forward_latency_ms'].fillna(0.0).to_numpy(dtype=float)
+        memory = (
+            layers['parameter_size_mb'].fillna(0.0).to_numpy(dtype=float)
+            if 'parameter_size_mb' in layers.columns else np.zeros(len(names))
+        )
+        activations = activation_size_mb(layers)
+        activations[-1] = 0.0  # Model output goes back to the coordinator
+        
+        device_ids, speed, memory_limit, bandwidth = self._device_arrays(
+            devices, num_stages, max_memory_per_stage_mb, default_bandwidth_mbps
+        )
+        
+        # Transfer time (ms) for a stage ending at each layer, per device
+        link_mbps = np.minimum(bandwidth, np.append(bandwidth[1:], np.inf))
+        transfer_ms = (
+            activations[None, :] * 8 * TRANSFER_OVERHEAD * 1000.0 / link_mbps[:, None]
+        )
+        
+        latency_prefix = np.concatenate(([0.0], np.cumsum(latency)))
+        memory_prefix = np.concatenate(([0.0], np.cumsum(memory)))
+        
+        oversized = memory > memory_limit.max()
+        if oversized.any():
+            raise ValueError(
+                f"Layer {names[int(np.argmax(oversized))]} needs "
+                f"{memory[oversized][0]:.1f} MB, more than any device has"
+            )
         
-        # Check balance constraint
-        latencies = [stages[s]['latency'] for s in stages]
-        variance = self._calculate_variance(latencies)
-        avg_latency = sum(latencies) / len(latencies)
+        def split(bottleneck_ms: float) -> Optional[List[int]]:
+            """Stage end indices (exclusive) if the bottleneck is feasible."""
+            ends = []
+            start = 0
+            for k in range(len(speed)):
+                if start == len(names):
+                    ends.append(start)
+                    continue
+                # Longest run that fits in memory and in compute time alone
+                last = min(
+                    np.searchsorted(memory_prefix, memory_prefix[start] + memory_limit[k], 'right') - 1,
+                    np.searchsorted(
+                        latency_prefix, latency_prefix[start] + bottleneck_ms * speed[k], 'right'
+                    ) - 1,
+                )
+                if last <= start:
+                    ends.append(start)
+                    continue
+                # Transfer time depends on where the stage ends: take the
+                # furthest end that still fits
+                stage_ms = (
+                    (latency_prefix[start + 1:last + 1] - latency_prefix[start]) / speed[k]
+                    + transfer_ms[k, start:last]
+                )
+                fits = np.flatnonzero(stage_ms <= bottleneck_ms)
+                if len(fits):
+                    start += int(fits[-1]) + 1
+                ends.append(start)
+            return ends if start == len(names) else None
+        
+        # Bounds: one layer's time, and everything on the slowest stage
+        low = float((latency / speed.max()).max()) if len(latency) else 0.0
+        high = float(latency_prefix[-1] / speed.min() + transfer_ms.max())
+        ends = split(high)
+        if ends is None:
+            raise ValueError("Layers do not fit in the devices' combined memory")
+        
+        while high - low > tolerance * max(high, 1e-9):
+            middle = (low + high) / 2
+            candidate = split(middle)
+            if candidate is None:
+                low = middle
+            else:
+                high, ends = middle, candidate
+        
+        result = StagePartition()
+        start = 0
+        for k, end in enumerate(ends):
+            if end == start:
+                continue
+            stage_id = f'stage_{len(result.stages)}'
+            result.stages[stage_id] = names[start:end]
+            result.stage_devices[stage_id] = device_ids[k]
+            result.stage_latency_ms[stage_id] = float(
+                (latency_prefix[end] - latency_prefix[start]) / speed[k]
+                + transfer_ms[k, end - 1]
+            )
+            result.stage_memory_mb[stage_id] = float(memory_prefix[end] - memory_prefix[start])
+            start = end
         
-        if avg_latency > 0 and variance / avg_latency > balance_threshold:
-            # Rebalance using recursive bisection
-            stages = self._rebalance_bisection(layers, num_stages)
+        return result
+    
+    def _ordered(self, layers: pd.DataFrame) -> pd.DataFrame:
+        """Layers in execution order."""
+        if 'layer_index' in layers.columns:
+            return layers.sort_values('layer_index', kind='stable')
+        return layers
+    
+    def _device_arrays(
+        self,
+        devices: Optional[Any],
+        num_stages: int,
+        max_memory_per_stage_mb: Optional[float],
+        default_bandwidth_mbps: float
+    ) -> Tuple[List[Optional[str]], np.ndarray, np.ndarray, np.ndarray]:
+        """Per-device ids, speed factors, memory limits (MB) and bandwidth."""
+        if devices is not None and hasattr(devices, 'devices'):
+            devices = list(devices.devices.values())  # CapabilityMatcher
+        
+        if not devices:
+            limit = max_memory_per_stage_mb if max_memory_per_stage_mb is not None else np.inf
+            count = max(1, num_stages)
+            return (
+                [None] * count,
+                np.ones(count),
+                np.full(count, float(limit)),
+                np.full(count, float(default_bandwidth_mbps)),
+            )
         
-        return {
-            stage_id: stage_data['layers']
-            for stage_id, stage_data in stages.items()
-        }
+        # Same speed and 90% memory margin as HardwareCapability uses for layers
+        return (
+            [device.device_id for device in devices],
+            np.array([1.0 / device.estimate_execution_time(1.0) for device in devices]),
+            np.array([device.available_memory_gb * 0.9 * 1024 for device in devices]),
+            np.array([device.network_bandwidth_mbps or default_bandwidth_mbps for device in devices]),
+        )
     
     def _optimize_greedy(
         self,
@@ -120,68 +340,24 @@ class PartitionOptimizer:
         num_stages: int
     ) -> Dict[str, List[str]]:
         """
-        Simple greedy optimization: accumulate layers until target latency.
-        
-        Less optimal but faster than bin-packing.
-        """
-        layers = valid_layers.sort_values('forward_latency_ms', ascending=False)
-        
-        # Calculate target latency per stage
-        total_latency = layers['forward_latency_ms'].sum()
-        target_latency = total_latency / num_stages
-        
-        stages = {f'stage_{i}': [] for i in range(num_stages)}
-        current_stage = 0
-        current_latency = 0.0
+        Simple greedy optimization: cut at equal shares of cumulative latency.
         
-        for _, row in layers.iterrows():
-            layer_latency = row['forward_latency_ms']
-            
-            # If adding this layer exceeds target and we're not at last stage
-            if (current_latency + layer_latency > target_latency * 1.2 and 
-                current_stage < num_stages - 1):
-                current_stage += 1
-                current_latency = 0.0
-            
-            stages[f'stage_{current_stage}'].append(row['layer_name'])
-            current_latency += layer_latency
-        
-        return stages
-    
-    def _rebalance_bisection(
-        self,
-        layers: pd.DataFrame,
-        num_stages: int,
-        max_iterations: int = 10
-    ) -> Dict[str, Dict[str, Any]]:
+        Less optimal but faster than the bottleneck search.
         """
-        Rebalance stages using recursive bisection approach.
+        layers = self._ordered(valid_layers)
+        latency = layers['forward_latency_ms'].fillna(0.0).to_numpy(dtype=float)
         
-        More complex but better balance than greedy bin-packing.
-        """
-        # Group layers into optimal bins using dynamic programming
-        layer_latencies = layers['forward_latency_ms'].values
-        layer_names = layers['layer_name'].values.tolist()
-        
-        # Use First Fit Decreasing with early stopping
-        stages = {f'stage_{i}': {'layers': [], 'latency': 0.0} 
-                  for i in range(num_stages)}
-        
-        for layer_name, latency in zip(layer_names, layer_latencies):
-            # Try to balance more aggressively
-            min_stage = None
-            min_latency = float('inf')
-            
-            for stage_id, stage_data in stages.items():
-                if stage_data['latency'] < min_latency:
-                    min_latency = stage_data['latency']
-                    min_stage = stage_id
-            
-            if min_stage:
-                stages[min_stage]['layers'].append(layer_name)
-                stages[min_stage]['latency'] += latency
+        # Assign each layer by the midpoint of its latency span
+        total_latency = latency.sum()
+        target_latency = total_latency / num_stages if total_latency > 0 else 1.0
+        midpoints = np.cumsum(latency) - latency / 2
+        stage_index = np.minimum((midpoints / target_latency).astype(int), num_stages - 1)
         
-        return stages
+        names = layers['layer_name'].to_numpy()
+        return {
+            f'stage_{i}': names[stage_index == i].tolist()
+            for i in range(num_stages)
+        }
     
     def _calculate_variance(self, values: List[float]) -> float:
         """Calculate variance of values."""
@@ -200,31 +376,13 @@ class PartitionOptimizer:
         """
         Optimize with memory constraints per stage.
         
-        First filters layers by memory, then performs latency optimization.
+        Raises ValueError if a single layer exceeds the limit.
         """
-        # Filter layers that fit in single stage
-        large_layers = []
-        small_layers = self.metrics[
-            self.metrics['parameter_size_mb'] <= max_memory_per_stage_mb
-        ].copy()
-        
-        # Handle layers that exceed memory limit (split or allocate separately)
-        oversized = self.metrics[
-            self.metrics['parameter_size_mb'] > max_memory_per_stage_mb
-        ]
-        
-        if not oversized.empty:
-            # For now, mark them for separate handling
-            large_layers = oversized['layer_name'].tolist()
-        
-        # Optimize manageable layers
-        stage_assignments = self.optimize(small_layers, num_stages)
-        
-        # Handle large layers by assigning them individually
-        for i, large_layer in enumerate(large_layers):
-            stage_assignments[f'stage_large_{i}'] = [large_layer]
-        
-        return stage_assignments
+        return self.partition(
+            self.metrics,
+            num_stages=num_stages,
+            max_memory_per_stage_mb=max_memory_per_stage_mb,
+        ).stages
     
     def analyze_plan(self, plan: Dict[str, List[str]]) -> Dict[str, Any]:
         """
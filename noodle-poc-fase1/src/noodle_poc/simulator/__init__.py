@@ -3,10 +3,23 @@ NoodleCore Fase 2: Stage Simulation Module
 Simulates multi-node execution on a single machine using virtual nodes.
 """
 
-from .core import StagedSimulator, VirtualNode, ExecutionTrace
+from .core import StagedSimulator, VirtualNode, ExecutionTrace, predict_pipeline
+from .events import (
+    EventSimulator, NodeFailure, SimNode, SimStage, SimulationResult, Workload,
+    evaluate_plans, stages_from_plan,
+)
 
 __all__ = [
     'StagedSimulator',
     'VirtualNode',
     'ExecutionTrace',
+    'predict_pipeline',
+    'EventSimulator',
+    'NodeFailure',
+    'SimNode',
+    'SimStage',
+    'SimulationResult',
+    'Workload',
+    'evaluate_plans',
+    'stages_from_plan',
 ]
@@ -10,6 +10,55 @@ import time
 import numpy as np
 from contextlib import contextmanager
 
+from .events import EventSimulator, NodeFailure, SimulationResult, Workload, stages_from_plan
+
+
+def predict_pipeline(
+    stage_latencies_ms: List[float],
+    num_micro_batches: int,
+    passes: int = 1,
+) -> Dict[str, Any]:
+    """
+    Analytical GPipe-style prediction for micro-batched execution.
+
+    The bottleneck stage has to process every micro-batch pass, and the
+    first micro-batch needs one full trip to fill the pipeline; a single
+    micro-batch also cannot start its next pass before the previous one
+    leaves the last stage.
+
+    Args:
+        stage_latencies_ms: Latency of each stage for one micro-batch
+        num_micro_batches: Micro-batches in flight
+        passes: Trips through the pipeline per micro-batch (decode steps)
+
+    Returns:
+        Predicted makespan, throughput, per-stage utilization and bubble fraction
+    """
+    if not stage_latencies_ms or num_micro_batches <= 0 or passes <= 0:
+        return {
+            'makespan_ms': 0.0,
+            'throughput_per_sec': 0.0,
+            'stage_utilization': [],
+            'bubble_fraction': 0.0,
+        }
+
+    total_ms = sum(stage_latencies_ms)
+    bottleneck_ms = max(stage_latencies_ms)
+    work = num_micro_batches * passes
+
+    makespan_ms = max(
+        work * bottleneck_ms + (total_ms - bottleneck_ms),
+        passes * total_ms,
+    )
+    utilization = [work * latency / makespan_ms for latency in stage_latencies_ms]
+
+    return {
+        'makespan_ms': makespan_ms,
+        'throughput_per_sec': work * 1000 / makespan_ms,
+        'stage_utilization': utilization,
+        'bubble_fraction': 1.0 - sum(utilization) / len(utilization),
+    }
+
 
 @dataclass
 class ExecutionTrace:
@@ -155,7 +204,7 @@ class VirtualNode:
         bottleneck_bandwidth = min(self.bandwidth_mbps, target_node.bandwidth_mbps)
         
         # Time = Size / Bandwidth (accounting for protocol overhead ~10%)
-        transfer_time_ms = (tensor_size_mb * 8 * 1.1) / bottleneck_bandwidth
+        transfer_time_ms = (tensor_size_mb * 8 * 1.1) / bottleneck_bandwidth * 1000
         return transfer_time_ms
     
     def estimate_compute_time(self, layer_latency_ms: float) -> float:
@@ -311,6 +360,40 @@ class StagedSimulator:
         throughput = (1000 / bottleneck_latency_ms) * batch_size
         return throughput
     
+    def predict_pipeline(self, num_micro_batches: int, passes: int = 1) -> Dict[str, Any]:
+        """
+        Predict micro-batched execution from the traced stage timings.
+        
+        Args:
+            num_micro_batches: Micro-batches in flight
+            passes: Trips through the pipeline per micro-batch
+            
+        Returns:
+            See predict_pipeline()
+        """
+        stage_timings = self.trace.get_stage_timings() if self.trace else {}
+        return predict_pipeline(list(stage_timings.values()), num_micro_batches, passes)
+    
+    def simulate_events(
+        self,
+        layer_costs: Any,
+        workload: Optional[Workload] = None,
+        failures: Optional[List[NodeFailure]] = None,
+    ) -> SimulationResult:
+        """
+        Replay profiled layer costs for many requests without running the model.
+        
+        Args:
+            layer_costs: Metrics DataFrame or dict of layer name -> costs
+            workload: Arrival process, micro-batching and decode passes
+            failures: Node outages to inject
+            
+        Returns:
+            SimulationResult with latency percentiles and utilization
+        """
+        stages, nodes = stages_from_plan(self.plan, layer_costs, self.nodes)
+        return EventSimulator(stages, nodes, failures).run(workload)
+    
     def get_resource_utilization(self) -> Dict[str, Dict[str, float]]:
         """
         Calculate resource utilization per node.
@@ -0,0 +1,444 @@
+"""
+Discrete-event simulation of pipelined inference.
+Replays profiled per-layer costs for many concurrent requests without
+executing the model, so candidate plans can be compared before deployment.
+"""
+
+import heapq
+import math
+import random
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+
+# Protocol overhead on transfers (same as VirtualNode.calculate_transfer_time)
+TRANSFER_OVERHEAD = 1.1
+
+
+@dataclass
+class SimStage:
+    """One pipeline stage as the simulator sees it."""
+    stage_id: str
+    node_id: str
+    compute_ms: float  # Per request, on this stage's node
+    output_mb: float = 0.0  # Activations sent to the next stage, per request
+
+
+@dataclass
+class SimNode:
+    """Compute node and its network link."""
+    node_id: str
+    bandwidth_mbps: float = 32000.0
+    link_latency_ms: float = 0.0
+
+
+@dataclass
+class NodeFailure:
+    """Node outage; duration_ms=None means the node never comes back."""
+    node_id: str
+    at_ms: float
+    duration_ms: Optional[float] = None
+
+
+@dataclass
+class Workload:
+    """Requests to replay through the pipeline."""
+    num_requests: int = 1000
+    arrival: str = 'poisson'  # 'poisson', 'uniform' or 'burst'
+    rate_rps: float = 100.0
+    arrival_times_ms: Optional[List[float]] = None  # Overrides arrival/rate_rps
+    micro_batch_size: int = 1
+    batch_timeout_ms: float = 0.0  # Wait for a full micro-batch at most this long
+    passes: int = 1  # Trips through the pipeline per request (decode steps)
+    marginal_item_cost: float = 1.0  # Cost of each extra micro-batch item vs the first
+    seed: int = 0
+    
+    def arrivals(self) -> List[float]:
+        """Arrival time of each request in milliseconds."""
+        if self.arrival_times_ms is not None:
+            return sorted(self.arrival_times_ms)
+        if self.arrival == 'burst':
+            return [0.0] * self.num_requests
+        if self.rate_rps <= 0:
+            raise ValueError("rate_rps must be positive")
+        
+        interval_ms = 1000.0 / self.rate_rps
+        if self.arrival == 'uniform':
+            return [i * interval_ms for i in range(self.num_requests)]
+        if self.arrival == 'poisson':
+            rng = random.Random(self.seed)
+            times, now = [], 0.0
+            for _ in range(self.num_requests):
+                times.append(now)
+                now += rng.expovariate(1.0 / interval_ms)
+            return times
+        raise ValueError(f"Unknown arrival process: {self.arrival}")
+
+
+@dataclass
+class SimulationResult:
+    """Outcome of one simulated run."""
+    completed: int
+    failed: int
+    makespan_ms: float
+    latencies_ms: List[float] = field(default_factory=list)
+    queue_wait_ms: Dict[str, float] = field(default_factory=dict)  # Mean wait per stage
+    node_utilization: Dict[str, float] = field(default_factory=dict)
+    link_utilization: Dict[str, float] = field(default_factory=dict)
+    retries: int = 0  # Stage executions lost to node failures
+    
+    def percentile(self, q: float) -> float:
+        """Latency percentile (nearest rank), q in [0, 100]."""
+        if not self.latencies_ms:
+            return 0.0
+        ordered = sorted(self.latencies_ms)
+        index = min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))
+        return ordered[index]
+    
+    @property
+    def throughput_rps(self) -> float:
+        """Completed requests per second."""
+        return self.completed * 1000 / self.makespan_ms if self.makespan_ms > 0 else 0.0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary."""
+        latencies = self.latencies_ms
+        return {
+            'completed': self.completed,
+            'failed': self.failed,
+            'makespan_ms': self.makespan_ms,
+            'throughput_rps': self.throughput_rps,
+            'mean_latency_ms': sum(latencies) / len(latencies) if latencies else 0.0,
+            'p50_latency_ms': self.percentile(50),
+            'p95_latency_ms': self.percentile(95),
+            'p99_latency_ms': self.percentile(99),
+            'queue_wait_ms': dict(self.queue_wait_ms),
+            'node_utilization': dict(self.node_utilization),
+            'link_utilization': dict(self.link_utilization),
+            'retries': self.retries,
+        }
+
+
+@dataclass
+class _Batch:
+    requests: List[Tuple[int, float]]  # (request_id, arrival_ms)
+    passes: int = 0
+    enqueued_ms: float = 0.0
+
+
+class _Resource:
+    """FIFO server: a node's compute or a node's outgoing link."""
+    
+    def __init__(self):
+        self.queue: Deque[Tuple[Any, ...]] = deque()
+        self.current: Optional[Tuple[Any, ...]] = None
+        self.busy_ms = 0.0
+        self.started_ms = 0.0
+        self.up = True
+        self.permanently_down = False
+        self.epoch = 0  # Bumped on failure so in-flight completions are dropped
+
+
+class EventSimulator:
+    """
+    Discrete-event simulator for a staged pipeline.
+    
+    Each node runs one micro-batch at a time in FIFO order, so stages that
+    share a node contend for it. Each node's outgoing link sends one
+    transfer at a time at the bandwidth of the slower endpoint, so
+    transfers leaving the same node contend for it. Requests are grouped
+    into micro-batches at admission and travel together for all passes.
+    A failed node loses its in-flight work, which restarts when the node
+    recovers; if it never recovers, work routed to it fails.
+    """
+    
+    def __init__(
+        self,
+        stages: List[SimStage],
+        nodes: Optional[Dict[str, SimNode]] = None,
+        failures: Optional[List[NodeFailure]] = None,
+    ):
+        """
+        Initialize simulator.
+        
+        Args:
+            stages: Pipeline stages in order
+            nodes: Node network properties by node_id (defaults for missing nodes)
+            failures: Node outages to inject
+        """
+        if not stages:
+            raise ValueError("Simulation needs at least one stage")
+        self.stages = stages
+        self.nodes = dict(nodes or {})
+        for stage in stages:
+            self.nodes.setdefault(stage.node_id, SimNode(stage.node_id))
+        self.failures = failures or []
+    
+    def run(self, workload: Optional[Workload] = None) -> SimulationResult:
+        """
+        Replay a workload.
+        
+        Args:
+            workload: Requests to simulate (defaults to Workload())
+            
+        Returns:
+            SimulationResult with latencies, queueing and utilization
+        """
+        workload = workload or Workload()
+        events: List[Tuple[float, int, Callable, Tuple]] = []
+        sequence = 0
+        now = 0.0
+        
+        compute = {node_id: _Resource() for node_id in self.nodes}
+        links = {node_id: _Resource() for node_id in self.nodes}
+        latencies: List[float] = []
+        waits: Dict[str, List[float]] = {stage.stage_id: [] for stage in self.stages}
+        counters = {'failed': 0, 'retries': 0}
+        pending: List[Tuple[int, float]] = []
+        batch_size = max(1, workload.micro_batch_size)
+        timeout_generation = [0]
+        
+        def schedule(at_ms: float, handler: Callable, *args):
+            nonlocal sequence
+            heapq.heappush(events, (at_ms, sequence, handler, args))
+            sequence += 1
+        
+        def stage_duration(index: int, batch: _Batch) -> float:
+            extra = len(batch.requests) - 1
+            return self.stages[index].compute_ms * (1.0 + extra * workload.marginal_item_cost)
+        
+        def transfer_duration(index: int, batch: _Batch) -> float:
+            stage = self.stages[index]
+            source = self.nodes[stage.node_id]
+            target = self.nodes[self.stages[index + 1].node_id]
+            bandwidth = min(source.bandwidth_mbps, target.bandwidth_mbps)
+            size_mb = stage.output_mb * len(batch.requests)
+            return (
+                source.link_latency_ms
+                + size_mb * 8 * TRANSFER_OVERHEAD * 1000.0 / bandwidth
+            )
+        
+        def fail(batch: _Batch):
+            counters['failed'] += len(batch.requests)
+        
+        # Compute
+        
+        def enqueue_stage(index: int, batch: _Batch):
+            node = compute[self.stages[index].node_id]
+            if node.permanently_down:
+                fail(batch)
+                return
+            batch.enqueued_ms = now
+            node.queue.append((index, batch))
+            start_compute(self.stages[index].node_id)
+        
+        def start_compute(node_id: str):
+            node = compute[node_id]
+            if node.current is not None or not node.up or not node.queue:
+                return
+            index, batch = node.queue.popleft()
+            waits[self.stages[index].stage_id].append(now - batch.enqueued_ms)
+            node.current = (index, batch)
+            node.started_ms = now
+            schedule(now + stage_duration(index, batch), finish_compute, node_id, node.epoch)
+        
+        def finish_compute(node_id: str, epoch: int):
+            node = compute[node_id]
+            if epoch != node.epoch:
+                return
+            index, batch = node.current
+            node.busy_ms += now - node.started_ms
+            node.current = None
+            start_compute(node_id)
+            
+            if index + 1 < len(self.stages):
+                if self.stages[index + 1].node_id == node_id:
+                    enqueue_stage(index + 1, batch)
+                else:
+                    links[node_id].queue.append((index, batch))
+                    start_transfer(node_id)
+                return
+            
+            batch.passes += 1
+            if batch.passes < workload.passes:
+                enqueue_stage(0, batch)
+            else:
+                latencies.extend(now - arrival for _, arrival in batch.requests)
+        
+        # Links
+        
+        def start_transfer(node_id: str):
+            link = links[node_id]
+            if link.current is not None or not link.queue:
+                return
+            index, batch = link.queue.popleft()
+            link.current = (index, batch)
+            link.started_ms = now
+            schedule(now + transfer_duration(index, batch), finish_transfer, node_id)
+        
+        def finish_transfer(node_id: str):
+            link = links[node_id]
+            index, batch = link.current
+            link.busy_ms += now - link.started_ms
+            link.current = None
+            start_transfer(node_id)
+            enqueue_stage(index + 1, batch)
+        
+        # Admission and micro-batching
+        
+        def dispatch():
+            timeout_generation[0] += 1
+            batch = _Batch(requests=list(pending))
+            pending.clear()
+            enqueue_stage(0, batch)
+        
+        def arrive(request_id: int):
+            pending.append((request_id, now))
+            if len(pending) >= batch_size:
+                dispatch()
+            elif len(pending) == 1:
+                schedule(now + workload.batch_timeout_ms, batch_timeout, timeout_generation[0])
+        
+        def batch_timeout(generation: int):
+            if generation == timeout_generation[0] and pending:
+                dispatch()
+        
+        # Failures
+        
+        def node_down(node_id: str, permanent: bool):
+            node = compute[node_id]
+            node.up = False
+            node.epoch += 1
+            if node.current is not None:
+                # In-flight work is lost and runs again after recovery
+                node.busy_ms += now - node.started_ms
+                node.queue.appendleft(node.current)
+                node.current = None
+                counters['retries'] += 1
+            if permanent:
+                node.permanently_down = True
+                while node.queue:
+                    fail(node.queue.popleft()[1])
+        
+        def node_up(node_id: str):
+            compute[node_id].up = True
+            start_compute(node_id)
+        
+        for request_id, arrival_ms in enumerate(workload.arrivals()):
+            schedule(arrival_ms, arrive, request_id)
+        for failure in self.failures:
+            if failure.node_id not in compute:
+                continue
+            schedule(failure.at_ms, node_down, failure.node_id, failure.duration_ms is None)
+            if failure.duration_ms is not None:
+                schedule(failure.at_ms + failure.duration_ms, node_up, failure.node_id)
+        
+        last_activity = 0.0
+        while events:
+            now, _, handler, args = heapq.heappop(events)
+            handler(*args)
+            if handler not in (node_down, node_up, batch_timeout):
+                last_activity = now
+        
+        makespan = last_activity
+        return SimulationResult(
+            completed=len(latencies),
+            failed=counters['failed'],
+            makespan_ms=makespan,
+            latencies_ms=latencies,
+            queue_wait_ms={
+                stage_id: sum(values) / len(values) if values else 0.0
+                for stage_id, values in waits.items()
+            },
+            node_utilization={
+                node_id: node.busy_ms / makespan if makespan > 0 else 0.0
+                for node_id, node in compute.items()
+            },
+            link_utilization={
+                node_id: link.busy_ms / makespan if makespan > 0 else 0.0
+                for node_id, link in links.items()
+            },
+            retries=counters['retries'],
+        )
+
+
+def stages_from_plan(
+    partition_plan,
+    layer_costs: Any,
+    virtual_nodes: Optional[Dict[str, Any]] = None,
+) -> Tuple[List[SimStage], Dict[str, SimNode]]:
+    """
+    Build simulator stages from a partition plan and profiled layer costs.
+    
+    Args:
+        partition_plan: PartitionPlan (or dict of stage_id -> layer names)
+        layer_costs: Metrics DataFrame, or dict of layer name ->
+            {'latency_ms': ..., 'output_mb': ...}
+        virtual_nodes: stage_id -> VirtualNode; its compute_factor scales
+            latency and its bandwidth_mbps sets the link speed
+            
+    Returns:
+        (stages, nodes) for EventSimulator
+    """
+    if hasattr(layer_costs, 'columns'):
+        from ..planner.optimizer import activation_size_mb
+        layer_costs = {
+            name: {'latency_ms': latency, 'output_mb': output_mb}
+            for name, latency, output_mb in zip(
+                layer_costs['layer_name'],
+                layer_costs['forward_latency_ms'].fillna(0.0),
+                activation_size_mb(layer_costs),
+            )
+        }
+    
+    plan_stages = getattr(partition_plan, 'stages', partition_plan)
+    virtual_nodes = virtual_nodes or {}
+    stages: List[SimStage] = []
+    nodes: Dict[str, SimNode] = {}
+    
+    for stage_id, layer_names in plan_stages.items():
+        if not layer_names:
+            continue
+        virtual_node = virtual_nodes.get(stage_id)
+        node_id = virtual_node.node_id if virtual_node is not None else stage_id
+        compute_factor = getattr(virtual_node, 'compute_factor', 1.0) or 1.0
+        
+        latency = sum(layer_costs.get(name, {}).get('latency_ms', 0.0) for name in layer_names)
+        stages.append(SimStage(
+            stage_id=stage_id,
+            node_id=node_id,
+            compute_ms=latency / compute_factor,
+            output_mb=layer_costs.get(layer_names[-1], {}).get('output_mb', 0.0),
+        ))
+        if virtual_node is not None:
+            nodes[node_id] = SimNode(node_id, bandwidth_mbps=virtual_node.bandwidth_mbps)
+    
+    return stages, nodes
+
+
+def evaluate_plans(
+    candidates: Dict[str, List[SimStage]],
+    workload: Optional[Workload] = None,
+    nodes: Optional[Dict[str, SimNode]] = None,
+    failures: Optional[List[NodeFailure]] = None,
+    metric: str = 'p95_latency_ms',
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Simulate every candidate plan under the same workload.
+    
+    Args:
+        candidates: Plan name -> stages
+        workload: Workload replayed for each plan
+        nodes: Shared node network properties
+        failures: Outages injected into each run
+        metric: SimulationResult.to_dict() key to rank by (lower is better)
+        
+    Returns:
+        (name, result dict) pairs, best first
+    """
+    results = [
+        (name, EventSimulator(stages, nodes, failures).run(workload).to_dict())
+        for name, stages in candidates.items()
+    ]
+    return sorted(results, key=lambda item: item[1][metric])
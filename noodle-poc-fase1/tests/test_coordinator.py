@@ -0,0 +1,136 @@
+"""
+Tests for the coordinator driving in-process stage workers.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from noodle_poc.advanced.planner.adaptive import AdaptationTrigger, OnlineReplanner
+from noodle_poc.network.coordinator import CoordinatorConfig, CoordinatorService, InferenceRequest
+from noodle_poc.network.worker import StageWorkerService, WorkerConfig
+
+STAGE_LAYERS = {
+    'stage_0': ['transformer.wte', 'transformer.wpe', 'transformer.h.0'],
+    'stage_1': ['transformer.h.1'],
+    'stage_2': ['transformer.ln_f', 'lm_head'],
+}
+PROMPTS = [[5, 17, 42], [7, 99], [1, 2, 3, 4], [60]]
+
+
+def _tiny_model():
+    from transformers import GPT2Config, GPT2LMHeadModel
+
+    torch.manual_seed(0)
+    return GPT2LMHeadModel(GPT2Config(n_layer=2, n_embd=64, n_head=2, vocab_size=128)).eval()
+
+
+def _greedy(model, prompt, num_tokens):
+    tokens = list(prompt)
+    with torch.no_grad():
+        for _ in range(num_tokens):
+            logits = model(torch.tensor([tokens])).logits
+            tokens.append(int(logits[0, -1].argmax()))
+    return tokens[len(prompt):]
+
+
+def _pipeline(model, session_ids, replanner=False):
+    """Coordinator with one worker per stage; every worker can serve any layer."""
+    modules = dict(model.named_modules())
+    coordinator = CoordinatorService(CoordinatorConfig(micro_batch_size=2, enable_metrics=False))
+    workers = {}
+    for stage, layer_names in STAGE_LAYERS.items():
+        worker = StageWorkerService(WorkerConfig(worker_id=f'worker-{stage}', device='cpu'))
+        worker.layers_assigned = {name: modules[name] for names in STAGE_LAYERS.values() for name in names}
+        for session_id in session_ids:
+            asyncio.run(worker.CreateSession(session_id, None, layer_names, 64, 'fp32'))
+        coordinator.attach_worker(worker)
+        workers[stage] = worker
+
+    if replanner:
+        costs = {name: 10.0 if '.h.' in name else 1.0 for names in STAGE_LAYERS.values() for name in names}
+        coordinator.replanner = OnlineReplanner(
+            costs, STAGE_LAYERS, {stage: f'worker-{stage}' for stage in STAGE_LAYERS},
+            trigger=AdaptationTrigger(latency_imbalance_threshold_ms=1.0, min_adaptation_interval_sec=0.0),
+            smoothing=1.0,
+        )
+    return coordinator, workers
+
+
+def _requests(prompts, max_new_tokens, generated=None):
+    return [
+        InferenceRequest(
+            input_tokens=prompt + (generated[i] if generated else []),
+            max_new_tokens=max_new_tokens,
+            session_id=f's{i}',
+        )
+        for i, prompt in enumerate(prompts)
+    ]
+
+
+class TestSubmitBatch:
+    """Tests for micro-batched generation across stage workers."""
+
+    def test_matches_single_process_greedy_decoding(self):
+        """Test that pipelined, cached generation gives the full model's tokens."""
+        model = _tiny_model()
+        coordinator, workers = _pipeline(model, [f's{i}' for i in range(len(PROMPTS))])
+
+        responses = asyncio.run(coordinator.submit_batch(_requests(PROMPTS, 6)))
+
+        assert [r.error_message for r in responses] == [None] * len(PROMPTS)
+        assert [r.generated_tokens for r in responses] == [_greedy(model, p, 6) for p in PROMPTS]
+        assert coordinator.last_pipeline_stats.num_micro_batches == 2
+        # After the prefill each stage saw one new position per step
+        assert all(
+            context.kv_cache.seq_len == len(PROMPTS[int(sid[1:])]) + 5
+            for worker in workers.values() for sid, context in worker.active_sessions.items()
+        )
+
+    def test_failing_micro_batch_does_not_stop_the_others(self):
+        """Test that errors are reported per request while other micro-batches finish."""
+        model = _tiny_model()
+        coordinator, _ = _pipeline(model, ['s0'])
+        requests = _requests([[3, 4]], 3) + [InferenceRequest(input_tokens=[]),
+                                              InferenceRequest(input_tokens=[1], session_id='unknown')]
+
+        ok, empty, unknown = asyncio.run(coordinator.submit_batch(requests, micro_batch_size=1))
+
+        assert ok.generated_tokens == _greedy(model, [3, 4], 3)
+        assert empty.error_message == "Empty input tokens"
+        assert 'Session not found' in unknown.error_message
+
+
+class TestRebalance:
+    """Tests for switching the layer layout between decode steps."""
+
+    def test_generation_continues_across_layout_switch(self):
+        """Test that sessions keep generating the same tokens after layers move."""
+        model = _tiny_model()
+        session_ids = [f's{i}' for i in range(len(PROMPTS))]
+        coordinator, workers = _pipeline(model, session_ids, replanner=True)
+        expected = [_greedy(model, p, 6) for p in PROMPTS]
+
+        first = asyncio.run(coordinator.submit_batch(_requests(PROMPTS, 3)))
+        # stage_0's node runs three times slower than profiled
+        coordinator.record_heartbeat('worker-stage_0', 4, {'recent_latency_ms': 36.0, 'recent_requests': 10})
+        plan = asyncio.run(coordinator.rebalance())
+        second = asyncio.run(coordinator.submit_batch(
+            _requests(PROMPTS, 3, [r.generated_tokens for r in first])
+        ))
+
+        assert plan is not None and plan.generation == 1
+        assert plan.stage_layers['stage_0'] == ['transformer.wte', 'transformer.wpe']
+        assert {plan.moves[0].layer_name, plan.moves[1].layer_name} == {'transformer.h.0', 'transformer.h.1'}
+        assert all(p.generation == 1 for p in coordinator.execution_plans.values())
+        assert [a.generated_tokens + b.generated_tokens for a, b in zip(first, second)] == expected
+        for stage, worker in workers.items():
+            assert all(c.layer_names == plan.stage_layers[stage] for c in worker.active_sessions.values())
+            assert all(c.generation == 1 for c in worker.active_sessions.values())
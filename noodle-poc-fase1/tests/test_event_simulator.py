@@ -0,0 +1,129 @@
+"""
+Tests for the discrete-event pipeline simulator.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("torch")
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from noodle_poc.simulator.core import predict_pipeline
+from noodle_poc.simulator.events import (
+    EventSimulator, NodeFailure, SimNode, SimStage, Workload, evaluate_plans, stages_from_plan
+)
+
+
+def _stages(latencies, node_ids=None, output_mb=0.0):
+    node_ids = node_ids or [f'node_{i}' for i in range(len(latencies))]
+    return [
+        SimStage(f'stage_{i}', node_id, latency, output_mb)
+        for i, (latency, node_id) in enumerate(zip(latencies, node_ids))
+    ]
+
+
+class TestEventSimulator:
+    """Tests for queueing, contention and failures."""
+
+    @pytest.mark.parametrize("passes", [1, 3])
+    def test_burst_matches_analytical_pipeline(self, passes):
+        """Test that a burst of requests reproduces the GPipe makespan."""
+        result = EventSimulator(_stages([10.0] * 4)).run(
+            Workload(num_requests=8, arrival='burst', passes=passes)
+        )
+
+        prediction = predict_pipeline([10.0] * 4, num_micro_batches=8, passes=passes)
+        assert result.completed == 8
+        assert result.makespan_ms == pytest.approx(prediction['makespan_ms'])
+
+    def test_light_load_has_no_queueing(self):
+        """Test that spaced-out arrivals see only the pipeline latency."""
+        result = EventSimulator(_stages([5.0, 5.0])).run(
+            Workload(num_requests=20, arrival='uniform', rate_rps=50.0)
+        )
+
+        assert result.percentile(99) == pytest.approx(10.0)
+        assert all(wait == 0.0 for wait in result.queue_wait_ms.values())
+
+    def test_stages_on_one_node_contend(self):
+        """Test that two stages sharing a node serialize."""
+        shared = EventSimulator(_stages([10.0, 10.0], node_ids=['gpu', 'gpu'])).run(
+            Workload(num_requests=10, arrival='burst')
+        )
+        separate = EventSimulator(_stages([10.0, 10.0])).run(
+            Workload(num_requests=10, arrival='burst')
+        )
+
+        assert shared.makespan_ms == pytest.approx(200.0)
+        assert separate.makespan_ms == pytest.approx(110.0)
+        assert shared.node_utilization['gpu'] == pytest.approx(1.0)
+
+    def test_link_bandwidth_contention(self):
+        """Test that transfers queue on a slow link."""
+        nodes = {'a': SimNode('a', bandwidth_mbps=1000.0), 'b': SimNode('b')}
+        result = EventSimulator(_stages([1.0, 1.0], ['a', 'b'], output_mb=1.0), nodes).run(
+            Workload(num_requests=10, arrival='burst')
+        )
+
+        # 1 MB at 1000 Mbps with 10% overhead = 8.8 ms per transfer
+        assert result.makespan_ms == pytest.approx(1.0 + 10 * 8.8 + 1.0)
+        assert result.link_utilization['a'] > 0.9
+
+    def test_micro_batching_amortizes_cost(self):
+        """Test that cheaper extra items raise throughput."""
+        workload = dict(num_requests=32, arrival='burst', micro_batch_size=4)
+        linear = EventSimulator(_stages([10.0] * 2)).run(Workload(**workload))
+        amortized = EventSimulator(_stages([10.0] * 2)).run(
+            Workload(marginal_item_cost=0.25, **workload)
+        )
+
+        assert amortized.throughput_rps > 2 * linear.throughput_rps
+
+    def test_transient_failure_retries(self):
+        """Test that work lost to an outage runs again after recovery."""
+        result = EventSimulator(
+            _stages([10.0] * 4), failures=[NodeFailure('node_1', at_ms=25.0, duration_ms=50.0)]
+        ).run(Workload(num_requests=8, arrival='burst'))
+
+        assert result.completed == 8 and result.failed == 0
+        assert result.retries == 1
+        assert result.makespan_ms > 110.0
+
+    def test_permanent_failure_fails_requests(self):
+        """Test that requests routed to a dead node fail."""
+        result = EventSimulator(
+            _stages([10.0] * 4), failures=[NodeFailure('node_1', at_ms=25.0)]
+        ).run(Workload(num_requests=8, arrival='burst'))
+
+        assert result.completed + result.failed == 8
+        assert result.failed > 0
+
+
+class TestPlans:
+    """Tests for building and ranking plans."""
+
+    def test_stages_from_plan(self):
+        """Test that layer costs and node speed make the stage cost."""
+        costs = {
+            'a': {'latency_ms': 2.0, 'output_mb': 4.0},
+            'b': {'latency_ms': 6.0, 'output_mb': 1.0},
+        }
+
+        stages, _ = stages_from_plan({'stage_0': ['a', 'b']}, costs)
+
+        assert stages == [SimStage('stage_0', 'stage_0', 8.0, 1.0)]
+
+    def test_evaluate_plans_ranks_balanced_first(self):
+        """Test that the balanced plan wins under load."""
+        ranked = evaluate_plans(
+            {
+                'skewed': _stages([16.0, 4.0]),
+                'balanced': _stages([10.0, 10.0]),
+            },
+            Workload(num_requests=200, rate_rps=80.0),
+        )
+
+        assert [name for name, _ in ranked] == ['balanced', 'skewed']
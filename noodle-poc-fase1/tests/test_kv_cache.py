@@ -0,0 +1,130 @@
+"""
+Tests for KV-cache-aware incremental decoding on stage workers.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from noodle_poc.network import utils
+from noodle_poc.network.kv_cache import SessionKVCache, benchmark_generation, cache_nbytes
+from noodle_poc.network.worker import StageWorkerService, WorkerConfig
+
+
+def _tiny_worker(max_kv_cache_mb: float = 2048.0):
+    """Worker holding a whole 2-layer GPT-2 as one stage."""
+    from transformers import GPT2Config, GPT2LMHeadModel
+
+    torch.manual_seed(0)
+    model = GPT2LMHeadModel(GPT2Config(n_layer=2, n_embd=64, n_head=2, vocab_size=128)).eval()
+    modules = dict(model.named_modules())
+    names = ['transformer.wte', 'transformer.wpe', 'transformer.h.0', 'transformer.h.1',
+             'transformer.ln_f', 'lm_head']
+
+    worker = StageWorkerService(WorkerConfig(device='cpu', max_kv_cache_mb=max_kv_cache_mb))
+    worker.layers_assigned = {name: modules[name] for name in names}
+    return worker, names
+
+
+def _forward(worker, session_id, tokens, past_length, use_cache=True):
+    return asyncio.run(worker.ExecuteForward(
+        session_id, 0, utils.serialize_tensor(utils.tokens_to_tensor(tokens)), [],
+        past_length=past_length, use_cache=use_cache,
+    ))
+
+
+class TestSessionKVCache:
+    """Tests for cache bookkeeping."""
+
+    def test_memory_accounting(self):
+        """Test that cached tensors are counted and freed."""
+        cache = SessionKVCache()
+        cache.update('h.0', (torch.zeros(1, 2, 4, 8), torch.zeros(1, 2, 4, 8)))
+        cache.advance(4)
+
+        assert cache.seq_len == 4
+        assert cache.nbytes == cache_nbytes(cache.layers) == 2 * 64 * 4
+        assert cache.clear() == 512
+        assert cache.seq_len == 0 and cache.nbytes == 0
+
+
+class TestIncrementalDecoding:
+    """Tests for cached execution on a stage worker."""
+
+    def test_cached_step_matches_full_recompute(self):
+        """Test that decoding one token from the cache gives the same logits."""
+        worker, names = _tiny_worker()
+        for session_id in ('full', 'cached'):
+            asyncio.run(worker.CreateSession(session_id, None, names, 64, 'fp32'))
+
+        tokens = [5, 17, 42, 7, 99]
+        full = _forward(worker, 'full', tokens, 0, use_cache=False)
+        _forward(worker, 'cached', tokens[:-1], 0)
+        step = _forward(worker, 'cached', tokens[-1:], len(tokens) - 1)
+
+        full_logits = utils.deserialize_tensor(full.output_activations)[..., -1, :]
+        step_logits = utils.deserialize_tensor(step.output_activations)[..., -1, :]
+        assert torch.allclose(full_logits, step_logits, atol=1e-4)
+
+    def test_evicted_cache_reports_miss(self):
+        """Test that a step after eviction asks for a new prefill."""
+        worker, names = _tiny_worker()
+        asyncio.run(worker.CreateSession('s', None, names, 64, 'fp32'))
+        _forward(worker, 's', [1, 2, 3], 0)
+
+        evicted = asyncio.run(worker.EvictCache('s'))
+        response = _forward(worker, 's', [4], 3)
+
+        assert evicted.freed_bytes > 0
+        assert not response.success and response.cache_miss
+        assert worker.get_metrics_summary()['kv_cache_evictions'] == 1
+
+    def test_failed_step_drops_partial_cache(self):
+        """Test that a step failing mid-stage leaves no half-extended cache behind."""
+        worker, names = _tiny_worker()
+        asyncio.run(worker.CreateSession('s', None, names, 64, 'fp32'))
+        _forward(worker, 's', [1, 2, 3], 0)
+        context = worker.active_sessions['s']
+        ln_f = context.layers['transformer.ln_f']
+
+        def fail(*args):
+            raise RuntimeError('device lost')
+
+        context.layers['transformer.ln_f'] = fail
+        failed = _forward(worker, 's', [4], 3)
+        context.layers['transformer.ln_f'] = ln_f
+        retry = _forward(worker, 's', [4], 3)
+
+        assert not failed.success and not failed.cache_miss
+        assert context.kv_cache.seq_len == 0
+        assert not retry.success and retry.cache_miss
+
+    def test_budget_evicts_least_recently_used(self):
+        """Test that exceeding the budget evicts other sessions' caches."""
+        worker, names = _tiny_worker(max_kv_cache_mb=0.0)
+        for session_id in ('old', 'new'):
+            asyncio.run(worker.CreateSession(session_id, None, names, 64, 'fp32'))
+
+        _forward(worker, 'old', [1, 2, 3], 0)
+        _forward(worker, 'new', [1, 2, 3], 0)
+
+        assert worker.active_sessions['old'].kv_cache.seq_len == 0
+        assert worker.active_sessions['new'].kv_cache.seq_len == 3
+
+
+@pytest.mark.benchmark
+def test_cached_generation_is_faster():
+    """Compare tokens/sec for 256-token generations."""
+    result = benchmark_generation(num_new_tokens=256)
+
+    print(f"\nfull: {result['full_tokens_per_sec']:.1f} tok/s, "
+          f"cached: {result['cached_tokens_per_sec']:.1f} tok/s, "
+          f"speedup: {result['speedup']:.2f}x")
+    assert result['speedup'] > 1.0
@@ -0,0 +1,112 @@
+"""
+Tests for lazy per-layer weight loading on stage workers.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+pytest.importorskip("safetensors")
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from noodle_poc.network import weights
+from noodle_poc.network.weights import LayerWeightStore
+from noodle_poc.network.worker import StageWorkerService, WorkerConfig
+
+
+@pytest.fixture
+def checkpoint(tmp_path):
+    """Tiny GPT-2 saved as safetensors."""
+    from transformers import GPT2Config, GPT2LMHeadModel
+
+    torch.manual_seed(0)
+    model = GPT2LMHeadModel(GPT2Config(n_layer=2, n_embd=32, n_head=2, vocab_size=64)).eval()
+    model.save_pretrained(tmp_path / 'model', safe_serialization=True)
+    return model, tmp_path / 'model'
+
+
+def _worker(model_dir, cache_dir, **kwargs):
+    worker = StageWorkerService(WorkerConfig(
+        device='cpu', model_dir=str(model_dir), weight_cache_dir=str(cache_dir), **kwargs
+    ))
+    asyncio.run(worker._load_base_model())
+    return worker
+
+
+class TestLayerWeightStore:
+    """Tests for building single layers from a checkpoint."""
+
+    def test_layer_matches_full_model(self, checkpoint, tmp_path):
+        """Test that a lazily built block computes what the full model does."""
+        model, model_dir = checkpoint
+        store = LayerWeightStore(model_dir, torch.device('cpu'), cache_dir=tmp_path / 'cache')
+
+        block = store.load('transformer.h.1')
+        hidden = torch.randn(1, 5, 32)
+
+        with torch.no_grad():
+            assert torch.allclose(block(hidden)[0], model.transformer.h[1](hidden)[0])
+        assert all(param.is_meta for param in store.skeleton.parameters())
+
+    def test_tied_output_embeddings(self, checkpoint):
+        """Test that lm_head falls back to the tied input embeddings."""
+        model, model_dir = checkpoint
+        store = LayerWeightStore(model_dir, torch.device('cpu'))
+
+        lm_head = store.load('lm_head')
+
+        assert torch.equal(lm_head.weight, model.transformer.wte.weight)
+
+    def test_restart_reads_shard_cache(self, checkpoint, tmp_path, monkeypatch):
+        """Test that a second store loads from the converted shard cache."""
+        _, model_dir = checkpoint
+        cache_dir = tmp_path / 'cache'
+        first = LayerWeightStore(model_dir, torch.device('cpu'), dtype=torch.float16, cache_dir=cache_dir)
+        expected = first.load('transformer.h.0')
+
+        def fail(self, names):
+            raise AssertionError("checkpoint read despite cache")
+
+        monkeypatch.setattr(weights.SafetensorsCheckpoint, 'read', fail)
+        second = LayerWeightStore(model_dir, torch.device('cpu'), dtype=torch.float16, cache_dir=cache_dir)
+        block = second.load('transformer.h.0')
+
+        assert block.attn.c_attn.weight.dtype == torch.float16
+        assert torch.equal(block.attn.c_attn.weight, expected.attn.c_attn.weight)
+
+
+class TestSharedLayers:
+    """Tests for reference-counted layers on a lazy worker."""
+
+    def test_only_assigned_layers_load_at_startup(self, checkpoint, tmp_path):
+        """Test that startup loads just the assigned layers."""
+        _, model_dir = checkpoint
+        worker = _worker(model_dir, tmp_path / 'cache', assigned_layers=['transformer.h.0'])
+
+        assert worker.weight_store is not None
+        assert list(worker.layers_assigned) == ['transformer.h.0']
+
+    def test_sessions_share_and_release_layers(self, checkpoint, tmp_path):
+        """Test that sessions share one module and the last close unloads it."""
+        _, model_dir = checkpoint
+        worker = _worker(model_dir, tmp_path / 'cache', assigned_layers=['transformer.h.0'])
+        names = ['transformer.h.0', 'transformer.h.1']
+
+        for session_id in ('a', 'b'):
+            assert asyncio.run(worker.CreateSession(session_id, None, names, 64, 'fp32')).success
+
+        assert worker.active_sessions['a'].layers['transformer.h.1'] is \
+            worker.active_sessions['b'].layers['transformer.h.1']
+        assert worker.layer_refs == {'transformer.h.0': 2, 'transformer.h.1': 2}
+
+        asyncio.run(worker.CloseSession('a'))
+        assert 'transformer.h.1' in worker.layers_assigned
+        asyncio.run(worker.CloseSession('b'))
+
+        assert worker.layer_refs == {}
+        assert list(worker.layers_assigned) == ['transformer.h.0']  # Pinned
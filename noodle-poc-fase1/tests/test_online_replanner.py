@@ -0,0 +1,133 @@
+"""
+Tests for the online re-planner.
+"""
+
+import itertools
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from noodle_poc.advanced.planner.adaptive import (
+    AdaptationTrigger, NodeTelemetry, OnlineReplanner, _min_bottleneck
+)
+
+
+def _replanner(num_layers=12, num_stages=3, **kwargs):
+    layers = [f'layer_{i}' for i in range(num_layers)]
+    per_stage = num_layers // num_stages
+    stage_layers = {
+        f'stage_{s}': layers[s * per_stage:(s + 1) * per_stage] for s in range(num_stages)
+    }
+    stage_to_node = {f'stage_{s}': f'node_{s}' for s in range(num_stages)}
+    trigger = AdaptationTrigger(latency_imbalance_threshold_ms=1.0, min_adaptation_interval_sec=0.0)
+    return OnlineReplanner(
+        {layer: 10.0 for layer in layers}, stage_layers, stage_to_node, trigger=trigger, **kwargs
+    )
+
+
+def _heartbeat(replanner, node_id, latency_ms):
+    replanner.observe(NodeTelemetry.from_heartbeat(
+        node_id, 1, {'recent_latency_ms': latency_ms, 'recent_requests': 10}
+    ))
+
+
+class TestOnlineReplanner:
+    """Tests for telemetry-driven minimal rebalancing."""
+
+    def test_balanced_load_keeps_layout(self):
+        """Test that nothing moves while nodes run as profiled."""
+        replanner = _replanner()
+        for node in range(3):
+            _heartbeat(replanner, f'node_{node}', 40.0)
+
+        assert replanner.propose() is None
+
+    def test_slow_node_sheds_layers_to_neighbours(self):
+        """Test that a slowed node gives layers away with few moves."""
+        replanner = _replanner()
+        _heartbeat(replanner, 'node_0', 40.0)
+        _heartbeat(replanner, 'node_1', 80.0)  # Twice as slow as profiled
+        _heartbeat(replanner, 'node_2', 40.0)
+
+        plan = replanner.propose()
+
+        assert plan is not None
+        assert plan.bottleneck_before_ms == pytest.approx(80.0)
+        assert plan.bottleneck_after_ms < 60.0
+        assert len(plan.stage_layers['stage_1']) < 4
+        assert {move.source_stage for move in plan.moves} == {'stage_1'}
+        # Stages stay contiguous and cover every layer once
+        ordered = [layer for layers in plan.stage_layers.values() for layer in layers]
+        assert ordered == [f'layer_{i}' for i in range(12)]
+
+    def test_slack_trades_bottleneck_for_fewer_moves(self):
+        """Test that a looser target never needs more moves."""
+        tight, loose = _replanner(slack=0.0), _replanner(slack=0.5)
+        for replanner in (tight, loose):
+            _heartbeat(replanner, 'node_0', 40.0)
+            _heartbeat(replanner, 'node_1', 40.0)
+            _heartbeat(replanner, 'node_2', 120.0)
+
+        tight_plan, loose_plan = tight.propose(), loose.propose()
+
+        assert len(loose_plan.moves) <= len(tight_plan.moves)
+        assert tight_plan.bottleneck_after_ms <= loose_plan.bottleneck_after_ms
+
+    def test_commit_adopts_layout(self):
+        """Test that a committed plan becomes the new baseline."""
+        replanner = _replanner()
+        _heartbeat(replanner, 'node_1', 80.0)
+        plan = replanner.propose(force=True)
+
+        replanner.commit(plan)
+
+        assert replanner.generation == 1
+        assert replanner.stage_layers == plan.stage_layers
+        assert plan.layers_by_node() == {
+            move.target_node: [m.layer_name for m in plan.moves if m.target_node == move.target_node]
+            for move in plan.moves
+        }
+
+    def test_heterogeneous_factors_reach_optimum(self):
+        """Test a layout where greedy packing misses the optimal bottleneck."""
+        costs = dict(zip('abcde', [1.0, 2.0, 7.0, 1.0, 1.0]))
+        replanner = OnlineReplanner(
+            costs,
+            {'s0': ['a', 'b'], 's1': ['c'], 's2': ['d'], 's3': ['e']},
+            {f's{i}': f'n{i}' for i in range(4)},
+            slack=0.0,
+        )
+        for node, latency in zip(['n0', 'n1', 'n2', 'n3'], [9.0, 14.0, 1.0, 0.5]):
+            _heartbeat(replanner, node, latency)
+
+        plan = replanner.propose(force=True)
+
+        assert plan.bottleneck_before_ms == pytest.approx(14.0)
+        assert plan.bottleneck_after_ms == pytest.approx(7.0)
+        assert plan.stage_layers == {'s0': ['a'], 's1': ['b'], 's2': ['c'], 's3': ['d', 'e']}
+
+    def test_min_bottleneck_matches_brute_force(self):
+        """Test the bottleneck search against every contiguous layout."""
+        rng = np.random.default_rng(0)
+        for _ in range(200):
+            num_stages = int(rng.integers(2, 5))
+            num_layers = int(rng.integers(num_stages, 9))
+            costs = rng.integers(1, 10, num_layers).astype(float)
+            factors = rng.choice([0.5, 1.0, 2.0, 3.0], num_stages)
+            prefix = np.concatenate([[0.0], np.cumsum(costs)])
+
+            best = min(
+                max(
+                    factor * (prefix[end] - prefix[start])
+                    for factor, start, end in zip(factors, (0,) + cuts, cuts + (num_layers,))
+                )
+                for cuts in itertools.combinations(range(1, num_layers), num_stages - 1)
+            )
+
+            assert _min_bottleneck(prefix, factors) == pytest.approx(best, rel=1e-5)
@@ -0,0 +1,146 @@
+"""
+Tests for contiguous bottleneck-minimizing partitioning.
+"""
+
+import itertools
+import random
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("torch")
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from noodle_poc.planner.optimizer import PartitionOptimizer
+
+
+def _layers(latencies, memory=None, output_mb=None):
+    return pd.DataFrame({
+        'layer_name': [f'layer_{i}' for i in range(len(latencies))],
+        'layer_index': list(range(len(latencies))),
+        'forward_latency_ms': latencies,
+        'parameter_size_mb': memory or [0.0] * len(latencies),
+        'output_size_mb': output_mb or [0.0] * len(latencies),
+    })
+
+
+def _device(device_id, compute_score=1.0, memory_gb=100.0, bandwidth_mbps=1000.0):
+    """Stand-in with the HardwareCapability attributes the optimizer reads."""
+    return SimpleNamespace(
+        device_id=device_id,
+        available_memory_gb=memory_gb,
+        network_bandwidth_mbps=bandwidth_mbps,
+        estimate_execution_time=lambda latency_ms: latency_ms / compute_score,
+    )
+
+
+def _brute_force_bottleneck(latencies, num_stages):
+    """Best bottleneck over every way to cut the layers into num_stages runs."""
+    best = float('inf')
+    for cuts in itertools.combinations(range(1, len(latencies)), num_stages - 1):
+        bounds = (0,) + cuts + (len(latencies),)
+        best = min(best, max(sum(latencies[a:b]) for a, b in zip(bounds, bounds[1:])))
+    return best
+
+
+class TestPartition:
+    """Tests for PartitionOptimizer.partition."""
+
+    def test_stages_are_contiguous_in_layer_order(self):
+        """Test that stages concatenate back to the original layer order."""
+        layers = _layers([5.0, 1.0, 9.0, 2.0, 7.0, 3.0]).sample(frac=1.0, random_state=0)
+
+        plan = PartitionOptimizer(layers).optimize(layers, num_stages=3)
+
+        assert [name for names in plan.values() for name in names] == [
+            f'layer_{i}' for i in range(6)
+        ]
+
+    def test_matches_brute_force(self):
+        """Test that the bottleneck is optimal on small random models."""
+        rng = random.Random(0)
+        for _ in range(20):
+            latencies = [rng.uniform(0.1, 10.0) for _ in range(9)]
+            layers = _layers(latencies)
+
+            partition = PartitionOptimizer(layers).partition(layers, num_stages=3)
+
+            assert partition.bottleneck_ms == pytest.approx(
+                _brute_force_bottleneck(latencies, 3), rel=1e-5
+            )
+
+    def test_faster_device_takes_more_layers(self):
+        """Test heterogeneous device speeds."""
+        layers = _layers([1.0] * 12)
+        devices = [_device('slow', compute_score=1.0), _device('fast', compute_score=3.0)]
+
+        partition = PartitionOptimizer(layers).partition(layers, devices=devices)
+
+        assert [len(names) for names in partition.stages.values()] == [3, 9]
+        assert partition.stage_devices == {'stage_0': 'slow', 'stage_1': 'fast'}
+        assert partition.bottleneck_ms == pytest.approx(3.0)
+
+    def test_respects_device_memory(self):
+        """Test that a small device gets fewer layers than balance would give it."""
+        layers = _layers([1.0] * 8, memory=[100.0] * 8)
+        devices = [_device('small', memory_gb=200 / (0.9 * 1024)), _device('large')]
+
+        partition = PartitionOptimizer(layers).partition(layers, devices=devices)
+
+        assert partition.stage_memory_mb['stage_0'] <= 200.0 + 1e-6
+        assert len(partition.stages['stage_1']) == 6
+
+    def test_oversized_layer_raises(self):
+        """Test that a layer larger than every device is reported."""
+        layers = _layers([1.0, 1.0], memory=[10.0, 5000.0])
+
+        with pytest.raises(ValueError, match='layer_1'):
+            PartitionOptimizer(layers).partition(layers, max_memory_per_stage_mb=1000.0)
+
+    def test_cuts_avoid_large_activations(self):
+        """Test that transfer time moves the cut to a small activation."""
+        # Cutting after layer_1 is balanced but sends 100 MB; after layer_2 sends 0.1 MB
+        layers = _layers([1.0, 1.0, 1.0, 1.0], output_mb=[100.0, 100.0, 0.1, 100.0])
+
+        partition = PartitionOptimizer(layers).partition(layers, num_stages=2)
+
+        assert partition.stages['stage_0'] == ['layer_0', 'layer_1', 'layer_2']
+        assert partition.bottleneck_ms == pytest.approx(3.0 + 0.1 * 8 * 1.1, rel=1e-4)
+
+    def test_thousand_layers_in_milliseconds(self):
+        """Test partitioning speed on a 1,000-layer model."""
+        rng = random.Random(1)
+        layers = _layers(
+            [rng.uniform(0.1, 5.0) for _ in range(1000)],
+            memory=[rng.uniform(1.0, 50.0) for _ in range(1000)],
+            output_mb=[rng.uniform(0.5, 4.0) for _ in range(1000)],
+        )
+        devices = [_device(f'dev_{i}', compute_score=1.0 + i % 3) for i in range(8)]
+        optimizer = PartitionOptimizer(layers)
+
+        start = time.perf_counter()
+        partition = optimizer.partition(layers, devices=devices)
+        elapsed = time.perf_counter() - start
+
+        assert sum(len(names) for names in partition.stages.values()) == 1000
+        assert elapsed < 0.1
+
+
+class TestGreedy:
+    """Tests for the greedy fallback."""
+
+    def test_greedy_is_contiguous(self):
+        """Test that greedy stages follow layer order."""
+        layers = _layers([2.0, 8.0, 1.0, 1.0, 4.0, 4.0])
+
+        plan = PartitionOptimizer(layers).optimize(layers, num_stages=2, algorithm='greedy')
+
+        assert plan == {
+            'stage_0': ['layer_0', 'layer_1'],
+            'stage_1': ['layer_2', 'layer_3', 'layer_4', 'layer_5'],
+        }
@@ -0,0 +1,97 @@
+"""
+Tests for micro-batched pipelined execution across stages.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("torch")
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from noodle_poc.network.pipeline import (
+    MicroBatch, PipelineScheduler, benchmark_pipeline, split_micro_batches
+)
+from noodle_poc.simulator.core import predict_pipeline
+
+
+def _sleep_stages(latency_sec: float, log: list):
+    async def execute_stage(stage_id: str, micro_batch: MicroBatch):
+        log.append((stage_id, micro_batch.micro_batch_id, micro_batch.passes))
+        await asyncio.sleep(latency_sec)
+    return execute_stage
+
+
+class TestPipelineScheduler:
+    """Tests for the GPipe-style scheduler."""
+
+    def test_every_micro_batch_visits_every_stage_per_pass(self):
+        """Test stage order and repeated passes."""
+        log = []
+        scheduler = PipelineScheduler(
+            ['s0', 's1', 's2'],
+            _sleep_stages(0.001, log),
+            on_complete=lambda mb: mb.passes < 2,
+        )
+
+        stats = asyncio.run(scheduler.run(split_micro_batches(list(range(5)), 2)))
+
+        assert stats.num_micro_batches == 3
+        assert stats.stage_executions == 3 * 3 * 2
+        for micro_batch_id in range(3):
+            visits = [stage for stage, mb, _ in log if mb == micro_batch_id]
+            assert visits == ['s0', 's1', 's2'] * 2
+
+    def test_stages_overlap(self):
+        """Test that K stages with M micro-batches beat serial execution."""
+        log = []
+        scheduler = PipelineScheduler(['s0', 's1', 's2', 's3'], _sleep_stages(0.02, log))
+
+        stats = asyncio.run(scheduler.run(split_micro_batches(list(range(8)), 1)))
+
+        # Serial: 8 * 4 * 20ms = 640ms; pipelined: (8 + 3) * 20ms = 220ms
+        assert stats.makespan_sec < 0.45
+        assert stats.bubble_fraction < 0.5
+        assert all(u > 0.5 for u in stats.stage_utilization.values())
+
+    def test_stage_error_finishes_micro_batch(self):
+        """Test that a failing stage does not stall the pipeline."""
+        async def execute_stage(stage_id, micro_batch):
+            if stage_id == 's1' and micro_batch.micro_batch_id == 0:
+                raise RuntimeError("boom")
+
+        micro_batches = split_micro_batches([0, 1], 1)
+        asyncio.run(PipelineScheduler(['s0', 's1'], execute_stage).run(micro_batches))
+
+        assert str(micro_batches[0].error) == "boom"
+        assert micro_batches[1].error is None and micro_batches[1].passes == 1
+
+
+class TestPredictPipeline:
+    """Tests for the analytical pipeline model."""
+
+    def test_full_pipeline(self):
+        """Test the GPipe makespan with enough micro-batches."""
+        prediction = predict_pipeline([10.0] * 4, num_micro_batches=8)
+
+        assert prediction['makespan_ms'] == pytest.approx((8 + 3) * 10.0)
+        assert prediction['bubble_fraction'] == pytest.approx(3 / 11)
+
+    def test_single_micro_batch_is_serial(self):
+        """Test that one micro-batch with several passes cannot overlap."""
+        prediction = predict_pipeline([10.0] * 4, num_micro_batches=1, passes=3)
+
+        assert prediction['makespan_ms'] == pytest.approx(120.0)
+        assert prediction['bubble_fraction'] == pytest.approx(0.75)
+
+
+@pytest.mark.benchmark
+def test_runtime_matches_simulator_on_process_workers():
+    """Compare the scheduler on local worker processes with the prediction."""
+    result = benchmark_pipeline([10.0, 10.0, 10.0, 10.0], num_requests=16, micro_batch_size=2, decode_steps=4)
+
+    assert result['measured_throughput_rps'] > 2 * result['sequential_throughput_rps']
+    assert abs(result['prediction_error']) < 0.5
@@ -0,0 +1,116 @@
+"""
+Tests for sampled low-overhead layer instrumentation.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from noodle_poc.hooks import ModelInstrumentor, SampledLayerHook, SamplingPolicy
+from noodle_poc.metrics import MetricsCollector
+
+
+def _model():
+    return torch.nn.Sequential(torch.nn.Linear(8, 16), torch.nn.ReLU(), torch.nn.Linear(16, 4))
+
+
+def _run(instrumentor, model, num_runs):
+    instrumentor.instrument_model(model)
+    with torch.no_grad():
+        for _ in range(num_runs):
+            model(torch.randn(2, 8))
+
+
+class TestSampledInstrumentation:
+    """Tests for SamplingPolicy-driven hooks."""
+
+    def test_every_nth_call_is_timed(self):
+        """Test that only sampled calls become metrics."""
+        collector = MetricsCollector()
+        instrumentor = ModelInstrumentor(collector, SamplingPolicy(every_n=5))
+
+        _run(instrumentor, _model(), 20)
+
+        assert collector.metrics_history == {}  # Deferred until flush
+        assert instrumentor.flush() == 2 * 4
+        runs = collector.metrics_history['0']
+        assert len(runs) == 4
+        assert all(run.forward_latency_ms > 0 for run in runs)
+        assert runs[0].output_shapes == [[2, 16]]
+        assert runs[0].num_parameters == 8 * 16 + 16
+
+    def test_adaptive_backs_off_for_stable_layers(self):
+        """Test that the interval grows once a layer's mean is known."""
+        hook = SampledLayerHook(
+            'layer', 'Linear', 0, MetricsCollector(),
+            SamplingPolicy(adaptive=True, min_samples=5, target_rel_error=1.0, max_interval=8),
+        )
+        module = torch.nn.Identity()
+        for _ in range(100):
+            hook.pre_forward_hook(module, ())
+            hook.post_forward_hook(module, (), torch.zeros(1))
+
+        assert hook.interval == 8
+        assert hook.samples < hook.calls
+
+    def test_ring_buffer_keeps_latest_samples(self):
+        """Test that a full buffer wraps in order."""
+        hook = SampledLayerHook('layer', 'Linear', 0, MetricsCollector(), SamplingPolicy(buffer_size=4))
+        for duration in range(1, 7):
+            hook._store(duration)
+
+        assert hook.drain().tolist() == [3, 4, 5, 6]
+        assert len(hook.drain()) == 0
+
+    def test_drain_restarts_adaptive_statistics(self):
+        """Test that adaptation after drain() only sees the new samples."""
+        policy = SamplingPolicy(adaptive=True, min_samples=20, max_interval=64)
+        drained = SampledLayerHook('layer', 'Linear', 0, MetricsCollector(), policy)
+        fresh = SampledLayerHook('layer', 'Linear', 0, MetricsCollector(), policy)
+
+        def feed(hook, count):
+            for i in range(count):
+                hook._store(1_000 if i % 2 else 100_000)
+                hook._adapt()
+
+        feed(drained, 100)
+        assert len(drained.drain()) == 100
+        feed(drained, 40)
+        feed(fresh, 40)
+
+        assert drained.interval == fresh.interval == 1
+
+    def test_overhead_report(self):
+        """Test that overhead is reported alongside the samples."""
+        instrumentor = ModelInstrumentor(MetricsCollector(), SamplingPolicy(every_n=4))
+        _run(instrumentor, _model(), 8)
+
+        report = instrumentor.get_overhead_report(forward_time_ms=100.0)
+
+        assert report['mode'] == 'sampled'
+        assert report['hook_calls'] == 16
+        assert report['sampled_calls'] == 4
+        assert report['hook_time_ms'] > 0
+        assert report['overhead_pct'] == pytest.approx(report['hook_time_ms'])
+
+
+class TestFullInstrumentation:
+    """Tests for the default every-call mode."""
+
+    def test_remove_hooks_removes_post_hooks(self):
+        """Test that no hook fires after removal."""
+        collector = MetricsCollector()
+        instrumentor = ModelInstrumentor(collector)
+        model = _model()
+        _run(instrumentor, model, 1)
+        instrumentor.remove_hooks()
+        collector.metrics_history.clear()
+
+        model(torch.randn(2, 8))
+
+        assert collector.metrics_history == {}
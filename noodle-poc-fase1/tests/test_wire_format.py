@@ -0,0 +1,103 @@
+"""
+Tests for the zero-copy tensor wire format.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from noodle_poc.network.utils import (
+    deserialize_tensor, pack_tensor, serialize_tensor, unpack_tensor
+)
+
+
+class TestSerializeTensor:
+    """Tests for serialize_tensor/deserialize_tensor."""
+
+    @pytest.mark.parametrize("dtype", [torch.float32, torch.float16, torch.bfloat16, torch.int64, torch.bool])
+    def test_roundtrip(self, dtype):
+        """Test that values, dtype and shape survive the trip."""
+        tensor = (torch.randn(2, 3, 4) * 10).to(dtype)
+
+        result = deserialize_tensor(serialize_tensor(tensor))
+
+        assert result.dtype == dtype
+        assert result.shape == tensor.shape
+        assert torch.equal(result, tensor)
+
+    def test_payload_is_not_copied(self):
+        """Test that both ends share memory with the tensor/buffer."""
+        tensor = torch.arange(12, dtype=torch.float32).view(3, 4)
+
+        data = serialize_tensor(tensor)
+        tensor[0, 0] = 42.0
+        buffer = bytearray(data['data'])
+        result = deserialize_tensor(dict(data, data=buffer))
+        buffer[0:4] = bytes(4)
+
+        assert data['num_bytes'] == 12 * 4
+        assert bytes(data['data'][:4]) == torch.tensor([42.0]).numpy().tobytes()
+        assert result[0, 0].item() == 0.0
+
+    def test_non_contiguous_and_empty(self):
+        """Test transposed and zero-size tensors."""
+        tensor = torch.randn(3, 5).t()
+        empty = torch.zeros(0, 7)
+
+        assert torch.equal(deserialize_tensor(serialize_tensor(tensor)), tensor)
+        assert deserialize_tensor(serialize_tensor(empty)).shape == (0, 7)
+
+    def test_fp16_quantization(self):
+        """Test that fp16 halves the bytes and restores the dtype."""
+        tensor = torch.randn(64, 32)
+
+        data = serialize_tensor(tensor, quantization='fp16')
+        result = deserialize_tensor(data)
+
+        assert data['num_bytes'] == tensor.numel() * 2
+        assert result.dtype == torch.float32
+        assert torch.allclose(result, tensor, atol=1e-2)
+
+    def test_int8_quantization(self):
+        """Test that int8 quarters the bytes within one quantization step."""
+        tensor = torch.randn(64, 32)
+
+        data = serialize_tensor(tensor, quantization='int8')
+        result = deserialize_tensor(data)
+
+        assert data['num_bytes'] == tensor.numel()
+        assert (result - tensor).abs().max() <= data['scale'] / 2 + 1e-6
+
+    def test_integer_tensors_are_not_quantized(self):
+        """Test that token ids are sent as-is."""
+        tokens = torch.tensor([1, 50256, 7])
+
+        data = serialize_tensor(tokens, quantization='int8')
+
+        assert data['wire_dtype'] == 'int64'
+        assert torch.equal(deserialize_tensor(data), tokens)
+
+
+class TestPackTensor:
+    """Tests for header + payload frames."""
+
+    @pytest.mark.parametrize("quantization", [None, 'fp16', 'int8'])
+    def test_frames_roundtrip(self, quantization):
+        """Test decoding the concatenated frames."""
+        tensor = torch.randn(4, 1, 8)
+
+        header, payload = pack_tensor(tensor, quantization)
+        result = unpack_tensor(bytes(header) + bytes(payload))
+
+        assert result.shape == tensor.shape
+        assert torch.allclose(result, tensor, atol=0.05)
+
+    def test_rejects_foreign_buffers(self):
+        """Test that non-tensor data is refused."""
+        with pytest.raises(ValueError):
+            unpack_tensor(b'\x80\x04' + bytes(30))
@@ -0,0 +1,246 @@
+﻿"""
+Noodle Vector Database::Ann - ann.py
+Copyright Â© 2025 Michael van Erp. All rights reserved.
+
+This file is part of the NoodleCore project.
+Licensed under the MIT License - see LICENSE file for details.
+
+Unauthorized copying, distribution, or modification is prohibited.
+"""
+
+"""Inverted-file (IVF) approximate nearest-neighbour index.
+
+The index stores integer keys only; callers read the vectors from
+whichever tier holds them, so searching never promotes cold vectors.
+"""
+
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from .tiers import GrowableArray
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Rows scaled to unit length (zero rows stay zero)."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def spherical_kmeans(
+    vectors: np.ndarray, nlist: int, iterations: int = 8, seed: int = 0
+) -> np.ndarray:
+    """Unit-length centroids of normalized vectors by cosine k-means."""
+    rng = np.random.default_rng(seed)
+    nlist = min(nlist, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignment = assign(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        empty = ~np.any(sums, axis=1)
+        # Reseed empty lists from random points
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        centroids = normalize(sums)
+    return centroids
+
+
+def assign(vectors: np.ndarray, centroids: np.ndarray, block: int = 65536) -> np.ndarray:
+    """Nearest centroid (max inner product) per vector, in blocks."""
+    result = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), block):
+        scores = vectors[start : start + block] @ centroids.T
+        result[start : start + block] = np.argmax(scores, axis=1)
+    return result
+
+
+def merge_topk(
+    best_scores: np.ndarray,
+    best_keys: np.ndarray,
+    rows: np.ndarray,
+    scores: np.ndarray,
+    keys: np.ndarray,
+):
+    """
+    Fold a block of scores into the running top-k of some queries.
+
+    Args:
+        best_scores: (num_queries, k) running scores, -inf where empty
+        best_keys: (num_queries, k) running keys, -1 where empty
+        rows: Which queries the block was scored for
+        scores: (len(rows), len(keys)) block scores
+        keys: Keys of the block columns
+    """
+    k = best_scores.shape[1]
+    merged_scores = np.concatenate([best_scores[rows], scores], axis=1)
+    merged_keys = np.concatenate(
+        [best_keys[rows], np.broadcast_to(keys, (len(rows), len(keys)))], axis=1
+    )
+    if merged_scores.shape[1] > k:
+        top = np.argpartition(-merged_scores, k - 1, axis=1)[:, :k]
+        merged_scores = np.take_along_axis(merged_scores, top, axis=1)
+        merged_keys = np.take_along_axis(merged_keys, top, axis=1)
+    best_scores[rows] = merged_scores
+    best_keys[rows] = merged_keys
+
+
+class ScalarQuantizer:
+    """
+    Int8 codes of normalized vectors with one scale per vector.
+
+    Scoring a query against codes costs a quarter of the memory traffic
+    of float32; callers rerank the survivors with exact vectors.
+    """
+
+    def __init__(self, dim: int, capacity: int = 1024):
+        self.dim = dim
+        self.codes = np.zeros((max(1, capacity), dim), dtype=np.int8)
+        self.scales = np.zeros(len(self.codes), dtype=np.float32)
+
+    def _reserve(self, size: int):
+        if size <= len(self.codes):
+            return
+        capacity = max(size, 2 * len(self.codes))
+        codes = np.zeros((capacity, self.dim), dtype=np.int8)
+        codes[: len(self.codes)] = self.codes
+        scales = np.zeros(capacity, dtype=np.float32)
+        scales[: len(self.scales)] = self.scales
+        self.codes, self.scales = codes, scales
+
+    def set(self, keys: np.ndarray, vectors: np.ndarray):
+        """Encode normalized vectors for the given keys."""
+        keys = np.asarray(keys, dtype=np.int64)
+        if not len(keys):
+            return
+        self._reserve(int(keys.max()) + 1)
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        self.codes[keys] = np.rint(vectors / scales[:, None]).astype(np.int8)
+        self.scales[keys] = scales
+
+    def score(self, queries: np.ndarray, keys: np.ndarray) -> np.ndarray:
+        """Approximate (len(queries), len(keys)) inner products."""
+        codes = self.codes[keys].astype(np.float32)
+        return (queries @ codes.T) * self.scales[keys]
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + self.scales.nbytes
+
+
+class IVFIndex:
+    """
+    IVF index over integer keys.
+
+    Until enough vectors are added to train, every key sits in one flat
+    list and search is exhaustive. Training clusters a sample with
+    spherical k-means and distributes all keys over nlist inverted lists;
+    search then scans the nprobe lists closest to the query. The index
+    retrains when it has grown retrain_factor times past its training size.
+    """
+
+    def __init__(
+        self,
+        dim: int,
+        nlist: Optional[int] = None,
+        nprobe: int = 8,
+        min_train_size: int = 4096,
+        train_points_per_list: int = 32,
+        retrain_factor: float = 8.0,
+        seed: int = 0,
+    ):
+        self.dim = dim
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.train_points_per_list = train_points_per_list
+        self.retrain_factor = retrain_factor
+        self.seed = seed
+
+        self.centroids: Optional[np.ndarray] = None
+        self.lists: List[GrowableArray] = [GrowableArray()]
+        self.list_of = GrowableArray(dtype=np.int32, fill=-1)  # key -> list
+        self.size = 0
+        self.trained_size = 0
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def needs_training(self, incoming: int = 0) -> bool:
+        """Whether adding incoming more keys should (re)train first."""
+        total = self.size + incoming
+        if not self.is_trained:
+            return total >= self.min_train_size
+        return total >= self.trained_size * self.retrain_factor
+
+    def train(self, sample: np.ndarray, expected_size: int):
+        """
+        Fit centroids to a sample of normalized vectors.
+
+        Existing keys must be re-added with rebuild() afterwards.
+        """
+        nlist = self.nlist or int(np.clip(np.sqrt(expected_size), 16, 4096))
+        self.centroids = spherical_kmeans(sample, nlist, seed=self.seed)
+        self.lists = [GrowableArray() for _ in range(len(self.centroids))]
+        self.trained_size = max(expected_size, 1)
+
+    def rebuild(self, keys: np.ndarray, load: Callable[[np.ndarray], np.ndarray], block: int = 65536):
+        """Reassign existing keys after training, loading vectors in blocks."""
+        self.lists = [GrowableArray() for _ in range(len(self.centroids))]
+        self.size = 0
+        for start in range(0, len(keys), block):
+            chunk = keys[start : start + block]
+            self.add(chunk, normalize(load(chunk)))
+
+    def add(self, keys: np.ndarray, vectors: np.ndarray):
+        """Insert keys with their normalized vectors."""
+        keys = np.asarray(keys, dtype=np.int64)
+        if not len(keys):
+            return
+        if self.is_trained:
+            assignment = assign(vectors, self.centroids)
+        else:
+            assignment = np.zeros(len(keys), dtype=np.int64)
+
+        # Group by list so each list grows once per call
+        order = np.argsort(assignment, kind="stable")
+        sorted_lists = assignment[order]
+        bounds = np.flatnonzero(np.diff(sorted_lists)) + 1
+        for group in np.split(order, bounds):
+            self.lists[int(assignment[group[0]])].extend(keys[group])
+
+        needed = int(keys.max()) + 1
+        if needed > len(self.list_of):
+            self.list_of.extend(np.full(needed - len(self.list_of), -1, dtype=np.int32))
+        self.list_of.data[keys] = assignment
+        self.size += len(keys)
+
+    def move(self, key: int, vector: np.ndarray):
+        """Reassign one key whose vector changed."""
+        old = int(self.list_of.data[key])
+        new = int(assign(vector[None, :], self.centroids)[0]) if self.is_trained else 0
+        if old == new:
+            return
+        members = self.lists[old]
+        view = members.view()
+        position = int(np.flatnonzero(view == key)[0])
+        view[position] = view[members.size - 1]
+        members.size -= 1
+        self.lists[new].append(key)
+        self.list_of.data[key] = new
+
+    def probe(self, queries: np.ndarray, nprobe: Optional[int] = None) -> np.ndarray:
+        """(num_queries, nprobe) ids of the lists closest to each normalized query."""
+        if not self.is_trained:
+            return np.zeros((len(queries), 1), dtype=np.int64)
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        scores = queries @ self.centroids.T
+        return np.argpartition(-scores, nprobe - 1, axis=1)[:, :nprobe]
+
+    def candidates(self, query: np.ndarray, nprobe: Optional[int] = None) -> np.ndarray:
+        """Keys in the lists closest to a normalized query."""
+        probes = self.probe(query[None, :], nprobe)[0]
+        return np.concatenate([self.lists[int(p)].view() for p in probes])
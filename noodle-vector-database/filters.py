@@ -0,0 +1,92 @@
+﻿"""
+Noodle Vector Database::Filters - filters.py
+Copyright Â© 2025 Michael van Erp. All rights reserved.
+
+This file is part of the NoodleCore project.
+Licensed under the MIT License - see LICENSE file for details.
+
+Unauthorized copying, distribution, or modification is prohibited.
+"""
+
+"""Metadata inverted index for filtered search.
+
+Each metadata field maps value -> set of keys. Filters combine fields
+with AND and the values listed for one field with OR.
+"""
+
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Optional, Set
+
+import numpy as np
+
+_SCALARS = (str, int, float, bool, type(None))
+
+
+def _values(value: Any) -> Iterable:
+    """Indexable values of one field (list elements are indexed separately)."""
+    if isinstance(value, (list, tuple, set)):
+        return [v for v in value if isinstance(v, _SCALARS)]
+    if isinstance(value, _SCALARS):
+        return [value]
+    return []
+
+
+class MetadataIndex:
+    """Per-field inverted index over integer keys."""
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[Any, Set[int]]] = defaultdict(lambda: defaultdict(set))
+        self._arrays: Dict[tuple, np.ndarray] = {}  # (field, value) -> sorted keys
+
+    def add(self, key: int, metadata: Optional[Dict]):
+        """Index one key's metadata."""
+        for field, value in (metadata or {}).items():
+            for v in _values(value):
+                self.postings[field][v].add(key)
+                self._arrays.pop((field, v), None)
+
+    def remove(self, key: int, metadata: Optional[Dict]):
+        """Drop one key's metadata from the index."""
+        for field, value in (metadata or {}).items():
+            values = self.postings.get(field)
+            if values is None:
+                continue
+            for v in _values(value):
+                values.get(v, set()).discard(key)
+                self._arrays.pop((field, v), None)
+
+    def _keys(self, field: str, value: Any) -> np.ndarray:
+        cached = self._arrays.get((field, value))
+        if cached is None:
+            keys = self.postings.get(field, {}).get(value, ())
+            cached = np.fromiter(keys, dtype=np.int64, count=len(keys))
+            cached.sort()
+            self._arrays[(field, value)] = cached
+        return cached
+
+    def match(self, filters: Dict[str, Any]) -> np.ndarray:
+        """
+        Sorted keys whose metadata satisfies every filter.
+
+        Args:
+            filters: field -> value, or field -> list of accepted values
+                (an empty list matches nothing)
+
+        Returns:
+            Sorted array of matching keys
+        """
+        result = None
+        # Smallest posting lists first keeps the intersections cheap
+        clauses = []
+        for field, accepted in filters.items():
+            # Only scalars are indexed, so other values match nothing
+            arrays = [self._keys(field, v) for v in _values(accepted)]
+            if not arrays:
+                return np.empty(0, dtype=np.int64)
+            keys = arrays[0] if len(arrays) == 1 else np.unique(np.concatenate(arrays))
+            clauses.append(keys)
+        for keys in sorted(clauses, key=len):
+            result = keys if result is None else np.intersect1d(result, keys, assume_unique=True)
+            if not len(result):
+                break
+        return result if result is not None else np.empty(0, dtype=np.int64)
@@ -0,0 +1,243 @@
+﻿"""
+Noodle Vector Database::Tiers - tiers.py
+Copyright Â© 2025 Michael van Erp. All rights reserved.
+
+This file is part of the NoodleCore project.
+Licensed under the MIT License - see LICENSE file for details.
+
+Unauthorized copying, distribution, or modification is prohibited.
+"""
+
+"""Storage tiers for the vector database.
+
+The hot tier is one contiguous in-RAM matrix; the cold tier is an
+append-only memory-mapped file. Both address vectors by integer row.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+class GrowableArray:
+    """1-D NumPy array with amortized O(1) append."""
+
+    def __init__(self, dtype=np.int64, capacity: int = 16, fill=0):
+        self.data = np.full(max(1, capacity), fill, dtype=dtype)
+        self.size = 0
+        self.fill = fill
+
+    def _reserve(self, size: int):
+        if size <= len(self.data):
+            return
+        capacity = max(size, 2 * len(self.data))
+        grown = np.full(capacity, self.fill, dtype=self.data.dtype)
+        grown[: self.size] = self.data[: self.size]
+        self.data = grown
+
+    def append(self, value) -> int:
+        """Append one value and return its index."""
+        self._reserve(self.size + 1)
+        self.data[self.size] = value
+        self.size += 1
+        return self.size - 1
+
+    def extend(self, values: np.ndarray):
+        """Append many values."""
+        self._reserve(self.size + len(values))
+        self.data[self.size : self.size + len(values)] = values
+        self.size += len(values)
+
+    def view(self) -> np.ndarray:
+        """The used part of the array (no copy)."""
+        return self.data[: self.size]
+
+    def __len__(self) -> int:
+        return self.size
+
+
+class HotTier:
+    """In-RAM vectors in one contiguous matrix with a free-slot list."""
+
+    def __init__(self, dim: int, capacity: int = 1024):
+        self.dim = dim
+        self.matrix = np.zeros((max(1, capacity), dim), dtype=np.float32)
+        self.keys = np.full(len(self.matrix), -1, dtype=np.int64)  # slot -> key
+        self.free: List[int] = list(range(len(self.matrix) - 1, -1, -1))
+        self.size = 0
+
+    def _grow(self):
+        old = len(self.matrix)
+        matrix = np.zeros((2 * old, self.dim), dtype=np.float32)
+        matrix[:old] = self.matrix
+        keys = np.full(2 * old, -1, dtype=np.int64)
+        keys[:old] = self.keys
+        self.matrix, self.keys = matrix, keys
+        self.free.extend(range(2 * old - 1, old - 1, -1))
+
+    def add(self, key: int, vector: np.ndarray) -> int:
+        """Store a vector and return its slot."""
+        if not self.free:
+            self._grow()
+        slot = self.free.pop()
+        self.matrix[slot] = vector
+        self.keys[slot] = key
+        self.size += 1
+        return slot
+
+    def add_many(self, keys: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+        """Store a block of vectors and return their slots."""
+        while len(self.free) < len(keys):
+            self._grow()
+        slots = np.array(self.free[len(self.free) - len(keys) :][::-1], dtype=np.int64)
+        del self.free[len(self.free) - len(keys) :]
+        self.matrix[slots] = vectors
+        self.keys[slots] = keys
+        self.size += len(keys)
+        return slots
+
+    def update(self, slot: int, vector: np.ndarray):
+        """Overwrite the vector in a slot."""
+        self.matrix[slot] = vector
+
+    def remove(self, slot: int):
+        """Free a slot."""
+        self.keys[slot] = -1
+        self.free.append(slot)
+        self.size -= 1
+
+    def get(self, slot: int) -> np.ndarray:
+        """Copy of the vector in a slot."""
+        return self.matrix[slot].copy()
+
+    def take(self, slots: np.ndarray) -> np.ndarray:
+        """Vectors for many slots."""
+        return self.matrix[slots]
+
+    @property
+    def vector_bytes(self) -> int:
+        """Bytes of live vectors."""
+        return self.size * self.dim * self.matrix.itemsize
+
+    @property
+    def allocated_bytes(self) -> int:
+        """Bytes reserved by the matrix and slot table."""
+        return self.matrix.nbytes + self.keys.nbytes
+
+
+class ColdTier:
+    """
+    Append-only memory-mapped float32 vectors with an id -> row index.
+
+    Vectors live in vectors.f32 (row-major, preallocated in chunks);
+    index.jsonl records one {"id", "row", "metadata"} line per append, and
+    the last line for an id wins when the tier is reopened.
+    """
+
+    VECTORS_FILE = "vectors.f32"
+    INDEX_FILE = "index.jsonl"
+
+    def __init__(self, path: str, dim: int, grow_rows: int = 65536):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.dim = dim
+        self.grow_rows = grow_rows
+        self.row_bytes = dim * np.dtype(np.float32).itemsize
+
+        self.rows: Dict[str, int] = {}
+        self.metadata: Dict[str, Dict] = {}
+        self.size = 0
+
+        self._vectors_path = self.path / self.VECTORS_FILE
+        self._index_path = self.path / self.INDEX_FILE
+        self._load_index()
+
+        if not self._vectors_path.exists():
+            self._vectors_path.touch()
+        capacity = os.path.getsize(self._vectors_path) // self.row_bytes
+        self._map(max(capacity, self.size, grow_rows))
+        self._index_file = open(self._index_path, "a", encoding="utf-8")
+
+    def _load_index(self):
+        if not self._index_path.exists():
+            return
+        with open(self._index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                self.rows[entry["id"]] = entry["row"]
+                self.metadata[entry["id"]] = entry.get("metadata") or {}
+                self.size = max(self.size, entry["row"] + 1)
+
+    def _map(self, capacity: int):
+        """(Re)map the vectors file with room for capacity rows."""
+        if os.path.getsize(self._vectors_path) < capacity * self.row_bytes:
+            with open(self._vectors_path, "r+b") as f:
+                f.truncate(capacity * self.row_bytes)
+        self.vectors = np.memmap(
+            self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim)
+        )
+
+    def _reserve(self, rows: int):
+        if self.size + rows <= len(self.vectors):
+            return
+        self.vectors.flush()
+        capacity = max(self.size + rows, len(self.vectors) + self.grow_rows)
+        del self.vectors
+        self._map(capacity)
+
+    def append(self, id_: str, vector: np.ndarray, metadata: Optional[Dict] = None) -> int:
+        """Append one vector and return its row."""
+        return int(self.append_many([id_], np.asarray(vector)[None, :], [metadata])[0])
+
+    def append_many(
+        self,
+        ids: List[str],
+        vectors: np.ndarray,
+        metadata: Optional[Iterable[Optional[Dict]]] = None,
+    ) -> np.ndarray:
+        """Append a block of vectors and return their rows."""
+        self._reserve(len(ids))
+        start = self.size
+        self.vectors[start : start + len(ids)] = vectors
+        self.size += len(ids)
+
+        metadata = list(metadata) if metadata is not None else [None] * len(ids)
+        lines = []
+        for offset, (id_, meta) in enumerate(zip(ids, metadata)):
+            self.rows[id_] = start + offset
+            self.metadata[id_] = meta or {}
+            lines.append(json.dumps({"id": id_, "row": start + offset, "metadata": meta or {}}))
+        self._index_file.write("\n".join(lines) + "\n")
+        return np.arange(start, start + len(ids), dtype=np.int64)
+
+    def get(self, row: int) -> np.ndarray:
+        """Copy of one row."""
+        return np.array(self.vectors[row])
+
+    def take(self, rows: np.ndarray) -> np.ndarray:
+        """Rows in the given order, read in ascending file order."""
+        order = np.argsort(rows, kind="stable")
+        block = np.empty((len(rows), self.dim), dtype=np.float32)
+        block[order] = self.vectors[rows[order]]
+        return block
+
+    @property
+    def file_bytes(self) -> int:
+        """Bytes of appended rows on disk (including superseded rows)."""
+        return self.size * self.row_bytes
+
+    def flush(self):
+        """Write mapped pages and the index to disk."""
+        self.vectors.flush()
+        self._index_file.flush()
+
+    def close(self):
+        """Flush and release the file handles."""
+        self.flush()
+        self._index_file.close()
+        del self.vectors
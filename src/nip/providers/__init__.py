@@ -4,6 +4,8 @@ Neural Interface Protocol - LLM Provider Integrations
 """
 
 from .base_provider import BaseProvider
+from .embedding_cache import EmbeddingCache
+from .streaming import StreamMultiplexer, StreamFanOut, StreamRace, StreamDelta, StreamMetrics
 from .anthropic_provider import AnthropicProvider
 from .cohere_provider import CohereProvider
 from .mistral_provider import MistralProvider
@@ -12,6 +14,12 @@ from .local_llm_provider import LocalLLMProvider
 
 __all__ = [
     'BaseProvider',
+    'EmbeddingCache',
+    'StreamMultiplexer',
+    'StreamFanOut',
+    'StreamRace',
+    'StreamDelta',
+    'StreamMetrics',
     'AnthropicProvider',
     'CohereProvider',
     'MistralProvider',
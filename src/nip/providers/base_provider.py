@@ -6,11 +6,15 @@ Abstract base class for all LLM providers
 from abc import ABC, abstractmethod
 from typing import Optional
 from collections.abc import AsyncIterator, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from enum import Enum
+import asyncio
 import time
 import logging
 
+from .embedding_cache import EmbeddingCache
+
 logger = logging.getLogger(__name__)
 
 
@@ -41,6 +45,7 @@ class ProviderConfig:
     timeout: int = 60
     max_retries: int = 3
     retry_delay: float = 1.0
+    embedding_cache_dir: Optional[str] = None
 
 
 @dataclass
@@ -96,6 +101,14 @@ class BaseProvider(ABC):
     consistent interface across different LLM backends.
     """
 
+    # Limits for one embedding request; providers override these
+    EMBED_BATCH_MAX_TEXTS = 96
+    EMBED_BATCH_MAX_TOKENS = 16000
+    # Concurrent embedding sub-batches
+    EMBED_MAX_CONCURRENCY = 4
+    # Embedding model used when none is passed; providers with embeddings set it
+    DEFAULT_EMBEDDING_MODEL: Optional[str] = None
+
     def __init__(self, config: ProviderConfig):
         """
         Initialize the provider with configuration.
@@ -105,6 +118,18 @@ class BaseProvider(ABC):
         """
         self.config = config
         self.provider_name = self.__class__.__name__.replace("Provider", "").lower()
+        self.embedding_cache = EmbeddingCache(config.embedding_cache_dir) if config.embedding_cache_dir else None
+        self.tokenizer = None
+
+    def set_tokenizer(self, tokenizer) -> None:
+        """
+        Use an exact tokenizer for token counts.
+
+        Args:
+            tokenizer: Object with a count(text) -> int method, or None
+                for the character approximation
+        """
+        self.tokenizer = tokenizer
 
     @abstractmethod
     def complete(
@@ -184,6 +209,140 @@ class BaseProvider(ABC):
         """Async version of embed()"""
         raise NotImplementedError(f"{self.provider_name} does not support embeddings")
 
+    def embed_batch(self, texts: list[str], **kwargs) -> list[EmbeddingResponse]:
+        """
+        Generate embeddings for many texts.
+
+        Cached texts are served from the embedding cache. The rest are
+        split into sub-batches within the provider's request limits, and
+        the sub-batches are sent concurrently.
+
+        Args:
+            texts: Texts to embed
+            **kwargs: Additional provider-specific parameters (e.g. model)
+
+        Returns:
+            EmbeddingResponse per text, in order
+        """
+        results, missing, model = self._lookup_cached_embeddings(texts, kwargs)
+        batches = self._plan_embed_batches([texts[i] for i in missing])
+
+        if len(batches) == 1:
+            responses = [self._embed_many(batches[0], **kwargs)]
+        elif batches:
+            with ThreadPoolExecutor(max_workers=self.EMBED_MAX_CONCURRENCY) as executor:
+                responses = list(executor.map(lambda batch: self._embed_many(batch, **kwargs), batches))
+        else:
+            responses = []
+
+        return self._merge_embeddings(texts, results, missing, model, responses)
+
+    async def aembed_batch(self, texts: list[str], **kwargs) -> list[EmbeddingResponse]:
+        """Async version of embed_batch()"""
+        results, missing, model = self._lookup_cached_embeddings(texts, kwargs)
+        batches = self._plan_embed_batches([texts[i] for i in missing])
+        semaphore = asyncio.Semaphore(self.EMBED_MAX_CONCURRENCY)
+
+        async def run(batch: list[str]) -> list[EmbeddingResponse]:
+            async with semaphore:
+                return await self._aembed_many(batch, **kwargs)
+
+        responses = await asyncio.gather(*(run(batch) for batch in batches))
+        return self._merge_embeddings(texts, results, missing, model, list(responses))
+
+    def _embed_many(self, texts: list[str], **kwargs) -> list[EmbeddingResponse]:
+        """
+        Embed one sub-batch in a single request.
+
+        Providers with a native batch endpoint override this; the default
+        embeds the texts one at a time.
+        """
+        return [self.embed(text, **kwargs) for text in texts]
+
+    async def _aembed_many(self, texts: list[str], **kwargs) -> list[EmbeddingResponse]:
+        """Async version of _embed_many()"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, lambda: self._embed_many(texts, **kwargs))
+
+    def _plan_embed_batches(self, texts: list[str]) -> list[list[str]]:
+        """Split texts into sub-batches within the request limits"""
+        batches: list[list[str]] = []
+        current: list[str] = []
+        tokens = 0
+        for text in texts:
+            text_tokens = self.count_tokens(text)
+            if current and (
+                len(current) >= self.EMBED_BATCH_MAX_TEXTS
+                or tokens + text_tokens > self.EMBED_BATCH_MAX_TOKENS
+            ):
+                batches.append(current)
+                current, tokens = [], 0
+            current.append(text)
+            tokens += text_tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def _lookup_cached_embeddings(
+        self,
+        texts: list[str],
+        kwargs: dict
+    ) -> tuple[list[Optional[EmbeddingResponse]], list[int], str]:
+        """Return cached responses, indices still to embed, and the model"""
+        model = kwargs.get("model") or self._default_embedding_model()
+        if self.embedding_cache is None:
+            cached: list[Optional[list[float]]] = [None] * len(texts)
+        else:
+            cached = self.embedding_cache.get_many(self.provider_name, model, texts)
+
+        # Embed each distinct uncached text once
+        results: list[Optional[EmbeddingResponse]] = []
+        missing: list[int] = []
+        seen: set[str] = set()
+        for index, (text, vector) in enumerate(zip(texts, cached)):
+            if vector is not None:
+                results.append(EmbeddingResponse(embedding=vector, model=model, tokens_used=0))
+            else:
+                results.append(None)
+                if text not in seen:
+                    seen.add(text)
+                    missing.append(index)
+        return results, missing, model
+
+    def _merge_embeddings(
+        self,
+        texts: list[str],
+        results: list[Optional[EmbeddingResponse]],
+        missing: list[int],
+        model: str,
+        responses: list[list[EmbeddingResponse]]
+    ) -> list[EmbeddingResponse]:
+        """Fill fresh embeddings into results and store them in the cache"""
+        fresh = [response for batch in responses for response in batch]
+        by_text = {texts[index]: response for index, response in zip(missing, fresh)}
+
+        if self.embedding_cache is not None and by_text:
+            self.embedding_cache.put_many(
+                self.provider_name,
+                model,
+                list(by_text),
+                [response.embedding for response in by_text.values()]
+            )
+
+        return [
+            result if result is not None else by_text[text]
+            for text, result in zip(texts, results)
+        ]
+
+    def _default_embedding_model(self) -> str:
+        """Embedding model used when none is passed"""
+        # config.model is the chat model, so it is not a fallback here
+        if self.DEFAULT_EMBEDDING_MODEL is None:
+            raise NotImplementedError(
+                f"{self.provider_name} has no default embedding model; pass model="
+            )
+        return self.DEFAULT_EMBEDDING_MODEL
+
     def count_tokens(self, text: str) -> int:
         """
         Count tokens in text.
@@ -192,8 +351,10 @@ class BaseProvider(ABC):
             text: Text to count tokens for
 
         Returns:
-            Approximate token count
+            Token count (approximate unless a tokenizer is set)
         """
+        if self.tokenizer is not None:
+            return self.tokenizer.count(text)
         # Default approximation: ~4 characters per token
         return len(text) // 4
 
@@ -4,6 +4,7 @@ Cohere API integration (Command, Command R, Command R+, Embeddings, Reranking)
 """
 
 import asyncio
+import threading
 from collections.abc import Iterator, AsyncIterator
 import logging
 
@@ -87,6 +88,11 @@ class CohereProvider(BaseProvider):
         },
     }
 
+    # Cohere accepts at most 96 texts per embed call
+    EMBED_BATCH_MAX_TEXTS = 96
+    EMBED_BATCH_MAX_TOKENS = 96 * 512
+    DEFAULT_EMBEDDING_MODEL = "embed-english-v3.0"
+
     EMBEDDING_INFO = {
         "embed-english-v3.0": {
             "dimensions": 1024,
@@ -304,27 +310,42 @@ class CohereProvider(BaseProvider):
         **kwargs
     ) -> AsyncIterator[StreamChunk]:
         """Async version of stream_complete()"""
-        loop = asyncio.get_event_loop()
-
-        def sync_gen():
-            yield from self.stream_complete(messages, **kwargs)
-
+        loop = asyncio.get_running_loop()
         queue = asyncio.Queue()
+        stop = threading.Event()
 
-        def run_sync():
-            for chunk in sync_gen():
-                loop.call_soon_threadsafe(queue.put_nowait, chunk)
-            loop.call_soon_threadsafe(queue.put_nowait, None)
+        def put(item):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                # Event loop already closed
+                stop.set()
 
-        import threading
-        thread = threading.Thread(target=run_sync)
+        def run_sync():
+            try:
+                for chunk in self.stream_complete(messages, **kwargs):
+                    if stop.is_set():
+                        return
+                    put(chunk)
+            except Exception as e:
+                put(e)
+            finally:
+                put(None)
+
+        thread = threading.Thread(target=run_sync, daemon=True)
         thread.start()
 
-        while True:
-            chunk = await queue.get()
-            if chunk is None:
-                break
-            yield chunk
+        try:
+            while True:
+                chunk = await queue.get()
+                if chunk is None:
+                    break
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield chunk
+        finally:
+            # Stop reading from Cohere if the consumer goes away
+            stop.set()
 
     def embed(
         self,
@@ -364,17 +385,19 @@ class CohereProvider(BaseProvider):
         loop = asyncio.get_event_loop()
         return await loop.run_in_executor(None, self.embed, text, **kwargs)
 
-    def embed_batch(
+    def _embed_many(
         self,
         texts: list[str],
         model: str = "embed-english-v3.0",
         **kwargs
     ) -> list[EmbeddingResponse]:
         """
-        Generate embeddings for multiple texts.
+        Generate embeddings for one sub-batch in a single request.
+
+        Use embed_batch() for cached, chunked and concurrent embedding.
 
         Args:
-            texts: List of texts to embed
+            texts: List of texts to embed (at most 96)
             model: Embedding model name
             **kwargs: Additional parameters
 
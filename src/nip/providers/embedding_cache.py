@@ -0,0 +1,236 @@
+"""
+NIP v3.0.0 - Embedding Cache
+Local cache of embedding vectors keyed by (provider, model, text hash)
+"""
+
+from array import array
+from pathlib import Path
+from typing import Optional
+import hashlib
+import mmap
+import os
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def embedding_key(provider: str, model: str, text: str) -> str:
+    """Cache key for a text embedded by a provider model"""
+    material = f"{provider}\0{model}\0".encode("utf-8") + text.encode("utf-8", "surrogatepass")
+    return hashlib.sha256(material).hexdigest()
+
+
+class _VectorMatrix:
+    """
+    Append-only float32 matrix on disk, read through mmap.
+
+    Rows live in <name>.f32; <name>.idx holds one "key row" line per row.
+    The vector dimension is fixed by the first row written.
+    """
+
+    def __init__(self, base: Path):
+        self.data_path = base.with_suffix(".f32")
+        self.index_path = base.with_suffix(".idx")
+        self.dim: Optional[int] = None
+        self.rows: dict[str, int] = {}
+        self._mmap: Optional[mmap.mmap] = None
+        self._mapped_size = 0
+        self._load_index()
+
+    def _load_index(self) -> None:
+        if not self.index_path.exists():
+            return
+        with open(self.index_path, "r", encoding="ascii") as f:
+            header = f.readline().split()
+            if len(header) != 2 or header[0] != "dim":
+                return
+            self.dim = int(header[1])
+            for line in f:
+                parts = line.split()
+                if len(parts) == 2:
+                    self.rows[parts[0]] = int(parts[1])
+
+        # Cut a torn trailing row so new rows are appended at aligned offsets,
+        # and forget index entries for rows that were never fully written
+        row_bytes = self.dim * 4
+        size = self._file_size()
+        row_count = size // row_bytes
+        if size != row_count * row_bytes:
+            logger.warning(f"Truncating torn row in {self.data_path}")
+            with open(self.data_path, "r+b") as f:
+                f.truncate(row_count * row_bytes)
+        rows = {key: row for key, row in self.rows.items() if row < row_count}
+        if len(rows) != len(self.rows):
+            self._rewrite_index(rows)
+        self.rows = rows
+
+    def _rewrite_index(self, rows: dict[str, int]) -> None:
+        """Replace the index file so dropped entries cannot point at reused rows"""
+        tmp_path = self.index_path.with_suffix(".idx.tmp")
+        with open(tmp_path, "w", encoding="ascii") as f:
+            f.write(f"dim {self.dim}\n")
+            f.writelines(f"{key} {row}\n" for key, row in sorted(rows.items(), key=lambda item: item[1]))
+        os.replace(tmp_path, self.index_path)
+
+    def _file_size(self) -> int:
+        try:
+            return os.path.getsize(self.data_path)
+        except OSError:
+            return 0
+
+    def _view(self) -> memoryview:
+        size = self._file_size()
+        if self._mmap is None or size != self._mapped_size:
+            if self._mmap is not None:
+                self._mmap.close()
+            with open(self.data_path, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mapped_size = size
+        return memoryview(self._mmap).cast("f")
+
+    def get(self, keys: list[str]) -> list[Optional[list[float]]]:
+        if not self.rows or self.dim is None:
+            return [None] * len(keys)
+        view = self._view()
+        try:
+            results = []
+            for key in keys:
+                row = self.rows.get(key)
+                if row is None:
+                    results.append(None)
+                else:
+                    results.append(view[row * self.dim:(row + 1) * self.dim].tolist())
+            return results
+        finally:
+            view.release()
+
+    def put(self, keys: list[str], vectors: list[list[float]]) -> None:
+        if not keys:
+            return
+        if self.dim is None:
+            self.dim = len(vectors[0])
+            self.data_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.index_path, "w", encoding="ascii") as f:
+                f.write(f"dim {self.dim}\n")
+
+        new_rows = []
+        next_row = self._file_size() // (self.dim * 4)
+        data = array("f")
+        for key, vector in zip(keys, vectors):
+            if key in self.rows or len(vector) != self.dim:
+                continue
+            data.extend(vector)
+            new_rows.append((key, next_row))
+            next_row += 1
+        if not new_rows:
+            return
+
+        # Rows first, then the index, so a crash never indexes missing data
+        with open(self.data_path, "ab") as f:
+            data.tofile(f)
+        with open(self.index_path, "a", encoding="ascii") as f:
+            f.writelines(f"{key} {row}\n" for key, row in new_rows)
+        self.rows.update(new_rows)
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+
+class EmbeddingCache:
+    """
+    Embedding cache keyed by (provider, model, text hash).
+
+    With a directory, vectors are stored per provider/model in a
+    memory-mapped float32 matrix plus a key index, so they persist across
+    runs. Without one, the cache is in memory only.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            directory: Directory for the on-disk matrices (None for memory only)
+        """
+        self.directory = Path(directory) if directory else None
+        self.hits = 0
+        self.misses = 0
+        self._matrices: dict[tuple[str, str], _VectorMatrix] = {}
+        self._memory: dict[str, list[float]] = {}
+        self._lock = threading.Lock()
+
+    def _matrix(self, provider: str, model: str) -> _VectorMatrix:
+        namespace = (provider, model)
+        if namespace not in self._matrices:
+            safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in f"{provider}__{model}")
+            self._matrices[namespace] = _VectorMatrix(self.directory / safe)
+        return self._matrices[namespace]
+
+    def get_many(
+        self,
+        provider: str,
+        model: str,
+        texts: list[str]
+    ) -> list[Optional[list[float]]]:
+        """
+        Look up cached embeddings.
+
+        Args:
+            provider: Provider name
+            model: Embedding model name
+            texts: Texts to look up
+
+        Returns:
+            Embedding per text, or None where not cached
+        """
+        keys = [embedding_key(provider, model, text) for text in texts]
+        with self._lock:
+            if self.directory is None:
+                results = [self._memory.get(key) for key in keys]
+            else:
+                results = self._matrix(provider, model).get(keys)
+            found = sum(1 for r in results if r is not None)
+            self.hits += found
+            self.misses += len(results) - found
+        return results
+
+    def put_many(
+        self,
+        provider: str,
+        model: str,
+        texts: list[str],
+        embeddings: list[list[float]]
+    ) -> None:
+        """
+        Store embeddings.
+
+        Args:
+            provider: Provider name
+            model: Embedding model name
+            texts: Embedded texts
+            embeddings: Embedding per text
+        """
+        keys = [embedding_key(provider, model, text) for text in texts]
+        with self._lock:
+            if self.directory is None:
+                self._memory.update(zip(keys, embeddings))
+            else:
+                self._matrix(provider, model).put(keys, embeddings)
+
+    def get_stats(self) -> dict[str, int]:
+        """Hit/miss counts and number of cached vectors"""
+        with self._lock:
+            if self.directory is None:
+                entries = len(self._memory)
+            else:
+                entries = sum(len(m.rows) for m in self._matrices.values())
+            return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+    def close(self) -> None:
+        """Release memory maps"""
+        with self._lock:
+            for matrix in self._matrices.values():
+                matrix.close()
@@ -109,6 +109,11 @@ class MistralProvider(BaseProvider):
         "embed": "mistral-embed",
     }
 
+    # mistral-embed accepts up to 16k tokens per request
+    EMBED_BATCH_MAX_TEXTS = 128
+    EMBED_BATCH_MAX_TOKENS = 16000
+    DEFAULT_EMBEDDING_MODEL = "mistral-embed"
+
     def __init__(self, config: ProviderConfig):
         """
         Initialize Mistral provider.
@@ -385,6 +390,70 @@ class MistralProvider(BaseProvider):
         except Exception as e:
             raise ProviderError(f"Async embedding error: {str(e)}", "mistral")
 
+    def _embed_many(
+        self,
+        texts: list[str],
+        model: str = "mistral-embed",
+        **kwargs
+    ) -> list[EmbeddingResponse]:
+        """
+        Generate embeddings for one sub-batch in a single request.
+
+        Args:
+            texts: List of texts to embed
+            model: Embedding model name
+            **kwargs: Additional parameters
+
+        Returns:
+            List of EmbeddingResponse objects
+        """
+        try:
+            response = self.client.embeddings(
+                model=model,
+                inputs=texts,
+            )
+
+            return [
+                EmbeddingResponse(
+                    embedding=item.embedding,
+                    model=model,
+                    tokens_used=response.usage.total_tokens // len(texts),
+                )
+                for item in response.data
+            ]
+
+        except Exception as e:
+            raise ProviderError(f"Batch embedding error: {str(e)}", "mistral") from e
+
+    async def _aembed_many(
+        self,
+        texts: list[str],
+        model: str = "mistral-embed",
+        **kwargs
+    ) -> list[EmbeddingResponse]:
+        """Async version of _embed_many()"""
+        try:
+            response = await self.async_client.embeddings(
+                model=model,
+                inputs=texts,
+            )
+
+            return [
+                EmbeddingResponse(
+                    embedding=item.embedding,
+                    model=model,
+                    tokens_used=response.usage.total_tokens // len(texts),
+                )
+                for item in response.data
+            ]
+
+        except Exception as e:
+            raise ProviderError(f"Async batch embedding error: {str(e)}", "mistral") from e
+
+    def _default_embedding_model(self) -> str:
+        """Embedding model used when none is passed"""
+        return self.EMBEDDING_MODELS["embed"]
+
     def get_model_info(self) -> dict:
         """Get information about available models"""
         return {
@@ -0,0 +1,557 @@
+"""
+NIP v3.0.0 - Streaming Multiplexer
+Normalized provider streams with first-token metrics, fan-out and racing
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Callable, Iterator
+from dataclasses import dataclass
+from typing import Optional, Union
+import logging
+
+from .base_provider import BaseProvider, Message, ProviderError, StreamChunk
+
+logger = logging.getLogger(__name__)
+
+# Provider finish reasons mapped onto common names
+FINISH_REASONS = {
+    "stop": "stop",
+    "end_turn": "stop",
+    "stop_sequence": "stop",
+    "complete": "stop",
+    "length": "length",
+    "max_tokens": "length",
+    "tool_use": "tool_calls",
+    "tool_calls": "tool_calls",
+    "content_filter": "content_filter",
+    "error_toxic": "content_filter",
+    "error": "error",
+}
+
+
+def normalize_finish_reason(reason: Optional[str]) -> Optional[str]:
+    """Map a provider finish reason onto a common name"""
+    if reason is None:
+        return None
+    key = str(reason).lower()
+    return FINISH_REASONS.get(key, key)
+
+
+@dataclass
+class StreamDelta:
+    """A normalized piece of a streamed response"""
+    provider: str
+    content: str
+    index: int
+    elapsed: float  # Seconds since the request was sent
+    finish_reason: Optional[str] = None
+    usage: Optional[dict[str, int]] = None
+
+    @property
+    def is_final(self) -> bool:
+        return self.finish_reason is not None
+
+
+@dataclass
+class StreamMetrics:
+    """Timing of one streamed response"""
+    provider: str
+    model: str
+    started_at: float
+    first_token_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    deltas: int = 0
+    characters: int = 0
+    completion_tokens: int = 0
+    finish_reason: Optional[str] = None
+    error: Optional[str] = None
+    cancelled: bool = False
+
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        """Generation rate after the first token"""
+        if self.first_token_at is None or self.finished_at is None:
+            return None
+        duration = self.finished_at - self.first_token_at
+        if duration <= 0:
+            return None
+        return self.completion_tokens / duration
+
+
+def _percentile(values: list[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class StreamMetricsRegistry:
+    """Recent stream metrics per provider"""
+
+    def __init__(self, window: int = 200):
+        """
+        Initialize the registry.
+
+        Args:
+            window: Number of recent streams kept per provider
+        """
+        self.window = window
+        self._records: dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, metrics: StreamMetrics) -> None:
+        """Add a finished stream"""
+        with self._lock:
+            records = self._records.setdefault(metrics.provider, deque(maxlen=self.window))
+            records.append(metrics)
+
+    def get_stats(self) -> dict[str, dict]:
+        """
+        Summarize recent streams.
+
+        Returns:
+            Per provider: stream, error and cancel counts, time-to-first-token
+            percentiles (seconds) and mean tokens per second
+        """
+        with self._lock:
+            snapshot = {provider: list(records) for provider, records in self._records.items()}
+
+        stats = {}
+        for provider, records in snapshot.items():
+            ttft = [m.time_to_first_token for m in records if m.time_to_first_token is not None]
+            rates = [m.tokens_per_second for m in records if m.tokens_per_second is not None]
+            stats[provider] = {
+                "streams": len(records),
+                "errors": sum(1 for m in records if m.error and not m.cancelled),
+                "cancelled": sum(1 for m in records if m.cancelled),
+                "ttft_p50": _percentile(ttft, 0.5),
+                "ttft_p95": _percentile(ttft, 0.95),
+                "tokens_per_second": sum(rates) / len(rates) if rates else None,
+            }
+        return stats
+
+
+class NormalizedStream:
+    """
+    A provider stream as StreamDeltas, with timing metrics.
+
+    Iterate with `async for` (astream_complete) or `for` (stream_complete).
+    Empty non-final chunks are dropped, finish reasons are mapped onto
+    common names and exactly one final delta ends the stream. Provider
+    errors are raised as ProviderError.
+    """
+
+    def __init__(
+        self,
+        provider: BaseProvider,
+        messages: list[Message],
+        registry: Optional[StreamMetricsRegistry] = None,
+        **kwargs
+    ):
+        """
+        Initialize the stream.
+
+        Args:
+            provider: Provider to stream from
+            messages: Conversation messages
+            registry: Registry that receives the metrics when the stream ends
+            **kwargs: Passed to the provider's stream methods
+        """
+        self.provider = provider
+        self.messages = messages
+        self.registry = registry
+        self.kwargs = kwargs
+        self.metrics: Optional[StreamMetrics] = None
+        self._finished = False
+
+    @property
+    def name(self) -> str:
+        return self.provider.provider_name
+
+    def _start(self) -> None:
+        if self.metrics is not None:
+            raise ProviderError("Stream can only be consumed once", self.name)
+        self.metrics = StreamMetrics(
+            provider=self.name,
+            model=self.kwargs.get("model", self.provider.config.model) or "",
+            started_at=time.perf_counter()
+        )
+
+    def _deliver(self, chunk: StreamChunk) -> Optional[StreamDelta]:
+        """Turn a provider chunk into a delta (None if there is nothing to emit)"""
+        if self._finished:
+            return None
+        metrics = self.metrics
+        now = time.perf_counter()
+        finish_reason = normalize_finish_reason(chunk.finish_reason)
+        content = chunk.content or ""
+
+        if content:
+            if metrics.first_token_at is None:
+                metrics.first_token_at = now
+            metrics.characters += len(content)
+            if self.provider.tokenizer is not None:
+                metrics.completion_tokens += self.provider.tokenizer.count(content)
+        elif finish_reason is None:
+            return None
+
+        delta = StreamDelta(
+            provider=self.name,
+            content=content,
+            index=metrics.deltas,
+            elapsed=now - metrics.started_at,
+            finish_reason=finish_reason,
+            usage=chunk.usage
+        )
+        metrics.deltas += 1
+        if finish_reason is not None:
+            self._finish(finish_reason, usage=chunk.usage)
+        return delta
+
+    def _finish(
+        self,
+        finish_reason: Optional[str],
+        usage: Optional[dict[str, int]] = None,
+        error: Optional[str] = None,
+        cancelled: bool = False
+    ) -> None:
+        if self._finished:
+            return
+        self._finished = True
+        metrics = self.metrics
+        metrics.finished_at = time.perf_counter()
+        metrics.finish_reason = finish_reason
+        metrics.error = error
+        metrics.cancelled = cancelled
+        if usage and usage.get("completion_tokens"):
+            metrics.completion_tokens = usage["completion_tokens"]
+        elif self.provider.tokenizer is None:
+            metrics.completion_tokens = math.ceil(metrics.characters / 4)
+        if self.registry is not None:
+            self.registry.record(metrics)
+
+    def _end_delta(self) -> Optional[StreamDelta]:
+        """Final delta for a provider stream that ended without a finish reason"""
+        if self._finished:
+            return None
+        return self._deliver(StreamChunk(content="", finish_reason="stop"))
+
+    def _fail(self, error: BaseException) -> BaseException:
+        if isinstance(error, (asyncio.CancelledError, GeneratorExit)):
+            self._finish(None, error="cancelled", cancelled=True)
+            return error
+        self._finish("error", error=str(error))
+        if isinstance(error, ProviderError):
+            return error
+        return ProviderError(f"Streaming error: {error}", self.name)
+
+    async def __aiter__(self) -> AsyncIterator[StreamDelta]:
+        self._start()
+        try:
+            async for chunk in self.provider.astream_complete(self.messages, **self.kwargs):
+                delta = self._deliver(chunk)
+                if delta is not None:
+                    yield delta
+            delta = self._end_delta()
+            if delta is not None:
+                yield delta
+        except BaseException as e:
+            if self._finished:
+                raise
+            error = self._fail(e)
+            if error is e:
+                raise
+            raise error from e
+
+    def __iter__(self) -> Iterator[StreamDelta]:
+        self._start()
+        try:
+            for chunk in self.provider.stream_complete(self.messages, **self.kwargs):
+                delta = self._deliver(chunk)
+                if delta is not None:
+                    yield delta
+            delta = self._end_delta()
+            if delta is not None:
+                yield delta
+        except BaseException as e:
+            if self._finished:
+                raise
+            error = self._fail(e)
+            if error is e:
+                raise
+            raise error from e
+
+
+_END = object()
+
+
+class _Subscription:
+    """One consumer's view of a fanned-out stream"""
+
+    def __init__(self, fan_out: "StreamFanOut", max_pending: int):
+        self._fan_out = fan_out
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self.closed = False
+
+    def __aiter__(self) -> "_Subscription":
+        return self
+
+    async def __anext__(self) -> StreamDelta:
+        if self.closed:
+            raise StopAsyncIteration
+        item = await self.queue.get()
+        if item is _END:
+            self.closed = True
+            raise StopAsyncIteration
+        if isinstance(item, BaseException):
+            self.closed = True
+            raise item
+        return item
+
+    def close(self) -> None:
+        """Stop receiving deltas without blocking the other consumers"""
+        self.closed = True
+        self._fan_out._unsubscribe(self)
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+
+class StreamFanOut:
+    """
+    Delivers one stream to several consumers as it arrives.
+
+    Each subscriber has a bounded queue, so the stream advances at the pace
+    of the slowest subscriber instead of being buffered in full. Sinks are
+    plain callbacks (logging, audit) called for every delta. Subscribe
+    before start() to see every delta.
+    """
+
+    def __init__(self, source: AsyncIterator[StreamDelta], max_pending: int = 64):
+        """
+        Initialize the fan-out.
+
+        Args:
+            source: Stream to deliver (usually a NormalizedStream)
+            max_pending: Default queue size per subscriber
+        """
+        self.source = source
+        self.max_pending = max_pending
+        self.error: Optional[BaseException] = None
+        self._subscriptions: list[_Subscription] = []
+        self._sinks: list[Callable[[StreamDelta], None]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, max_pending: Optional[int] = None) -> _Subscription:
+        """
+        Add a consumer.
+
+        Args:
+            max_pending: Deltas queued for this consumer before the stream waits
+
+        Returns:
+            Async iterator of deltas; call close() to leave early
+        """
+        subscription = _Subscription(self, max_pending or self.max_pending)
+        self._subscriptions.append(subscription)
+        return subscription
+
+    def add_sink(self, sink: Callable[[StreamDelta], None]) -> None:
+        """Call sink(delta) for every delta; sink errors are logged and ignored"""
+        self._sinks.append(sink)
+
+    def _unsubscribe(self, subscription: _Subscription) -> None:
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+
+    def start(self) -> asyncio.Task:
+        """Start delivering the stream (idempotent)"""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._pump())
+        return self._task
+
+    async def run(self) -> None:
+        """Deliver the whole stream and raise its error, if any"""
+        await self.start()
+        if self.error is not None:
+            raise self.error
+
+    async def _pump(self) -> None:
+        try:
+            async for delta in self.source:
+                for sink in self._sinks:
+                    try:
+                        sink(delta)
+                    except Exception as e:
+                        logger.warning(f"Stream sink failed: {e}")
+                for subscription in list(self._subscriptions):
+                    if not subscription.closed:
+                        await subscription.queue.put(delta)
+        except Exception as e:
+            self.error = e
+        finally:
+            end = self.error if self.error is not None else _END
+            for subscription in list(self._subscriptions):
+                if not subscription.closed:
+                    await subscription.queue.put(end)
+
+
+class StreamRace:
+    """
+    Streams from several providers at once and keeps the first to
+    produce a token.
+
+    The other streams are cancelled as soon as a winner emits content. A
+    stream that fails before its first token drops out of the race; the
+    race fails only if every stream does.
+    """
+
+    def __init__(
+        self,
+        streams: list[NormalizedStream],
+        first_token_timeout: Optional[float] = None,
+        max_pending: int = 64
+    ):
+        """
+        Initialize the race.
+
+        Args:
+            streams: Competing streams
+            first_token_timeout: Seconds to wait for any first token
+            max_pending: Deltas buffered per stream
+        """
+        if not streams:
+            raise ValueError("StreamRace needs at least one stream")
+        self.streams = streams
+        self.first_token_timeout = first_token_timeout
+        self.max_pending = max_pending
+        self.winner: Optional[NormalizedStream] = None
+
+    async def __aiter__(self) -> AsyncIterator[StreamDelta]:
+        queues = [asyncio.Queue(maxsize=self.max_pending) for _ in self.streams]
+        pumps = [
+            asyncio.ensure_future(self._pull(stream, queue))
+            for stream, queue in zip(self.streams, queues)
+        ]
+        try:
+            index, first = await self._first_token(queues)
+            self.winner = self.streams[index]
+            for i, pump in enumerate(pumps):
+                if i != index:
+                    pump.cancel()
+
+            item = first
+            while item is not _END:
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+                item = await queues[index].get()
+        finally:
+            for pump in pumps:
+                pump.cancel()
+
+    @staticmethod
+    async def _pull(stream: NormalizedStream, queue: asyncio.Queue) -> None:
+        try:
+            async for delta in stream:
+                await queue.put(delta)
+        except Exception as e:
+            await queue.put(e)
+            return
+        await queue.put(_END)
+
+    async def _first_token(self, queues: list[asyncio.Queue]) -> tuple[int, Union[StreamDelta, object]]:
+        """Wait for the first content delta; returns (stream index, delta)"""
+        deadline = None
+        if self.first_token_timeout is not None:
+            deadline = time.perf_counter() + self.first_token_timeout
+        getters = {asyncio.ensure_future(queue.get()): i for i, queue in enumerate(queues)}
+        fallback: Optional[tuple[int, object]] = None
+        last_error: Optional[BaseException] = None
+
+        try:
+            while getters:
+                timeout = None if deadline is None else max(0.0, deadline - time.perf_counter())
+                done, _ = await asyncio.wait(getters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise ProviderError(
+                        f"No stream produced a token within {self.first_token_timeout}s", "race"
+                    )
+                for getter in done:
+                    index = getters.pop(getter)
+                    item = getter.result()
+                    if isinstance(item, StreamDelta) and item.content:
+                        return index, item
+                    if isinstance(item, BaseException):
+                        last_error = item
+                    elif fallback is None:
+                        # Finished without content; used only if nobody produces any
+                        fallback = (index, item)
+        finally:
+            for getter in getters:
+                getter.cancel()
+
+        if fallback is not None:
+            return fallback
+        raise ProviderError(f"All streams failed: {last_error}", "race")
+
+
+class StreamMultiplexer:
+    """
+    Opens normalized, fanned-out and raced provider streams that report
+    into one metrics registry.
+    """
+
+    def __init__(self, registry: Optional[StreamMetricsRegistry] = None, max_pending: int = 64):
+        """
+        Initialize the multiplexer.
+
+        Args:
+            registry: Metrics registry (a new one by default)
+            max_pending: Default per-consumer queue size
+        """
+        self.registry = registry or StreamMetricsRegistry()
+        self.max_pending = max_pending
+
+    def open(self, provider: BaseProvider, messages: list[Message], **kwargs) -> NormalizedStream:
+        """Normalized stream from one provider"""
+        return NormalizedStream(provider, messages, registry=self.registry, **kwargs)
+
+    def fan_out(self, provider: BaseProvider, messages: list[Message], **kwargs) -> StreamFanOut:
+        """One provider stream delivered to several consumers"""
+        return StreamFanOut(self.open(provider, messages, **kwargs), max_pending=self.max_pending)
+
+    def race(
+        self,
+        providers: list[BaseProvider],
+        messages: list[Message],
+        first_token_timeout: Optional[float] = None,
+        **kwargs
+    ) -> StreamRace:
+        """
+        Race the same request across providers.
+
+        Args:
+            providers: Competing providers
+            messages: Conversation messages
+            first_token_timeout: Seconds to wait for any first token
+            **kwargs: Passed to every provider (omit "model" to use each provider's default)
+
+        Returns:
+            StreamRace yielding the winner's deltas
+        """
+        streams = [self.open(provider, messages, **kwargs) for provider in providers]
+        return StreamRace(streams, first_token_timeout=first_token_timeout, max_pending=self.max_pending)
+
+    def get_stats(self) -> dict[str, dict]:
+        """Per-provider time-to-first-token and throughput"""
+        return self.registry.get_stats()
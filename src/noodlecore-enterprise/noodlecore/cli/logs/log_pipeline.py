@@ -0,0 +1,495 @@
+﻿"""
+Logs::Log Pipeline - log_pipeline.py
+Copyright Â© 2025 Michael van Erp. All rights reserved.
+
+This file is part of the NoodleCore project.
+Licensed under the MIT License - see LICENSE file for details.
+
+Unauthorized copying, distribution, or modification is prohibited.
+"""
+
+"""
+Log Pipeline Module
+
+This module implements the bounded, asynchronous log pipeline used by the
+enterprise Logger. The request path only captures a plain tuple into a ring
+buffer; building LogRecords, running filters, formatting and writing all happen
+on a dedicated writer thread, which hands each sink a whole batch at once.
+"""
+
+import io
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from typing import Dict, Any, Optional, List, Tuple, Deque
+
+
+# (created, levelno, message, request_id, fields, pathname, lineno, func_name)
+PendingRecord = Tuple[float, int, str, Optional[str], Dict[str, Any], str, int, str]
+
+DEFAULT_CAPACITY = 65536
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_FLUSH_INTERVAL = 0.1
+DEFAULT_SAMPLE_RATE = 10
+
+
+_SRCFILE = os.path.normcase(os.path.abspath(__file__))
+
+
+def find_caller(skip_files: frozenset) -> Tuple[str, int, str]:
+    """
+    Return (pathname, lineno, func_name) of the nearest frame outside skip_files.
+    
+    Like logging.Logger.findCaller, but without building a stack summary.
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        if os.path.normcase(code.co_filename) not in skip_files:
+            return code.co_filename, frame.f_lineno, code.co_name
+        frame = frame.f_back
+    return '(unknown file)', 0, '(unknown function)'
+
+
+class OverflowPolicy(Enum):
+    """What the ring buffer does when it is full."""
+    BLOCK = "block"
+    DROP_OLDEST = "drop_oldest"
+    SAMPLE = "sample"
+
+
+class LogRingBuffer:
+    """
+    Bounded buffer of pending log records.
+    
+    BLOCK makes producers wait for the writer to free space. DROP_OLDEST
+    evicts the oldest pending record. SAMPLE keeps one in every sample_rate
+    records while the buffer is full (evicting the oldest to make room), and
+    always keeps records at or above always_keep_level.
+    """
+    
+    def __init__(
+        self,
+        capacity: int = DEFAULT_CAPACITY,
+        policy: OverflowPolicy = OverflowPolicy.BLOCK,
+        sample_rate: int = DEFAULT_SAMPLE_RATE,
+        always_keep_level: int = logging.ERROR
+    ):
+        """
+        Initialize the ring buffer.
+        
+        Args:
+            capacity: Maximum number of pending records
+            policy: Overflow policy applied when the buffer is full
+            sample_rate: Keep one in this many records when sampling
+            always_keep_level: Records at or above this level are never sampled out
+        """
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.policy = policy
+        self.sample_rate = max(1, sample_rate)
+        self.always_keep_level = always_keep_level
+        
+        # Appending to a bounded deque evicts from the left atomically
+        maxlen = None if policy == OverflowPolicy.BLOCK else capacity
+        self._items: Deque[PendingRecord] = deque(maxlen=maxlen)
+        self._space = threading.Condition(threading.Lock())
+        self._waiters = 0
+        self._sample_counter = 0
+        
+        self.dropped = 0
+        self.sampled_out = 0
+        self.blocked = 0
+        self.high_water = 0
+    
+    def __len__(self) -> int:
+        return len(self._items)
+    
+    def put(self, item: PendingRecord) -> bool:
+        """
+        Add a record, applying the overflow policy if the buffer is full.
+        
+        Returns:
+            True if the record was accepted, False if it was sampled out
+        """
+        items = self._items
+        if self.policy == OverflowPolicy.BLOCK:
+            # Check and insert under the lock so producers cannot overshoot capacity
+            with self._space:
+                if len(items) >= self.capacity:
+                    self.blocked += 1
+                    self._waiters += 1
+                    try:
+                        while len(items) >= self.capacity:
+                            self._space.wait()
+                    finally:
+                        self._waiters -= 1
+                items.append(item)
+            return True
+        
+        # The bounded deque enforces capacity for the other policies
+        if len(items) < self.capacity:
+            items.append(item)
+            return True
+        
+        if self.policy == OverflowPolicy.DROP_OLDEST:
+            self.dropped += 1
+            items.append(item)
+            return True
+        
+        # SAMPLE
+        self._sample_counter += 1
+        if item[1] < self.always_keep_level and self._sample_counter % self.sample_rate:
+            self.sampled_out += 1
+            return False
+        self.dropped += 1
+        items.append(item)
+        return True
+    
+    def take(self, limit: int) -> List[PendingRecord]:
+        """Remove and return up to limit records, oldest first."""
+        items = self._items
+        size = len(items)
+        if size > self.high_water:
+            self.high_water = size
+        popleft = items.popleft
+        batch = []
+        for _ in range(min(limit, size)):
+            try:
+                batch.append(popleft())
+            except IndexError:
+                break
+        if self._waiters and batch:
+            with self._space:
+                self._space.notify_all()
+        return batch
+
+
+def emit_batch(handler: logging.Handler, records: List[logging.LogRecord]) -> int:
+    """
+    Write a batch of records to a handler.
+    
+    Stream and file handlers get the whole batch formatted, joined and written
+    with a single write and flush under the handler lock. Other handlers fall
+    back to handling each record individually.
+    
+    Returns:
+        Number of records written
+    """
+    records = [record for record in records if record.levelno >= handler.level and handler.filter(record)]
+    if not records:
+        return 0
+    
+    if not isinstance(handler, logging.StreamHandler):
+        for record in records:
+            handler.handle(record)
+        return len(records)
+    
+    lines = []
+    for record in records:
+        try:
+            lines.append(handler.format(record))
+        except Exception:
+            handler.handleError(record)
+    if not lines:
+        return 0
+    
+    terminator = handler.terminator
+    payload = terminator.join(lines) + terminator
+    
+    handler.acquire()
+    try:
+        if isinstance(handler, logging.FileHandler) and handler.stream is None:
+            handler.stream = handler._open()
+        if isinstance(handler, logging.handlers.RotatingFileHandler) and handler.maxBytes > 0:
+            handler.stream.seek(0, 2)
+            if handler.stream.tell() and handler.stream.tell() + len(payload) >= handler.maxBytes:
+                handler.doRollover()
+        handler.stream.write(payload)
+        handler.flush()
+    except Exception:
+        handler.handleError(records[-1])
+    finally:
+        handler.release()
+    return len(lines)
+
+
+class LogPipeline:
+    """
+    Ring buffer plus writer thread that feeds a list of batched sinks.
+    
+    submit() is the only method on the request path; it captures a tuple and
+    never formats, filters or touches I/O.
+    """
+    
+    def __init__(
+        self,
+        sinks: List[logging.Handler],
+        logger_name: str = 'noodlecore',
+        filters: Optional[List[Any]] = None,
+        capacity: int = DEFAULT_CAPACITY,
+        policy: OverflowPolicy = OverflowPolicy.BLOCK,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        sample_rate: int = DEFAULT_SAMPLE_RATE,
+        internal_files: Optional[List[str]] = None
+    ):
+        """
+        Initialize the pipeline.
+        
+        Args:
+            sinks: Handlers that receive each batch
+            logger_name: Logger name stamped on built records
+            filters: LogFilter objects applied on the writer thread
+            capacity: Ring buffer capacity
+            policy: Ring buffer overflow policy
+            batch_size: Maximum records per sink write
+            flush_interval: Seconds the writer waits before flushing a partial batch
+            sample_rate: Keep one in this many records when sampling
+            internal_files: Source files of logging wrappers around submit();
+                their frames are skipped when recording the caller
+        """
+        self.sinks = sinks
+        self.logger_name = logger_name
+        self.filters = filters if filters is not None else []
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.buffer = LogRingBuffer(capacity, policy, sample_rate)
+        self._skip_files = frozenset(
+            [_SRCFILE] + [os.path.normcase(os.path.abspath(path)) for path in internal_files or []]
+        )
+        
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+        self._write_lock = threading.Lock()
+        
+        self._stats = {
+            'submitted': 0,
+            'written': 0,
+            'filtered': 0,
+            'batches': 0,
+            'write_errors': 0,
+            'last_batch_duration': 0.0
+        }
+    
+    def submit(
+        self,
+        levelno: int,
+        message: str,
+        request_id: Optional[str] = None,
+        fields: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """
+        Capture a log record for the writer thread.
+        
+        The caller's pathname, lineno and function are captured here, since
+        the record is only built later on the writer thread.
+        
+        Returns:
+            True if the record was queued, False if it was sampled out
+        """
+        buffer = self.buffer
+        pathname, lineno, func_name = find_caller(self._skip_files)
+        accepted = buffer.put((
+            time.time(), levelno, message, request_id, fields or {}, pathname, lineno, func_name
+        ))
+        self._stats['submitted'] += 1
+        if len(buffer) >= self.batch_size and not self._wakeup.is_set():
+            self._wakeup.set()
+        return accepted
+    
+    def _build_record(self, pending: PendingRecord) -> logging.LogRecord:
+        created, levelno, message, request_id, fields, pathname, lineno, func_name = pending
+        record = logging.LogRecord(
+            self.logger_name, levelno, pathname, lineno, message, None, None, func=func_name
+        )
+        record.created = created
+        record.msecs = (created - int(created)) * 1000
+        record.request_id = request_id or str(uuid.uuid4())
+        record.component = fields.get('component', 'logger')
+        for key, value in fields.items():
+            if key not in ('component', 'request_id', 'message', 'asctime'):
+                record.__dict__[key] = value
+        return record
+    
+    def _should_write(self, record: logging.LogRecord) -> bool:
+        for filter_obj in self.filters:
+            if not filter_obj.should_log(record):
+                return False
+        return True
+    
+    def flush(self) -> int:
+        """
+        Write everything currently buffered.
+        
+        Returns:
+            Number of records taken from the buffer
+        """
+        taken = 0
+        with self._write_lock:
+            while True:
+                pending = self.buffer.take(self.batch_size)
+                if not pending:
+                    break
+                taken += len(pending)
+                start = time.perf_counter()
+                
+                records = []
+                for item in pending:
+                    record = self._build_record(item)
+                    if self._should_write(record):
+                        records.append(record)
+                self._stats['filtered'] += len(pending) - len(records)
+                
+                written = 0
+                for sink in self.sinks:
+                    try:
+                        written = max(written, emit_batch(sink, records))
+                    except Exception:
+                        self._stats['write_errors'] += 1
+                
+                self._stats['written'] += written
+                self._stats['batches'] += 1
+                self._stats['last_batch_duration'] = time.perf_counter() - start
+        return taken
+    
+    def _write_loop(self) -> None:
+        while not self._stop_event.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                # Keep writing; a failing sink must not stop the pipeline
+                self._stats['write_errors'] += 1
+        self.flush()
+    
+    def start(self) -> None:
+        """Start the writer thread if it is not running."""
+        if self._writer is not None and self._writer.is_alive():
+            return
+        self._stop_event.clear()
+        self._writer = threading.Thread(
+            target=self._write_loop,
+            name='log-pipeline-writer',
+            daemon=True
+        )
+        self._writer.start()
+    
+    def stop(self) -> None:
+        """Stop the writer thread after writing everything buffered."""
+        self._stop_event.set()
+        self._wakeup.set()
+        if self._writer is not None:
+            self._writer.join(timeout=self.flush_interval + 5)
+            self._writer = None
+        self.flush()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pipeline statistics."""
+        buffer = self.buffer
+        return {
+            **self._stats,
+            'policy': buffer.policy.value,
+            'capacity': buffer.capacity,
+            'pending': len(buffer),
+            'high_water': buffer.high_water,
+            'dropped': buffer.dropped,
+            'sampled_out': buffer.sampled_out,
+            'blocked': buffer.blocked,
+            'writer_running': self._writer is not None and self._writer.is_alive()
+        }
+
+
+def benchmark_log_pipeline(
+    threads: int = 4,
+    records_per_thread: int = 25_000,
+    policy: OverflowPolicy = OverflowPolicy.BLOCK,
+    capacity: int = DEFAULT_CAPACITY
+) -> Dict[str, Any]:
+    """
+    Compare request-path logging overhead of LogPipeline against stdlib
+    logging with a QueueHandler/QueueListener pair. Both write the same
+    records through the same formatter to an in-memory stream.
+    
+    Returns:
+        Dictionary with nanoseconds per call on the request path, end-to-end
+        wall time and record counts for both pipelines
+    """
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(component)s - %(request_id)s - %(message)s')
+    fields = {'component': 'benchmark', 'endpoint': '/api/v1/benchmark'}
+    
+    def run(log_call, drain) -> Dict[str, float]:
+        def worker(index: int) -> float:
+            request_id = f"bench-{index}"
+            start = time.perf_counter_ns()
+            for i in range(records_per_thread):
+                log_call(request_id, i)
+            return (time.perf_counter_ns() - start) / records_per_thread
+        
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            per_thread_ns = list(pool.map(worker, range(threads)))
+        submit_wall = time.perf_counter() - wall_start
+        drain()
+        return {
+            'ns_per_call': sum(per_thread_ns) / len(per_thread_ns),
+            'submit_wall_seconds': submit_wall,
+            'total_wall_seconds': time.perf_counter() - wall_start
+        }
+    
+    # LogPipeline
+    pipeline_stream = io.StringIO()
+    pipeline_sink = logging.StreamHandler(pipeline_stream)
+    pipeline_sink.setFormatter(formatter)
+    pipeline = LogPipeline([pipeline_sink], logger_name='bench.pipeline', capacity=capacity, policy=policy)
+    pipeline.start()
+    submit = pipeline.submit
+    
+    def pipeline_call(request_id: str, i: int) -> None:
+        submit(logging.INFO, "request handled", request_id, fields)
+    
+    pipeline_result = run(pipeline_call, pipeline.stop)
+    pipeline_result['lines_written'] = pipeline_stream.getvalue().count('\n')
+    pipeline_result['stats'] = pipeline.get_stats()
+    
+    # stdlib logging with QueueHandler
+    stdlib_stream = io.StringIO()
+    stdlib_sink = logging.StreamHandler(stdlib_stream)
+    stdlib_sink.setFormatter(formatter)
+    record_queue: queue.Queue = queue.Queue(-1)
+    listener = logging.handlers.QueueListener(record_queue, stdlib_sink)
+    stdlib_logger = logging.getLogger('bench.stdlib')
+    stdlib_logger.propagate = False
+    stdlib_logger.setLevel(logging.INFO)
+    queue_handler = logging.handlers.QueueHandler(record_queue)
+    stdlib_logger.addHandler(queue_handler)
+    listener.start()
+    info = stdlib_logger.info
+    
+    def stdlib_call(request_id: str, i: int) -> None:
+        info("request handled", extra={'request_id': request_id, **fields})
+    
+    try:
+        stdlib_result = run(stdlib_call, listener.stop)
+    finally:
+        stdlib_logger.removeHandler(queue_handler)
+    stdlib_result['lines_written'] = stdlib_stream.getvalue().count('\n')
+    
+    return {
+        'threads': threads,
+        'total_calls': threads * records_per_thread,
+        'pipeline': pipeline_result,
+        'stdlib_queue_handler': stdlib_result,
+        'speedup': stdlib_result['ns_per_call'] / pipeline_result['ns_per_call']
+    }
@@ -0,0 +1,22 @@
+"""
+Symbol extraction benchmark for the NIP LSP facts gate.
+
+Extracts a synthetic 5k-file repository cold, then validates a candidate
+that changes a handful of files against the warm content-hash cache.
+"""
+
+import pytest
+
+
+@pytest.mark.benchmark
+def test_incremental_validation_on_5k_files():
+    """Validating a small change only re-extracts the changed files"""
+    from noodlecore.improve.lsp_facts_gate import benchmark_symbol_extraction
+
+    result = benchmark_symbol_extraction(files=5000, changed_files=50)
+
+    # Cold cache: every file parsed once; incremental: only changed files
+    assert result['cache_misses'] == 5000 + 50
+    assert result['incremental_validate_seconds'] < result['cold_serial_seconds']
+    # Adding an optional keyword argument is not a breaking change
+    assert result['passed'] is True
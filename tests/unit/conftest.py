@@ -0,0 +1,48 @@
+"""
+Shared fixtures for unit tests.
+"""
+
+import importlib
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+NIP_PROVIDERS_DIR = REPO_ROOT / 'src' / 'nip' / 'providers'
+VECTOR_DB_DIR = REPO_ROOT / 'noodle-vector-database'
+
+
+def _import_from(directory, package, name):
+    """Import package.name with package bound to directory, without an __init__"""
+    if package not in sys.modules:
+        module = types.ModuleType(package)
+        module.__path__ = [str(directory)]
+        sys.modules[package] = module
+    return importlib.import_module(f'{package}.{name}')
+
+
+@pytest.fixture
+def load_nip_module():
+    """
+    Import a module from src/nip/providers.
+
+    The package __init__ imports every provider, including ones that are not
+    in this tree, so modules are loaded under a bare package when the real
+    one cannot be imported.
+    """
+    def load(name):
+        try:
+            return importlib.import_module(f'nip.providers.{name}')
+        except ImportError:
+            return _import_from(NIP_PROVIDERS_DIR, '_nip_providers', name)
+    return load
+
+
+@pytest.fixture
+def load_vector_db_module():
+    """Import a module from noodle-vector-database (a directory, not a package)"""
+    pytest.importorskip('numpy')
+    pytest.importorskip('psutil')
+    return lambda name: _import_from(VECTOR_DB_DIR, '_noodle_vector_database', name)
@@ -0,0 +1,236 @@
+"""
+Unit tests for the enterprise audit trail.
+
+Covers the hash chain and signed segments, group commit durability on close
+and at exit, timed commit failures and the SQLite query index.
+"""
+
+import asyncio
+import json
+import logging
+
+import pytest
+
+
+class _Config:
+    def get_int(self, name, default=None):
+        return default
+
+
+@pytest.fixture
+def audit(monkeypatch, tmp_path):
+    from noodlecore.cli.logs import audit_trail
+
+    # The signer keeps its key under the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(audit_trail, 'get_cli_config', lambda: _Config())
+    return audit_trail
+
+
+def _open(audit, tmp_path, **kwargs):
+    return audit.AuditTrail(audit_dir=str(tmp_path / 'logs'), fsync_commits=False, **kwargs)
+
+
+def _committed_ids(tmp_path):
+    ids = []
+    with open(tmp_path / 'logs' / 'audit.log', encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('{'):
+                ids.append(json.loads(line)['entry_id'])
+    return ids
+
+
+def test_chain_verifies_across_reopen(audit, tmp_path):
+    """Entries from two sessions form one verified chain"""
+    async def scenario():
+        trail = _open(audit, tmp_path, batch_size=4)
+        for i in range(10):
+            await trail.log_event(audit.AuditEventType.COMMAND_EXECUTION, action=f'run-{i}')
+        await trail.close()
+
+        reopened = _open(audit, tmp_path, batch_size=4)
+        for i in range(3):
+            await reopened.log_event(audit.AuditEventType.CONFIG_CHANGE, action=f'set-{i}')
+        first = await reopened.verify_audit_integrity()
+        second = await reopened.verify_audit_integrity()
+        full = await reopened.verify_audit_integrity(full=True)
+        await reopened.close()
+        return reopened, first, second, full
+
+    reopened, first, second, full = asyncio.run(scenario())
+
+    assert first['success'] and not first['tamper_detected']
+    assert first['verified_entries'] == 13
+    assert first['missing_signatures'] == 0
+    # The checkpoint means nothing is re-read the second time
+    assert second['newly_verified_entries'] == 0
+    assert full['newly_verified_entries'] == 13 and not full['tamper_detected']
+    assert reopened.audit_entries[-1]['seq'] == 12
+
+
+def test_tampered_entry_is_detected(audit, tmp_path):
+    """Editing a committed entry breaks verification"""
+    async def write():
+        trail = _open(audit, tmp_path)
+        for i in range(5):
+            await trail.log_event(audit.AuditEventType.FILE_OPERATION, resource=f'file-{i}.txt')
+        await trail.close()
+
+    asyncio.run(write())
+    log_file = tmp_path / 'logs' / 'audit.log'
+    log_file.write_text(log_file.read_text(encoding='utf-8').replace('file-2.txt', 'file-9.txt'), encoding='utf-8')
+
+    result = asyncio.run(_open(audit, tmp_path).verify_audit_integrity(full=True))
+
+    assert result['tamper_detected']
+    assert 'hash chain' in result['failure']
+
+
+def test_close_commits_buffered_entries(audit, tmp_path):
+    """Entries waiting for the commit timer are written by close()"""
+    async def scenario():
+        trail = _open(audit, tmp_path, batch_size=100, commit_interval=60)
+        logged = await trail.log_event(audit.AuditEventType.SYSTEM_EVENT, action='start')
+        before = _committed_ids(tmp_path)
+        await trail.close()
+        return logged['entry_id'], before
+
+    entry_id, before = asyncio.run(scenario())
+
+    assert entry_id not in before
+    assert entry_id in _committed_ids(tmp_path)
+
+
+def test_exit_hook_commits_buffered_entries(audit, tmp_path):
+    """The atexit hook writes and seals entries never flushed by the app"""
+    async def scenario():
+        trail = _open(audit, tmp_path, batch_size=100, commit_interval=60)
+        logged = await trail.log_event(audit.AuditEventType.SYSTEM_EVENT, action='start')
+        return trail, logged['entry_id']
+
+    trail, entry_id = asyncio.run(scenario())
+    trail._flush_at_exit()
+
+    assert entry_id in _committed_ids(tmp_path)
+    result = asyncio.run(_open(audit, tmp_path).verify_audit_integrity())
+    assert result['verified_entries'] == 1 and not result['tamper_detected']
+
+
+def test_timed_commit_failure_is_logged_and_retried(audit, tmp_path, caplog, monkeypatch):
+    """A failing timer commit is logged and its batch stays buffered"""
+    async def scenario():
+        trail = _open(audit, tmp_path, batch_size=100, commit_interval=0.01)
+        original = trail._append_batch
+        calls = []
+
+        def failing_once(batch, done=None):
+            calls.append(len(batch))
+            if len(calls) == 1:
+                raise audit.AuditException("disk full", audit.AuditErrorCodes.STORAGE_ERROR)
+            original(batch, done)
+
+        monkeypatch.setattr(trail, '_append_batch', failing_once)
+        logged = await trail.log_event(audit.AuditEventType.SYSTEM_EVENT, action='start')
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if len(calls) >= 2:
+                break
+        await trail.close()
+        return logged['entry_id'], calls
+
+    with caplog.at_level(logging.ERROR, logger=audit.__name__):
+        entry_id, calls = asyncio.run(scenario())
+
+    assert calls[:2] == [1, 1]
+    assert any('disk full' in record.getMessage() for record in caplog.records)
+    assert _committed_ids(tmp_path) == [entry_id]
+
+
+@pytest.mark.parametrize('failing_step', ['index', 'segment'])
+def test_failed_commit_step_is_not_repeated(audit, tmp_path, monkeypatch, failing_step):
+    """A retry after the entries were written only redoes the failed step"""
+    import sqlite3
+
+    async def scenario():
+        trail = _open(audit, tmp_path, batch_size=100, commit_interval=60)
+        failures = []
+
+        def fail_once(original):
+            def wrapper(*args):
+                if not failures:
+                    failures.append(failing_step)
+                    if failing_step == 'index':
+                        raise sqlite3.OperationalError('database is locked')
+                    raise OSError('no space left on device')
+                return original(*args)
+            return wrapper
+
+        if failing_step == 'index':
+            monkeypatch.setattr(trail.index, 'add_entries', fail_once(trail.index.add_entries))
+        else:
+            monkeypatch.setattr(trail.signer, 'sign_entry', fail_once(trail.signer.sign_entry))
+        for i in range(3):
+            await trail.log_event(audit.AuditEventType.SYSTEM_EVENT, action=f'step-{i}')
+        with pytest.raises(audit.AuditException):
+            await trail.flush()
+        await trail.log_event(audit.AuditEventType.SYSTEM_EVENT, action='after')
+        await trail.close()
+        events = await _open(audit, tmp_path).get_audit_events()
+        result = await _open(audit, tmp_path).verify_audit_integrity(full=True)
+        return failures, events, result
+
+    failures, events, result = asyncio.run(scenario())
+
+    assert failures == [failing_step]
+    assert len(_committed_ids(tmp_path)) == 4
+    assert [event['action'] for event in events['events']] == ['after', 'step-2', 'step-1', 'step-0']
+    assert not result['tamper_detected'] and result['verified_entries'] == 4
+
+
+def test_index_filters_and_pages(audit, tmp_path):
+    """Filtered queries page newest first through the index with cursors"""
+    async def scenario():
+        trail = _open(audit, tmp_path, batch_size=8)
+        for i in range(25):
+            await trail.log_event(
+                audit.AuditEventType.COMMAND_EXECUTION if i % 2 else audit.AuditEventType.FILE_OPERATION,
+                user='alice' if i % 5 else 'bob',
+                action=f'op-{i}'
+            )
+        pages = []
+        cursor = None
+        while True:
+            page = await trail.get_audit_events(event_type='command_execution', limit=5, cursor=cursor)
+            pages.append([event['action'] for event in page['events']])
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        bob = await trail.get_audit_events(user='bob')
+        await trail.close()
+        return pages, bob
+
+    pages, bob = asyncio.run(scenario())
+
+    assert pages == [
+        ['op-23', 'op-21', 'op-19', 'op-17', 'op-15'],
+        ['op-13', 'op-11', 'op-9', 'op-7', 'op-5'],
+        ['op-3', 'op-1'],
+    ]
+    assert [event['action'] for event in bob['events']] == ['op-20', 'op-15', 'op-10', 'op-5', 'op-0']
+
+
+def test_index_is_rebuilt_when_missing(audit, tmp_path):
+    """A deleted index is backfilled from the audit log on open"""
+    async def write():
+        trail = _open(audit, tmp_path)
+        for i in range(3):
+            await trail.log_event(audit.AuditEventType.SECURITY_EVENT, action=f'check-{i}')
+        await trail.close()
+
+    asyncio.run(write())
+    (tmp_path / 'logs' / 'audit_index.db').unlink()
+
+    trail = _open(audit, tmp_path)
+    result = asyncio.run(trail.get_audit_events())
+
+    assert [event['action'] for event in result['events']] == ['check-2', 'check-1', 'check-0']
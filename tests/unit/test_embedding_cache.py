@@ -0,0 +1,171 @@
+"""
+Unit tests for the nip embedding cache and BaseProvider.embed_batch.
+"""
+
+import asyncio
+
+import pytest
+
+
+@pytest.fixture
+def cache_module(load_nip_module):
+    return load_nip_module('embedding_cache')
+
+
+@pytest.fixture
+def base(load_nip_module):
+    return load_nip_module('base_provider')
+
+
+@pytest.fixture
+def fake_provider(base):
+    class FakeProvider(base.BaseProvider):
+        """Embeds text as [len(text), 0.5] and records every request"""
+
+        DEFAULT_EMBEDDING_MODEL = 'fake-embed'
+        EMBED_BATCH_MAX_TEXTS = 2
+
+        def __init__(self, config):
+            super().__init__(config)
+            self.requests = []
+
+        def complete(self, *args, **kwargs):
+            raise NotImplementedError
+
+        async def acomplete(self, *args, **kwargs):
+            raise NotImplementedError
+
+        def stream_complete(self, *args, **kwargs):
+            raise NotImplementedError
+
+        async def astream_complete(self, *args, **kwargs):
+            raise NotImplementedError
+
+        def _embed_many(self, texts, **kwargs):
+            self.requests.append(list(texts))
+            model = kwargs.get('model', self.DEFAULT_EMBEDDING_MODEL)
+            return [
+                base.EmbeddingResponse(embedding=[float(len(text)), 0.5], model=model, tokens_used=1)
+                for text in texts
+            ]
+
+    def make(cache_dir=None, **config):
+        return FakeProvider(base.ProviderConfig(embedding_cache_dir=cache_dir, **config))
+    return make
+
+
+def test_memory_cache_hits_and_misses(cache_module):
+    """Stored vectors are returned and counted as hits"""
+    cache = cache_module.EmbeddingCache()
+    cache.put_many('p', 'm', ['a', 'b'], [[1.0, 2.0], [3.0, 4.0]])
+
+    assert cache.get_many('p', 'm', ['b', 'c', 'a']) == [[3.0, 4.0], None, [1.0, 2.0]]
+    assert cache.get_many('p', 'other-model', ['a']) == [None]
+    assert cache.get_stats() == {'hits': 2, 'misses': 2, 'entries': 2}
+
+
+def test_disk_cache_persists_across_reopen(cache_module, tmp_path):
+    """Vectors written to disk are found by a new cache on the same directory"""
+    cache = cache_module.EmbeddingCache(str(tmp_path))
+    cache.put_many('p', 'm', ['alpha', 'beta'], [[0.25, -1.0, 2.0], [4.0, 5.0, 6.0]])
+    cache.put_many('p', 'm', ['alpha', 'gamma'], [[9.0, 9.0, 9.0], [7.0, 8.0, 0.0]])
+    cache.close()
+
+    reopened = cache_module.EmbeddingCache(str(tmp_path))
+    # The first vector stored for a key wins
+    assert reopened.get_many('p', 'm', ['gamma', 'alpha', 'beta', 'delta']) == [
+        [7.0, 8.0, 0.0], [0.25, -1.0, 2.0], [4.0, 5.0, 6.0], None
+    ]
+    assert reopened.get_stats()['entries'] == 3
+    reopened.close()
+
+
+def test_disk_cache_ignores_torn_rows(cache_module, tmp_path):
+    """An index entry whose row was not fully written is dropped on reopen"""
+    cache = cache_module.EmbeddingCache(str(tmp_path))
+    cache.put_many('p', 'm', ['a', 'b'], [[1.0, 2.0], [3.0, 4.0]])
+    cache.close()
+    data_path = next(tmp_path.glob('*.f32'))
+    data_path.write_bytes(data_path.read_bytes()[:-4])
+
+    reopened = cache_module.EmbeddingCache(str(tmp_path))
+    assert reopened.get_many('p', 'm', ['a', 'b']) == [[1.0, 2.0], None]
+    reopened.close()
+
+
+def test_disk_cache_writes_after_torn_row(cache_module, tmp_path):
+    """Rows written after a torn row are aligned and survive another reopen"""
+    cache = cache_module.EmbeddingCache(str(tmp_path))
+    cache.put_many('p', 'm', ['a', 'b'], [[1.0, 2.0], [3.0, 4.0]])
+    cache.close()
+    data_path = next(tmp_path.glob('*.f32'))
+    data_path.write_bytes(data_path.read_bytes()[:-4])
+
+    reopened = cache_module.EmbeddingCache(str(tmp_path))
+    reopened.put_many('p', 'm', ['c'], [[5.0, 6.0]])
+    assert reopened.get_many('p', 'm', ['a', 'b', 'c']) == [[1.0, 2.0], None, [5.0, 6.0]]
+    reopened.close()
+
+    again = cache_module.EmbeddingCache(str(tmp_path))
+    assert again.get_many('p', 'm', ['a', 'b', 'c']) == [[1.0, 2.0], None, [5.0, 6.0]]
+    again.put_many('p', 'm', ['b'], [[7.0, 8.0]])
+    assert again.get_many('p', 'm', ['b', 'c']) == [[7.0, 8.0], [5.0, 6.0]]
+    again.close()
+
+
+def test_embed_batch_deduplicates_and_chunks(fake_provider):
+    """Repeated texts are embedded once and sub-batches respect the limit"""
+    provider = fake_provider()
+
+    responses = provider.embed_batch(['aa', 'b', 'aa', 'cccc', 'b', 'ddd'])
+
+    assert sorted(text for request in provider.requests for text in request) == ['aa', 'b', 'cccc', 'ddd']
+    assert all(len(request) <= 2 for request in provider.requests)
+    assert [r.embedding[0] for r in responses] == [2.0, 1.0, 2.0, 4.0, 1.0, 3.0]
+
+
+def test_embed_batch_serves_cache_hits(fake_provider, tmp_path):
+    """Cached texts cost no request, also for a provider opened later"""
+    provider = fake_provider(str(tmp_path))
+    provider.embed_batch(['one', 'two'])
+
+    reopened = fake_provider(str(tmp_path))
+    responses = reopened.embed_batch(['two', 'three', 'one'])
+
+    assert reopened.requests == [['three']]
+    assert [r.embedding[0] for r in responses] == [3.0, 5.0, 3.0]
+    assert [r.tokens_used for r in responses] == [0, 1, 0]
+    assert all(r.model == 'fake-embed' for r in responses)
+
+
+def test_cache_is_keyed_by_embedding_model(fake_provider, tmp_path):
+    """The default embedding model, not the chat model, keys the cache"""
+    provider = fake_provider(str(tmp_path), model='chat-model')
+    provider.embed_batch(['x'])
+    provider.embed_batch(['x'], model='fake-embed')
+    provider.embed_batch(['x'], model='other-embed')
+
+    assert provider.requests == [['x'], ['x']]
+
+
+def test_aembed_batch_matches_sync(fake_provider, tmp_path):
+    """The async path deduplicates, caches and preserves order"""
+    provider = fake_provider(str(tmp_path))
+    texts = ['a', 'bb', 'a', 'ccc', 'dddd', 'bb']
+
+    responses = asyncio.run(provider.aembed_batch(texts))
+    again = asyncio.run(provider.aembed_batch(texts))
+
+    assert [r.embedding[0] for r in responses] == [1.0, 2.0, 1.0, 3.0, 4.0, 2.0]
+    assert [r.embedding for r in again] == [r.embedding for r in responses]
+    assert sum(len(request) for request in provider.requests) == 4
+
+
+def test_missing_default_embedding_model_is_an_error(base, fake_provider):
+    """A provider without a default embedding model needs an explicit model"""
+    provider = fake_provider(model='chat-model')
+    provider.DEFAULT_EMBEDDING_MODEL = None
+
+    with pytest.raises(NotImplementedError):
+        provider.embed_batch(['x'])
+    assert provider.embed_batch(['x'], model='explicit')[0].model == 'explicit'
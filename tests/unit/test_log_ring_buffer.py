@@ -0,0 +1,59 @@
+"""
+Unit tests for the enterprise log pipeline ring buffer and record building.
+"""
+
+import inspect
+import io
+import logging
+import threading
+
+
+def test_block_policy_never_exceeds_capacity():
+    """Concurrent producers under BLOCK wait instead of overshooting capacity"""
+    from noodlecore.cli.logs.log_pipeline import LogRingBuffer, OverflowPolicy
+
+    capacity = 8
+    buffer = LogRingBuffer(capacity, OverflowPolicy.BLOCK)
+    producers, per_producer = 4, 500
+    sizes = []
+    taken = []
+    done = threading.Event()
+
+    def produce(index):
+        for i in range(per_producer):
+            buffer.put((0.0, logging.INFO, f'{index}-{i}', None, {}, '', 0, ''))
+            sizes.append(len(buffer))
+
+    def consume():
+        while not done.is_set() or len(buffer):
+            taken.extend(buffer.take(3))
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    threads = [threading.Thread(target=produce, args=(i,)) for i in range(producers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    done.set()
+    consumer.join()
+
+    assert max(sizes) <= capacity
+    assert buffer.high_water <= capacity
+    assert len(taken) == producers * per_producer
+
+
+def test_records_carry_caller_location():
+    """Records built on the writer thread keep the submitting caller's location"""
+    from noodlecore.cli.logs.log_pipeline import LogPipeline
+
+    stream = io.StringIO()
+    sink = logging.StreamHandler(stream)
+    sink.setFormatter(logging.Formatter('%(filename)s:%(lineno)d:%(funcName)s %(message)s'))
+    pipeline = LogPipeline([sink])
+
+    line = inspect.currentframe().f_lineno + 1
+    pipeline.submit(logging.WARNING, "located")
+    pipeline.flush()
+
+    assert stream.getvalue() == f"test_log_ring_buffer.py:{line}:test_records_carry_caller_location located\n"
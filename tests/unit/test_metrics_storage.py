@@ -0,0 +1,162 @@
+"""
+Unit tests for the enterprise columnar metric store.
+
+Covers the on-disk chunk codec, incremental rollups, late samples and raw
+retention.
+"""
+
+import pytest
+
+
+@pytest.fixture
+def storage():
+    from noodlecore.cli.logs import metrics_storage
+    return metrics_storage
+
+
+def test_chunk_codec_round_trip(storage):
+    """Encoded chunks decode to the same timestamps, values and tags"""
+    tag_table = [{'host': 'a'}, {'host': 'b'}, {'host': 'c'}]
+    chunk = storage.MetricChunk()
+    samples = [
+        (1700000000.000001, 1.5, 2),
+        (1700000000.25, -3.0, 0),
+        (1700000000.25, 0.0, 2),
+        (1700000100.0, 1e300, 1),
+        (1700003600.123456, float('nan'), 0),
+    ]
+    for timestamp, value, tag_id in samples:
+        chunk.append(timestamp, value, tag_id)
+
+    decoded, local_tags = storage.MetricChunk.decode(chunk.encode(tag_table))
+
+    assert decoded.sealed
+    assert list(decoded.timestamps) == [ts for ts, _, _ in samples]
+    assert [repr(v) for v in decoded.values] == [repr(v) for _, v, _ in samples]
+    assert [local_tags[i] for i in decoded.tag_ids] == [tag_table[t] for _, _, t in samples]
+
+
+def test_chunk_decode_rejects_foreign_data(storage):
+    """Data without the chunk magic is refused"""
+    with pytest.raises(ValueError):
+        storage.MetricChunk.decode(b'XXXX' + bytes(64))
+
+
+def test_chunk_append_rejects_out_of_order(storage):
+    """A chunk never rewrites an older timestamp to keep its column sorted"""
+    chunk = storage.MetricChunk()
+    chunk.append(10.0, 1.0, 0)
+
+    with pytest.raises(ValueError):
+        chunk.append(9.0, 2.0, 0)
+
+    chunk.insert(9.0, 2.0, 0)
+    assert list(chunk.timestamps) == [9.0, 10.0]
+    assert list(chunk.values) == [2.0, 1.0]
+
+
+def test_late_samples_keep_their_timestamps(storage, tmp_path):
+    """Late samples are stored at their own time, across sealed chunks too"""
+    store = storage.ColumnarMetricStore(tmp_path, chunk_size=4)
+    for t in (100.0, 101.0, 102.0, 103.0, 104.0, 105.0):
+        store.append('latency', t, t, {})
+    store.append('latency', 104.5, -1.0, {})
+    store.append('latency', 101.5, -2.0, {})
+
+    samples = store.query_raw('latency')
+    assert [ts for ts, _, _ in samples] == [105.0, 104.5, 104.0, 103.0, 102.0, 101.5, 101.0, 100.0]
+    assert dict((ts, v) for ts, v, _ in samples)[101.5] == -2.0
+
+    assert [ts for ts, _, _ in store.query_raw('latency', since=101.0, until=102.0)] == [102.0, 101.5, 101.0]
+    assert [ts for ts, _, _ in store.query_raw('latency', limit=2)] == [105.0, 104.5]
+
+
+def test_rollups_match_raw_samples(storage, tmp_path):
+    """Rollup buckets aggregate exactly the samples they cover"""
+    store = storage.ColumnarMetricStore(tmp_path, rollup_resolutions={10: 100, 60: 10})
+    values = [float(i) for i in range(60)]
+    for i, value in enumerate(values):
+        store.append('cpu', 1200.0 + i, value, {'host': 'a'})
+
+    tens = store.rollup_points('cpu', 10)
+    assert [b.start for b in tens] == [1200.0 + 10 * i for i in range(6)]
+    assert [b.count for b in tens] == [10] * 6
+    assert tens[1].total == sum(values[10:20])
+    assert tens[1].minimum == 10.0 and tens[1].maximum == 19.0
+    assert tens[1].latest == 19.0
+
+    (minute,) = store.rollup_points('cpu', 60)
+    assert minute.count == 60
+    assert minute.mean == pytest.approx(sum(values) / 60)
+    assert minute.sketch.quantile(0.5) == pytest.approx(29.5, rel=0.05)
+
+    merged = store.aggregate('cpu', window=60, now=1259.0)
+    assert merged.count == 60
+    assert merged.maximum == 59.0
+
+
+def test_flush_and_load_round_trip(storage, tmp_path):
+    """Flushed chunks and rollups are restored by a new store"""
+    store = storage.ColumnarMetricStore(tmp_path, chunk_size=3, raw_retention_seconds=3600)
+    for i in range(7):
+        store.append('requests', 1000.0 + i, float(i), {'route': f'/r{i % 2}'})
+    store.append('requests', 1000.5, 99.0, {'route': '/late'})
+    store.flush()
+
+    reloaded = storage.ColumnarMetricStore(tmp_path, chunk_size=3, raw_retention_seconds=3600)
+    reloaded.load(now=1010.0)
+
+    assert reloaded.query_raw('requests') == store.query_raw('requests')
+    assert reloaded.sample_counts() == {'requests': 8}
+    original = store.rollup_points('requests', 10)
+    restored = reloaded.rollup_points('requests', 10)
+    assert [b.to_dict() for b in restored] == [b.to_dict() for b in original]
+
+
+def test_retention_drops_whole_sealed_chunks(storage, tmp_path):
+    """Expired sealed chunks and their files go; the head chunk stays"""
+    store = storage.ColumnarMetricStore(tmp_path, chunk_size=2, raw_retention_seconds=100)
+    for t in (0.0, 1.0, 50.0, 51.0, 150.0):
+        store.append('m', t, t, {})
+    store.flush()
+    files = sorted(tmp_path.glob('m/*.chunk'))
+    assert len(files) == 3
+
+    assert store.enforce_retention(now=140.0) == 1
+    assert [ts for ts, _, _ in store.query_raw('m')] == [150.0, 51.0, 50.0]
+    assert not files[0].exists()
+
+    # Rollups outlive raw retention
+    assert sum(b.count for b in store.rollup_points('m', 10)) == 5
+
+    reloaded = storage.ColumnarMetricStore(tmp_path, chunk_size=2, raw_retention_seconds=100)
+    reloaded.load(now=200.0)
+    assert [ts for ts, _, _ in reloaded.query_raw('m')] == [150.0]
+
+
+def test_retention_with_overlapping_chunks(storage, tmp_path):
+    """An expired chunk behind a newer one is still dropped"""
+    store = storage.ColumnarMetricStore(tmp_path, chunk_size=2, raw_retention_seconds=100)
+    for t in (200.0, 201.0):
+        store.append('m', t, t, {})
+    for t in (5.0, 6.0):
+        store.append('m', t, t, {})
+    store.append('m', 300.0, 300.0, {})
+
+    assert store.enforce_retention(now=250.0) == 1
+    assert [ts for ts, _, _ in store.query_raw('m')] == [300.0, 201.0, 200.0]
+
+
+def test_late_sample_opens_missing_rollup_bucket(storage, tmp_path):
+    """A late sample between two buckets gets its own bucket in time order"""
+    store = storage.ColumnarMetricStore(tmp_path, rollup_resolutions={10: 3})
+    for t in (0.0, 25.0, 12.0):
+        store.append('cpu', t, 1.0, {})
+    assert [(b.start, b.count) for b in store.rollup_points('cpu', 10)] == [(0.0, 1), (10.0, 1), (20.0, 1)]
+
+    # A full ring evicts its oldest bucket; a sample older than all of them is dropped
+    store.append('cpu', 5.0, 1.0, {})
+    store.append('cpu', 17.0, 1.0, {})
+    store.append('cpu', 31.0, 1.0, {})
+    store.append('cpu', 3.0, 1.0, {})
+    assert [(b.start, b.count) for b in store.rollup_points('cpu', 10)] == [(10.0, 2), (20.0, 1), (30.0, 1)]
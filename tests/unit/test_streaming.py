@@ -0,0 +1,211 @@
+"""
+Unit tests for the nip streaming multiplexer.
+
+Uses fake async providers to cover racing, fan-out backpressure and
+early close.
+"""
+
+import asyncio
+
+import pytest
+
+
+@pytest.fixture
+def streaming(load_nip_module):
+    return load_nip_module('streaming')
+
+
+@pytest.fixture
+def base(load_nip_module):
+    return load_nip_module('base_provider')
+
+
+@pytest.fixture
+def make_provider(base):
+    class FakeStreamProvider(base.BaseProvider):
+        """Streams fixed chunks after a delay; records how far it got"""
+
+        def __init__(self, name, chunks, first_delay=0.0, delay=0.0):
+            super().__init__(base.ProviderConfig(model=f'{name}-model'))
+            self.provider_name = name
+            self.chunks = chunks
+            self.first_delay = first_delay
+            self.delay = delay
+            self.sent = 0
+            self.cancelled = False
+
+        def complete(self, *args, **kwargs):
+            raise NotImplementedError
+
+        async def acomplete(self, *args, **kwargs):
+            raise NotImplementedError
+
+        def stream_complete(self, *args, **kwargs):
+            raise NotImplementedError
+
+        async def astream_complete(self, messages, **kwargs):
+            try:
+                await asyncio.sleep(self.first_delay)
+                for chunk in self.chunks:
+                    if isinstance(chunk, Exception):
+                        raise chunk
+                    self.sent += 1
+                    yield chunk
+                    await asyncio.sleep(self.delay)
+            except asyncio.CancelledError:
+                self.cancelled = True
+                raise
+
+    return FakeStreamProvider
+
+
+def _chunks(base, *contents, finish_reason='end_turn'):
+    return [base.StreamChunk(content=c) for c in contents] + [base.StreamChunk(content='', finish_reason=finish_reason)]
+
+
+def _messages(base):
+    return [base.Message(role=base.MessageRole.USER, content='hi')]
+
+
+def test_race_keeps_first_token_and_cancels_losers(streaming, base, make_provider):
+    """The first stream to emit content wins and the others are cancelled"""
+    fast = make_provider('fast', _chunks(base, 'a', 'b'), first_delay=0.01)
+    slow = make_provider('slow', _chunks(base, 'x', 'y'), first_delay=5.0)
+    mux = streaming.StreamMultiplexer()
+
+    async def scenario():
+        race = mux.race([slow, fast], _messages(base))
+        deltas = [delta async for delta in race]
+        return race, deltas
+
+    race, deltas = asyncio.run(asyncio.wait_for(scenario(), timeout=2.0))
+
+    assert race.winner.name == 'fast'
+    assert [d.content for d in deltas] == ['a', 'b', '']
+    assert deltas[-1].finish_reason == 'stop'
+    assert slow.cancelled and slow.sent == 0
+    stats = mux.get_stats()
+    assert stats['slow']['cancelled'] == 1
+    assert stats['fast']['streams'] == 1 and stats['fast']['errors'] == 0
+
+
+def test_race_skips_streams_that_fail_before_a_token(streaming, base, make_provider):
+    """A stream failing before its first token drops out of the race"""
+    broken = make_provider('broken', [RuntimeError('boom')])
+    working = make_provider('working', _chunks(base, 'ok'), first_delay=0.02)
+
+    async def scenario():
+        race = streaming.StreamMultiplexer().race([broken, working], _messages(base))
+        return race, [delta.content async for delta in race]
+
+    race, contents = asyncio.run(scenario())
+
+    assert race.winner.name == 'working'
+    assert contents == ['ok', '']
+
+
+def test_race_fails_when_every_stream_fails(streaming, base, make_provider):
+    """The race raises once no stream is left"""
+    providers = [make_provider(name, [RuntimeError(name)]) for name in ('one', 'two')]
+
+    async def scenario():
+        return [delta async for delta in streaming.StreamMultiplexer().race(providers, _messages(base))]
+
+    with pytest.raises(base.ProviderError, match='All streams failed'):
+        asyncio.run(scenario())
+
+
+def test_race_first_token_timeout(streaming, base, make_provider):
+    """No first token within the timeout fails the race and cancels every stream"""
+    slow = make_provider('slow', _chunks(base, 'late'), first_delay=5.0)
+
+    async def scenario():
+        race = streaming.StreamMultiplexer().race([slow], _messages(base), first_token_timeout=0.05)
+        return [delta async for delta in race]
+
+    with pytest.raises(base.ProviderError, match='within'):
+        asyncio.run(asyncio.wait_for(scenario(), timeout=2.0))
+    assert slow.cancelled
+
+
+def test_fan_out_waits_for_slowest_subscriber(streaming, base, make_provider):
+    """Bounded queues hold the source back until the slow consumer reads"""
+    provider = make_provider('source', _chunks(base, *[str(i) for i in range(20)]))
+    mux = streaming.StreamMultiplexer(max_pending=64)
+    seen_by_sink = []
+
+    async def scenario():
+        fan_out = mux.fan_out(provider, _messages(base))
+        fast = fan_out.subscribe()
+        slow = fan_out.subscribe(max_pending=2)
+        fan_out.add_sink(lambda delta: seen_by_sink.append(delta.content))
+        fan_out.start()
+
+        await asyncio.sleep(0.05)
+        sent_while_blocked = provider.sent
+        fast_deltas, slow_deltas = await asyncio.gather(
+            _collect(fast),
+            _collect(slow, delay=0.001)
+        )
+        await fan_out.run()
+        return sent_while_blocked, fast_deltas, slow_deltas
+
+    sent_while_blocked, fast_deltas, slow_deltas = asyncio.run(asyncio.wait_for(scenario(), timeout=5.0))
+
+    # Two in the slow queue and one waiting to be put; an unbounded queue would take all 21
+    assert sent_while_blocked <= 3
+    expected = [str(i) for i in range(20)] + ['']
+    assert [d.content for d in fast_deltas] == expected
+    assert [d.content for d in slow_deltas] == expected
+    assert seen_by_sink == expected
+
+
+def test_closed_subscriber_does_not_block_others(streaming, base, make_provider):
+    """Closing a subscription mid-stream lets the rest of the stream through"""
+    provider = make_provider('source', _chunks(base, *[str(i) for i in range(10)]))
+
+    async def scenario():
+        fan_out = streaming.StreamFanOut(streaming.NormalizedStream(provider, _messages(base)), max_pending=1)
+        leaver = fan_out.subscribe()
+        stayer = fan_out.subscribe()
+        fan_out.start()
+
+        first = await leaver.__anext__()
+        leaver.close()
+        rest = await _collect(stayer)
+        await fan_out.run()
+        return first, rest, [item async for item in leaver]
+
+    first, rest, after_close = asyncio.run(asyncio.wait_for(scenario(), timeout=2.0))
+
+    assert first.content == '0'
+    assert [d.content for d in rest] == [str(i) for i in range(10)] + ['']
+    assert after_close == []
+
+
+def test_fan_out_delivers_source_errors(streaming, base, make_provider):
+    """A failing source ends every subscription with the provider error"""
+    provider = make_provider('source', [base.StreamChunk(content='a'), RuntimeError('dropped')])
+
+    async def scenario():
+        fan_out = streaming.StreamFanOut(streaming.NormalizedStream(provider, _messages(base)))
+        subscription = fan_out.subscribe()
+        fan_out.start()
+        received = []
+        with pytest.raises(base.ProviderError, match='dropped'):
+            async for delta in subscription:
+                received.append(delta.content)
+        with pytest.raises(base.ProviderError):
+            await fan_out.run()
+        return received
+
+    assert asyncio.run(scenario()) == ['a']
+
+
+async def _collect(subscription, delay=0.0):
+    deltas = []
+    async for delta in subscription:
+        deltas.append(delta)
+        if delay:
+            await asyncio.sleep(delay)
+    return deltas
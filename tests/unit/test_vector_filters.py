@@ -0,0 +1,153 @@
+"""
+Unit tests for metadata-filtered vector search, checked against a
+brute-force filtered scan.
+"""
+
+import pytest
+
+COUNT = 6000
+
+
+@pytest.fixture
+def np():
+    return pytest.importorskip('numpy')
+
+
+@pytest.fixture
+def memory(load_vector_db_module):
+    return load_vector_db_module('memory')
+
+
+@pytest.fixture
+def filters(load_vector_db_module):
+    return load_vector_db_module('filters')
+
+
+def _metadata(i):
+    return {'lang': ['en', 'nl', 'de'][i % 3], 'tag': i % 7, 'labels': ['even' if i % 2 == 0 else 'odd']}
+
+
+@pytest.fixture
+def dataset(np):
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(64, 16)).astype(np.float32)
+    vectors = centers[rng.integers(0, 64, COUNT)] + rng.normal(scale=0.3, size=(COUNT, 16)).astype(np.float32)
+    queries = vectors[rng.choice(COUNT, 8, replace=False)] + rng.normal(scale=0.1, size=(8, 16)).astype(np.float32)
+    return vectors, queries
+
+
+@pytest.fixture
+def make_manager(memory, dataset, tmp_path):
+    managers = []
+
+    def make(**kwargs):
+        vectors, _ = dataset
+        manager = memory.MemoryManager(16, cold_path=str(tmp_path / str(len(managers))), max_hot_size=200, **kwargs)
+        manager.add_embeddings([f'v{i}' for i in range(COUNT)], vectors, [_metadata(i) for i in range(COUNT)])
+        manager.prefetch([f'v{i}' for i in range(0, COUNT, 30)])
+        managers.append(manager)
+        return manager
+
+    yield make
+    for manager in managers:
+        manager.close()
+
+
+def _brute_force(np, vectors, queries, allowed, k):
+    """Exact top-k ids among the allowed rows"""
+    rows = np.flatnonzero(allowed)
+    normalized = vectors[rows] / np.linalg.norm(vectors[rows], axis=1, keepdims=True)
+    results = []
+    for query in queries:
+        scores = normalized @ (query / np.linalg.norm(query))
+        results.append([f'v{rows[i]}' for i in np.argsort(-scores, kind='stable')[:k]])
+    return results
+
+
+def _ids(results):
+    return [[id_ for id_, _ in found] for found in results]
+
+
+def _mask(np, predicate):
+    return np.array([predicate(_metadata(i)) for i in range(COUNT)])
+
+
+@pytest.mark.parametrize('exact_filter_size', [50_000, 0])
+def test_filtered_batch_matches_brute_force(np, dataset, make_manager, exact_filter_size):
+    """Both the exhaustive and the IVF filter paths return the exact filtered top-k"""
+    vectors, queries = dataset
+    manager = make_manager(exact_filter_size=exact_filter_size)
+    assert manager.index.is_trained
+    query_filter = {'lang': ['nl', 'de'], 'tag': [1, 2, 5]}
+    allowed = _mask(np, lambda m: m['lang'] in ('nl', 'de') and m['tag'] in (1, 2, 5))
+
+    # Probing every list makes the IVF path exact as well
+    results = manager.search_batch(queries, 10, nprobe=len(manager.index.lists), filters=query_filter)
+
+    assert _ids(results) == _brute_force(np, vectors, queries, allowed, 10)
+    for found in results:
+        scores = [score for _, score in found]
+        assert scores == sorted(scores, reverse=True)
+
+
+def test_list_valued_metadata_filter(np, dataset, make_manager):
+    """List metadata values match any of their elements"""
+    vectors, queries = dataset
+    manager = make_manager()
+    allowed = _mask(np, lambda m: 'odd' in m['labels'] and m['lang'] == 'en')
+
+    results = manager.search_batch(queries, 5, filters={'labels': 'odd', 'lang': 'en'})
+
+    assert _ids(results) == _brute_force(np, vectors, queries, allowed, 5)
+
+
+def test_quantized_filtered_search_respects_filter(np, dataset, make_manager):
+    """Int8 candidates are reranked exactly and never leave the filtered set"""
+    vectors, queries = dataset
+    manager = make_manager(quantize=True)
+    allowed = _mask(np, lambda m: m['tag'] == 3)
+
+    results = manager.search_batch(queries, 10, filters={'tag': 3})
+
+    expected = _brute_force(np, vectors, queries, allowed, 10)
+    assert all(allowed[int(id_[1:])] for found in _ids(results) for id_ in found)
+    hits = sum(len(set(found) & set(exact)) for found, exact in zip(_ids(results), expected))
+    assert hits / (len(queries) * 10) >= 0.95
+
+
+@pytest.mark.parametrize('query_filter', [
+    {'lang': 'fr'},
+    {'missing_field': 1},
+    {'lang': 'en', 'tag': []},
+    {'lang': 'en', 'labels': 'odd', 'tag': 100},
+])
+@pytest.mark.parametrize('options', [{}, {'exact_filter_size': 0}, {'quantize': True}])
+def test_filter_matching_nothing_returns_empty(np, dataset, make_manager, query_filter, options):
+    """A filter with no matches gives an empty list per query"""
+    _, queries = dataset
+    manager = make_manager(**options)
+
+    assert manager.search_batch(queries, 10, filters=query_filter) == [[] for _ in queries]
+    assert manager.search(queries[0], 3, filters=query_filter) == []
+
+
+def test_updated_metadata_moves_between_filters(np, dataset, make_manager):
+    """Re-adding an id with new metadata drops it from its old filter values"""
+    vectors, _ = dataset
+    manager = make_manager()
+    manager.add_embedding('v3', vectors[3], {'lang': 'fr'})
+
+    assert manager.search(vectors[3], 1, filters={'lang': 'fr'})[0][0] == 'v3'
+    assert 'v3' not in {id_ for id_, _ in manager.search(vectors[3], 20, filters={'lang': 'en'})}
+
+
+def test_metadata_index_combines_clauses(np, filters):
+    """Values for one field are ORed and fields are ANDed"""
+    index = filters.MetadataIndex()
+    for key in range(20):
+        index.add(key, {'parity': key % 2, 'bucket': key // 5, 'nested': {'ignored': True}})
+    index.remove(4, {'parity': 0, 'bucket': 0})
+
+    assert index.match({'parity': 0, 'bucket': [0, 3]}).tolist() == [0, 2, 16, 18]
+    assert index.match({'nested': {'ignored': True}}).tolist() == []
+    assert index.match({'parity': 1, 'bucket': 9}).dtype == np.int64
@@ -0,0 +1,214 @@
+"""
+Unit tests for the vector database storage: IVF index, int8 quantizer,
+cold tier and hot-to-cold demotion.
+"""
+
+import pytest
+
+
+@pytest.fixture
+def np():
+    return pytest.importorskip('numpy')
+
+
+@pytest.fixture
+def ann(load_vector_db_module):
+    return load_vector_db_module('ann')
+
+
+@pytest.fixture
+def tiers(load_vector_db_module):
+    return load_vector_db_module('tiers')
+
+
+@pytest.fixture
+def memory(load_vector_db_module):
+    return load_vector_db_module('memory')
+
+
+def _clustered(np, count, dim=32, clusters=64, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    noise = rng.normal(scale=0.3, size=(count, dim)).astype(np.float32)
+    return centers[rng.integers(0, clusters, count)] + noise
+
+
+def _exact_topk(np, ann, vectors, queries, k):
+    scores = ann.normalize(queries) @ ann.normalize(vectors).T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def _recall(results, exact):
+    hits = sum(
+        len({id_ for id_, _ in found} & {f'v{i}' for i in row})
+        for found, row in zip(results, exact)
+    )
+    return hits / exact.size
+
+
+def _list_members(index):
+    return [set(members.view().tolist()) for members in index.lists]
+
+
+def test_ivf_rebuild_assigns_every_key_once(np, ann):
+    """Training and rebuilding spreads all keys over the inverted lists"""
+    vectors = ann.normalize(_clustered(np, 2000))
+    index = ann.IVFIndex(32, nlist=16, min_train_size=1000)
+    index.add(np.arange(500), vectors[:500])
+
+    assert not index.is_trained and not index.needs_training()
+    assert index.needs_training(incoming=500)
+    index.train(vectors[:1000], expected_size=2000)
+    index.rebuild(np.arange(500), lambda keys: vectors[keys], block=128)
+    index.add(np.arange(500, 2000), vectors[500:])
+
+    members = _list_members(index)
+    assert len(members) == 16 and index.size == 2000
+    assert sum(len(m) for m in members) == 2000
+    assert set().union(*members) == set(range(2000))
+    for list_id, keys in enumerate(members):
+        assert all(index.list_of.data[key] == list_id for key in keys)
+    # Probing every list is exhaustive
+    assert set(index.candidates(vectors[0], nprobe=16).tolist()) == set(range(2000))
+
+
+def test_ivf_retrains_after_growth(np, ann):
+    """A trained index asks to retrain once it grows retrain_factor times"""
+    vectors = ann.normalize(_clustered(np, 100))
+    index = ann.IVFIndex(32, nlist=4, retrain_factor=4.0)
+    index.train(vectors, expected_size=100)
+    index.add(np.arange(100), vectors)
+
+    assert not index.needs_training(incoming=299)
+    assert index.needs_training(incoming=300)
+
+
+def test_ivf_move_reassigns_key(np, ann):
+    """A changed vector moves its key to the nearest list exactly once"""
+    vectors = ann.normalize(_clustered(np, 1000))
+    index = ann.IVFIndex(32, nlist=8)
+    index.train(vectors, expected_size=1000)
+    index.add(np.arange(1000), vectors)
+
+    key = 7
+    target = next(i for i in range(1000) if index.list_of.data[i] != index.list_of.data[key])
+    index.move(key, vectors[target])
+
+    members = _list_members(index)
+    new_list = int(index.list_of.data[target])
+    assert int(index.list_of.data[key]) == new_list
+    assert [key in m for m in members].count(True) == 1
+    assert key in members[new_list]
+    assert sum(len(m) for m in members) == 1000
+
+
+def test_scalar_quantizer_scores_close_to_exact(np, ann):
+    """Int8 scores stay within quantization error and storage grows on demand"""
+    vectors = ann.normalize(_clustered(np, 300))
+    queries = ann.normalize(_clustered(np, 5, seed=1))
+    quantizer = ann.ScalarQuantizer(32, capacity=16)
+    keys = np.arange(300)
+    quantizer.set(keys, vectors)
+
+    approx = quantizer.score(queries, keys)
+
+    assert np.abs(approx - queries @ vectors.T).max() < 0.02
+    assert quantizer.codes.dtype == np.int8 and len(quantizer.codes) >= 300
+    assert quantizer.nbytes < vectors.nbytes / 2
+
+
+def test_cold_tier_reopen_last_line_wins(np, tiers, tmp_path):
+    """Reopening maps each id to its latest row and metadata"""
+    cold = tiers.ColdTier(str(tmp_path), dim=4, grow_rows=2)
+    first = np.arange(4, dtype=np.float32)
+    cold.append('a', first, {'version': 1})
+    cold.append_many(['b', 'c'], np.ones((2, 4), dtype=np.float32), [{'tag': 'x'}, None])
+    cold.append('a', -first, {'version': 2})
+    cold.close()
+
+    reopened = tiers.ColdTier(str(tmp_path), dim=4, grow_rows=2)
+
+    assert reopened.size == 4
+    assert reopened.rows == {'a': 3, 'b': 1, 'c': 2}
+    assert reopened.metadata['a'] == {'version': 2} and reopened.metadata['c'] == {}
+    assert np.array_equal(reopened.get(reopened.rows['a']), -first)
+    assert np.array_equal(reopened.take(np.array([3, 0])), np.stack([-first, first]))
+    # Appends after reopen continue past the superseded rows
+    assert reopened.append('d', first) == 4
+    reopened.close()
+
+
+def test_demotion_keeps_lru_hot_and_values(np, memory, tmp_path):
+    """Least recently used vectors are demoted and read back unchanged"""
+    vectors = _clustered(np, 5, dim=8)
+    manager = memory.MemoryManager(8, cold_path=str(tmp_path), max_hot_size=3)
+    for i in range(5):
+        manager.add_embedding(f'v{i}', vectors[i], {'i': i})
+
+    status = manager.get_status()
+    assert list(manager.hot) == ['v2', 'v3', 'v4']
+    assert status['hot_count'] == 3 and status['cold_count'] == 2 and status['evictions'] == 2
+
+    # Reading a cold vector promotes it and demotes the new LRU entry
+    assert np.array_equal(manager.get_embedding('v0'), vectors[0])
+    assert list(manager.hot) == ['v3', 'v4', 'v0']
+
+    # Once every vector has a current cold copy, demotion writes nothing
+    manager.flush()
+    rows = manager.cold.size
+    for i in range(5):
+        assert np.array_equal(manager.get_embedding(f'v{i}'), vectors[i])
+    assert manager.cold.size == rows
+    assert manager.get_status()['evictions'] == 7
+    manager.close()
+
+    reopened = memory.MemoryManager(8, cold_path=str(tmp_path), max_hot_size=3)
+    assert reopened.get_status()['total_count'] == 5
+    assert reopened.search(vectors[3], 1)[0][0] == 'v3'
+    reopened.close()
+
+
+def test_byte_threshold_demotes(np, memory, tmp_path):
+    """The hot tier stays under max_hot_mb, including serialized metadata"""
+    manager = memory.MemoryManager(256, cold_path=str(tmp_path), max_hot_size=1000, max_hot_mb=0.005)
+    for i in range(10):
+        manager.add_embedding(f'v{i}', np.ones(256, dtype=np.float32), {'i': i})
+
+    # 1 KiB per vector plus 8 bytes of metadata: five fit in 0.005 MB
+    assert list(manager.hot) == [f'v{i}' for i in range(5, 10)]
+    assert manager.get_status()['ram_usage_mb'] <= 0.005
+    manager.close()
+
+
+def test_set_config_keeps_explicit_max_hot_mb(memory, tmp_path):
+    """Changing threshold_pct does not discard an explicit byte cap"""
+    manager = memory.MemoryManager(8, cold_path=str(tmp_path / 'capped'), max_hot_mb=1.5)
+    manager.set_config(threshold_pct=50)
+    assert manager.threshold_mb == 1.5
+    manager.set_config(max_hot_mb=0.5)
+    assert manager.threshold_mb == 0.5
+    manager.close()
+
+    manager = memory.MemoryManager(8, cold_path=str(tmp_path / 'pct'))
+    manager.set_config(threshold_pct=50)
+    assert manager.threshold_mb == manager.total_ram_mb * 50 / 100
+    manager.close()
+
+
+@pytest.mark.parametrize('quantize, min_recall', [(False, 1.0), (True, 0.95)])
+def test_search_recall_across_tiers(np, ann, memory, tmp_path, quantize, min_recall):
+    """Probing every list matches an exact scan; int8 reranking stays close"""
+    vectors = _clustered(np, 6000)
+    queries = _clustered(np, 20, seed=1)
+    manager = memory.MemoryManager(32, cold_path=str(tmp_path), max_hot_size=500, quantize=quantize)
+    manager.add_embeddings([f'v{i}' for i in range(6000)], vectors)
+    manager.prefetch([f'v{i}' for i in range(0, 6000, 12)])
+    assert manager.index.is_trained
+    assert manager.get_status()['hot_count'] == 500
+
+    results = manager.search_batch(queries, 10, nprobe=len(manager.index.lists))
+
+    assert _recall(results, _exact_topk(np, ann, vectors, queries, 10)) >= min_recall
+    # Searching reads candidates in place and promotes nothing
+    assert manager.get_status()['hot_count'] == 500
+    manager.close()